@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for shadow learning intervention clustering
+
+Generates synthetic event embeddings around topic centers (plus unclustered
+noise) and compares the IncrementalClusterer with the previous greedy
+clustering over a full n x n cosine_similarity matrix. The previous
+implementation is run on a sample, checked for identical output and
+extrapolated, since its matrix alone needs 8 * n^2 bytes.
+
+Usage:
+    python benchmarks/clustering_benchmark.py [--sizes 10000 100000] [--dim 384]
+        [--topics 500] [--noise 0.2] [--legacy-sample 4000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pattern_clustering import IncrementalClusterer
+
+def synthetic_embeddings(size: int, dim: int, topics: int, noise: float, seed: int = 11) -> np.ndarray:
+    """Events near one of `topics` centers; a `noise` fraction is unclustered"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    vectors = centers[rng.integers(0, topics, size)]
+    # Per-dimension jitter giving a typical cosine of ~0.9 to the center
+    vectors = vectors + rng.standard_normal((size, dim)).astype(np.float32) * (0.45 / np.sqrt(dim))
+    unclustered = rng.random(size) < noise
+    vectors[unclustered] = rng.standard_normal((int(unclustered.sum()), dim)).astype(np.float32)
+    return vectors
+
+def cosine_similarity(matrix: np.ndarray) -> np.ndarray:
+    """Same result as sklearn's cosine_similarity for a single dense matrix"""
+    normalized = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return normalized @ normalized.T
+
+def legacy_clustering(embeddings, threshold: float = 0.8):
+    """Previous ShadowLearningEngine._simple_clustering"""
+    embeddings_array = np.array(embeddings)
+    similarity_matrix = cosine_similarity(embeddings_array)
+
+    clusters = []
+    used_indices = set()
+    for i in range(len(embeddings)):
+        if i in used_indices:
+            continue
+        cluster = [i]
+        used_indices.add(i)
+        for j in range(i + 1, len(embeddings)):
+            if j in used_indices:
+                continue
+            if similarity_matrix[i][j] >= threshold:
+                cluster.append(j)
+                used_indices.add(j)
+        if len(cluster) > 1:
+            clusters.append(cluster)
+    return clusters
+
+def cluster_all(vectors: np.ndarray, threshold: float) -> IncrementalClusterer:
+    clusterer = IncrementalClusterer(threshold=threshold)
+    clusterer.add_many(list(range(len(vectors))), vectors)
+    return clusterer
+
+def main():
+    parser = argparse.ArgumentParser(description="Intervention clustering benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--legacy-sample", type=int, default=4000)
+    parser.add_argument("--incremental-batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Previous implementation on a sample, checked against the clusterer
+    sample = synthetic_embeddings(args.legacy_sample, args.dim, args.topics, args.noise)
+    start = time.perf_counter()
+    legacy = legacy_clustering(sample.tolist(), args.threshold)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    engine = cluster_all(sample, args.threshold).clusters(min_size=2)
+    engine_time = time.perf_counter() - start
+    print(f"Sample of {args.legacy_sample}: legacy {legacy_time:.2f}s, clusterer {engine_time:.3f}s, "
+          f"identical clusters: {legacy == engine} ({len(engine)} clusters)")
+
+    for size in args.sizes:
+        vectors = synthetic_embeddings(size, args.dim, args.topics, args.noise)
+        base = size - args.incremental_batch
+
+        start = time.perf_counter()
+        clusterer = cluster_all(vectors, args.threshold)
+        full_time = time.perf_counter() - start
+        stats = clusterer.get_stats()
+
+        incremental = cluster_all(vectors[:base], args.threshold)
+        start = time.perf_counter()
+        incremental.add_many(list(range(base, size)), vectors[base:])
+        incremental_time = time.perf_counter() - start
+        same = incremental.clusters(min_size=2) == clusterer.clusters(min_size=2)
+
+        scale = (size / args.legacy_sample) ** 2
+        block_bytes = min(size, clusterer.block_size) * stats["clusters"] * 5  # float32 sims + bool mask
+        print(f"\n{size} events ({args.dim}d):")
+        print(f"  full clustering {full_time:.2f}s -> {stats['clusters']} leaders, "
+              f"{stats['multi_item_clusters']} clusters with 2+ events")
+        print(f"  incremental add of {args.incremental_batch} events to {base}: {incremental_time:.3f}s "
+              f"(matches full run: {same})")
+        print(f"  peak similarity block ~{block_bytes / 2**20:.0f} MB vs n x n matrix {8 * size * size / 2**30:.1f} GB")
+        print(f"  legacy extrapolated: {legacy_time * scale:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Consensus Engine para Chain-of-Debate SuperMCP
+
+Calcula el consenso entre respuestas de modelos usando embeddings de un
+sentence-transformer local. Cada respuesta se embebe una sola vez: los
+vectores se cachean por (espacio de embedding, hash de contenido) y se
+reutilizan entre rondas y en la síntesis final; vectores del modelo y del
+fallback hasheado nunca se comparan entre sí.
+
+Cálculo por ronda:
+1. Embeddings normalizados solo para contenidos no cacheados (un batch)
+2. Matriz de similitud coseno con un único producto matricial
+3. Consenso = media del triángulo superior de la matriz
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+    logging.getLogger(__name__).warning(
+        "sentence-transformers not available, using hashed bag-of-words vectors for consensus"
+    )
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+@dataclass
+class ConsensusScore:
+    """Resultado del análisis de consenso de una ronda"""
+    score: float                  # Similitud media entre pares
+    similarity_matrix: np.ndarray
+    agreement: List[float]        # Similitud media de cada respuesta con el resto
+    representative_index: int     # Respuesta más cercana al resto (medoid)
+
+class ConsensusEngine:
+    """
+    Motor de consenso basado en embeddings con cache por hash de contenido
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        max_cache_size: int = 4096,
+        batch_size: int = 32,
+        fallback_dimension: int = 1024
+    ):
+        self.model_name = model_name or os.getenv('CONSENSUS_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+        self.max_cache_size = max_cache_size
+        self.batch_size = batch_size
+        self.fallback_dimension = fallback_dimension
+
+        self.model = None
+        self._model_failed = False  # Un fallo de carga no se reintenta en cada llamada
+        self._model_lock = asyncio.Lock()
+        self.vector_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+
+        self.stats = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "texts_encoded": 0,
+            "rounds_scored": 0
+        }
+
+    async def _ensure_model(self):
+        """Cargar el modelo de embeddings en un hilo la primera vez"""
+        if self.model is not None or self._model_failed or not SENTENCE_TRANSFORMERS_AVAILABLE:
+            return
+        async with self._model_lock:
+            if self.model is None and not self._model_failed:
+                try:
+                    self.model = await asyncio.to_thread(SentenceTransformer, self.model_name)
+                    logger.info(f"🧠 Consensus embedding model loaded: {self.model_name}")
+                except Exception as e:
+                    self._model_failed = True
+                    logger.error(f"Error loading consensus embedding model, using hashed vectors: {e}")
+
+    @property
+    def space(self) -> str:
+        """Espacio de embedding actual: los vectores solo se comparan dentro de uno"""
+        if self.model is not None:
+            return f"model:{self.model_name}"
+        return f"hashed:{self.fallback_dimension}"
+
+    @staticmethod
+    def content_key(text: str) -> str:
+        """Clave de cache por hash de contenido"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _hashed_vectors(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectores bag-of-words con feature hashing (fallback sin modelo)"""
+        vectors = np.zeros((len(texts), self.fallback_dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                vectors[row, zlib.crc32(word.encode('utf-8')) % self.fallback_dimension] += 1.0
+        return vectors
+
+    def _encode(self, texts: List[str], model=None) -> np.ndarray:
+        """Codificar textos en vectores float32 normalizados (hasheados si no hay modelo)"""
+        if model is not None:
+            vectors = model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ).astype(np.float32)
+        else:
+            vectors = self._hashed_vectors(texts)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Obtener vectores para textos, codificando solo los no cacheados"""
+        await self._ensure_model()
+        # Fijar modelo y espacio para toda la llamada: nunca se apilan vectores de dos espacios
+        model = self.model
+        space = self.space
+        keys = [(space, self.content_key(text)) for text in texts]
+
+        missing: Dict[Tuple[str, str], str] = {}
+        for key, text in zip(keys, texts):
+            if key in self.vector_cache:
+                self.vector_cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+            elif key not in missing:
+                missing[key] = text
+                self.stats["cache_misses"] += 1
+
+        if missing:
+            encoded = await asyncio.to_thread(self._encode, list(missing.values()), model)
+            self.stats["texts_encoded"] += len(missing)
+            for key, vector in zip(missing, encoded):
+                self.vector_cache[key] = vector
+
+        vectors = np.stack([self.vector_cache[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+        # Evict only after assembling this batch so its own vectors stay available
+        while len(self.vector_cache) > self.max_cache_size:
+            self.vector_cache.popitem(last=False)
+
+        return vectors
+
+    async def score(self, texts: Sequence[str]) -> ConsensusScore:
+        """Calcular consenso de una ronda con una matriz de similitud vectorizada"""
+        n = len(texts)
+        if n < 2:
+            return ConsensusScore(
+                score=0.0,
+                similarity_matrix=np.ones((n, n), dtype=np.float32),
+                agreement=[0.0] * n,
+                representative_index=0
+            )
+
+        vectors = await self.embed(texts)
+        matrix = np.clip(vectors @ vectors.T, -1.0, 1.0)
+
+        off_diagonal = matrix.sum(axis=1) - np.diag(matrix)
+        agreement = off_diagonal / (n - 1)
+        score = float(np.triu(matrix, k=1).sum() / (n * (n - 1) / 2))
+
+        self.stats["rounds_scored"] += 1
+
+        return ConsensusScore(
+            score=max(0.0, score),
+            similarity_matrix=matrix,
+            agreement=[float(a) for a in agreement],
+            representative_index=int(np.argmax(agreement))
+        )
+
+    async def position_shift(self, previous: Sequence[str], current: Sequence[str]) -> List[float]:
+        """Distancia coseno entre la posición anterior y la nueva de cada participante"""
+        if not previous or len(previous) != len(current):
+            return []
+        vectors = await self.embed(list(previous) + list(current))
+        n = len(previous)
+        similarities = np.einsum('ij,ij->i', vectors[:n], vectors[n:])
+        return [float(1.0 - s) for s in similarities]
+
+    async def rank_by_centrality(self, texts: Sequence[str]) -> List[int]:
+        """Índices de textos ordenados del más al menos representativo"""
+        if len(texts) < 2:
+            return list(range(len(texts)))
+        result = await self.score(texts)
+        return [int(i) for i in np.argsort(result.agreement)[::-1]]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Métricas del motor de consenso"""
+        lookups = self.stats["cache_hits"] + self.stats["cache_misses"]
+        return {
+            **self.stats,
+            "cache_size": len(self.vector_cache),
+            "cache_hit_rate": self.stats["cache_hits"] / lookups if lookups else 0.0,
+            "backend": self.model_name if self.model is not None else "hashed_bow"
+        }
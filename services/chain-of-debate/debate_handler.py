@@ -23,7 +23,7 @@ import json
 import logging
 import time
 import os
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 import openai
@@ -33,6 +33,8 @@ from datetime import datetime
 
 from dynamic_roles import DynamicRoleOrchestrator, RoleAssignment, RoleType
 from model_resilience import ModelResilienceOrchestrator
+from consensus_engine import ConsensusEngine
+from round_scheduler import RoundScheduler, RoundOutcome
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +59,7 @@ class ModelResponse:
     tokens_used: int = 0
     response_time: float = 0.0
     cost: float = 0.0
+    is_fallback: bool = False  # Respuesta de emergencia de un modelo que falló
 
 @dataclass
 class DebateRound:
@@ -67,6 +70,10 @@ class DebateRound:
     consensus_score: float
     synthesis: str
     duration: float
+    agreement: Optional[Dict[str, float]] = None       # Acuerdo de cada modelo con el resto
+    position_shift: Optional[Dict[str, float]] = None  # Cambio de posición vs ronda anterior
+    closed_early: bool = False                         # Cerrada por quórum de consenso
+    participant_status: Optional[Dict[str, str]] = None
 
 @dataclass
 class DebateResult:
@@ -104,6 +111,15 @@ class DebateHandler:
         self.consensus_threshold = 0.7
         self.max_response_time = 30  # segundos
         
+        # Consenso basado en embeddings con vectores cacheados entre rondas
+        self.consensus_engine = ConsensusEngine()
+        
+        # Participantes en paralelo con timeout propio y cierre por quórum
+        self.round_scheduler = RoundScheduler(
+            resilience_orchestrator=resilience_orchestrator,
+            participant_timeout=self.max_response_time
+        )
+        
         # Métricas
         self.debate_history = []
         
@@ -136,7 +152,8 @@ class DebateHandler:
         domain: str,
         roles: Dict[str, RoleAssignment],
         context: Dict[str, Any] = None,
-        max_rounds: int = None
+        max_rounds: int = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
     ) -> Dict[str, Any]:
         """
         Conducir un debate completo entre modelos especializados
@@ -147,6 +164,7 @@ class DebateHandler:
             roles: Asignaciones de roles por modelo
             context: Contexto adicional
             max_rounds: Máximo número de rondas
+            progress_callback: Recibe respuestas parciales y cierres de ronda
             
         Returns:
             Resultado completo del debate
@@ -164,7 +182,7 @@ class DebateHandler:
             
             # Ronda inicial: Declaraciones de apertura
             opening_round = await self._conduct_opening_statements(
-                content, domain, roles, context
+                content, domain, roles, context, progress_callback
             )
             rounds.append(opening_round)
             total_cost += sum(r.cost for r in opening_round.responses)
@@ -178,7 +196,7 @@ class DebateHandler:
             else:
                 # Rondas de debate iterativo
                 final_result, quality_score = await self._conduct_debate_rounds(
-                    content, domain, roles, context, rounds, max_rounds
+                    content, domain, roles, context, rounds, max_rounds, progress_callback
                 )
                 total_cost += sum(
                     sum(r.cost for r in round.responses) 
@@ -227,64 +245,90 @@ class DebateHandler:
         content: str,
         domain: str,
         roles: Dict[str, RoleAssignment],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
     ) -> DebateRound:
         """Conducir ronda de declaraciones de apertura"""
         
-        round_start = time.time()
-        responses = []
-        
         # Preparar prompts especializados
-        model_tasks = []
+        participants = {}
         for model_name, role_assignment in roles.items():
             role_prompt = self.role_orchestrator.get_role_prompt(
                 role_assignment.role, content, context
             )
-            model_tasks.append(
-                self._get_model_response(model_name, role_prompt, role_assignment.role)
+            participants[model_name] = self._participant_call(
+                model_name, role_prompt, role_assignment.role
             )
         
-        # Ejecutar en paralelo con timeouts
-        try:
-            responses = await asyncio.wait_for(
-                asyncio.gather(*model_tasks, return_exceptions=True),
-                timeout=self.max_response_time
-            )
-            
-            # Filtrar errores y fallbacks
-            valid_responses = []
-            for response in responses:
-                if isinstance(response, ModelResponse):
-                    valid_responses.append(response)
-                elif isinstance(response, Exception):
-                    logger.warning(f"Model response error: {response}")
-                    # Usar fallback si es disponible
-                    fallback_response = await self.resilience_orchestrator.get_fallback_response(
-                        content, str(response)
-                    )
-                    if fallback_response:
-                        valid_responses.append(fallback_response)
-            
-        except asyncio.TimeoutError:
-            logger.warning("Opening statements timeout - using available responses")
-            valid_responses = [r for r in responses if isinstance(r, ModelResponse)]
-        
-        # Calcular consenso inicial
-        consensus_score = self._calculate_consensus(valid_responses)
-        
-        # Generar síntesis inicial
-        synthesis = self._synthesize_responses(valid_responses, domain)
+        return await self._run_scheduled_round(
+            1, "Opening Statements", participants, domain, progress_callback
+        )
+    
+    def _participant_call(self, model_name: str, prompt: str, role: RoleType):
+        """Fábrica de la llamada de un participante para el scheduler"""
+        return lambda: self._get_model_response(model_name, prompt, role)
+    
+    async def _run_scheduled_round(
+        self,
+        round_number: int,
+        topic: str,
+        participants: Dict[str, Callable],
+        domain: str,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> DebateRound:
+        """Ejecutar participantes en paralelo y construir la ronda"""
+        
+        async def quorum_consensus(responses: List[ModelResponse]) -> float:
+            score, _ = await self._calculate_consensus(responses)
+            return score
+        
+        outcome: RoundOutcome = await self.round_scheduler.run_round(
+            round_number,
+            participants,
+            consensus_fn=quorum_consensus,
+            consensus_threshold=self.consensus_threshold,
+            on_partial=progress_callback
+        )
+        valid_responses = outcome.responses
+        
+        if not valid_responses:
+            logger.warning(f"Round {round_number} produced no responses")
         
-        round_duration = time.time() - round_start
+        # Evaluar consenso (vectores ya cacheados por la comprobación de quórum)
+        consensus_score, agreement = await self._calculate_consensus(valid_responses)
+        synthesis = self._synthesize_responses(valid_responses, domain)
         
-        return DebateRound(
-            round_number=1,
-            topic="Opening Statements",
+        debate_round = DebateRound(
+            round_number=round_number,
+            topic=topic,
             responses=valid_responses,
             consensus_score=consensus_score,
             synthesis=synthesis,
-            duration=round_duration
+            duration=outcome.duration,
+            agreement=agreement,
+            closed_early=outcome.closed_early,
+            participant_status={
+                name: participant.status for name, participant in outcome.participants.items()
+            }
         )
+        
+        if progress_callback is not None:
+            try:
+                result = progress_callback({
+                    "type": "round_completed",
+                    "round": round_number,
+                    "topic": topic,
+                    "consensus": consensus_score,
+                    "closed_early": outcome.closed_early,
+                    "participants": debate_round.participant_status,
+                    "duration": outcome.duration
+                })
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Progress callback error: {e}")
+        
+        return debate_round
     
     async def _conduct_debate_rounds(
         self,
@@ -293,7 +337,8 @@ class DebateHandler:
         roles: Dict[str, RoleAssignment],
         context: Dict[str, Any],
         rounds: List[DebateRound],
-        max_rounds: int
+        max_rounds: int,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
     ) -> Tuple[str, float]:
         """Conducir rondas iterativas de debate"""
         
@@ -322,7 +367,12 @@ class DebateHandler:
             
             # Generar prompts de debate
             debate_round = await self._conduct_debate_round(
-                content, domain, roles, context, debate_context, round_num
+                content, domain, roles, context, debate_context, round_num, progress_callback
+            )
+            
+            # Cambio de posición por modelo (vectores de la ronda anterior ya cacheados)
+            debate_round.position_shift = await self._calculate_position_shift(
+                previous_round, debate_round
             )
             
             rounds.append(debate_round)
@@ -341,49 +391,23 @@ class DebateHandler:
         roles: Dict[str, RoleAssignment],
         context: Dict[str, Any],
         debate_context: Dict[str, Any],
-        round_number: int
+        round_number: int,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
     ) -> DebateRound:
         """Conducir una ronda individual de debate"""
         
-        round_start = time.time()
-        responses = []
-        
         # Prompts de debate iterativo
-        model_tasks = []
+        participants = {}
         for model_name, role_assignment in roles.items():
             debate_prompt = self._generate_debate_prompt(
                 role_assignment.role, content, context, debate_context
             )
-            model_tasks.append(
-                self._get_model_response(model_name, debate_prompt, role_assignment.role)
+            participants[model_name] = self._participant_call(
+                model_name, debate_prompt, role_assignment.role
             )
         
-        # Ejecutar debate round
-        try:
-            responses = await asyncio.wait_for(
-                asyncio.gather(*model_tasks, return_exceptions=True),
-                timeout=self.max_response_time
-            )
-            
-            valid_responses = [r for r in responses if isinstance(r, ModelResponse)]
-            
-        except asyncio.TimeoutError:
-            logger.warning(f"Round {round_number} timeout")
-            valid_responses = [r for r in responses if isinstance(r, ModelResponse)]
-        
-        # Evaluar consenso
-        consensus_score = self._calculate_consensus(valid_responses)
-        synthesis = self._synthesize_responses(valid_responses, domain)
-        
-        round_duration = time.time() - round_start
-        
-        return DebateRound(
-            round_number=round_number,
-            topic=f"Debate Round {round_number}",
-            responses=valid_responses,
-            consensus_score=consensus_score,
-            synthesis=synthesis,
-            duration=round_duration
+        return await self._run_scheduled_round(
+            round_number, f"Debate Round {round_number}", participants, domain, progress_callback
         )
     
     async def _get_model_response(
@@ -407,6 +431,7 @@ class DebateHandler:
                 raise ValueError(f"Unknown model: {model_name}")
             
             response_time = time.time() - start_time
+            await self.resilience_orchestrator.report_model_success(model_name, response_time)
             
             return ModelResponse(
                 model_name=model_name,
@@ -420,12 +445,29 @@ class DebateHandler:
                 cost=response.get('cost', 0.0)
             )
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Model {model_name} error: {e}")
             # Return fallback response
-            return await self.resilience_orchestrator.get_fallback_response(
+            fallback = await self.resilience_orchestrator.get_fallback_response(
                 prompt, f"{model_name} error: {str(e)}"
             )
+            if fallback is None:
+                return None
+            
+            return ModelResponse(
+                model_name=model_name,
+                role=role,
+                content=fallback.content,
+                confidence=fallback.confidence,
+                reasoning=fallback.fallback_reason,
+                timestamp=datetime.now(),
+                tokens_used=fallback.tokens,
+                response_time=time.time() - start_time,
+                cost=fallback.cost,
+                is_fallback=True
+            )
     
     async def _call_gpt4(self, prompt: str) -> Dict[str, Any]:
         """Llamar a GPT-4"""
@@ -510,58 +552,70 @@ class DebateHandler:
             logger.error(f"Gemini API error: {e}")
             raise
     
-    def _calculate_consensus(self, responses: List[ModelResponse]) -> float:
-        """Calcular score de consenso entre respuestas"""
-        if len(responses) < 2:
-            return 0.0
-        
-        # Análisis de similitud semántica simplificado
-        # En producción usaríamos embeddings para comparación
+    async def _calculate_consensus(
+        self,
+        responses: List[ModelResponse]
+    ) -> Tuple[float, Dict[str, float]]:
+        """Calcular score de consenso entre respuestas
         
-        total_similarity = 0.0
-        comparisons = 0
+        Cada respuesta se embebe una sola vez (cache por hash de contenido) y
+        la similitud entre pares sale de una única matriz coseno. Las respuestas
+        de fallback no cuentan: dos plantillas idénticas no son un acuerdo.
+        """
+        responses = [r for r in responses if not r.is_fallback]
+        if len(responses) < 2:
+            return 0.0, {}
         
-        for i in range(len(responses)):
-            for j in range(i + 1, len(responses)):
-                similarity = self._calculate_text_similarity(
-                    responses[i].content, 
-                    responses[j].content
-                )
-                total_similarity += similarity
-                comparisons += 1
+        try:
+            result = await self.consensus_engine.score([r.content for r in responses])
+        except Exception as e:
+            logger.error(f"Consensus scoring error: {e}")
+            return 0.0, {}
         
-        consensus_score = total_similarity / comparisons if comparisons > 0 else 0.0
+        agreement = {
+            r.model_name: score for r, score in zip(responses, result.agreement)
+        }
         
         # Ajustar por confianza promedio
         avg_confidence = sum(r.confidence for r in responses) / len(responses)
-        adjusted_score = (consensus_score * 0.7) + (avg_confidence * 0.3)
+        adjusted_score = (result.score * 0.7) + (avg_confidence * 0.3)
         
-        return min(1.0, adjusted_score)
+        return min(1.0, adjusted_score), agreement
     
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Calcular similitud básica entre textos"""
-        # Implementación simplificada - en producción usar embeddings
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        if len(union) == 0:
-            return 0.0
-        
-        jaccard_similarity = len(intersection) / len(union)
+    async def _calculate_position_shift(
+        self,
+        previous_round: DebateRound,
+        current_round: DebateRound
+    ) -> Dict[str, float]:
+        """Calcular cuánto cambió la posición de cada modelo entre rondas"""
+        previous_by_model = {r.model_name: r.content for r in previous_round.responses}
+        pairs = [
+            (r.model_name, previous_by_model[r.model_name], r.content)
+            for r in current_round.responses
+            if r.model_name in previous_by_model
+        ]
+        if not pairs:
+            return {}
         
-        # Considerar longitud similar como factor positivo
-        length_similarity = 1 - abs(len(text1) - len(text2)) / max(len(text1), len(text2))
+        try:
+            shifts = await self.consensus_engine.position_shift(
+                [previous for _, previous, _ in pairs],
+                [current for _, _, current in pairs]
+            )
+        except Exception as e:
+            logger.error(f"Position shift error: {e}")
+            return {}
         
-        return (jaccard_similarity * 0.6) + (length_similarity * 0.4)
+        return {model: shift for (model, _, _), shift in zip(pairs, shifts)}
     
     def _synthesize_responses(self, responses: List[ModelResponse], domain: str) -> str:
         """Sintetizar respuestas en una conclusión coherente"""
         if not responses:
             return "No responses available for synthesis"
         
+        # Las plantillas de fallback solo se usan si ningún modelo respondió
+        responses = [r for r in responses if not r.is_fallback] or responses
+        
         if len(responses) == 1:
             return responses[0].content
         
@@ -640,6 +694,22 @@ As a senior consultant, synthesize the following multi-round debate into a final
             synthesis_prompt += f"Consensus Score: {round.consensus_score:.2f}\n"
             synthesis_prompt += f"Synthesis: {round.synthesis[:300]}...\n\n"
         
+        # Posiciones más representativas del debate (vectores ya cacheados por ronda)
+        all_responses = [r for round in rounds for r in round.responses]
+        try:
+            ranking = await self.consensus_engine.rank_by_centrality(
+                [r.content for r in all_responses]
+            )
+        except Exception as e:
+            logger.error(f"Centrality ranking error: {e}")
+            ranking = []
+        
+        if ranking:
+            synthesis_prompt += "## Most Representative Positions\n"
+            for index in ranking[:3]:
+                response = all_responses[index]
+                synthesis_prompt += f"- **{response.role.value.replace('_', ' ').title()}** ({response.model_name}): {response.content[:300]}...\n"
+        
         synthesis_prompt += """
 Provide a final synthesis that:
 1. Integrates the best insights from all rounds
@@ -713,7 +783,11 @@ Format as a structured executive summary with clear next steps.
                     "round": r.round_number,
                     "topic": r.topic,
                     "consensus": r.consensus_score,
-                    "duration": r.duration
+                    "duration": r.duration,
+                    "agreement": r.agreement or {},
+                    "position_shift": r.position_shift or {},
+                    "closed_early": r.closed_early,
+                    "participants": r.participant_status or {}
                 }
                 for r in result.rounds
             ]
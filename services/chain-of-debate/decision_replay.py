@@ -10,6 +10,9 @@ Funcionalidades:
 - Métricas de mejora cuantificables
 - Dashboard ejecutivo para justificar ROI
 - Análisis de evolución del sistema
+- Replay por lotes concurrente con presupuesto (tokens, costo, concurrencia),
+  ejecutado en un event loop propio de larga vida (sobrevive a la petición HTTP)
+- Memoización de outputs por (hash de input, hash de configuración)
 
 Beneficios Empresariales:
 - Transparencia en evolución del sistema
@@ -19,15 +22,17 @@ Beneficios Empresariales:
 """
 
 import asyncio
+import hashlib
 import json
 import logging
+import threading
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import uuid
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict
 
 # Para análisis y comparación
 import openai
@@ -70,6 +75,15 @@ class DecisionReplay:
     system_config_original: Dict[str, Any]
     system_config_current: Dict[str, Any]
     status: ReplayStatus
+    replay_tokens: int = 0
+    memoized: bool = False  # Output reutilizado de un replay con mismo input y configuración
+
+@dataclass
+class ReplayBudget:
+    """Presupuesto de un replay por lotes"""
+    max_concurrency: int = 8
+    max_cost: Optional[float] = None
+    max_tokens: Optional[int] = None
 
 @dataclass
 class ImprovementMetrics:
@@ -99,11 +113,44 @@ class DecisionReplaySystem:
     Sistema de replay de decisiones para auditoría evolutiva
     """
     
-    def __init__(self):
-        self.replays_history = []
+    def __init__(self, max_history: int = 10000, max_cache_size: int = 5000, max_batches: int = 200):
+        self.replays_history = deque(maxlen=max_history)
+        self.replays_by_task: Dict[str, DecisionReplay] = {}  # Último replay por tarea
         self.improvement_analytics = {}
         self.system_evolution_tracking = []
         
+        # Memoización de outputs y evaluaciones de modelos
+        self.max_cache_size = max_cache_size
+        self.output_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self.evaluation_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending_outputs: Dict[Tuple[str, str], asyncio.Future] = {}  # Replays en curso por clave
+        
+        # Agregados incrementales sobre el historial
+        self.aggregates = {
+            "count": 0,
+            "improved": 0,
+            "improvement_sum": 0.0,
+            "cost_reduction_sum": 0.0,
+            "cost_reduction_count": 0,
+            "speed_improvement_sum": 0.0,
+            "speed_improvement_count": 0,
+            "cost_savings_sum": 0.0,
+            "roi_sum": 0.0
+        }
+        
+        # Replays por lotes (se conservan los max_batches más recientes)
+        self.max_batches = max_batches
+        self.replay_batches: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_thread: Optional[threading.Thread] = None
+        self._batch_lock = threading.Lock()
+        self.replay_metrics = {
+            "output_cache_hits": 0,
+            "output_cache_misses": 0,
+            "evaluation_cache_hits": 0
+        }
+        self._replay_handler = None
+        
         # Configuración de evaluación
         self.evaluation_criteria = {
             "quality": 0.4,
@@ -125,7 +172,8 @@ class DecisionReplaySystem:
         self,
         original_task_id: str,
         original_data: Dict[str, Any] = None,
-        force_replay: bool = False
+        force_replay: bool = False,
+        current_config: Dict[str, Any] = None
     ) -> Dict[str, Any]:
         """
         Re-ejecutar una decisión pasada con configuración actual
@@ -133,82 +181,447 @@ class DecisionReplaySystem:
         Args:
             original_task_id: ID de la decisión original
             original_data: Datos de la decisión original (si disponible)
-            force_replay: Forzar replay aunque ya exista
+            force_replay: Forzar replay aunque ya exista (ignora la memoización)
+            current_config: Configuración actual (se obtiene si no se pasa)
             
         Returns:
             Análisis de mejora y resultados del replay
         """
         
-        replay_id = f"replay_{original_task_id}_{int(datetime.now().timestamp())}"
-        
         try:
-            logger.info(f"🔄 Starting decision replay: {replay_id}")
-            
-            # Verificar si ya existe replay reciente
-            if not force_replay:
-                existing_replay = self._find_recent_replay(original_task_id)
-                if existing_replay:
-                    logger.info(f"Using existing replay: {existing_replay.replay_id}")
-                    return self._format_replay_result(existing_replay)
-            
-            # Obtener datos de la decisión original
-            if not original_data:
-                original_data = await self._fetch_original_decision(original_task_id)
-            
-            if not original_data:
-                raise ValueError(f"Original decision data not found: {original_task_id}")
-            
-            # Configurar replay
-            replay = DecisionReplay(
-                replay_id=replay_id,
-                original_task_id=original_task_id,
-                original_timestamp=original_data.get('timestamp', datetime.now()),
-                replay_timestamp=datetime.now(),
-                original_input=original_data.get('input', ''),
-                original_output=original_data.get('output', ''),
-                original_cost=original_data.get('cost', 0.0),
-                original_duration=original_data.get('duration', 0.0),
-                replay_output='',
-                replay_cost=0.0,
-                replay_duration=0.0,
-                improvement_score=0.0,
-                improvement_types=[],
-                differences_analysis={},
-                system_config_original=original_data.get('system_config', {}),
-                system_config_current=await self._get_current_system_config(),
-                status=ReplayStatus.IN_PROGRESS
-            )
-            
-            # Ejecutar replay
-            replay_result = await self._execute_replay(replay)
-            
-            # Análisis de mejoras
-            improvement_analysis = await self._analyze_improvements(replay)
-            
-            # Actualizar replay con resultados
-            replay.status = ReplayStatus.COMPLETED
-            replay.improvement_score = improvement_analysis['improvement_score']
-            replay.improvement_types = improvement_analysis['improvement_types']
-            replay.differences_analysis = improvement_analysis['differences']
-            
-            # Guardar en historial
-            self.replays_history.append(replay)
-            
-            # Actualizar analytics
-            await self._update_improvement_analytics(replay)
-            
-            logger.info(f"✅ Replay completed: {replay_id} (improvement: {replay.improvement_score:.2f})")
-            
+            replay = await self._run_replay(original_task_id, original_data, force_replay, current_config)
             return self._format_replay_result(replay)
             
         except Exception as e:
             logger.error(f"Replay error for {original_task_id}: {e}")
             return {
-                "replay_id": replay_id,
+                "replay_id": f"replay_{original_task_id}_{int(datetime.now().timestamp())}",
                 "error": str(e),
                 "status": "failed"
             }
     
+    async def _run_replay(
+        self,
+        original_task_id: str,
+        original_data: Optional[Dict[str, Any]],
+        force_replay: bool,
+        current_config: Optional[Dict[str, Any]]
+    ) -> DecisionReplay:
+        """Ejecutar (o reutilizar) el replay de una decisión"""
+        
+        replay_id = f"replay_{original_task_id}_{int(datetime.now().timestamp())}"
+        logger.info(f"🔄 Starting decision replay: {replay_id}")
+        
+        # Verificar si ya existe replay reciente
+        if not force_replay:
+            existing_replay = self._find_recent_replay(original_task_id)
+            if existing_replay:
+                logger.info(f"Using existing replay: {existing_replay.replay_id}")
+                return existing_replay
+        
+        # Obtener datos de la decisión original
+        if not original_data:
+            original_data = await self._fetch_original_decision(original_task_id)
+        
+        if not original_data:
+            raise ValueError(f"Original decision data not found: {original_task_id}")
+        
+        # Configurar replay
+        replay = DecisionReplay(
+            replay_id=replay_id,
+            original_task_id=original_task_id,
+            original_timestamp=original_data.get('timestamp', datetime.now()),
+            replay_timestamp=datetime.now(),
+            original_input=original_data.get('input', ''),
+            original_output=original_data.get('output', ''),
+            original_cost=original_data.get('cost', 0.0),
+            original_duration=original_data.get('duration', 0.0),
+            replay_output='',
+            replay_cost=0.0,
+            replay_duration=0.0,
+            improvement_score=0.0,
+            improvement_types=[],
+            differences_analysis={},
+            system_config_original=original_data.get('system_config', {}),
+            system_config_current=current_config or await self._get_current_system_config(),
+            status=ReplayStatus.IN_PROGRESS
+        )
+        
+        # Ejecutar replay (o reutilizar el output de mismo input + configuración)
+        cache_key = (self._content_hash(replay.original_input), self._config_hash(replay.system_config_current))
+        cached_output = None if force_replay else self._cache_get(self.output_cache, cache_key)
+        
+        # Otro replay con el mismo input y configuración ya está en curso (en este
+        # mismo event loop): esperar su output
+        in_flight = self._pending_outputs.get(cache_key)
+        if (not cached_output and not force_replay and in_flight is not None
+                and in_flight.get_loop() is asyncio.get_running_loop()):
+            cached_output = await asyncio.shield(in_flight)
+        
+        if cached_output:
+            self.replay_metrics["output_cache_hits"] += 1
+            replay.replay_output = cached_output["output"]
+            # Reutilizar el output no cuesta nada: no se copia el gasto del replay original
+            replay.replay_cost = 0.0
+            replay.replay_tokens = 0
+            replay.replay_duration = cached_output["duration"]
+            replay.memoized = True
+        else:
+            self.replay_metrics["output_cache_misses"] += 1
+            pending = asyncio.get_running_loop().create_future()
+            self._pending_outputs[cache_key] = pending
+            memo = None
+            
+            try:
+                replay_result = await self._execute_replay(replay)
+                
+                # Solo se memoizan ejecuciones reales, no fallbacks ni errores
+                if not replay_result.get("fallback") and not replay_result.get("error"):
+                    memo = {
+                        "output": replay.replay_output,
+                        "cost": replay.replay_cost,
+                        "tokens": replay.replay_tokens,
+                        "duration": replay.replay_duration
+                    }
+                    self._cache_put(self.output_cache, cache_key, memo)
+            finally:
+                self._pending_outputs.pop(cache_key, None)
+                pending.set_result(memo)
+        
+        # Análisis de mejoras
+        improvement_analysis = await self._analyze_improvements(replay)
+        
+        # Actualizar replay con resultados
+        replay.status = ReplayStatus.COMPLETED
+        replay.improvement_score = improvement_analysis['improvement_score']
+        replay.improvement_types = improvement_analysis['improvement_types']
+        replay.differences_analysis = improvement_analysis['differences']
+        
+        # Guardar en historial
+        self._store_replay(replay)
+        
+        # Actualizar analytics
+        await self._update_improvement_analytics(replay)
+        
+        logger.info(f"✅ Replay completed: {replay_id} (improvement: {replay.improvement_score:.2f})")
+        
+        return replay
+    
+    async def replay_batch(
+        self,
+        task_ids: List[str],
+        decisions: Dict[str, Dict[str, Any]] = None,
+        budget: ReplayBudget = None,
+        force_replay: bool = False,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        batch_id: str = None
+    ) -> Dict[str, Any]:
+        """
+        Re-ejecutar un lote de decisiones de forma concurrente
+        
+        Args:
+            task_ids: IDs de las decisiones a re-ejecutar
+            decisions: Datos originales por task_id (si disponibles)
+            budget: Límites de concurrencia, costo y tokens
+            force_replay: Ignorar replays previos y memoización
+            progress_callback: Recibe métricas agregadas a medida que terminan los replays
+            batch_id: ID del lote (se genera si no se pasa)
+            
+        Returns:
+            Resumen del lote con métricas agregadas de ROI y calidad
+        """
+        
+        budget = budget or ReplayBudget()
+        decisions = decisions or {}
+        batch_id = batch_id or f"batch_{uuid.uuid4().hex[:12]}"
+        task_ids = list(dict.fromkeys(task_ids))  # Sin duplicados, mismo orden
+        
+        batch = self.replay_batches.get(batch_id)
+        if batch is None or batch["status"] != "pending":
+            batch = self._new_batch_state(batch_id, len(task_ids), budget)
+            self._remember_batch(batch)
+        batch["status"] = "running"
+        
+        # La configuración actual se obtiene una sola vez para todo el lote
+        current_config = await self._get_current_system_config()
+        semaphore = asyncio.Semaphore(max(1, budget.max_concurrency))
+        budget_changed = asyncio.Condition()
+        
+        logger.info(f"📦 Starting replay batch {batch_id}: {len(task_ids)} decisions "
+                    f"(concurrency: {budget.max_concurrency}, max cost: {budget.max_cost}, max tokens: {budget.max_tokens})")
+        
+        async def run_one(task_id: str) -> Tuple[str, Optional[DecisionReplay], Optional[str], bool]:
+            async with semaphore:
+                # Un replay reciente de la misma tarea no consume presupuesto
+                existing = None if force_replay else self._find_recent_replay(task_id)
+                if existing is not None:
+                    return task_id, existing, None, True
+                async with budget_changed:
+                    await budget_changed.wait_for(
+                        lambda: self._budget_exhausted(batch, budget) or self._budget_allows_start(batch, budget)
+                    )
+                    if self._budget_exhausted(batch, budget):
+                        return task_id, None, "budget_exhausted", False
+                    batch["in_flight"] += 1
+                try:
+                    replay = await self._run_replay(task_id, decisions.get(task_id), force_replay, current_config)
+                    if not replay.memoized:
+                        batch["executed"] += 1
+                        batch["spent_cost"] += replay.replay_cost
+                        batch["spent_tokens"] += replay.replay_tokens
+                    return task_id, replay, None, False
+                except Exception as e:
+                    logger.error(f"Replay error for {task_id}: {e}")
+                    return task_id, None, str(e), False
+                finally:
+                    async with budget_changed:
+                        batch["in_flight"] -= 1
+                        budget_changed.notify_all()
+        
+        tasks = [asyncio.create_task(run_one(task_id)) for task_id in task_ids]
+        
+        try:
+            for finished in asyncio.as_completed(tasks):
+                task_id, replay, error, reused = await finished
+                event = self._record_batch_result(batch, task_id, replay, error, reused)
+                
+                if progress_callback is not None:
+                    try:
+                        result = progress_callback(event)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception as e:
+                        logger.error(f"Replay progress callback error: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        batch["status"] = "completed"
+        batch["completed_at"] = datetime.now().isoformat()
+        
+        logger.info(f"✅ Replay batch {batch_id} completed: {batch['completed']} replayed, "
+                    f"{batch['memoized']} memoized, {batch['skipped']} skipped, {batch['failed']} failed")
+        
+        return self.get_batch_status(batch_id)
+    
+    def submit_batch(
+        self,
+        task_ids: List[str],
+        decisions: Dict[str, Dict[str, Any]] = None,
+        budget: ReplayBudget = None,
+        force_replay: bool = False,
+        progress_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> str:
+        """Lanzar un lote en background y devolver su ID (consultable con get_batch_status)
+        
+        El lote corre en el event loop de lotes del sistema, no en el del
+        llamador: una vista async de Flask cierra su loop al responder.
+        """
+        
+        budget = budget or ReplayBudget()
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch = self._new_batch_state(batch_id, len(set(task_ids)), budget)
+        batch["status"] = "pending"
+        self._remember_batch(batch)
+        
+        future = asyncio.run_coroutine_threadsafe(
+            self.replay_batch(task_ids, decisions, budget, force_replay, progress_callback, batch_id=batch_id),
+            self._ensure_batch_loop()
+        )
+        
+        def on_done(done):
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"Replay batch {batch_id} failed: {done.exception()}")
+                batch["status"] = "failed"
+                batch["completed_at"] = datetime.now().isoformat()
+        
+        future.add_done_callback(on_done)
+        return batch_id
+    
+    def _ensure_batch_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop de larga vida (en su propio hilo) donde corren los lotes"""
+        
+        with self._batch_lock:
+            if self._batch_loop is None or self._batch_loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="replay-batches", daemon=True)
+                thread.start()
+                self._batch_loop, self._batch_thread = loop, thread
+            return self._batch_loop
+    
+    def shutdown(self):
+        """Detener el event loop de lotes (los lotes en curso se abandonan)"""
+        
+        with self._batch_lock:
+            loop, thread = self._batch_loop, self._batch_thread
+            self._batch_loop = self._batch_thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+    
+    def _remember_batch(self, batch: Dict[str, Any]):
+        """Registrar un lote descartando los terminados más antiguos por encima de max_batches"""
+        
+        with self._batch_lock:
+            self.replay_batches[batch["batch_id"]] = batch
+            excess = len(self.replay_batches) - self.max_batches
+            if excess <= 0:
+                return
+            for batch_id in [
+                batch_id for batch_id, state in self.replay_batches.items()
+                if state["status"] in ("completed", "failed")
+            ][:excess]:
+                del self.replay_batches[batch_id]
+    
+    def _new_batch_state(self, batch_id: str, total: int, budget: ReplayBudget) -> Dict[str, Any]:
+        """Estado inicial de un lote"""
+        
+        return {
+            "batch_id": batch_id,
+            "status": "running",
+            "started_at": datetime.now().isoformat(),
+            "completed_at": None,
+            "budget": asdict(budget),
+            "total": total,
+            "completed": 0,
+            "memoized": 0,
+            "failed": 0,
+            "skipped": 0,
+            "in_flight": 0,
+            "executed": 0,
+            "spent_cost": 0.0,
+            "spent_tokens": 0,
+            "improved": 0,
+            "improvement_sum": 0.0,
+            "roi_sum": 0.0,
+            "cost_savings_sum": 0.0,
+            "results": {}
+        }
+    
+    def _budget_exhausted(self, batch: Dict[str, Any], budget: ReplayBudget) -> bool:
+        """Comprobar presupuesto contando el gasto estimado de los replays en curso"""
+        
+        return not self._budget_allows_start(batch, budget, wait_for_estimate=False)
+    
+    def _budget_allows_start(self, batch: Dict[str, Any], budget: ReplayBudget, wait_for_estimate: bool = True) -> bool:
+        """Sin gasto observado aún, un solo replay en curso sirve para estimar el costo por replay"""
+        
+        limited = budget.max_cost is not None or budget.max_tokens is not None
+        if wait_for_estimate and limited and batch["executed"] == 0 and batch["in_flight"] > 0:
+            return False
+        
+        executed = max(batch["executed"], 1)
+        expected_cost = batch["spent_cost"] + batch["in_flight"] * batch["spent_cost"] / executed
+        expected_tokens = batch["spent_tokens"] + batch["in_flight"] * batch["spent_tokens"] / executed
+        
+        if budget.max_cost is not None and expected_cost >= budget.max_cost:
+            return False
+        if budget.max_tokens is not None and expected_tokens >= budget.max_tokens:
+            return False
+        return True
+    
+    def _record_batch_result(
+        self,
+        batch: Dict[str, Any],
+        task_id: str,
+        replay: Optional[DecisionReplay],
+        error: Optional[str],
+        reused: bool = False
+    ) -> Dict[str, Any]:
+        """Actualizar agregados del lote y construir el evento de progreso"""
+        
+        if replay is None:
+            if error == "budget_exhausted":
+                batch["skipped"] += 1
+            else:
+                batch["failed"] += 1
+            batch["results"][task_id] = {"status": "skipped" if error == "budget_exhausted" else "failed", "error": error}
+        else:
+            batch["completed"] += 1
+            if reused or replay.memoized:
+                batch["memoized"] += 1
+            
+            if replay.improvement_score > 0.1:
+                batch["improved"] += 1
+            batch["improvement_sum"] += replay.improvement_score
+            batch["roi_sum"] += self._calculate_single_decision_roi(replay)
+            batch["cost_savings_sum"] += max(0, replay.original_cost - replay.replay_cost)
+            batch["results"][task_id] = {
+                "status": "completed",
+                "replay_id": replay.replay_id,
+                "improvement_score": replay.improvement_score,
+                "improvement_types": [t.value for t in replay.improvement_types],
+                "memoized": reused or replay.memoized
+            }
+        
+        return {
+            "type": "replay_completed",
+            "batch_id": batch["batch_id"],
+            "task_id": task_id,
+            **batch["results"][task_id],
+            "aggregate": self._batch_aggregate(batch)
+        }
+    
+    def _batch_aggregate(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        """Métricas agregadas de ROI y calidad de un lote"""
+        
+        completed = batch["completed"]
+        
+        return {
+            "processed": completed + batch["failed"] + batch["skipped"],
+            "total": batch["total"],
+            "completed": completed,
+            "memoized": batch["memoized"],
+            "failed": batch["failed"],
+            "skipped": batch["skipped"],
+            "spent_cost": batch["spent_cost"],
+            "spent_tokens": batch["spent_tokens"],
+            "improvement_rate": batch["improved"] / completed * 100 if completed else 0.0,
+            "avg_improvement": batch["improvement_sum"] / completed if completed else 0.0,
+            "total_roi_impact": batch["roi_sum"],
+            "total_cost_savings": batch["cost_savings_sum"]
+        }
+    
+    def get_batch_status(self, batch_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        """Estado y métricas agregadas de un lote (disponible mientras se ejecuta)"""
+        
+        batch = self.replay_batches.get(batch_id)
+        if batch is None:
+            return None
+        
+        status = {
+            "batch_id": batch_id,
+            "status": batch["status"],
+            "started_at": batch["started_at"],
+            "completed_at": batch["completed_at"],
+            "budget": batch["budget"],
+            "aggregate": self._batch_aggregate(batch)
+        }
+        if include_results:
+            status["results"] = batch["results"]
+        return status
+    
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _config_hash(config: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    
+    def _cache_get(self, cache: OrderedDict, key) -> Optional[Dict[str, Any]]:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+    
+    def _cache_put(self, cache: OrderedDict, key, value: Dict[str, Any]):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_cache_size:
+            cache.popitem(last=False)
+    
     async def _fetch_original_decision(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Obtener datos de decisión original desde storage"""
         
@@ -275,15 +688,8 @@ class DecisionReplaySystem:
             # Simular ejecución con sistema actual
             # En producción, esto llamaría al debate handler actual
             
-            # Importar componentes actuales
-            from debate_handler import DebateHandler
-            from dynamic_roles import DynamicRoleOrchestrator
-            from model_resilience import ModelResilienceOrchestrator
-            
-            # Inicializar con configuración actual
-            role_orchestrator = DynamicRoleOrchestrator()
-            resilience_orchestrator = ModelResilienceOrchestrator()
-            debate_handler = DebateHandler(role_orchestrator, resilience_orchestrator)
+            # Componentes actuales (se crean una vez y se reutilizan entre replays)
+            role_orchestrator, debate_handler = self._get_replay_handler()
             
             # Ejecutar debate con input original
             result = await debate_handler.conduct_debate(
@@ -299,6 +705,7 @@ class DecisionReplaySystem:
             # Actualizar replay con resultados
             replay.replay_output = result.get('final_result', '')
             replay.replay_cost = result.get('total_cost', 0.0)
+            replay.replay_tokens = result.get('total_tokens', 0)
             replay.replay_duration = (datetime.now() - start_time).total_seconds()
             
             return result
@@ -311,7 +718,21 @@ class DecisionReplaySystem:
             replay.replay_cost = replay.original_cost * 0.85  # 15% reducción simulada
             replay.replay_duration = (datetime.now() - start_time).total_seconds()
             
-            return {"final_result": replay.replay_output}
+            return {"final_result": replay.replay_output, "fallback": True}
+    
+    def _get_replay_handler(self):
+        """Crear (una sola vez) el debate handler con la configuración actual"""
+        
+        if self._replay_handler is None:
+            from debate_handler import DebateHandler
+            from dynamic_roles import DynamicRoleOrchestrator
+            from model_resilience import ModelResilienceOrchestrator
+            
+            role_orchestrator = DynamicRoleOrchestrator()
+            resilience_orchestrator = ModelResilienceOrchestrator()
+            self._replay_handler = (role_orchestrator, DebateHandler(role_orchestrator, resilience_orchestrator))
+        
+        return self._replay_handler
     
     async def _generate_improved_output(self, original_input: str) -> str:
         """Generar output mejorado usando configuración actual"""
@@ -446,6 +867,25 @@ Provide a response that shows significant improvement over a basic analysis.
     ) -> Dict[str, Any]:
         """Evaluar mejora de calidad usando LLM"""
         
+        cache_key = self._content_hash("\x00".join([original_input, original_output, replay_output]))
+        cached = self._cache_get(self.evaluation_cache, cache_key)
+        if cached is not None:
+            self.replay_metrics["evaluation_cache_hits"] += 1
+            return cached
+        
+        evaluation = await self._run_quality_evaluation(original_output, replay_output, original_input)
+        if not evaluation.get("fallback_analysis"):
+            self._cache_put(self.evaluation_cache, cache_key, evaluation)
+        return evaluation
+    
+    async def _run_quality_evaluation(
+        self,
+        original_output: str,
+        replay_output: str,
+        original_input: str
+    ) -> Dict[str, Any]:
+        """Llamar al LLM evaluador"""
+        
         try:
             client = openai.AsyncOpenAI()
             
@@ -544,7 +984,8 @@ Be objective and quantitative in your assessment.
             "areas_enhanced": ["content_depth", "organization"],
             "consistency_improved": improvement_score > 0.15,
             "professional_value_added": "Quantitative improvement detected",
-            "recommendation": "Significant improvement" if improvement_score > 0.2 else "Moderate improvement"
+            "recommendation": "Significant improvement" if improvement_score > 0.2 else "Moderate improvement",
+            "fallback_analysis": True
         }
     
     def _analyze_structure_improvements(self, original: str, replay: str) -> List[str]:
@@ -607,27 +1048,58 @@ Be objective and quantitative in your assessment.
         
         cutoff_time = datetime.now() - timedelta(hours=24)
         
-        for replay in reversed(self.replays_history):
-            if (replay.original_task_id == task_id and 
-                replay.replay_timestamp >= cutoff_time and
-                replay.status == ReplayStatus.COMPLETED):
-                return replay
+        replay = self.replays_by_task.get(task_id)
+        if (replay is not None and
+            replay.replay_timestamp >= cutoff_time and
+            replay.status == ReplayStatus.COMPLETED):
+            return replay
         
         return None
     
+    def _store_replay(self, replay: DecisionReplay):
+        """Guardar replay en el historial acotado, el índice por tarea y los agregados"""
+        
+        if len(self.replays_history) == self.replays_history.maxlen:
+            evicted = self.replays_history[0]
+            self._update_aggregates(evicted, -1)
+            if self.replays_by_task.get(evicted.original_task_id) is evicted:
+                del self.replays_by_task[evicted.original_task_id]
+        
+        self.replays_history.append(replay)
+        self.replays_by_task[replay.original_task_id] = replay
+        self._update_aggregates(replay, 1)
+    
+    def _update_aggregates(self, replay: DecisionReplay, sign: int):
+        """Sumar (sign=1) o restar (sign=-1) un replay de los agregados"""
+        
+        agg = self.aggregates
+        agg["count"] += sign
+        agg["improvement_sum"] += sign * replay.improvement_score
+        agg["roi_sum"] += sign * self._calculate_single_decision_roi(replay)
+        agg["cost_savings_sum"] += sign * max(0, replay.original_cost - replay.replay_cost)
+        
+        if replay.improvement_score > 0.1:
+            agg["improved"] += sign
+        if replay.original_cost > 0:
+            agg["cost_reduction_sum"] += sign * max(0, (replay.original_cost - replay.replay_cost) / replay.original_cost)
+            agg["cost_reduction_count"] += sign
+        if replay.original_duration > 0:
+            agg["speed_improvement_sum"] += sign * max(0, (replay.original_duration - replay.replay_duration) / replay.original_duration)
+            agg["speed_improvement_count"] += sign
+    
     async def _update_improvement_analytics(self, replay: DecisionReplay):
         """Actualizar analytics de mejoras"""
         
-        # Actualizar métricas globales
-        total_replays = len(self.replays_history)
-        improved_decisions = sum(1 for r in self.replays_history if r.improvement_score > 0.1)
+        # Actualizar métricas globales (agregados incrementales, O(1) por replay)
+        total_replays = self.aggregates["count"]
+        improved_decisions = self.aggregates["improved"]
         
         if total_replays > 0:
             self.improvement_analytics = {
                 "total_replays": total_replays,
                 "improved_decisions": improved_decisions,
                 "improvement_rate": improved_decisions / total_replays * 100,
-                "avg_quality_improvement": sum(r.improvement_score for r in self.replays_history) / total_replays,
+                "avg_quality_improvement": self.aggregates["improvement_sum"] / total_replays,
                 "avg_cost_reduction": self._calculate_avg_cost_reduction(),
                 "avg_speed_improvement": self._calculate_avg_speed_improvement(),
                 "total_roi_impact": self._calculate_total_roi(),
@@ -638,34 +1110,21 @@ Be objective and quantitative in your assessment.
     def _calculate_avg_cost_reduction(self) -> float:
         """Calcular reducción promedio de costo"""
         
-        cost_reductions = []
-        for replay in self.replays_history:
-            if replay.original_cost > 0:
-                reduction = (replay.original_cost - replay.replay_cost) / replay.original_cost
-                cost_reductions.append(max(0, reduction))
-        
-        return sum(cost_reductions) / len(cost_reductions) if cost_reductions else 0.0
+        count = self.aggregates["cost_reduction_count"]
+        return self.aggregates["cost_reduction_sum"] / count if count else 0.0
     
     def _calculate_avg_speed_improvement(self) -> float:
         """Calcular mejora promedio de velocidad"""
         
-        speed_improvements = []
-        for replay in self.replays_history:
-            if replay.original_duration > 0:
-                improvement = (replay.original_duration - replay.replay_duration) / replay.original_duration
-                speed_improvements.append(max(0, improvement))
-        
-        return sum(speed_improvements) / len(speed_improvements) if speed_improvements else 0.0
+        count = self.aggregates["speed_improvement_count"]
+        return self.aggregates["speed_improvement_sum"] / count if count else 0.0
     
     def _calculate_total_roi(self) -> float:
         """Calcular ROI total estimado"""
         
         # ROI basado en mejoras de calidad y eficiencia
-        total_quality_improvement = sum(r.improvement_score for r in self.replays_history)
-        total_cost_savings = sum(
-            max(0, r.original_cost - r.replay_cost) 
-            for r in self.replays_history
-        )
+        total_quality_improvement = self.aggregates["improvement_sum"]
+        total_cost_savings = self.aggregates["cost_savings_sum"]
         
         # ROI estimado: mejoras de calidad valen $100 cada una, cost savings directos
         quality_value = total_quality_improvement * 100
@@ -806,7 +1265,12 @@ Be objective and quantitative in your assessment.
             **self.improvement_analytics,
             "trend_analysis": self._analyze_improvement_trends(),
             "top_improvement_areas": self._identify_top_improvement_areas(),
-            "recent_performance": self._get_recent_performance_metrics()
+            "recent_performance": self._get_recent_performance_metrics(),
+            "replay_cache": {
+                **self.replay_metrics,
+                "output_cache_size": len(self.output_cache),
+                "evaluation_cache_size": len(self.evaluation_cache)
+            }
         }
     
     def get_recent_improvements(self, limit: int = 10) -> List[Dict[str, Any]]:
@@ -837,7 +1301,7 @@ Be objective and quantitative in your assessment.
             return {"message": "No data available for ROI calculation"}
         
         total_replays = len(self.replays_history)
-        total_roi = sum(self._calculate_single_decision_roi(r) for r in self.replays_history)
+        total_roi = self.aggregates["roi_sum"]
         
         # Proyección anual
         if total_replays > 0:
@@ -909,8 +1373,9 @@ Be objective and quantitative in your assessment.
         if len(self.replays_history) < 10:
             return {"trend": "insufficient_data"}
         
-        recent_replays = self.replays_history[-10:]
-        older_replays = self.replays_history[:-10] if len(self.replays_history) > 10 else []
+        history = list(self.replays_history)
+        recent_replays = history[-10:]
+        older_replays = history[:-10] if len(history) > 10 else []
         
         recent_avg = sum(r.improvement_score for r in recent_replays) / len(recent_replays)
         older_avg = sum(r.improvement_score for r in older_replays) / len(older_replays) if older_replays else recent_avg
@@ -0,0 +1,343 @@
+"""
+Embedding Service para Chain-of-Debate SuperMCP
+
+Servicio local de embeddings para el ShadowLearningEngine:
+- Micro-batching: las peticiones concurrentes se agrupan y se codifican
+  en un único batch (una llamada al modelo/API por batch, no por texto)
+- Store persistente en SQLite por hash de contenido (sobrevive reinicios)
+- Cache LRU en memoria delante del store
+- Backend local (sentence-transformers) con fallback de dimensión fija
+  (feature hashing) cuando el modelo no está disponible
+
+Los vectores se guardan por espacio de embedding (backend + dimensión), así
+que cambiar de backend nunca mezcla vectores incomparables. Por lo mismo, si
+la API de OpenAI falla el error se propaga en lugar de devolver vectores
+hasheados: quien llama decide reintentar más tarde.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+    logging.getLogger(__name__).warning(
+        "sentence-transformers not available, shadow learning will use hashed embeddings"
+    )
+
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+OPENAI_EMBEDDING_DIMENSION = 1536
+MAX_EMBEDDING_CHARS = 8000
+
+class EmbeddingStore:
+    """Store SQLite de vectores float32 por (espacio, hash de contenido)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                space TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (space, content_hash)
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, space: str, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Leer los vectores existentes para un conjunto de hashes"""
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            # SQLite limita el número de parámetros por consulta
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE space = ? AND content_hash IN ({placeholders})",
+                    [space, *chunk]
+                )
+                for content_hash, blob in rows:
+                    found[content_hash] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, space: str, vectors: Dict[str, np.ndarray]):
+        """Guardar un batch de vectores en una transacción"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (space, content_hash, vector) VALUES (?, ?, ?)",
+                [(space, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+            )
+            self._conn.commit()
+
+    def count(self, space: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE space = ?", (space,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class EmbeddingService:
+    """
+    Codificador por lotes con store persistente y cache LRU
+    """
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        model_name: Optional[str] = None,
+        dimension: Optional[int] = None,
+        store_path: Optional[str] = None,
+        max_cache_size: int = 10000,
+        max_batch_size: int = 64,
+        batch_window: float = 0.01
+    ):
+        self.backend = (backend or os.getenv("SHADOW_EMBEDDING_BACKEND", "local")).lower()
+        self.model_name = model_name or os.getenv("SHADOW_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.dimension = dimension or int(os.getenv("SHADOW_EMBEDDING_DIMENSION", "384"))
+        self.max_cache_size = max_cache_size
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+
+        if self.backend == "openai":
+            if not OPENAI_AVAILABLE:
+                logger.warning("openai not available, shadow embeddings falling back to local backend")
+                self.backend = "local"
+            else:
+                self.dimension = OPENAI_EMBEDDING_DIMENSION
+
+        self.store = EmbeddingStore(store_path or os.getenv("SHADOW_EMBEDDING_STORE", "data/shadow_embeddings.db"))
+        self.cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self.model = None
+        self.openai_client = None
+        self._model_lock = asyncio.Lock()
+        self._model_loaded = False
+
+        # Peticiones pendientes del próximo batch: hash -> (texto, futures)
+        self._pending: "OrderedDict[str, Tuple[str, List[asyncio.Future]]]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_full = asyncio.Event()
+
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "store_hits": 0,
+            "texts_encoded": 0,
+            "batches": 0,
+            "backend_errors": 0
+        }
+
+        logger.info(f"🧬 Embedding service initialized ({self.backend}, store: {self.store.db_path})")
+
+    @property
+    def space(self) -> str:
+        """Espacio de embedding: vectores de espacios distintos no se mezclan"""
+        if self.backend == "openai":
+            return f"openai:{OPENAI_EMBEDDING_MODEL}"
+        if self.model is not None:
+            return f"local:{self.model_name}"
+        return f"hashed:{self.dimension}"
+
+    @staticmethod
+    def content_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def _ensure_backend(self):
+        """Inicializar modelo local o cliente OpenAI una sola vez"""
+        if self._model_loaded:
+            return
+        async with self._model_lock:
+            if self._model_loaded:
+                return
+            if self.backend == "openai":
+                self.openai_client = openai.AsyncOpenAI()
+            elif SENTENCE_TRANSFORMERS_AVAILABLE:
+                try:
+                    self.model = await asyncio.to_thread(SentenceTransformer, self.model_name)
+                    self.dimension = self.model.get_sentence_embedding_dimension()
+                    logger.info(f"🧠 Shadow embedding model loaded: {self.model_name} ({self.dimension}d)")
+                except Exception as e:
+                    logger.error(f"Error loading shadow embedding model, using hashed embeddings: {e}")
+            self._model_loaded = True
+
+    def _hashed_vectors(self, texts: Sequence[str]) -> np.ndarray:
+        """Vectores bag-of-words con feature hashing y dimensión fija"""
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+        return vectors
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        """Codificar un batch en el espacio del backend activo"""
+        texts = [text[:MAX_EMBEDDING_CHARS] for text in texts]
+
+        if self.openai_client is not None:
+            try:
+                response = await self.openai_client.embeddings.create(model=OPENAI_EMBEDDING_MODEL, input=texts)
+            except Exception:
+                # Sin fallback hasheado: esos vectores no son comparables con los de OpenAI
+                self.stats["backend_errors"] += 1
+                raise
+            vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+            return self._normalize(vectors)
+
+        if self.model is not None:
+            vectors = await asyncio.to_thread(
+                self.model.encode,
+                texts,
+                batch_size=self.max_batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            return self._normalize(np.asarray(vectors, dtype=np.float32))
+
+        return self._normalize(self._hashed_vectors(texts))
+
+    def _cache_get(self, key: str) -> Optional[np.ndarray]:
+        vector = self.cache.get(key)
+        if vector is not None:
+            self.cache.move_to_end(key)
+        return vector
+
+    def _cache_put(self, key: str, vector: np.ndarray):
+        self.cache[key] = vector
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_cache_size:
+            self.cache.popitem(last=False)
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embedding de un texto (se agrupa con otras peticiones concurrentes)"""
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings de varios textos en orden"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        await self._ensure_backend()
+        self.stats["requests"] += len(texts)
+
+        keys = [self.content_key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+
+        for key, text in zip(keys, texts):
+            if key in vectors or key in waiting:
+                continue
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                vectors[key] = cached
+                continue
+            future = loop.create_future()
+            waiting[key] = future
+            if key in self._pending:
+                self._pending[key][1].append(future)
+            else:
+                self._pending[key] = (text, [future])
+
+        if waiting:
+            if len(self._pending) >= self.max_batch_size:
+                self._batch_full.set()
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_loop())
+            results = await asyncio.gather(*waiting.values())
+            vectors.update(zip(waiting.keys(), results))
+
+        return np.stack([vectors[key] for key in keys])
+
+    async def _flush_loop(self):
+        """Vaciar la cola de pendientes en batches hasta que quede vacía"""
+        while self._pending:
+            # Esperar la ventana de batching salvo que el batch ya esté lleno
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.batch_window)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_full.clear()
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popitem(last=False))
+
+            try:
+                resolved = await self._resolve_batch([(key, text) for key, (text, _) in batch])
+                for key, (_, futures) in batch:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(resolved[key])
+            except Exception as e:
+                logger.error(f"Embedding batch error: {e}")
+                for _, (_, futures) in batch:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+
+    async def _resolve_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        """Resolver un batch contra el store y codificar solo lo que falta"""
+        space = self.space
+        keys = [key for key, _ in batch]
+
+        resolved = await asyncio.to_thread(self.store.get_many, space, keys)
+        self.stats["store_hits"] += len(resolved)
+
+        missing = [(key, text) for key, text in batch if key not in resolved]
+        if missing:
+            encoded = await self._encode([text for _, text in missing])
+            self.stats["batches"] += 1
+            self.stats["texts_encoded"] += len(missing)
+            new_vectors = dict(zip((key for key, _ in missing), encoded))
+            resolved.update(new_vectors)
+            await asyncio.to_thread(self.store.put_many, space, new_vectors)
+
+        for key, vector in resolved.items():
+            self._cache_put(key, vector)
+        return resolved
+
+    def get_stats(self) -> Dict[str, float]:
+        """Métricas del servicio de embeddings"""
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "backend": self.space,
+            "dimension": self.dimension,
+            "cache_size": len(self.cache),
+            "cache_hit_rate": self.stats["cache_hits"] / requests if requests else 0.0,
+            "avg_batch_size": self.stats["texts_encoded"] / self.stats["batches"] if self.stats["batches"] else 0.0
+        }
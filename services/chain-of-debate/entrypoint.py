@@ -24,7 +24,7 @@ from enum import Enum
 # Importar componentes del sistema
 from dynamic_roles import DynamicRoleOrchestrator
 from shadow_learning import ShadowLearningEngine
-from decision_replay import DecisionReplaySystem
+from decision_replay import DecisionReplaySystem, ReplayBudget
 from model_resilience import ModelResilienceOrchestrator
 from debate_handler import DebateHandler
 
@@ -71,6 +71,8 @@ class DebateTask:
     human_intervention_used: bool = False
     cost: float = 0.0
     quality_score: float = 0.0
+    rounds_completed: int = 0
+    partial_responses: List[Dict[str, Any]] = None
 
 # Inicializar componentes del sistema
 role_orchestrator = DynamicRoleOrchestrator()
@@ -188,6 +190,11 @@ def get_debate_status(task_id: str):
             "cost": task.cost
         }
         
+        # Respuestas parciales que van llegando durante el debate
+        if task.partial_responses:
+            response["rounds_completed"] = task.rounds_completed
+            response["partial_responses"] = task.partial_responses
+        
         # Agregar resultado si está completo
         if task.status == DebateStatus.COMPLETED and task.consensus_result:
             response["result"] = task.consensus_result
@@ -363,6 +370,61 @@ async def execute_replay(task_id: str):
         logger.error(f"Replay execution error: {e}")
         return jsonify({"error": "Replay failed"}), 500
 
+@app.route('/api/v1/replay/batch', methods=['POST'])
+async def submit_replay_batch():
+    """
+    Re-ejecutar un lote de decisiones con presupuesto
+    POST /api/v1/replay/batch
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('task_ids'):
+            return jsonify({
+                "error": "Missing required field: task_ids",
+                "status": "error"
+            }), 400
+        
+        budget_data = data.get('budget', {})
+        budget = ReplayBudget(
+            max_concurrency=int(budget_data.get('max_concurrency', 8)),
+            max_cost=budget_data.get('max_cost'),
+            max_tokens=budget_data.get('max_tokens')
+        )
+        
+        batch_id = replay_system.submit_batch(
+            data['task_ids'],
+            decisions=data.get('decisions'),
+            budget=budget,
+            force_replay=data.get('force_replay', False)
+        )
+        
+        logger.info(f"📦 Replay batch submitted: {batch_id} ({len(data['task_ids'])} decisions)")
+        
+        return jsonify({
+            "batch_id": batch_id,
+            "status": "submitted",
+            "total": len(data['task_ids'])
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Replay batch submit error: {e}")
+        return jsonify({"error": "Replay batch failed"}), 500
+
+@app.route('/api/v1/replay/batch/<batch_id>')
+def get_replay_batch_status(batch_id: str):
+    """
+    Estado y métricas agregadas (ROI, calidad) de un lote en curso o terminado
+    GET /api/v1/replay/batch/{batch_id}
+    """
+    status = replay_system.get_batch_status(
+        batch_id,
+        include_results=request.args.get('results', 'false').lower() == 'true'
+    )
+    if status is None:
+        return jsonify({"error": "Batch not found", "batch_id": batch_id}), 404
+    return jsonify(status), 200
+
 @app.route('/api/v1/metrics')
 def get_system_metrics():
     """
@@ -376,6 +438,8 @@ def get_system_metrics():
             "pending_reviews": len(pending_human_reviews),
             "model_health": resilience_orchestrator.get_health_status(),
             "learning_progress": shadow_learning.get_learning_metrics(),
+            "round_scheduler": debate_handler.round_scheduler.get_metrics(),
+            "consensus_engine": debate_handler.consensus_engine.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -391,6 +455,8 @@ async def _process_debate_task(task: DebateTask, retry: bool = False):
     """Procesar una tarea de debate con los modelos"""
     try:
         task.status = DebateStatus.IN_PROGRESS
+        task.rounds_completed = 0
+        task.partial_responses = []
         
         # Obtener roles dinámicos basados en contexto
         roles = role_orchestrator.assign_roles_by_context(
@@ -404,7 +470,8 @@ async def _process_debate_task(task: DebateTask, retry: bool = False):
             content=task.input_content,
             domain=task.domain.value,
             roles=roles,
-            context=task.context
+            context=task.context,
+            progress_callback=lambda event: _record_debate_progress(task, event)
         )
         
         task.model_outputs = debate_result.get("model_outputs", {})
@@ -447,6 +514,22 @@ async def _process_debate_task(task: DebateTask, retry: bool = False):
         task.status = DebateStatus.FAILED
         task.consensus_result = f"Error: {str(e)}"
 
+def _record_debate_progress(task: DebateTask, event: Dict[str, Any]):
+    """Registrar respuestas parciales y cierres de ronda para el endpoint de estado"""
+    if event.get("type") == "response":
+        content = event.get("content", "")
+        task.partial_responses.append({
+            "round": event.get("round"),
+            "model": event.get("model"),
+            "role": event.get("role"),
+            "preview": content[:300] + "..." if len(content) > 300 else content,
+            "confidence": event.get("confidence"),
+            "latency": event.get("latency"),
+            "received_at": datetime.now().isoformat()
+        })
+    elif event.get("type") == "round_completed":
+        task.rounds_completed = event.get("round", task.rounds_completed)
+
 def _needs_human_intervention(task: DebateTask, consensus_score: float, retry: bool) -> bool:
     """Determinar si una tarea necesita intervención humana"""
     # Reglas para intervención humana
@@ -490,7 +573,11 @@ def _calculate_progress(task: DebateTask) -> float:
     if task.status == DebateStatus.PENDING:
         return 0.0
     elif task.status == DebateStatus.IN_PROGRESS:
-        return 0.5
+        # Avanza con cada ronda y con cada respuesta parcial recibida
+        max_rounds = max(1, debate_handler.max_rounds)
+        round_progress = min(task.rounds_completed, max_rounds) / max_rounds
+        partial_bonus = 0.05 * min(len(task.partial_responses or []), 4)
+        return min(0.75, 0.1 + 0.5 * round_progress + partial_bonus)
     elif task.status == DebateStatus.HUMAN_INTERVENTION:
         return 0.8
     elif task.status == DebateStatus.COMPLETED:
@@ -12,6 +12,8 @@ Patrones de Resiliencia:
 - Circuit Breaker: Abre circuito cuando modelo falla repetidamente
 - Retry con backoff exponencial
 - Fallback ordenado: GPT-4 → Claude → Gemini → Local
+- Hedged requests: duplicar la llamada al siguiente proveedor sano cuando
+  supera el p90 de latencia observado, y quedarse con la primera respuesta
 - Health checks automáticos
 - Métricas de confiabilidad en tiempo real
 
@@ -49,6 +51,22 @@ class ModelProvider(Enum):
     GEMINI = "gemini-pro"
     LOCAL_BACKUP = "local-llama"
 
+# Nombres de modelo usados por el DebateHandler
+MODEL_NAME_PROVIDERS = {
+    "gpt-4": ModelProvider.GPT4,
+    "claude": ModelProvider.CLAUDE,
+    "gemini": ModelProvider.GEMINI,
+    "local": ModelProvider.LOCAL_BACKUP
+}
+
+# Coste estimado por token (mismas estimaciones que las llamadas a cada API)
+PROVIDER_TOKEN_COST = {
+    ModelProvider.GPT4: 0.00003,
+    ModelProvider.CLAUDE: 0.000015,
+    ModelProvider.GEMINI: 0.000001,
+    ModelProvider.LOCAL_BACKUP: 0.0
+}
+
 class CircuitState(Enum):
     """Estados del circuit breaker"""
     CLOSED = "closed"      # Normal operation
@@ -104,6 +122,41 @@ class FallbackResponse:
     tokens: int = 0
     cost: float = 0.0
 
+class LatencyWindow:
+    """Ventana deslizante de latencias con percentiles exactos"""
+    
+    def __init__(self, max_samples: int = 200, max_age: float = 3600.0):
+        self.samples = deque(maxlen=max_samples)  # (timestamp, latency)
+        self.max_age = max_age
+    
+    def observe(self, latency: float):
+        self.samples.append((time.time(), latency))
+    
+    def _prune(self):
+        cutoff = time.time() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+    
+    def __len__(self) -> int:
+        self._prune()
+        return len(self.samples)
+    
+    def percentile(self, q: float) -> float:
+        """Percentil q (nearest-rank) de la ventana, 0 si está vacía"""
+        self._prune()
+        if not self.samples:
+            return 0.0
+        values = sorted(latency for _, latency in self.samples)
+        return values[min(len(values) - 1, max(0, int(q * len(values) + 0.5) - 1))]
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "samples": len(self),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99)
+        }
+
 class ModelResilienceOrchestrator:
     """
     Orquestador de resiliencia que maneja fallos y balanceado de modelos
@@ -147,6 +200,19 @@ class ModelResilienceOrchestrator:
             ) for provider in ModelProvider
         }
         
+        # Latencias recientes por proveedor y de extremo a extremo
+        self.latency_windows = {
+            provider: LatencyWindow() for provider in ModelProvider
+        }
+        self.request_latency = LatencyWindow(max_samples=1000)
+        
+        # Hedged requests: duplicar la llamada cuando supera el p90 del proveedor
+        # (opt-in: cada hedge es una llamada de pago adicional)
+        self.hedging_enabled = os.getenv("MODEL_HEDGING_ENABLED", "false").lower() == "true"
+        self.hedge_percentile = float(os.getenv("MODEL_HEDGE_PERCENTILE", "0.9"))
+        self.hedge_min_samples = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_min_delay = float(os.getenv("MODEL_HEDGE_MIN_DELAY", "0.5"))
+        
         # Configurar clientes API
         self._setup_api_clients()
         
@@ -155,6 +221,11 @@ class ModelResilienceOrchestrator:
             "total_calls": 0,
             "fallback_calls": 0,
             "circuit_breaker_activations": 0,
+            "slow_model_reports": 0,
+            "hedged_calls": 0,
+            "hedges_won": 0,
+            "hedge_extra_tokens": 0,
+            "hedge_extra_cost": 0.0,
             "avg_response_time": 0.0,
             "uptime_percentage": 100.0
         }
@@ -217,12 +288,13 @@ class ModelResilienceOrchestrator:
                 logger.warning(f"🚫 Circuit breaker OPEN for {provider.value}, falling back")
                 return await self._execute_fallback_chain(prompt, provider, context, max_tokens, temperature)
             
-            # Intentar llamada principal
-            result = await self._execute_model_call(provider, prompt, context, max_tokens, temperature)
+            # Intentar llamada principal (con hedge si supera su p90)
+            result, served_by = await self._execute_hedged_call(provider, prompt, context, max_tokens, temperature)
             
             if result:
-                # Llamada exitosa
-                await self._record_success(provider, time.time() - call_start)
+                # Llamada exitosa (el éxito de un hedge ya se registró)
+                if served_by == provider:
+                    await self._record_success(provider, time.time() - call_start)
                 return result
             else:
                 # Llamada falló
@@ -234,6 +306,131 @@ class ModelResilienceOrchestrator:
             await self._record_failure(provider, str(e), time.time() - call_start)
             logger.error(f"Model call error for {provider.value}: {e}")
             return await self._execute_fallback_chain(prompt, provider, context, max_tokens, temperature)
+        
+        finally:
+            self.request_latency.observe(time.time() - call_start)
+    
+    def _hedge_delay(self, provider: ModelProvider) -> Optional[float]:
+        """Espera antes de lanzar un hedge (p90 observado), None si no hay datos suficientes"""
+        
+        if not self.hedging_enabled or provider == ModelProvider.LOCAL_BACKUP:
+            return None
+        
+        window = self.latency_windows[provider]
+        if len(window) < self.hedge_min_samples:
+            return None
+        
+        delay = max(self.hedge_min_delay, window.percentile(self.hedge_percentile))
+        if delay >= self.circuit_configs[provider].request_timeout:
+            return None
+        return delay
+    
+    def _select_hedge_provider(self, provider: ModelProvider) -> Optional[ModelProvider]:
+        """Siguiente proveedor sano para duplicar la llamada (nunca el backup local)"""
+        
+        for candidate in self._get_fallback_order(provider):
+            if candidate == ModelProvider.LOCAL_BACKUP:
+                continue
+            if self.model_health[candidate].status == HealthStatus.HEALTHY and self._can_call_provider(candidate):
+                return candidate
+        return None
+    
+    def _record_hedge_waste(self, provider: ModelProvider, prompt: str, result: Optional[Dict[str, Any]] = None):
+        """Contabilizar los tokens gastados por la llamada perdedora de un hedge"""
+        
+        if result:
+            tokens = int(result.get("tokens", 0))
+            cost = float(result.get("cost", 0.0))
+        else:
+            # Cancelada en vuelo: al menos se factura el prompt
+            tokens = int(len(prompt.split()) * 1.3)  # Estimación
+            cost = tokens * PROVIDER_TOKEN_COST[provider]
+        
+        self.orchestrator_metrics["hedge_extra_tokens"] += tokens
+        self.orchestrator_metrics["hedge_extra_cost"] += cost
+    
+    async def _execute_hedged_call(
+        self,
+        provider: ModelProvider,
+        prompt: str,
+        context: Dict[str, Any],
+        max_tokens: int,
+        temperature: float
+    ) -> tuple:
+        """
+        Ejecutar la llamada principal y, si no responde antes de su p90,
+        lanzar la misma llamada al siguiente proveedor sano. Gana la primera
+        respuesta válida y la otra se cancela.
+        
+        Returns:
+            (resultado, proveedor que respondió)
+        """
+        
+        delay = self._hedge_delay(provider)
+        hedge_provider = self._select_hedge_provider(provider) if delay is not None else None
+        
+        if hedge_provider is None:
+            return await self._execute_model_call(provider, prompt, context, max_tokens, temperature), provider
+        
+        primary_start = time.time()
+        primary = asyncio.create_task(self._execute_model_call(provider, prompt, context, max_tokens, temperature))
+        
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result(), provider
+        
+        self.orchestrator_metrics["hedged_calls"] += 1
+        logger.info(f"🪁 {provider.value} exceeded p{int(self.hedge_percentile * 100)} ({delay:.1f}s), "
+                    f"hedging with {hedge_provider.value}")
+        
+        hedge_start = time.time()
+        hedge = asyncio.create_task(self._execute_model_call(hedge_provider, prompt, context, max_tokens, temperature))
+        pending = {primary, hedge}
+        primary_error: Optional[BaseException] = None
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                # Si ambas terminan a la vez, preferir la principal
+                for task in sorted(done, key=lambda t: t is not primary):
+                    error = task.exception()
+                    result = None if error else task.result()
+                    
+                    if task is primary:
+                        if result:
+                            if hedge.done() and not hedge.cancelled() and not hedge.exception():
+                                self._record_hedge_waste(hedge_provider, prompt, hedge.result())
+                            elif not hedge.done():
+                                self._record_hedge_waste(hedge_provider, prompt)
+                            return result, provider
+                        primary_error = error or Exception("Empty response")
+                        continue
+                    
+                    if result:
+                        self.orchestrator_metrics["hedges_won"] += 1
+                        await self._record_success(hedge_provider, time.time() - hedge_start)
+                        if primary.done():
+                            await self._record_failure(provider, str(primary_error), time.time() - primary_start)
+                        else:
+                            # Latencia censurada: la principal tardó al menos esto
+                            self.latency_windows[provider].observe(time.time() - primary_start)
+                            self._record_hedge_waste(provider, prompt)
+                        result["hedged_from"] = provider.value
+                        logger.info(f"✅ Hedge with {hedge_provider.value} answered before {provider.value}")
+                        return result, hedge_provider
+                    
+                    await self._record_failure(hedge_provider, str(error or "Empty response"), time.time() - hedge_start)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        # Ambas fallaron: el llamador registra el fallo de la principal
+        if primary_error is not None:
+            raise primary_error
+        return None, provider
     
     def _can_call_provider(self, provider: ModelProvider) -> bool:
         """Verificar si se puede llamar al proveedor (circuit breaker check)"""
@@ -447,6 +644,7 @@ Analysis for the provided request:
         
         for provider in fallback_order:
             if self._can_call_provider(provider):
+                fallback_start = time.time()
                 try:
                     result = await self._execute_model_call(provider, prompt, context, max_tokens, temperature)
                     if result:
@@ -464,7 +662,7 @@ Analysis for the provided request:
                     
                 except Exception as e:
                     logger.warning(f"Fallback to {provider.value} also failed: {e}")
-                    await self._record_failure(provider, str(e), 0)
+                    await self._record_failure(provider, str(e), time.time() - fallback_start)
                     continue
         
         # Si todos los fallbacks fallan, generar respuesta de emergencia
@@ -572,6 +770,7 @@ All AI models are currently experiencing issues. This is an automated emergency
         )
         
         self.call_history[provider].append(call)
+        self.latency_windows[provider].observe(response_time)
         
         # Actualizar health status
         await self._update_health_status(provider)
@@ -602,6 +801,8 @@ All AI models are currently experiencing issues. This is an automated emergency
         )
         
         self.call_history[provider].append(call)
+        # Fallos y timeouts también cuentan: sin ellos el p90 del hedge queda sesgado a la baja
+        self.latency_windows[provider].observe(response_time)
         
         # Actualizar health status
         await self._update_health_status(provider)
@@ -666,18 +867,21 @@ All AI models are currently experiencing issues. This is an automated emergency
                     # Health check simple
                     try:
                         health_check_prompt = "Health check - respond with OK"
+                        check_start = time.time()
                         result = await asyncio.wait_for(
                             self._execute_model_call(provider, health_check_prompt, {}, 10, 0.1),
                             timeout=15.0
                         )
                         
                         if result:
-                            await self._record_success(provider, 1.0)
+                            await self._record_success(provider, time.time() - check_start)
                         else:
-                            await self._record_failure(provider, "Health check failed - empty response", 1.0)
+                            await self._record_failure(provider, "Health check failed - empty response",
+                                                       time.time() - check_start)
                             
                     except Exception as e:
-                        await self._record_failure(provider, f"Health check failed: {str(e)}", 1.0)
+                        await self._record_failure(provider, f"Health check failed: {str(e)}",
+                                                   time.time() - check_start)
                         
                 logger.debug("🔍 Periodic health checks completed")
                 
@@ -697,6 +901,42 @@ All AI models are currently experiencing issues. This is an automated emergency
             temperature=0.1
         )
     
+    def provider_for_model(self, model_name: str) -> Optional[ModelProvider]:
+        """Resolver el proveedor de un nombre de modelo"""
+        if model_name in MODEL_NAME_PROVIDERS:
+            return MODEL_NAME_PROVIDERS[model_name]
+        for provider in ModelProvider:
+            if provider.value == model_name:
+                return provider
+        return None
+    
+    def is_model_available(self, model_name: str) -> bool:
+        """Verificar si un modelo puede recibir llamadas (circuit breaker)"""
+        provider = self.provider_for_model(model_name)
+        return provider is None or self._can_call_provider(provider)
+    
+    def get_model_latency(self, model_name: str) -> float:
+        """Tiempo de respuesta medio reciente de un modelo (0 si no hay datos)"""
+        provider = self.provider_for_model(model_name)
+        if provider is None:
+            return 0.0
+        return self.model_health[provider].avg_response_time
+    
+    async def report_model_success(self, model_name: str, response_time: float):
+        """Registrar una respuesta exitosa obtenida fuera del orquestador"""
+        provider = self.provider_for_model(model_name)
+        if provider is not None:
+            await self._record_success(provider, response_time)
+    
+    async def report_slow_model(self, model_name: str, response_time: float):
+        """Degradar un modelo que no respondió dentro de su timeout de ronda"""
+        provider = self.provider_for_model(model_name)
+        if provider is None:
+            return
+        
+        self.orchestrator_metrics["slow_model_reports"] += 1
+        await self._record_failure(provider, f"Round timeout after {response_time:.1f}s", response_time)
+    
     def get_health_status(self) -> Dict[str, Any]:
         """Obtener estado de salud de todos los proveedores"""
         
@@ -712,7 +952,8 @@ All AI models are currently experiencing issues. This is an automated emergency
                 "total_calls": health.total_calls,
                 "failed_calls": health.failed_calls,
                 "last_check": health.last_check.isoformat(),
-                "last_error": health.last_error
+                "last_error": health.last_error,
+                "latency": self.latency_windows[provider].to_dict()
             }
             
             if health.status == HealthStatus.HEALTHY:
@@ -726,6 +967,13 @@ All AI models are currently experiencing issues. This is an automated emergency
             "uptime_status": "operational" if overall_healthy >= 2 else "degraded" if overall_healthy >= 1 else "critical"
         }
     
+    def _latency_percentile(self, provider: ModelProvider, q: float) -> float:
+        """Percentil de latencia de la ventana (media de health si no hay muestras)"""
+        window = self.latency_windows[provider]
+        if len(window) == 0:
+            return self.model_health[provider].avg_response_time
+        return window.percentile(q)
+    
     def get_best_available_provider(self) -> Optional[ModelProvider]:
         """Obtener el mejor proveedor disponible actualmente"""
         
@@ -734,7 +982,8 @@ All AI models are currently experiencing issues. This is an automated emergency
         for provider in ModelProvider:
             if self._can_call_provider(provider):
                 health = self.model_health[provider]
-                score = health.success_rate * (1 / max(health.avg_response_time, 0.1))
+                # Rankear por latencia de cola (p90) en lugar de la media
+                score = health.success_rate * (1 / max(self._latency_percentile(provider, 0.9), 0.1))
                 available_providers.append((provider, score))
         
         if available_providers:
@@ -751,8 +1000,10 @@ All AI models are currently experiencing issues. This is an automated emergency
         for provider in [ModelProvider.GPT4, ModelProvider.CLAUDE, ModelProvider.GEMINI]:
             if self._can_call_provider(provider):
                 health = self.model_health[provider]
-                # Score basado en success rate, response time y cost
-                score = health.success_rate / max(health.avg_response_time, 0.1)
+                # Score basado en success rate, latencia típica (p50) y dispersión de la cola (p50/p99)
+                p50 = max(self._latency_percentile(provider, 0.5), 0.1)
+                p99 = max(self._latency_percentile(provider, 0.99), p50)
+                score = health.success_rate / p50 * (p50 / p99)
                 available_providers.append((provider, score))
         
         if not available_providers:
@@ -792,9 +1043,31 @@ All AI models are currently experiencing issues. This is an automated emergency
             "provider_diversity": len([p for p in ModelProvider if self._can_call_provider(p)]),
             "recovery_readiness": self._assess_recovery_readiness(),
             "cost_efficiency": self._calculate_cost_efficiency(),
+            "tail_latency": {
+                "requests": self.request_latency.to_dict(),
+                "providers": {p.value: w.to_dict() for p, w in self.latency_windows.items()}
+            },
+            "hedging": self._get_hedging_metrics(),
             "recommendations": self._generate_resilience_recommendations()
         }
     
+    def _get_hedging_metrics(self) -> Dict[str, Any]:
+        """Métricas de hedged requests y su coste extra"""
+        
+        hedged = self.orchestrator_metrics["hedged_calls"]
+        total_calls = self.orchestrator_metrics["total_calls"]
+        
+        return {
+            "enabled": self.hedging_enabled,
+            "percentile": self.hedge_percentile,
+            "hedged_calls": hedged,
+            "hedge_rate": hedged / total_calls if total_calls else 0.0,
+            "hedges_won": self.orchestrator_metrics["hedges_won"],
+            "hedge_win_rate": self.orchestrator_metrics["hedges_won"] / hedged if hedged else 0.0,
+            "extra_tokens": self.orchestrator_metrics["hedge_extra_tokens"],
+            "extra_cost": self.orchestrator_metrics["hedge_extra_cost"]
+        }
+    
     def _calculate_resilience_score(self) -> float:
         """Calcular score de resiliencia (0-100)"""
         
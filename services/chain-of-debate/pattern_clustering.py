@@ -0,0 +1,202 @@
+"""
+Pattern Clustering para Chain-of-Debate SuperMCP
+
+Clustering incremental por líderes para el ShadowLearningEngine.
+
+Cada cluster tiene un líder (su primer miembro). Un vector nuevo se une al
+primer líder, en orden de creación, con similitud coseno >= threshold; si
+no hay ninguno, pasa a ser líder de un cluster nuevo. Añadir los vectores en
+orden da exactamente los mismos clusters que el clustering greedy anterior
+(matriz n×n completa + bucles anidados), pero:
+- Memoria O(block × líderes) en lugar de O(n²)
+- Similitud por bloques con un producto matricial float32 normalizado
+- Los eventos nuevos se asignan sin re-clusterizar lo ya indexado
+
+Los vectores de distinta dimensión (p. ej. tras cambiar de modelo de
+embeddings) se agrupan en índices de líderes separados: nunca se comparan
+entre sí y el resto del índice se conserva.
+"""
+
+import logging
+from typing import Any, Dict, Hashable, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class _LeaderSpace:
+    """Líderes de una misma dimensión y el cluster global de cada uno"""
+
+    def __init__(self, dimension: int, initial_capacity: int):
+        self.vectors = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        self.cluster_ids: List[int] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.cluster_ids)
+
+    def append(self, vector: np.ndarray, cluster_id: int):
+        if self.count == self.vectors.shape[0]:
+            grown = np.zeros((self.vectors.shape[0] * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+        self.vectors[self.count] = vector
+        self.cluster_ids.append(cluster_id)
+
+class IncrementalClusterer:
+    """
+    Índice de clusters por líderes con asignación incremental
+    """
+
+    def __init__(self, threshold: float = 0.8, block_size: int = 1024, initial_capacity: int = 256):
+        self.threshold = threshold
+        self.block_size = block_size
+        self.initial_capacity = initial_capacity
+
+        self.spaces: Dict[int, _LeaderSpace] = {}  # dimensión -> líderes float32 normalizados
+        self.leader_items: List[Hashable] = []     # cluster -> item líder
+
+        self.members: List[List[Hashable]] = []   # cluster -> items en orden de llegada
+        self.assignment: Dict[Hashable, int] = {}  # item -> cluster
+
+        self.stats = {
+            "items_added": 0,
+            "items_removed": 0,
+            "blocks_processed": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self.assignment)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self.assignment
+
+    @property
+    def leader_count(self) -> int:
+        return len(self.leader_items)
+
+    @property
+    def stale_ratio(self) -> float:
+        """Fracción de líderes cuyo item ya no está indexado"""
+        if not self.leader_count:
+            return 0.0
+        stale = sum(1 for item in self.leader_items if item not in self.assignment)
+        return stale / self.leader_count
+
+    def _append_leader(self, space: _LeaderSpace, vector: np.ndarray, item_id: Hashable) -> int:
+        cluster_id = self.leader_count
+        space.append(vector, cluster_id)
+        self.leader_items.append(item_id)
+        self.members.append([])
+        return cluster_id
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, item_id: Hashable, vector: Sequence[float]) -> int:
+        """Asignar un vector y devolver su cluster"""
+        return self.add_many([item_id], [vector])[0]
+
+    def add_many(self, item_ids: Sequence[Hashable], vectors: Any) -> List[int]:
+        """Asignar vectores en orden; los items ya indexados conservan su cluster"""
+        if len(item_ids) == 0:
+            return []
+
+        if isinstance(vectors, np.ndarray) and vectors.ndim == 2:
+            groups = {vectors.shape[1]: (list(range(len(item_ids))), vectors)}
+        else:
+            # Agrupar por dimensión conservando el orden de llegada dentro de cada grupo
+            rows = [np.asarray(vector, dtype=np.float32).ravel() for vector in vectors]
+            positions: Dict[int, List[int]] = {}
+            for position, row in enumerate(rows):
+                positions.setdefault(row.shape[0], []).append(position)
+            groups = {
+                dimension: (indices, np.stack([rows[i] for i in indices]))
+                for dimension, indices in positions.items()
+            }
+
+        assigned: List[int] = [0] * len(item_ids)
+        for dimension, (indices, group) in groups.items():
+            space = self.spaces.get(dimension)
+            if space is None:
+                space = self.spaces[dimension] = _LeaderSpace(dimension, self.initial_capacity)
+            matrix = self._normalize(np.asarray(group, dtype=np.float32))
+            group_ids = [item_ids[i] for i in indices]
+            for start in range(0, len(group_ids), self.block_size):
+                block_assigned = self._add_block(
+                    space, group_ids[start:start + self.block_size], matrix[start:start + self.block_size]
+                )
+                for i, cluster_id in zip(indices[start:start + self.block_size], block_assigned):
+                    assigned[i] = cluster_id
+                self.stats["blocks_processed"] += 1
+        return assigned
+
+    def _add_block(self, space: _LeaderSpace, item_ids: Sequence[Hashable], block: np.ndarray) -> List[int]:
+        """Asignar un bloque contra los líderes existentes de su dimensión con un solo matmul"""
+        existing = space.count
+        if existing:
+            matches = (block @ space.vectors[:existing].T) >= self.threshold
+            has_match = matches.any(axis=1)
+            first_match = matches.argmax(axis=1)
+        else:
+            has_match = np.zeros(len(block), dtype=bool)
+            first_match = np.zeros(len(block), dtype=np.int64)
+
+        assigned = []
+        for row, item_id in enumerate(item_ids):
+            if item_id in self.assignment:
+                assigned.append(self.assignment[item_id])
+                continue
+
+            if has_match[row]:
+                cluster_id = space.cluster_ids[int(first_match[row])]
+            else:
+                # Líderes creados dentro de este mismo bloque
+                cluster_id = None
+                if space.count > existing:
+                    block_matches = np.flatnonzero(
+                        space.vectors[existing:space.count] @ block[row] >= self.threshold
+                    )
+                    if block_matches.size:
+                        cluster_id = space.cluster_ids[existing + int(block_matches[0])]
+                if cluster_id is None:
+                    cluster_id = self._append_leader(space, block[row], item_id)
+
+            self.members[cluster_id].append(item_id)
+            self.assignment[item_id] = cluster_id
+            self.stats["items_added"] += 1
+            assigned.append(cluster_id)
+
+        return assigned
+
+    def retain(self, live_ids: set) -> int:
+        """Olvidar items que ya no existen; los líderes siguen actuando como prototipo"""
+        removed = [item for item in self.assignment if item not in live_ids]
+        if not removed:
+            return 0
+
+        removed_set = set(removed)
+        for item in removed:
+            del self.assignment[item]
+        self.members = [
+            [item for item in members if item not in removed_set] if members else members
+            for members in self.members
+        ]
+        self.stats["items_removed"] += len(removed)
+        return len(removed)
+
+    def clusters(self, min_size: int = 2) -> List[List[Hashable]]:
+        """Clusters con al menos min_size items, en orden de creación"""
+        return [list(members) for members in self.members if len(members) >= min_size]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "items": len(self.assignment),
+            "clusters": self.leader_count,
+            "dimensions": sorted(self.spaces),
+            "multi_item_clusters": sum(1 for members in self.members if len(members) > 1),
+            "stale_leader_ratio": self.stale_ratio
+        }
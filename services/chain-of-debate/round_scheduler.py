@@ -0,0 +1,241 @@
+"""
+Round Scheduler para Chain-of-Debate SuperMCP
+
+Ejecuta las llamadas de todos los participantes de una ronda en paralelo,
+cada una con su propio timeout, y publica cada respuesta en cuanto llega.
+
+Reglas de la ronda:
+- Timeout por participante (adaptado a su latencia histórica)
+- Cierre anticipado cuando un quórum de respuestas alcanza el umbral de consenso
+  (las respuestas de fallback, marcadas con is_fallback, no cuentan)
+- Los modelos que agotan su timeout se cancelan y se reportan como lentos
+  al ModelResilienceOrchestrator (que puede abrir su circuit breaker)
+- Los modelos con circuit breaker abierto no se llaman (degradados)
+"""
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fábrica de la llamada a un participante
+ParticipantCall = Callable[[], Awaitable[Any]]
+# Callback para respuestas parciales (evento con modelo, ronda, contenido...)
+PartialCallback = Callable[[Dict[str, Any]], Any]
+# Función de consenso sobre las respuestas recibidas
+ConsensusFn = Callable[[List[Any]], Awaitable[float]]
+
+@dataclass
+class ParticipantOutcome:
+    """Resultado de un participante en una ronda"""
+    model_name: str
+    status: str  # 'completed', 'fallback', 'timeout', 'error', 'cancelled', 'skipped'
+    latency: float = 0.0
+    error: Optional[str] = None
+
+@dataclass
+class RoundOutcome:
+    """Resultado de una ronda programada"""
+    responses: List[Any]
+    participants: Dict[str, ParticipantOutcome] = field(default_factory=dict)
+    closed_early: bool = False
+    early_consensus: Optional[float] = None
+    duration: float = 0.0
+
+class RoundScheduler:
+    """
+    Planificador concurrente de rondas de debate
+    """
+
+    def __init__(
+        self,
+        resilience_orchestrator=None,
+        participant_timeout: float = 30.0,
+        min_participant_timeout: float = 5.0,
+        latency_multiplier: float = 3.0,
+        quorum_fraction: float = 0.66,
+        min_quorum: int = 2
+    ):
+        self.resilience_orchestrator = resilience_orchestrator
+        self.participant_timeout = participant_timeout
+        self.min_participant_timeout = min_participant_timeout
+        self.latency_multiplier = latency_multiplier
+        self.quorum_fraction = quorum_fraction
+        self.min_quorum = min_quorum
+
+        self.metrics = {
+            "rounds": 0,
+            "rounds_closed_early": 0,
+            "participant_calls": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "fallbacks": 0,
+            "cancelled": 0,
+            "skipped_demoted": 0
+        }
+
+    def timeout_for(self, model_name: str) -> float:
+        """Timeout del participante según su latencia media reciente"""
+        if self.resilience_orchestrator is None:
+            return self.participant_timeout
+
+        avg_response_time = self.resilience_orchestrator.get_model_latency(model_name)
+        if not avg_response_time:
+            return self.participant_timeout
+
+        adaptive = avg_response_time * self.latency_multiplier
+        return max(self.min_participant_timeout, min(self.participant_timeout, adaptive))
+
+    def quorum_for(self, participants: int) -> int:
+        """Respuestas necesarias para evaluar cierre anticipado"""
+        return min(participants, max(self.min_quorum, math.ceil(participants * self.quorum_fraction)))
+
+    async def run_round(
+        self,
+        round_number: int,
+        participants: Dict[str, ParticipantCall],
+        consensus_fn: Optional[ConsensusFn] = None,
+        consensus_threshold: float = 0.7,
+        on_partial: Optional[PartialCallback] = None
+    ) -> RoundOutcome:
+        """Ejecutar una ronda con todos los participantes en paralelo"""
+
+        round_start = time.time()
+        outcome = RoundOutcome(responses=[])
+        self.metrics["rounds"] += 1
+
+        # Excluir modelos degradados mientras queden suficientes para un quórum
+        active = dict(participants)
+        if self.resilience_orchestrator is not None:
+            available = {
+                name: call for name, call in participants.items()
+                if self.resilience_orchestrator.is_model_available(name)
+            }
+            if len(available) >= min(self.min_quorum, len(participants)):
+                for name in participants.keys() - available.keys():
+                    outcome.participants[name] = ParticipantOutcome(name, 'skipped', error="circuit open")
+                    self.metrics["skipped_demoted"] += 1
+                    logger.info(f"⏭️ Skipping demoted model {name} in round {round_number}")
+                active = available
+
+        if not active:
+            outcome.duration = time.time() - round_start
+            return outcome
+
+        tasks: Dict[asyncio.Task, str] = {}
+        for name, call in active.items():
+            task = asyncio.create_task(asyncio.wait_for(call(), timeout=self.timeout_for(name)))
+            tasks[task] = name
+            self.metrics["participant_calls"] += 1
+
+        quorum = self.quorum_for(len(active))
+        pending = set(tasks)
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    name = tasks[task]
+                    latency = time.time() - round_start
+                    await self._collect(task, name, latency, round_number, outcome, on_partial)
+
+                live_responses = [
+                    response for response in outcome.responses
+                    if not getattr(response, 'is_fallback', False)
+                ]
+                if pending and consensus_fn and len(live_responses) >= quorum:
+                    try:
+                        score = await consensus_fn(live_responses)
+                    except Exception as e:
+                        logger.error(f"Early consensus check error: {e}")
+                        score = 0.0
+
+                    if score >= consensus_threshold:
+                        outcome.closed_early = True
+                        outcome.early_consensus = score
+                        self.metrics["rounds_closed_early"] += 1
+                        logger.info(f"⚡ Round {round_number} closed early with {len(live_responses)}/"
+                                    f"{len(active)} responses (consensus: {score:.2f})")
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+                name = tasks[task]
+                outcome.participants[name] = ParticipantOutcome(
+                    name, 'cancelled', latency=time.time() - round_start
+                )
+                self.metrics["cancelled"] += 1
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        outcome.duration = time.time() - round_start
+        return outcome
+
+    async def _collect(
+        self,
+        task: asyncio.Task,
+        name: str,
+        latency: float,
+        round_number: int,
+        outcome: RoundOutcome,
+        on_partial: Optional[PartialCallback]
+    ):
+        """Registrar el resultado de un participante terminado"""
+        try:
+            response = task.result()
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            outcome.participants[name] = ParticipantOutcome(name, 'timeout', latency, "participant timeout")
+            logger.warning(f"⏱️ {name} timed out in round {round_number} after {latency:.1f}s")
+            if self.resilience_orchestrator is not None:
+                await self.resilience_orchestrator.report_slow_model(name, latency)
+            return
+        except Exception as e:
+            self.metrics["errors"] += 1
+            outcome.participants[name] = ParticipantOutcome(name, 'error', latency, str(e))
+            logger.warning(f"Model response error from {name}: {e}")
+            return
+
+        if response is None:
+            outcome.participants[name] = ParticipantOutcome(name, 'error', latency, "empty response")
+            return
+
+        outcome.responses.append(response)
+        if getattr(response, 'is_fallback', False):
+            # Respuesta de plantilla de un modelo caído: se conserva, pero no es una opinión real
+            self.metrics["fallbacks"] += 1
+            outcome.participants[name] = ParticipantOutcome(name, 'fallback', latency)
+        else:
+            outcome.participants[name] = ParticipantOutcome(name, 'completed', latency)
+
+        if on_partial is not None:
+            try:
+                result = on_partial({
+                    "type": "response",
+                    "round": round_number,
+                    "model": name,
+                    "role": getattr(getattr(response, 'role', None), 'value', None),
+                    "content": getattr(response, 'content', ''),
+                    "confidence": getattr(response, 'confidence', 0.0),
+                    "latency": latency,
+                    "received": len(outcome.responses)
+                })
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Partial response callback error: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del planificador"""
+        return {
+            **self.metrics,
+            "early_close_rate": (
+                self.metrics["rounds_closed_early"] / self.metrics["rounds"]
+                if self.metrics["rounds"] else 0.0
+            )
+        }
@@ -22,20 +22,20 @@ Pipeline de Mejora:
 import asyncio
 import json
 import logging
-import numpy as np
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import pickle
-import hashlib
 from collections import defaultdict, deque
 
 # Para embeddings y análisis semántico
-import openai
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from embedding_service import EmbeddingService
+from pattern_clustering import IncrementalClusterer
+
 logger = logging.getLogger(__name__)
 
 class InterventionType(Enum):
@@ -106,9 +106,13 @@ class ShadowLearningEngine:
         self.retraining_threshold = 100  # Eventos con intervención
         self.quality_improvement_threshold = 0.15  # 15% mejora mínima
         
-        # Análisis semántico
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.embeddings_cache = {}
+        # Análisis semántico (embeddings por lotes con store persistente)
+        self.embedding_service = EmbeddingService()
+        
+        # Clusters incrementales de intervenciones por dominio
+        self.intervention_clusters: Dict[str, IncrementalClusterer] = {}
+        self.cluster_similarity_threshold = 0.8
+        self.cluster_rebuild_stale_ratio = 0.25
         
         # Métricas de mejora
         self.improvement_metrics = {
@@ -241,42 +245,16 @@ class ShadowLearningEngine:
         
         logger.warning(f"Event not found for client feedback: {task_id}")
     
-    async def _generate_embedding(self, text: str) -> List[float]:
-        """Generar embedding para análisis semántico"""
-        
-        # Cache para evitar regenerar embeddings
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        if text_hash in self.embeddings_cache:
-            return self.embeddings_cache[text_hash]
+    async def _generate_embedding(self, text: str) -> Optional[List[float]]:
+        """Generar embedding para análisis semántico (None si el backend falla)"""
         
         try:
-            # Usar OpenAI embeddings
-            client = openai.AsyncOpenAI()
-            response = await client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text[:8000]  # Limitar longitud
-            )
-            
-            embedding = response.data[0].embedding
-            self.embeddings_cache[text_hash] = embedding
-            
-            # Limitar cache
-            if len(self.embeddings_cache) > 5000:
-                # Remover 20% más antiguos
-                keys_to_remove = list(self.embeddings_cache.keys())[:1000]
-                for key in keys_to_remove:
-                    del self.embeddings_cache[key]
-            
-            return embedding
-            
+            vector = await self.embedding_service.embed(text)
+            return vector.tolist()
         except Exception as e:
+            # Sin embedding: _backfill_embeddings lo reintenta en el próximo análisis
             logger.error(f"Embedding generation error: {e}")
-            # Fallback a TF-IDF
-            try:
-                tfidf_matrix = self.vectorizer.fit_transform([text])
-                return tfidf_matrix.toarray()[0].tolist()
-            except:
-                return [0.0] * 1536  # Embedding vacío
+            return None
     
     async def _calculate_quality_improvement(
         self,
@@ -287,9 +265,18 @@ class ShadowLearningEngine:
         """Calcular mejora de calidad después de intervención humana"""
         
         try:
-            # Obtener embeddings
-            input_embedding = await self._generate_embedding(input_content)
-            final_embedding = await self._generate_embedding(final_result)
+            # Comparar con output original de mejor modelo
+            best_original = max(
+                original_outputs.values(),
+                key=lambda x: x.get('confidence', 0),
+                default={}
+            )
+            original_content = best_original.get('content', '') if best_original else ''
+            
+            # Obtener embeddings (un solo batch)
+            input_embedding, final_embedding, original_embedding = await self.embedding_service.embed_many(
+                [input_content, final_result, original_content]
+            )
             
             # Calcular relevancia semántica
             relevance_score = cosine_similarity(
@@ -300,17 +287,7 @@ class ShadowLearningEngine:
             # Calcular coherencia (longitud apropiada, estructura)
             coherence_score = self._calculate_coherence_score(final_result)
             
-            # Comparar con output original de mejor modelo
-            best_original = max(
-                original_outputs.values(),
-                key=lambda x: x.get('confidence', 0),
-                default={}
-            )
-            
             if best_original:
-                original_content = best_original.get('content', '')
-                original_embedding = await self._generate_embedding(original_content)
-                
                 # Mejora relativa
                 original_relevance = cosine_similarity(
                     [input_embedding], 
@@ -391,31 +368,28 @@ class ShadowLearningEngine:
         intervention_events = [e for e in events if e.human_intervention]
         
         if len(intervention_events) >= 10:
-            # Clustering de inputs similares con intervenciones
-            intervention_embeddings = [e.embedding for e in intervention_events if e.embedding]
+            # Clustering incremental de inputs similares con intervenciones
+            await self._backfill_embeddings(intervention_events)
+            clusterer = self._update_intervention_clusters(domain, intervention_events)
+            events_by_id = {e.event_id: e for e in intervention_events}
             
-            if len(intervention_embeddings) >= 5:
-                # Análisis de clustering simple
-                similarity_clusters = self._simple_clustering(intervention_embeddings, threshold=0.8)
+            for cluster in clusterer.clusters(min_size=3):  # Patrón significativo
+                cluster_events = [events_by_id[event_id] for event_id in cluster]
+                
+                # Extraer patrón común
+                common_issues = self._extract_common_issues(cluster_events)
                 
-                for cluster in similarity_clusters:
-                    if len(cluster) >= 3:  # Patrón significativo
-                        cluster_events = [intervention_events[i] for i in cluster]
-                        
-                        # Extraer patrón común
-                        common_issues = self._extract_common_issues(cluster_events)
-                        
-                        pattern = LearningPattern(
-                            pattern_id=f"{domain}_intervention_{len(patterns)}",
-                            pattern_type="frequent_intervention",
-                            description=f"Frequent human intervention needed for {common_issues}",
-                            confidence=len(cluster) / len(intervention_events),
-                            examples=[e.original_input[:100] for e in cluster_events[:3]],
-                            improvement_suggestions=self._generate_improvement_suggestions(cluster_events),
-                            frequency=len(cluster)
-                        )
-                        
-                        patterns.append(pattern)
+                pattern = LearningPattern(
+                    pattern_id=f"{domain}_intervention_{len(patterns)}",
+                    pattern_type="frequent_intervention",
+                    description=f"Frequent human intervention needed for {common_issues}",
+                    confidence=len(cluster) / len(intervention_events),
+                    examples=[e.original_input[:100] for e in cluster_events[:3]],
+                    improvement_suggestions=self._generate_improvement_suggestions(cluster_events),
+                    frequency=len(cluster)
+                )
+                
+                patterns.append(pattern)
         
         # Patrón 2: Baja calidad consistente en ciertos tipos de requests
         low_quality_events = [
@@ -465,41 +439,48 @@ class ShadowLearningEngine:
         
         return patterns
     
-    def _simple_clustering(
-        self, 
-        embeddings: List[List[float]], 
-        threshold: float = 0.8
-    ) -> List[List[int]]:
-        """Clustering simple basado en similitud coseno"""
-        
-        if not embeddings:
-            return []
+    async def _backfill_embeddings(self, events: List[ShadowLearningEvent]):
+        """Generar en un batch los embeddings que falten en los eventos"""
         
-        embeddings_array = np.array(embeddings)
-        similarity_matrix = cosine_similarity(embeddings_array)
+        missing = [e for e in events if not e.embedding]
+        if not missing:
+            return
         
-        clusters = []
-        used_indices = set()
-        
-        for i in range(len(embeddings)):
-            if i in used_indices:
-                continue
-            
-            cluster = [i]
-            used_indices.add(i)
-            
-            for j in range(i + 1, len(embeddings)):
-                if j in used_indices:
-                    continue
-                
-                if similarity_matrix[i][j] >= threshold:
-                    cluster.append(j)
-                    used_indices.add(j)
-            
-            if len(cluster) > 1:
-                clusters.append(cluster)
-        
-        return clusters
+        try:
+            vectors = await self.embedding_service.embed_many([e.original_input for e in missing])
+            for event, vector in zip(missing, vectors):
+                event.embedding = vector.tolist()
+        except Exception as e:
+            # Se dejan sin embedding (fuera del clustering) hasta el próximo intento
+            logger.error(f"Embedding backfill error, retrying on next analysis: {e}")
+    
+    def _update_intervention_clusters(
+        self,
+        domain: str,
+        intervention_events: List[ShadowLearningEvent]
+    ) -> IncrementalClusterer:
+        """Asignar solo los eventos nuevos al índice de clusters del dominio"""
+        
+        clusterer = self.intervention_clusters.get(domain)
+        live_ids = {e.event_id for e in intervention_events}
+        
+        if clusterer is not None:
+            clusterer.retain(live_ids)
+            # Demasiados líderes de eventos ya descartados: reconstruir
+            if clusterer.stale_ratio > self.cluster_rebuild_stale_ratio:
+                logger.info(f"♻️ Rebuilding intervention clusters for {domain}")
+                clusterer = None
+        
+        if clusterer is None:
+            clusterer = IncrementalClusterer(threshold=self.cluster_similarity_threshold)
+            self.intervention_clusters[domain] = clusterer
+        
+        # Los eventos sin embedding real quedan fuera hasta que el backfill lo consiga
+        new_events = [e for e in intervention_events if e.embedding and e.event_id not in clusterer]
+        if new_events:
+            clusterer.add_many([e.event_id for e in new_events], [e.embedding for e in new_events])
+        
+        return clusterer
     
     def _extract_common_issues(self, events: List[ShadowLearningEvent]) -> str:
         """Extraer issues comunes de eventos similares"""
@@ -766,7 +747,11 @@ class ShadowLearningEngine:
             "active_patterns": len(self.learning_patterns),
             "pending_retraining_triggers": len([t for t in self.retraining_triggers if t.threshold_met]),
             "learning_efficiency": self._calculate_learning_efficiency(),
-            "data_quality_score": self._calculate_data_quality_score()
+            "data_quality_score": self._calculate_data_quality_score(),
+            "embedding_service": self.embedding_service.get_stats(),
+            "intervention_clusters": {
+                domain: clusterer.get_stats() for domain, clusterer in self.intervention_clusters.items()
+            }
         }
     
     def _calculate_learning_efficiency(self) -> float:
@@ -29,6 +29,7 @@ Beneficios Empresariales:
 import asyncio
 import json
 import logging
+import os
 import time
 from typing import Dict, List, Any, Optional, Callable, Union
 from dataclasses import dataclass, asdict
@@ -36,7 +37,8 @@ from datetime import datetime, timedelta
 from enum import Enum
 import uuid
 from collections import defaultdict, deque
-import heapq
+
+from task_scheduler import PriorityTaskScheduler
 
 # MCP Integration imports
 try:
@@ -230,7 +232,6 @@ class TaskRouter:
     def __init__(self):
         self.mcp_manager = MCPServerManager()
         self.routing_rules = self._load_routing_rules()
-        self.task_queue = []  # Priority queue
         self.active_tasks = {}
         self.completed_tasks = deque(maxlen=1000)
         
@@ -254,6 +255,15 @@ class TaskRouter:
             cost_per_request=0.50
         )
         
+        # Cola de prioridad event-driven con workers concurrentes
+        self.scheduler = PriorityTaskScheduler(
+            route=self.route_task,
+            execute=self._run_scheduled_task,
+            on_expired=self._mark_task_expired,
+            workers=int(os.getenv('TASK_ROUTER_WORKERS', '4')),
+            aging_seconds=float(os.getenv('TASK_ROUTER_AGING_SECONDS', '60'))
+        )
+        
         # Inicializar MCP discovery
         asyncio.create_task(self._initialize_mcp_discovery())
         
@@ -350,14 +360,6 @@ class TaskRouter:
         try:
             logger.info(f"🧭 Routing task {task_request.task_id} ({task_request.task_type.value})")
             
-            # Agregar a queue si no es crítico
-            if task_request.priority != Priority.CRITICAL:
-                heapq.heappush(self.task_queue, (
-                    task_request.priority.value,
-                    task_request.created_at.timestamp(),
-                    task_request
-                ))
-            
             # Obtener destinos candidatos
             candidate_destinations = await self._get_candidate_destinations(task_request)
             
@@ -391,7 +393,7 @@ class TaskRouter:
                 routing_metadata={
                     "routing_time": time.time() - routing_start,
                     "candidates_evaluated": len(candidate_destinations),
-                    "queue_position": len(self.task_queue) if task_request.priority != Priority.CRITICAL else 0,
+                    "queue_depth": self.scheduler.depth,
                     "load_balancing_factor": best_destination.load_score
                 }
             )
@@ -399,14 +401,6 @@ class TaskRouter:
             # Actualizar métricas
             self._update_routing_metrics(routing_decision)
             
-            # Registrar tarea activa
-            self.active_tasks[task_request.task_id] = {
-                "request": task_request,
-                "routing_decision": routing_decision,
-                "status": RouteStatus.ROUTED,
-                "routed_at": datetime.now()
-            }
-            
             logger.info(f"✅ Task {task_request.task_id} routed to {best_destination.destination_id}")
             
             return routing_decision
@@ -647,30 +641,69 @@ class TaskRouter:
             (current_avg * (total_routed - 1) + routing_time) / total_routed
         )
     
+    async def submit_task(self, task_request: TaskRequest) -> Optional[RoutingDecision]:
+        """
+        Encolar una tarea para routing y ejecución
+        
+        Las tareas CRITICAL saltan la cola y se ejecutan de inmediato
+        (devuelve su decisión); el resto se encola y devuelve None.
+        """
+        priority_rules = self.routing_rules["priority_routing"].get(task_request.priority, {})
+        
+        if priority_rules.get("bypass_queue"):
+            routing_decision = await self.route_task(task_request)
+            await self._run_scheduled_task(task_request, routing_decision)
+            return routing_decision
+        
+        self.active_tasks[task_request.task_id] = {
+            "request": task_request,
+            "routing_decision": None,
+            "status": RouteStatus.PENDING,
+            "queued_at": datetime.now()
+        }
+        
+        await self.scheduler.enqueue(
+            task_request.task_id,
+            task_request.priority.value,
+            task_request,
+            deadline=task_request.deadline.timestamp() if task_request.deadline else None
+        )
+        
+        logger.info(f"📥 Task {task_request.task_id} queued (depth: {self.scheduler.depth})")
+        return None
+    
     async def process_task_queue(self):
         """Procesar queue de tareas de forma continua"""
+        await self.scheduler.run()
+    
+    async def _run_scheduled_task(self, task_request: TaskRequest, routing_decision: RoutingDecision):
+        """Ejecutar una tarea ya enrutada y registrar su resultado"""
         
-        while True:
-            try:
-                if self.task_queue:
-                    # Obtener task de mayor prioridad
-                    priority, timestamp, task_request = heapq.heappop(self.task_queue)
-                    
-                    # Verificar si no ha expirado
-                    if task_request.deadline and datetime.now() > task_request.deadline:
-                        logger.warning(f"Task {task_request.task_id} expired - skipping")
-                        continue
-                    
-                    # Procesar task
-                    routing_decision = await self.route_task(task_request)
-                    await self._execute_routing_decision(task_request, routing_decision)
-                
-                # Sleep corto para no consumir CPU
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Task queue processing error: {e}")
-                await asyncio.sleep(5)
+        task_info = self.active_tasks.setdefault(task_request.task_id, {"request": task_request})
+        task_info["routing_decision"] = routing_decision
+        task_info["status"] = RouteStatus.IN_PROGRESS
+        task_info.setdefault("routed_at", datetime.now())
+        
+        success = False
+        try:
+            await self._execute_routing_decision(task_request, routing_decision)
+            success = True
+            task_info["status"] = RouteStatus.COMPLETED
+            self.routing_metrics["successful_routes"] += 1
+        except Exception:
+            task_info["status"] = RouteStatus.FAILED
+            self.routing_metrics["failed_routes"] += 1
+            raise
+        finally:
+            self.active_tasks.pop(task_request.task_id, None)
+            self.completed_tasks.append({**task_info, "success": success, "completed_at": datetime.now()})
+    
+    def _mark_task_expired(self, task_request: TaskRequest):
+        """Marcar como vencida una tarea que alcanzó su deadline en cola"""
+        
+        task_info = self.active_tasks.pop(task_request.task_id, None) or {"request": task_request}
+        task_info["status"] = RouteStatus.TIMEOUT
+        self.completed_tasks.append({**task_info, "success": False, "completed_at": datetime.now()})
     
     async def _execute_routing_decision(
         self, 
@@ -820,6 +853,13 @@ class TaskRouter:
         
         if task_id in self.active_tasks:
             task_info = self.active_tasks[task_id]
+            if task_info.get("routing_decision") is None:
+                return {
+                    "task_id": task_id,
+                    "status": task_info["status"].value,
+                    "queued_at": task_info["queued_at"].isoformat(),
+                    "queue_depth": self.scheduler.depth
+                }
             return {
                 "task_id": task_id,
                 "status": task_info["status"].value,
@@ -837,7 +877,8 @@ class TaskRouter:
         return {
             **self.routing_metrics,
             "active_tasks": len(self.active_tasks),
-            "queue_length": len(self.task_queue),
+            "queue_length": self.scheduler.depth,
+            "scheduler": self.scheduler.get_metrics(),
             "available_destinations": len(self.mcp_manager.available_servers) + 1,  # +1 for Chain-of-Debate
             "mcp_servers_health": {
                 server_id: health["status"] 
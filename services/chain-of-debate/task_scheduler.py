@@ -0,0 +1,341 @@
+"""
+Task Scheduler para Chain-of-Debate SuperMCP
+
+Planificador event-driven para la cola del TaskRouter:
+- Los workers despiertan al encolar (sin polling)
+- N workers concurrentes
+- Índice de expiración por deadline (las tareas vencidas salen de la cola
+  en su deadline, no al hacer pop)
+- Límites de concurrencia por destino derivados de su load_score; una tarea
+  sin destino con capacidad se aparca sin ocupar worker y vuelve a la cola
+  cuando uno de sus destinos libera un slot
+- Aging de prioridad para que las tareas LOW/BATCH no se queden sin turno
+- Histogramas de profundidad de cola y tiempo de espera
+"""
+
+import asyncio
+import bisect
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+WAIT_TIME_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+QUEUE_DEPTH_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+class Histogram:
+    """Histograma de buckets acumulativos (estilo Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """Cota superior del bucket que contiene el percentil q"""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = list(itertools.accumulate(self.counts))
+        return {
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.buckets, cumulative)},
+                "+Inf": self.total
+            },
+            "count": self.total,
+            "sum": self.sum,
+            "avg": self.sum / self.total if self.total else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95)
+        }
+
+@dataclass
+class ScheduledTask:
+    """Entrada de la cola del scheduler"""
+    task_id: str
+    priority: int
+    enqueued_at: float
+    payload: Any
+    deadline: Optional[float] = None  # epoch seconds
+    cancelled: bool = False
+    sequence: int = 0
+    decision: Any = None  # Decisión de routing reutilizada al volver de aparcada
+
+    def sort_key(self, aging_seconds: float) -> float:
+        # priority - wait/aging_seconds ordena igual que priority*aging_seconds + enqueued_at,
+        # por lo que el aging no requiere reordenar el heap
+        return self.priority * aging_seconds + self.enqueued_at
+
+class PriorityTaskScheduler:
+    """
+    Cola de prioridad con workers concurrentes y límites por destino
+    """
+
+    def __init__(
+        self,
+        route: Callable[[Any], Awaitable[Any]],
+        execute: Callable[[Any, Any], Awaitable[Any]],
+        on_expired: Optional[Callable[[Any], Any]] = None,
+        workers: int = 4,
+        aging_seconds: float = 60.0,
+        base_destination_limit: int = 8,
+        min_destination_limit: int = 1
+    ):
+        self.route = route
+        self.execute = execute
+        self.on_expired = on_expired
+        self.worker_count = workers
+        self.aging_seconds = aging_seconds
+        self.base_destination_limit = base_destination_limit
+        self.min_destination_limit = min_destination_limit
+
+        self._queue: List[tuple] = []
+        self._expiry: List[tuple] = []
+        self._entries: Dict[str, ScheduledTask] = {}
+        self._sequence = itertools.count()
+
+        self._queue_changed = asyncio.Condition()
+        self._expiry_changed = asyncio.Event()
+        self._in_flight: Dict[str, int] = {}
+        self._parked: List[ScheduledTask] = []  # Tareas esperando capacidad de destino
+
+        self._workers: List[asyncio.Task] = []
+        self._expiry_task: Optional[asyncio.Task] = None
+
+        self.wait_time_histogram = Histogram(WAIT_TIME_BUCKETS)
+        self.queue_depth_histogram = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.metrics = {
+            "enqueued": 0,
+            "dispatched": 0,
+            "completed": 0,
+            "failed": 0,
+            "expired": 0,
+            "spilled_to_fallback": 0,
+            "parked": 0
+        }
+
+    @property
+    def depth(self) -> int:
+        return len(self._entries)
+
+    def destination_limit(self, destination) -> int:
+        """Slots concurrentes de un destino según su load_score"""
+        load = max(0.0, getattr(destination, 'load_score', 0.0) or 0.0)
+        return max(self.min_destination_limit, int(self.base_destination_limit / (1.0 + load)))
+
+    def has_capacity(self, destination) -> bool:
+        return self._in_flight.get(destination.destination_id, 0) < self.destination_limit(destination)
+
+    async def enqueue(self, task_id: str, priority: int, payload: Any, deadline: Optional[float] = None) -> ScheduledTask:
+        """Encolar una tarea y despertar a un worker"""
+        entry = ScheduledTask(
+            task_id=task_id,
+            priority=priority,
+            enqueued_at=time.time(),
+            payload=payload,
+            deadline=deadline,
+            sequence=next(self._sequence)
+        )
+
+        async with self._queue_changed:
+            previous = self._entries.get(task_id)
+            if previous is not None:
+                # Re-encolar sustituye la entrada anterior en lugar de duplicarla
+                previous.cancelled = True
+            self._entries[task_id] = entry
+            heapq.heappush(self._queue, (entry.sort_key(self.aging_seconds), entry.sequence, entry))
+            self.metrics["enqueued"] += 1
+            self.queue_depth_histogram.observe(self.depth)
+            self._queue_changed.notify()
+
+        if deadline is not None:
+            heapq.heappush(self._expiry, (deadline, entry.sequence, entry))
+            if self._expiry[0][2] is entry:
+                self._expiry_changed.set()
+
+        return entry
+
+    def start(self):
+        """Arrancar workers y el vigilante de deadlines"""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        self._expiry_task = asyncio.create_task(self._expire_loop())
+        logger.info(f"🗂️ Task scheduler started with {self.worker_count} workers")
+
+    async def run(self):
+        """Arrancar y esperar a los workers (bloquea hasta stop)"""
+        self.start()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def stop(self):
+        """Detener workers y vigilante de deadlines"""
+        tasks = self._workers + ([self._expiry_task] if self._expiry_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._expiry_task = None
+
+    async def _next_entry(self) -> ScheduledTask:
+        """Esperar (sin polling) hasta que haya una tarea viva en la cola"""
+        async with self._queue_changed:
+            while True:
+                while self._queue and self._queue[0][2].cancelled:
+                    heapq.heappop(self._queue)
+                if self._queue:
+                    entry = heapq.heappop(self._queue)[2]
+                    entry.cancelled = True  # Fuera de la cola: el vigilante ya no la expira
+                    self._entries.pop(entry.task_id, None)
+                    self.queue_depth_histogram.observe(self.depth)
+                    return entry
+                await self._queue_changed.wait()
+
+    @staticmethod
+    def _candidates(decision) -> list:
+        return [decision.destination] + list(decision.fallback_destinations or [])
+
+    def _reserve_destination(self, decision):
+        """Reservar un slot en el destino o en un fallback con capacidad (None si no hay)"""
+        candidates = self._candidates(decision)
+        for destination in candidates:
+            if self.has_capacity(destination):
+                self._in_flight[destination.destination_id] = self._in_flight.get(destination.destination_id, 0) + 1
+                if destination is not decision.destination:
+                    self.metrics["spilled_to_fallback"] += 1
+                    decision = replace(
+                        decision,
+                        destination=destination,
+                        routing_reason=f"{decision.routing_reason} (primary at capacity)",
+                        fallback_destinations=[d for d in candidates if d is not destination]
+                    )
+                return decision
+        return None
+
+    async def _park(self, entry: ScheduledTask, decision):
+        """Aparcar una tarea sin destino con capacidad, liberando al worker"""
+        async with self._queue_changed:
+            if entry.task_id in self._entries:
+                return  # Re-encolada mientras se enrutaba: la entrada nueva manda
+            entry.decision = decision
+            entry.cancelled = False  # Sigue siendo expirable mientras espera
+            self._entries[entry.task_id] = entry
+            self._parked.append(entry)
+            self.metrics["parked"] += 1
+        if entry.deadline is not None:
+            heapq.heappush(self._expiry, (entry.deadline, entry.sequence, entry))
+            if self._expiry[0][2] is entry:
+                self._expiry_changed.set()
+
+    async def _release_destination(self, destination):
+        """Liberar un slot y devolver a la cola la mejor tarea aparcada que lo puede usar"""
+        self._in_flight[destination.destination_id] -= 1
+
+        async with self._queue_changed:
+            self._parked = [entry for entry in self._parked if not entry.cancelled]
+            waiting = [
+                entry for entry in self._parked
+                if any(d.destination_id == destination.destination_id for d in self._candidates(entry.decision))
+            ]
+            if not waiting:
+                return
+            entry = min(waiting, key=lambda e: (e.sort_key(self.aging_seconds), e.sequence))
+            self._parked.remove(entry)
+            heapq.heappush(self._queue, (entry.sort_key(self.aging_seconds), entry.sequence, entry))
+            self._queue_changed.notify()
+
+    async def _worker(self, worker_id: int):
+        """Consumir la cola ejecutando tareas con límites por destino"""
+        while True:
+            entry = await self._next_entry()
+
+            try:
+                decision = entry.decision or await self.route(entry.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["failed"] += 1
+                logger.error(f"Scheduling error for {entry.task_id}: {e}")
+                continue
+
+            reserved = self._reserve_destination(decision)
+            if reserved is None:
+                await self._park(entry, decision)
+                continue
+
+            self.wait_time_histogram.observe(time.time() - entry.enqueued_at)
+            self.metrics["dispatched"] += 1
+
+            try:
+                await self.execute(entry.payload, reserved)
+                self.metrics["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["failed"] += 1
+                logger.error(f"Task execution error for {entry.task_id} (worker {worker_id}): {e}")
+            finally:
+                await self._release_destination(reserved.destination)
+
+    async def _expire_loop(self):
+        """Expirar tareas en su deadline usando el índice de expiración"""
+        while True:
+            self._expiry_changed.clear()
+            while self._expiry and self._expiry[0][2].cancelled:
+                heapq.heappop(self._expiry)
+
+            timeout = None
+            if self._expiry:
+                timeout = max(0.0, self._expiry[0][0] - time.time())
+
+            try:
+                await asyncio.wait_for(self._expiry_changed.wait(), timeout=timeout)
+                continue  # Nuevo deadline más próximo: recalcular
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.time()
+            async with self._queue_changed:
+                while self._expiry and self._expiry[0][0] <= now:
+                    entry = heapq.heappop(self._expiry)[2]
+                    if entry.cancelled:
+                        continue
+                    entry.cancelled = True
+                    self._entries.pop(entry.task_id, None)
+                    self.metrics["expired"] += 1
+                    logger.warning(f"Task {entry.task_id} expired in queue")
+                    if self.on_expired is not None:
+                        try:
+                            self.on_expired(entry.payload)
+                        except Exception as e:
+                            logger.error(f"Expiry callback error for {entry.task_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del scheduler"""
+        return {
+            **self.metrics,
+            "queue_depth": self.depth,
+            "workers": len(self._workers),
+            "parked_tasks": sum(1 for entry in self._parked if not entry.cancelled),
+            "in_flight_by_destination": {k: v for k, v in self._in_flight.items() if v},
+            "wait_time_seconds": self.wait_time_histogram.to_dict(),
+            "queue_depth_histogram": self.queue_depth_histogram.to_dict()
+        }
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark for the claude-code-memory CacheManager
+
+Compares hit latency and multi-threaded throughput of the current
+CacheManager against a reference of the previous engine (plain dict,
+pickle-based sizing, sort-based eviction, one sqlite connection and one
+UPDATE per disk read).
+
+Usage:
+    python benchmarks/cache_benchmark.py [--entries 5000] [--threads 8] [--capacity 1000]
+"""
+
+import argparse
+import pickle
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.cache_manager import CacheManager
+
+class LegacyCacheManager(CacheManager):
+    """Reference of the previous hot paths, for comparison only"""
+
+    def _get_db_connection(self):
+        from contextlib import closing
+        return closing(sqlite3.connect(str(self.db_path)))
+
+    def _calculate_size(self, value, _depth=0):
+        if isinstance(value, (list, tuple, dict)):
+            return len(pickle.dumps(value))
+        return super()._calculate_size(value)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self.memory_cache.get(key)
+            if entry is not None:
+                if entry.is_expired:
+                    return default
+                entry.last_accessed = datetime.utcnow()
+                entry.access_count += 1
+                return entry.value
+            value = self._get_disk_cache(key, default)
+            self._flush_access_updates()
+            return value
+
+    def _evict_memory_cache(self, required_space, candidate=None):
+        for key, entry in sorted(self.memory_cache.items(), key=lambda x: x[1].last_accessed):
+            if self.memory_size + required_space <= self.max_memory_size:
+                break
+            del self.memory_cache[key]
+            self.memory_size -= entry.size_bytes
+        return self.memory_size + required_space <= self.max_memory_size
+
+def make_value(i: int):
+    return {"file": f"src/module_{i}.py", "elements": [{"name": f"fn_{j}", "line": j} for j in range(20)]}
+
+def bench_hits(cache: CacheManager, keys, rounds: int = 5):
+    """Median per-get latency in microseconds for memory hits"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        samples.append((time.perf_counter() - start) / len(keys) * 1e6)
+    return statistics.median(samples)
+
+def bench_disk_hits(cache: CacheManager, keys):
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+def bench_throughput(cache: CacheManager, keys, threads: int, duration: float = 2.0):
+    """Mixed get/set operations per second across threads"""
+    counts = [0] * threads
+    stop = time.perf_counter() + duration
+
+    def worker(index):
+        n = 0
+        i = index
+        while time.perf_counter() < stop:
+            key = keys[i % len(keys)]
+            if i % 10 == 0:
+                cache.set(key, make_value(i))
+            else:
+                cache.get(key)
+            i += threads
+            n += 1
+        counts[index] = n
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(counts) / duration
+
+def bench_insert_churn(cache: CacheManager, entries: int):
+    """Inserts per second once the memory tier is full and evicting"""
+    start = time.perf_counter()
+    for i in range(entries):
+        cache.set(f"churn:{i}", make_value(i))
+    return entries / (time.perf_counter() - start)
+
+def run(label: str, cache_cls, args):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Hit and throughput runs keep every entry in the memory tier
+        cache = cache_cls(cache_dir, max_memory_size=1024 * 1024 * 1024, **args.extra)
+        keys = [f"key:{i}" for i in range(args.entries)]
+        for i, key in enumerate(keys):
+            cache.set(key, make_value(i))
+
+        disk_keys = [f"disk:{i}" for i in range(min(500, args.entries))]
+        for i, key in enumerate(disk_keys):
+            cache.set(key, make_value(i), force_disk=True)
+
+        results = {
+            "memory hit (us)": bench_hits(cache, keys),
+            "disk hit (us)": bench_disk_hits(cache, disk_keys),
+            f"throughput x{args.threads} (ops/s)": bench_throughput(cache, keys, args.threads),
+        }
+        cache.shutdown()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Churn run sizes the memory tier to hold a fixed number of entries
+        cache = cache_cls(cache_dir, **args.extra)
+        cache.max_memory_size = args.capacity * cache._calculate_size(make_value(0))
+        results["insert with eviction (ops/s)"] = bench_insert_churn(cache, args.entries)
+        cache.shutdown()
+
+    print(f"\n{label}")
+    for name, value in results.items():
+        print(f"  {name:<32} {value:>12.1f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="CacheManager micro-benchmark")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--capacity", type=int, default=1000, help="entries held by the memory tier in the churn run")
+    args = parser.parse_args()
+
+    args.extra = {}
+    legacy = run("legacy engine", LegacyCacheManager, args)
+    current = run("current engine", CacheManager, args)
+    args.extra = {"admission_policy": "tinylfu"}
+    run("current engine + TinyLFU", CacheManager, args)
+
+    print("\nspeedup (current vs legacy)")
+    for name in legacy:
+        better = legacy[name] / current[name] if "(us)" in name else current[name] / legacy[name]
+        print(f"  {name:<32} {better:>11.2f}x")
+
+if __name__ == "__main__":
+    main()
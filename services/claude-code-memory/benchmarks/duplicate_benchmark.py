@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for project-wide duplicate detection
+
+Generates a synthetic project of functions with planted clone families
+(renamed identifiers, changed literals, inserted lines), then compares the
+MinHash/LSH DuplicateDetector with the previous all-pairs line-similarity
+check. The all-pairs check is timed on a sample and extrapolated, since
+running it over 10k functions takes tens of minutes.
+
+Usage:
+    python benchmarks/duplicate_benchmark.py [--functions 10000] [--files 500]
+        [--clone-fraction 0.1] [--legacy-sample 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.duplicate_detector import DuplicateDetector
+
+WORDS = ["total", "items", "value", "result", "count", "index", "buffer", "record",
+         "config", "payload", "entry", "node", "cache", "limit", "offset", "score"]
+OPS = ["+", "-", "*", "//", "%"]
+
+def random_body(rng: random.Random, lines: int) -> list:
+    body = []
+    for _ in range(lines):
+        a, b, c = rng.sample(WORDS, 3)
+        kind = rng.random()
+        if kind < 0.3:
+            body.append(f"    {a} = {b} {rng.choice(OPS)} {rng.randint(1, 99)}")
+        elif kind < 0.5:
+            body.append(f"    if {a} > {b}:\n        {c} = self.{a}_{b}({c})")
+        elif kind < 0.7:
+            body.append(f"    for {a} in {b}:\n        {c}.append({a} {rng.choice(OPS)} {c}_{b})")
+        else:
+            body.append(f"    {a} = {b}.get('{c}', {rng.randint(0, 9)})")
+    return body
+
+def mutate(rng: random.Random, body: list) -> list:
+    """Rename an identifier on one line, change literals and insert a line"""
+    mutated = [line.replace("1", "2") if rng.random() < 0.2 else line for line in body]
+    target = rng.randrange(len(mutated))
+    old, new = rng.sample(WORDS, 2)
+    mutated[target] = mutated[target].replace(old, f"{old}_v")
+    mutated.insert(rng.randrange(len(mutated)), f"    {new}_tmp = None")
+    return mutated
+
+def synthetic_project(functions: int, files: int, clone_fraction: float, seed: int = 7):
+    """Return [(file_path, name, start_line, end_line, content)] and planted families"""
+    rng = random.Random(seed)
+    records, families = [], []
+
+    cloned = int(functions * clone_fraction)
+    while len(records) < cloned:
+        base = random_body(rng, rng.randint(8, 25))
+        family = []
+        for _ in range(rng.randint(2, 6)):
+            family.append(len(records))
+            records.append(mutate(rng, base))
+        families.append(family)
+    while len(records) < functions:
+        records.append(random_body(rng, rng.randint(8, 25)))
+
+    order = list(range(len(records)))
+    rng.shuffle(order)
+    position = {original: new for new, original in enumerate(order)}
+    families = [[position[i] for i in family] for family in families]
+
+    project = []
+    line = {}
+    for new, original in enumerate(order):
+        file_path = f"src/module_{new % files}.py"
+        start = line.get(file_path, 1)
+        content = f"def func_{new}(self, items):\n" + "\n".join(records[original]) + "\n    return items\n"
+        end = start + content.count("\n")
+        line[file_path] = end + 1
+        project.append((file_path, f"func_{new}", start, end, content))
+    return project, families
+
+def legacy_similarity(text1: str, text2: str) -> float:
+    """Line-set Jaccard used by the previous _check_duplicate_code"""
+    lines1 = set(line.strip() for line in text1.split('\n') if line.strip())
+    lines2 = set(line.strip() for line in text2.split('\n') if line.strip())
+    if not lines1 or not lines2:
+        return 0.0
+    return len(lines1 & lines2) / len(lines1 | lines2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Duplicate detection benchmark")
+    parser.add_argument("--functions", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--clone-fraction", type=float, default=0.1)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--legacy-sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    project, families = synthetic_project(args.functions, args.files, args.clone_fraction)
+    planted_pairs = {pair for family in families for pair in combinations(sorted(family), 2)}
+    print(f"{len(project)} functions in {args.files} files, "
+          f"{len(families)} planted clone families ({len(planted_pairs)} pairs)")
+
+    # MinHash/LSH over the whole project
+    detector = DuplicateDetector(threshold=args.threshold, min_lines=5)
+    start = time.perf_counter()
+    index_of = {}
+    for i, (file_path, name, start_line, end_line, content) in enumerate(project):
+        if detector.add(file_path, name, start_line, end_line, content):
+            index_of[(file_path, name)] = i
+    indexed = time.perf_counter() - start
+    clusters = detector.find_clusters()
+    lsh_total = time.perf_counter() - start
+
+    found_pairs = set()
+    for cluster in clusters:
+        members = sorted(index_of[(m.file_path, m.name)] for m in cluster.members)
+        found_pairs.update(combinations(members, 2))
+    recall = len(found_pairs & planted_pairs) / max(1, len(planted_pairs))
+    precision = len(found_pairs & planted_pairs) / max(1, len(found_pairs))
+
+    # Planted pairs whose exact shingle Jaccard reaches the threshold, to separate
+    # LSH misses from pairs that are simply less similar than the threshold
+    shingles = {}
+    for i in {i for pair in planted_pairs for i in pair}:
+        tokens = detector.tokenize(project[i][4])
+        shingles[i] = {tuple(tokens[n:n + detector.shingle_size]) for n in range(len(tokens) - detector.shingle_size + 1)}
+    similar_pairs = {(a, b) for a, b in planted_pairs
+                     if len(shingles[a] & shingles[b]) / len(shingles[a] | shingles[b]) >= args.threshold}
+    lsh_recall = len(found_pairs & similar_pairs) / max(1, len(similar_pairs))
+
+    print(f"\nMinHash/LSH: indexed {len(detector)} functions in {indexed:.2f}s, "
+          f"clustered in {lsh_total - indexed:.2f}s (total {lsh_total:.2f}s)")
+    print(f"  {len(clusters)} clusters, {sum(c.files > 1 for c in clusters)} spanning several files")
+    print(f"  pair recall {recall:.3f}, pair precision {precision:.3f}")
+    print(f"  recall on {len(similar_pairs)} planted pairs with Jaccard >= {args.threshold}: {lsh_recall:.3f}")
+    print(f"  signature memory {detector.get_stats()['signature_bytes'] / 1024:.0f} KB")
+
+    # Previous all-pairs line similarity, on a sample
+    sample = project[:min(args.legacy_sample, len(project))]
+    start = time.perf_counter()
+    legacy_pairs = 0
+    for (_, _, _, _, a), (_, _, _, _, b) in combinations(sample, 2):
+        if legacy_similarity(a, b) > args.threshold:
+            legacy_pairs += 1
+    legacy_sample_time = time.perf_counter() - start
+    scale = (len(project) / len(sample)) ** 2
+    print(f"\nAll-pairs line similarity: {len(sample)} functions in {legacy_sample_time:.2f}s "
+          f"({legacy_pairs} pairs above threshold)")
+    print(f"  extrapolated to {len(project)} functions: {legacy_sample_time * scale:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for the embedded LocalVectorIndex
+
+Builds a synthetic clustered corpus, measures recall@10 and latency
+percentiles of the local exact and IVF search paths, and optionally runs
+the same queries against a Qdrant instance for comparison.
+
+Usage:
+    python benchmarks/local_index_benchmark.py [--size 1000000] [--dim 384]
+        [--queries 200] [--nprobe 16] [--qdrant-url http://localhost:6333]
+
+The default 1M x 384 corpus needs roughly 3GB of RAM.
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.local_index import LocalVectorIndex
+
+LANGUAGES = ["python", "javascript", "typescript", "go", "rust", "java"]
+
+def synthetic_corpus(size: int, dim: int, clusters: int, seed: int = 0, chunk: int = 100000):
+    """Yield chunks of clustered vectors, resembling code embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    for start in range(0, size, chunk):
+        n = min(chunk, size - start)
+        labels = rng.integers(0, clusters, n)
+        vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+        yield start, vectors
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+def recall_at_k(results, truth, k: int = 10):
+    hits = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    return hits / (k * len(truth))
+
+def run_local(index: LocalVectorIndex, queries: np.ndarray, exact: bool, language=None):
+    ids, latencies = [], []
+    filters = {"language": language} if language else None
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, limit=10, filters=filters, exact=exact)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([point_id for point_id, _, _ in hits])
+    return ids, latencies
+
+def run_qdrant(url: str, args, queries: np.ndarray):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+
+    client = QdrantClient(url=url, timeout=120)
+    collection = f"local_index_bench_{uuid.uuid4().hex[:8]}"
+    client.create_collection(
+        collection_name=collection,
+        vectors_config=models.VectorParams(size=args.dim, distance=models.Distance.COSINE)
+    )
+    try:
+        for start, vectors in synthetic_corpus(args.size, args.dim, args.clusters):
+            for offset in range(0, len(vectors), 1000):
+                batch = vectors[offset:offset + 1000]
+                client.upsert(
+                    collection_name=collection,
+                    points=models.Batch(
+                        ids=list(range(start + offset, start + offset + len(batch))),
+                        vectors=batch.tolist(),
+                        payloads=[{"language": LANGUAGES[(start + offset + i) % len(LANGUAGES)]}
+                                  for i in range(len(batch))]
+                    )
+                )
+
+        ids, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = client.search(collection_name=collection, query_vector=query.tolist(), limit=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+            ids.append([str(hit.id) for hit in hits])
+        return ids, latencies
+    finally:
+        client.delete_collection(collection)
+
+def main():
+    parser = argparse.ArgumentParser(description="LocalVectorIndex benchmark")
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--qdrant-url", default=None)
+    args = parser.parse_args()
+
+    index = LocalVectorIndex(args.dim, ann_threshold=args.size + 1, nprobe=args.nprobe)
+
+    start = time.perf_counter()
+    for offset, vectors in synthetic_corpus(args.size, args.dim, args.clusters):
+        index.upsert(
+            [str(offset + i) for i in range(len(vectors))],
+            vectors,
+            [{"language": LANGUAGES[(offset + i) % len(LANGUAGES)]} for i in range(len(vectors))]
+        )
+    print(f"loaded {index.size} vectors in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index.train()
+    index.ann_threshold = 0
+    print(f"trained IVF ({len(index.centroids)} lists) in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(42)
+    _, sample = next(synthetic_corpus(args.queries, args.dim, args.clusters, seed=1))
+    queries = sample + 0.1 * rng.standard_normal(sample.shape).astype(np.float32)
+
+    truth, exact_latency = run_local(index, queries, exact=True)
+    ivf_ids, ivf_latency = run_local(index, queries, exact=False)
+    _, filtered_latency = run_local(index, queries, exact=False, language="python")
+
+    print(f"\n{'backend':<28}{'recall@10':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    rows = [
+        ("local exact", 1.0, exact_latency),
+        (f"local IVF (nprobe={args.nprobe})", recall_at_k(ivf_ids, truth), ivf_latency),
+        ("local IVF + language filter", float("nan"), filtered_latency),
+    ]
+    if args.qdrant_url:
+        qdrant_ids, qdrant_latency = run_qdrant(args.qdrant_url, args, queries)
+        rows.append(("qdrant", recall_at_k(qdrant_ids, truth), qdrant_latency))
+
+    for name, recall, latency in rows:
+        p50, p99 = percentiles(latency)
+        print(f"{name:<28}{recall:>10.3f}{p50:>10.2f}{p99:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,32 @@
 Cache management for Claude Code Memory
 """
 import os
+import sys
 import json
 import pickle
 import hashlib
 import time
+from array import array
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
 from typing import Any, Optional, Dict, List, Tuple, Union
 from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 import threading
 import sqlite3
 from contextlib import contextmanager
 
+import numpy as np
+
+from .vector_store import VectorStore
+
 logger = logging.getLogger(__name__)
 
+# Number of container items inspected when estimating value sizes
+SIZE_SAMPLE = 16
+
 @dataclass
 class CacheEntry:
     """Represents a cache entry"""
@@ -28,25 +39,78 @@ class CacheEntry:
     ttl_seconds: Optional[int] = None
     tags: List[str] = None
     size_bytes: int = 0
+    expires_at: Optional[float] = None
     
     def __post_init__(self):
         if self.tags is None:
             self.tags = []
+        if self.expires_at is None and self.ttl_seconds is not None:
+            age = (datetime.utcnow() - self.created_at).total_seconds()
+            self.expires_at = time.time() - age + self.ttl_seconds
     
     @property
     def is_expired(self) -> bool:
         """Check if cache entry is expired"""
-        if self.ttl_seconds is None:
+        if self.expires_at is None:
             return False
         
-        expiry_time = self.created_at + timedelta(seconds=self.ttl_seconds)
-        return datetime.utcnow() > expiry_time
+        return time.time() > self.expires_at
     
     @property
     def age_seconds(self) -> float:
         """Get age of cache entry in seconds"""
         return (datetime.utcnow() - self.created_at).total_seconds()
 
+class TinyLFUAdmission:
+    """TinyLFU admission policy backed by an aging count-min sketch
+    
+    A new key is only admitted to the memory tier over the LRU victim it
+    would evict when its estimated access frequency is higher, which keeps
+    one-off scans from flushing frequently used entries.
+    """
+    
+    DEPTH = 4
+    MAX_COUNT = 15
+    
+    def __init__(self, width: int = 16384, sample_factor: int = 10):
+        # Round width up to a power of two so rows can be indexed with a mask
+        self.width = 1 << max(4, (width - 1).bit_length())
+        self.mask = self.width - 1
+        self.table = [array('B', bytes(self.width)) for _ in range(self.DEPTH)]
+        # Zero-copy numpy views over the rows, so aging is one vectorized shift
+        self._views = [np.frombuffer(row, dtype=np.uint8) for row in self.table]
+        self.sample_size = self.width * sample_factor
+        self.additions = 0
+    
+    def _indexes(self, key: str):
+        h = hash(key)
+        for row in range(self.DEPTH):
+            yield row, (h >> (row * 8) ^ h * (row + 1)) & self.mask
+    
+    def record(self, key: str):
+        """Record one access to key"""
+        for row, index in self._indexes(key):
+            if self.table[row][index] < self.MAX_COUNT:
+                self.table[row][index] += 1
+        
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+    
+    def estimate(self, key: str) -> int:
+        """Estimated access frequency of key"""
+        return min(self.table[row][index] for row, index in self._indexes(key))
+    
+    def admit(self, candidate: str, victim: str) -> bool:
+        """Whether candidate should replace victim in the memory tier"""
+        return self.estimate(candidate) > self.estimate(victim)
+    
+    def _age(self):
+        """Halve all counters so the sketch tracks recent frequency"""
+        for view in self._views:
+            np.right_shift(view, 1, out=view)
+        self.additions //= 2
+
 class CacheManager:
     """Advanced cache manager with multiple storage backends"""
     
@@ -55,7 +119,9 @@ class CacheManager:
                  max_memory_size: int = 100 * 1024 * 1024,  # 100MB
                  max_disk_size: int = 1024 * 1024 * 1024,   # 1GB
                  default_ttl: int = 3600,  # 1 hour
-                 cleanup_interval: int = 300):  # 5 minutes
+                 cleanup_interval: int = 300,  # 5 minutes
+                 admission_policy: Optional[str] = None,
+                 access_flush_threshold: int = 256):
         
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -65,13 +131,29 @@ class CacheManager:
         self.default_ttl = default_ttl
         self.cleanup_interval = cleanup_interval
         
-        # In-memory cache (LRU-like)
-        self.memory_cache: Dict[str, CacheEntry] = {}
+        # In-memory LRU cache: least recently used entries first
+        self.memory_cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self.memory_size = 0
         self._lock = threading.RLock()
         
-        # Initialize disk cache database
+        # Optional admission filter for the memory tier
+        if admission_policy is None:
+            self.admission = None
+        elif admission_policy == "tinylfu":
+            self.admission = TinyLFUAdmission()
+        else:
+            raise ValueError(f"Unknown admission policy: {admission_policy}")
+        
+        # Disk reads record access here; rows are updated in batches
+        self.access_flush_threshold = access_flush_threshold
+        self._pending_access: Dict[str, Tuple[str, int]] = {}
+        self._access_lock = threading.Lock()
+        
+        # One pooled WAL-mode connection per thread
         self.db_path = self.cache_dir / "cache.db"
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self._init_database()
         
         # Start cleanup thread
@@ -82,7 +164,9 @@ class CacheManager:
     
     def _init_database(self):
         """Initialize SQLite database for disk cache metadata"""
-        with sqlite3.connect(str(self.db_path)) as conn:
+        with self._get_db_connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS cache_entries (
                     key TEXT PRIMARY KEY,
@@ -107,32 +191,58 @@ class CacheManager:
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_tags ON cache_entries(tags)
             """)
+            conn.commit()
     
     @contextmanager
     def _get_db_connection(self):
-        """Get database connection with proper cleanup"""
-        conn = sqlite3.connect(str(self.db_path))
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Get this thread's pooled database connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        yield conn
     
     def _generate_cache_key(self, *components: Any) -> str:
         """Generate a unique cache key from components"""
         key_string = ":".join(str(c) for c in components)
         return hashlib.sha256(key_string.encode()).hexdigest()
     
-    def _calculate_size(self, value: Any) -> int:
-        """Calculate approximate size of value in bytes"""
+    def _calculate_size(self, value: Any, _depth: int = 0) -> int:
+        """Estimate size of value in bytes without serializing it
+        
+        Containers are sampled and extrapolated, so the cost is bounded
+        regardless of the value's size.
+        """
         try:
-            if isinstance(value, str):
-                return len(value.encode('utf-8'))
-            elif isinstance(value, (bytes, bytearray)):
+            value_type = type(value)
+            if value_type is str:
+                return len(value) if value.isascii() else len(value.encode('utf-8'))
+            elif value_type in (bytes, bytearray, memoryview):
                 return len(value)
-            elif isinstance(value, (list, tuple, dict)):
-                return len(pickle.dumps(value))
+            elif value_type in (int, float, bool) or value is None:
+                return 8
+            elif hasattr(value, 'nbytes'):
+                return int(value.nbytes)
+            elif _depth >= 2:
+                return sys.getsizeof(value)
+            elif isinstance(value, dict):
+                sample = list(islice(value.items(), SIZE_SAMPLE))
+                sample_size = sum(
+                    self._calculate_size(k, _depth + 1) + self._calculate_size(v, _depth + 1)
+                    for k, v in sample
+                )
+                return sys.getsizeof(value) + sample_size * len(value) // max(1, len(sample))
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                sample = list(islice(value, SIZE_SAMPLE))
+                sample_size = sum(self._calculate_size(v, _depth + 1) for v in sample)
+                return sys.getsizeof(value) + sample_size * len(value) // max(1, len(sample))
+            elif hasattr(value, '__dict__'):
+                return sys.getsizeof(value) + self._calculate_size(vars(value), _depth + 1)
             else:
-                return len(str(value).encode('utf-8'))
+                return sys.getsizeof(value)
         except Exception:
             return 1024  # Default estimate
     
@@ -154,46 +264,53 @@ class CacheManager:
         ttl = ttl or self.default_ttl
         tags = tags or []
         
-        with self._lock:
-            try:
-                # Calculate size
-                size_bytes = self._calculate_size(value)
-                
-                # Create cache entry
-                entry = CacheEntry(
-                    key=key,
-                    value=value,
-                    created_at=datetime.utcnow(),
-                    last_accessed=datetime.utcnow(),
-                    access_count=0,
-                    ttl_seconds=ttl,
-                    tags=tags,
-                    size_bytes=size_bytes
-                )
-                
-                # Decide storage location
-                if not force_disk and size_bytes < 1024 * 1024:  # < 1MB
-                    # Try memory cache first
-                    if self.memory_size + size_bytes <= self.max_memory_size:
-                        self.memory_cache[key] = entry
-                        self.memory_size += size_bytes
+        try:
+            # Size is computed once here and carried on the entry
+            size_bytes = self._calculate_size(value)
+            now = datetime.utcnow()
+            
+            entry = CacheEntry(
+                key=key,
+                value=value,
+                created_at=now,
+                last_accessed=now,
+                access_count=0,
+                ttl_seconds=ttl,
+                tags=tags,
+                size_bytes=size_bytes,
+                expires_at=time.time() + ttl
+            )
+            
+            # Decide storage location
+            if not force_disk and size_bytes < 1024 * 1024:  # < 1MB
+                with self._lock:
+                    if self.admission is not None:
+                        self.admission.record(key)
+                    
+                    if self._store_in_memory(entry):
                         logger.debug(f"Cached to memory: {key} ({size_bytes} bytes)")
                         return True
-                    else:
-                        # Evict LRU items
-                        self._evict_memory_cache(size_bytes)
-                        if self.memory_size + size_bytes <= self.max_memory_size:
-                            self.memory_cache[key] = entry
-                            self.memory_size += size_bytes
-                            logger.debug(f"Cached to memory after eviction: {key}")
-                            return True
-                
-                # Fall back to disk cache
-                return self._set_disk_cache(key, entry)
-                
-            except Exception as e:
-                logger.error(f"Error setting cache key {key}: {e}")
+            
+            # Fall back to disk cache
+            return self._set_disk_cache(key, entry)
+            
+        except Exception as e:
+            logger.error(f"Error setting cache key {key}: {e}")
+            return False
+    
+    def _store_in_memory(self, entry: CacheEntry) -> bool:
+        """Insert entry into the memory LRU, evicting as needed; caller holds the lock"""
+        previous = self.memory_cache.pop(entry.key, None)
+        if previous is not None:
+            self.memory_size -= previous.size_bytes
+        
+        if self.memory_size + entry.size_bytes > self.max_memory_size:
+            if not self._evict_memory_cache(entry.size_bytes, candidate=entry.key):
                 return False
+        
+        self.memory_cache[entry.key] = entry
+        self.memory_size += entry.size_bytes
+        return True
     
     def _set_disk_cache(self, key: str, entry: CacheEntry) -> bool:
         """Store entry in disk cache"""
@@ -242,29 +359,32 @@ class CacheManager:
     
     def get(self, key: str, default: Any = None) -> Any:
         """Retrieve value from cache"""
-        with self._lock:
-            try:
+        try:
+            with self._lock:
+                if self.admission is not None:
+                    self.admission.record(key)
+                
                 # Check memory cache first
-                if key in self.memory_cache:
-                    entry = self.memory_cache[key]
-                    
+                entry = self.memory_cache.get(key)
+                if entry is not None:
                     if entry.is_expired:
                         del self.memory_cache[key]
                         self.memory_size -= entry.size_bytes
                         return default
                     
-                    # Update access info
+                    # Update access info and recency
+                    self.memory_cache.move_to_end(key)
                     entry.last_accessed = datetime.utcnow()
                     entry.access_count += 1
                     
                     return entry.value
-                
-                # Check disk cache
-                return self._get_disk_cache(key, default)
-                
-            except Exception as e:
-                logger.error(f"Error getting cache key {key}: {e}")
-                return default
+            
+            # Check disk cache
+            return self._get_disk_cache(key, default)
+            
+        except Exception as e:
+            logger.error(f"Error getting cache key {key}: {e}")
+            return default
     
     def _get_disk_cache(self, key: str, default: Any = None) -> Any:
         """Retrieve value from disk cache"""
@@ -276,150 +396,177 @@ class CacheManager:
                 """, (key,))
                 
                 row = cursor.fetchone()
-                if not row:
-                    return default
-                
-                file_path, created_at_str, ttl_seconds, size_bytes = row
-                created_at = datetime.fromisoformat(created_at_str)
-                
-                # Check expiration
-                if ttl_seconds and (datetime.utcnow() - created_at).total_seconds() > ttl_seconds:
-                    self.delete(key)
-                    return default
-                
-                # Load data from file
-                file_path = Path(file_path)
-                if not file_path.exists():
-                    self.delete(key)
-                    return default
-                
-                # Try to determine file type and load appropriately
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        value = f.read()
-                except UnicodeDecodeError:
-                    # Binary data or pickled object
-                    with open(file_path, 'rb') as f:
-                        data = f.read()
-                        try:
-                            value = pickle.loads(data)
-                        except pickle.UnpicklingError:
-                            value = data
-                
-                # Update access info
-                conn.execute("""
+            
+            if not row:
+                return default
+            
+            file_path, created_at_str, ttl_seconds, size_bytes = row
+            created_at = datetime.fromisoformat(created_at_str)
+            
+            # Check expiration
+            if ttl_seconds and (datetime.utcnow() - created_at).total_seconds() > ttl_seconds:
+                self.delete(key)
+                return default
+            
+            # Load data from file
+            file_path = Path(file_path)
+            if not file_path.exists():
+                self.delete(key)
+                return default
+            
+            # Try to determine file type and load appropriately
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    value = f.read()
+            except UnicodeDecodeError:
+                # Binary data or pickled object
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+                    try:
+                        value = pickle.loads(data)
+                    except pickle.UnpicklingError:
+                        value = data
+            
+            self._record_disk_access(key)
+            
+            logger.debug(f"Retrieved from disk cache: {key}")
+            return value
+            
+        except Exception as e:
+            logger.error(f"Error getting disk cache for {key}: {e}")
+            return default
+    
+    def _record_disk_access(self, key: str):
+        """Buffer a last_accessed update for a disk entry"""
+        with self._access_lock:
+            _, count = self._pending_access.get(key, (None, 0))
+            self._pending_access[key] = (datetime.utcnow().isoformat(), count + 1)
+            should_flush = len(self._pending_access) >= self.access_flush_threshold
+        
+        if should_flush:
+            self._flush_access_updates()
+    
+    def _flush_access_updates(self):
+        """Write buffered last_accessed updates in one batch"""
+        with self._access_lock:
+            if not self._pending_access:
+                return
+            pending, self._pending_access = self._pending_access, {}
+        
+        try:
+            with self._get_db_connection() as conn:
+                conn.executemany("""
                     UPDATE cache_entries 
-                    SET last_accessed = ?, access_count = access_count + 1
+                    SET last_accessed = ?, access_count = access_count + ?
                     WHERE key = ?
-                """, (datetime.utcnow().isoformat(), key))
+                """, [(accessed, count, key) for key, (accessed, count) in pending.items()])
                 conn.commit()
-                
-                logger.debug(f"Retrieved from disk cache: {key}")
-                return value
-                
         except Exception as e:
-            logger.error(f"Error getting disk cache for {key}: {e}")
-            return default
+            logger.error(f"Error flushing cache access updates: {e}")
     
     def delete(self, key: str) -> bool:
         """Delete value from cache"""
-        with self._lock:
-            try:
-                deleted = False
-                
-                # Remove from memory cache
-                if key in self.memory_cache:
-                    entry = self.memory_cache[key]
-                    del self.memory_cache[key]
+        try:
+            deleted = False
+            
+            # Remove from memory cache
+            with self._lock:
+                entry = self.memory_cache.pop(key, None)
+                if entry is not None:
                     self.memory_size -= entry.size_bytes
                     deleted = True
+            
+            with self._access_lock:
+                self._pending_access.pop(key, None)
+            
+            # Remove from disk cache
+            with self._get_db_connection() as conn:
+                cursor = conn.execute("SELECT file_path FROM cache_entries WHERE key = ?", (key,))
+                row = cursor.fetchone()
                 
-                # Remove from disk cache
-                with self._get_db_connection() as conn:
-                    cursor = conn.execute("SELECT file_path FROM cache_entries WHERE key = ?", (key,))
-                    row = cursor.fetchone()
+                if row:
+                    file_path = Path(row[0])
+                    if file_path.exists():
+                        file_path.unlink()
                     
-                    if row:
-                        file_path = Path(row[0])
-                        if file_path.exists():
-                            file_path.unlink()
-                        
-                        conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
-                        conn.commit()
-                        deleted = True
-                
-                return deleted
-                
-            except Exception as e:
-                logger.error(f"Error deleting cache key {key}: {e}")
-                return False
+                    conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                    conn.commit()
+                    deleted = True
+            
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Error deleting cache key {key}: {e}")
+            return False
     
     def exists(self, key: str) -> bool:
         """Check if key exists in cache"""
         with self._lock:
             # Check memory cache
-            if key in self.memory_cache:
-                entry = self.memory_cache[key]
+            entry = self.memory_cache.get(key)
+            if entry is not None:
                 if not entry.is_expired:
                     return True
                 else:
                     # Clean up expired entry
                     del self.memory_cache[key]
                     self.memory_size -= entry.size_bytes
+        
+        # Check disk cache
+        try:
+            with self._get_db_connection() as conn:
+                cursor = conn.execute("""
+                    SELECT created_at, ttl_seconds FROM cache_entries WHERE key = ?
+                """, (key,))
+                
+                row = cursor.fetchone()
             
-            # Check disk cache
-            try:
-                with self._get_db_connection() as conn:
-                    cursor = conn.execute("""
-                        SELECT created_at, ttl_seconds FROM cache_entries WHERE key = ?
-                    """, (key,))
-                    
-                    row = cursor.fetchone()
-                    if row:
-                        created_at_str, ttl_seconds = row
-                        created_at = datetime.fromisoformat(created_at_str)
-                        
-                        if ttl_seconds and (datetime.utcnow() - created_at).total_seconds() > ttl_seconds:
-                            self.delete(key)
-                            return False
-                        
-                        return True
-            
-            except Exception as e:
-                logger.error(f"Error checking cache key existence {key}: {e}")
-            
-            return False
+            if row:
+                created_at_str, ttl_seconds = row
+                created_at = datetime.fromisoformat(created_at_str)
+                
+                if ttl_seconds and (datetime.utcnow() - created_at).total_seconds() > ttl_seconds:
+                    self.delete(key)
+                    return False
+                
+                return True
+        
+        except Exception as e:
+            logger.error(f"Error checking cache key existence {key}: {e}")
+        
+        return False
     
     def clear_by_tags(self, tags: List[str]) -> int:
         """Clear cache entries by tags"""
         cleared_count = 0
         
-        with self._lock:
-            try:
-                # Clear from memory cache
-                keys_to_delete = []
-                for key, entry in self.memory_cache.items():
-                    if any(tag in entry.tags for tag in tags):
-                        keys_to_delete.append(key)
-                
-                for key in keys_to_delete:
-                    self.delete(key)
+        try:
+            # Clear from memory cache
+            with self._lock:
+                keys_to_delete = [
+                    key for key, entry in self.memory_cache.items()
+                    if any(tag in entry.tags for tag in tags)
+                ]
+            
+            for key in keys_to_delete:
+                self.delete(key)
+                cleared_count += 1
+            
+            # Clear from disk cache
+            with self._get_db_connection() as conn:
+                keys = []
+                for tag in tags:
+                    cursor = conn.execute("""
+                        SELECT key FROM cache_entries WHERE tags LIKE ?
+                    """, (f'%"{tag}"%',))
+                    keys.extend(row[0] for row in cursor.fetchall())
+            
+            for key in keys:
+                if self.delete(key):
                     cleared_count += 1
-                
-                # Clear from disk cache
-                with self._get_db_connection() as conn:
-                    for tag in tags:
-                        cursor = conn.execute("""
-                            SELECT key FROM cache_entries WHERE tags LIKE ?
-                        """, (f'%"{tag}"%',))
-                        
-                        keys = [row[0] for row in cursor.fetchall()]
-                        for key in keys:
-                            if self.delete(key):
-                                cleared_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error clearing cache by tags {tags}: {e}")
+            
+        except Exception as e:
+            logger.error(f"Error clearing cache by tags {tags}: {e}")
         
         return cleared_count
     
@@ -427,81 +574,81 @@ class CacheManager:
         """Clear all expired cache entries"""
         cleared_count = 0
         
-        with self._lock:
-            try:
-                # Clear from memory cache
-                keys_to_delete = []
-                for key, entry in self.memory_cache.items():
-                    if entry.is_expired:
-                        keys_to_delete.append(key)
+        try:
+            # Clear from memory cache
+            with self._lock:
+                keys_to_delete = [
+                    key for key, entry in self.memory_cache.items() if entry.is_expired
+                ]
                 
                 for key in keys_to_delete:
-                    del self.memory_cache[key]
+                    entry = self.memory_cache.pop(key)
+                    self.memory_size -= entry.size_bytes
                     cleared_count += 1
+            
+            # Clear from disk cache
+            with self._get_db_connection() as conn:
+                current_time = datetime.utcnow()
                 
-                # Clear from disk cache
-                with self._get_db_connection() as conn:
-                    current_time = datetime.utcnow()
-                    
-                    cursor = conn.execute("""
-                        SELECT key, created_at, ttl_seconds FROM cache_entries 
-                        WHERE ttl_seconds IS NOT NULL
-                    """)
-                    
-                    expired_keys = []
-                    for key, created_at_str, ttl_seconds in cursor.fetchall():
-                        created_at = datetime.fromisoformat(created_at_str)
-                        if (current_time - created_at).total_seconds() > ttl_seconds:
-                            expired_keys.append(key)
-                    
-                    for key in expired_keys:
-                        if self.delete(key):
-                            cleared_count += 1
+                cursor = conn.execute("""
+                    SELECT key, created_at, ttl_seconds FROM cache_entries 
+                    WHERE ttl_seconds IS NOT NULL
+                """)
                 
-            except Exception as e:
-                logger.error(f"Error clearing expired cache entries: {e}")
+                expired_keys = []
+                for key, created_at_str, ttl_seconds in cursor.fetchall():
+                    created_at = datetime.fromisoformat(created_at_str)
+                    if (current_time - created_at).total_seconds() > ttl_seconds:
+                        expired_keys.append(key)
+            
+            for key in expired_keys:
+                if self.delete(key):
+                    cleared_count += 1
+            
+        except Exception as e:
+            logger.error(f"Error clearing expired cache entries: {e}")
         
         return cleared_count
     
-    def _evict_memory_cache(self, required_space: int):
-        """Evict LRU items from memory cache to free space"""
-        if not self.memory_cache:
-            return
+    def _evict_memory_cache(self, required_space: int, candidate: Optional[str] = None) -> bool:
+        """Evict LRU items from memory cache to free space; caller holds the lock
         
-        # Sort by last accessed time (LRU first)
-        sorted_entries = sorted(
-            self.memory_cache.items(),
-            key=lambda x: x[1].last_accessed
-        )
+        Returns False when the admission policy rejects the candidate, in
+        which case nothing is evicted.
+        """
+        if self.admission is not None and candidate is not None and self.memory_cache:
+            victim = next(iter(self.memory_cache))
+            if not self.admission.admit(candidate, victim):
+                return False
         
-        freed_space = 0
-        for key, entry in sorted_entries:
-            if freed_space >= required_space:
-                break
-            
-            del self.memory_cache[key]
+        while self.memory_cache and self.memory_size + required_space > self.max_memory_size:
+            key, entry = self.memory_cache.popitem(last=False)
             self.memory_size -= entry.size_bytes
-            freed_space += entry.size_bytes
             
             logger.debug(f"Evicted from memory cache: {key}")
+        
+        return self.memory_size + required_space <= self.max_memory_size
     
     def _evict_disk_cache(self, required_space: int):
         """Evict LRU items from disk cache to free space"""
         try:
+            self._flush_access_updates()
+            
             with self._get_db_connection() as conn:
                 cursor = conn.execute("""
                     SELECT key, size_bytes FROM cache_entries 
                     ORDER BY last_accessed ASC
                 """)
+                candidates = cursor.fetchall()
+            
+            freed_space = 0
+            for key, size_bytes in candidates:
+                if freed_space >= required_space:
+                    break
                 
-                freed_space = 0
-                for key, size_bytes in cursor.fetchall():
-                    if freed_space >= required_space:
-                        break
-                    
-                    if self.delete(key):
-                        freed_space += size_bytes
-                        logger.debug(f"Evicted from disk cache: {key}")
+                if self.delete(key):
+                    freed_space += size_bytes
+                    logger.debug(f"Evicted from disk cache: {key}")
         
         except Exception as e:
             logger.error(f"Error evicting disk cache: {e}")
@@ -519,6 +666,8 @@ class CacheManager:
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         try:
+            self._flush_access_updates()
+            
             with self._get_db_connection() as conn:
                 cursor = conn.execute("""
                     SELECT COUNT(*), SUM(size_bytes), SUM(access_count) 
@@ -535,7 +684,8 @@ class CacheManager:
                     'entries': len(self.memory_cache),
                     'size_bytes': self.memory_size,
                     'max_size_bytes': self.max_memory_size,
-                    'usage_percent': (self.memory_size / self.max_memory_size) * 100
+                    'usage_percent': (self.memory_size / self.max_memory_size) * 100,
+                    'admission_policy': 'tinylfu' if self.admission is not None else None
                 },
                 'disk_cache': {
                     'entries': disk_count,
@@ -559,6 +709,7 @@ class CacheManager:
         while True:
             try:
                 time.sleep(self.cleanup_interval)
+                self._flush_access_updates()
                 cleared = self.clear_expired()
                 if cleared > 0:
                     logger.info(f"Cleaned up {cleared} expired cache entries")
@@ -570,6 +721,17 @@ class CacheManager:
         """Shutdown cache manager"""
         logger.info("Shutting down cache manager")
         
+        self._flush_access_updates()
+        
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+        
         # Note: Python threads are daemon threads and will be cleaned up automatically
         # We don't need to explicitly stop the cleanup thread
     
@@ -580,6 +742,21 @@ class CacheManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.shutdown()
 
+@dataclass
+class ManifestEntry:
+    """Stat triple and content hash recorded for an indexed file"""
+    path: str
+    mtime_ns: int
+    size_bytes: int
+    inode: int
+    content_hash: str
+    
+    def matches_stat(self, mtime_ns: int, size_bytes: int, inode: int) -> bool:
+        """Check whether a fresh stat result is identical to the recorded one"""
+        return (self.mtime_ns == mtime_ns and 
+                self.size_bytes == size_bytes and 
+                self.inode == inode)
+
 # Specialized cache managers
 class ParseResultCache(CacheManager):
     """Cache manager specialized for parse results"""
@@ -592,6 +769,85 @@ class ParseResultCache(CacheManager):
             max_disk_size=500 * 1024 * 1024   # 500MB
         )
     
+    def _init_database(self):
+        """Initialize cache tables plus the per-project file manifest"""
+        super()._init_database()
+        
+        with self._get_db_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_manifest (
+                    project_name TEXT,
+                    path TEXT,
+                    mtime_ns INTEGER,
+                    size_bytes INTEGER,
+                    inode INTEGER,
+                    content_hash TEXT,
+                    PRIMARY KEY (project_name, path)
+                )
+            """)
+            conn.commit()
+    
+    def get_manifest(self, project_name: str) -> Dict[str, ManifestEntry]:
+        """Load the file manifest for a project, keyed by path"""
+        try:
+            with self._get_db_connection() as conn:
+                cursor = conn.execute("""
+                    SELECT path, mtime_ns, size_bytes, inode, content_hash
+                    FROM file_manifest WHERE project_name = ?
+                """, (project_name,))
+                
+                return {row[0]: ManifestEntry(*row) for row in cursor.fetchall()}
+                
+        except Exception as e:
+            logger.error(f"Error loading manifest for {project_name}: {e}")
+            return {}
+    
+    def update_manifest(self, project_name: str, entries: List[ManifestEntry]) -> bool:
+        """Insert or replace manifest entries for a project"""
+        try:
+            with self._get_db_connection() as conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO file_manifest
+                    (project_name, path, mtime_ns, size_bytes, inode, content_hash)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [
+                    (project_name, e.path, e.mtime_ns, e.size_bytes, e.inode, e.content_hash)
+                    for e in entries
+                ])
+                conn.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating manifest for {project_name}: {e}")
+            return False
+    
+    def remove_from_manifest(self, project_name: str, paths: List[str]) -> bool:
+        """Remove paths from a project's manifest"""
+        try:
+            with self._get_db_connection() as conn:
+                conn.executemany(
+                    "DELETE FROM file_manifest WHERE project_name = ? AND path = ?",
+                    [(project_name, path) for path in paths]
+                )
+                conn.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error removing manifest entries for {project_name}: {e}")
+            return False
+    
+    def clear_manifest(self, project_name: str) -> bool:
+        """Drop the whole manifest for a project"""
+        try:
+            with self._get_db_connection() as conn:
+                conn.execute("DELETE FROM file_manifest WHERE project_name = ?", (project_name,))
+                conn.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error clearing manifest for {project_name}: {e}")
+            return False
+    
     def cache_parse_result(self, file_path: str, file_checksum: str, parse_result: Any) -> bool:
         """Cache a parse result with file-based key"""
         key = self._generate_cache_key("parse", file_path, file_checksum)
@@ -603,22 +859,56 @@ class ParseResultCache(CacheManager):
         return self.get(key)
 
 class VectorCache(CacheManager):
-    """Cache manager specialized for vectors"""
+    """Cache manager specialized for vectors
     
-    def __init__(self, cache_dir: str):
+    Vectors live in a memory-mapped float32 VectorStore rather than the
+    generic pickle-per-file disk tier.
+    """
+    
+    def __init__(self, cache_dir: str, dimension: Optional[int] = None):
         super().__init__(
             cache_dir=cache_dir,
             default_ttl=7 * 24 * 3600,  # 7 days for vectors
             max_memory_size=20 * 1024 * 1024,  # 20MB (vectors are large)
             max_disk_size=200 * 1024 * 1024   # 200MB
         )
+        self.vector_store = VectorStore(str(self.cache_dir / "vectors"), dimension=dimension)
     
-    def cache_vector(self, content_hash: str, vector: List[float]) -> bool:
+    def cache_vector(self, content_hash: str, vector: Union[List[float], np.ndarray]) -> bool:
         """Cache a vector with content-based key"""
-        key = self._generate_cache_key("vector", content_hash)
-        return self.set(key, vector, tags=["vector"], force_disk=True)
+        try:
+            self.vector_store.put(content_hash, np.asarray(vector, dtype=np.float32))
+            return True
+        except Exception as e:
+            logger.error(f"Error caching vector {content_hash}: {e}")
+            return False
+    
+    def cache_vectors(self, content_hashes: List[str], vectors: np.ndarray) -> bool:
+        """Cache a batch of vectors given as an (n, dimension) matrix"""
+        try:
+            self.vector_store.put_many(content_hashes, vectors)
+            return True
+        except Exception as e:
+            logger.error(f"Error caching {len(content_hashes)} vectors: {e}")
+            return False
+    
+    def get_vector(self, content_hash: str) -> Optional[np.ndarray]:
+        """Get cached vector as a zero-copy float32 view"""
+        return self.vector_store.get(content_hash)
+    
+    def get_vectors(self, content_hashes: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Get many cached vectors; returns (matrix, found_mask)"""
+        return self.vector_store.get_many(content_hashes)
+    
+    def compact(self) -> int:
+        """Reclaim space left by overwritten or deleted vectors"""
+        return self.vector_store.compact()
     
-    def get_vector(self, content_hash: str) -> Optional[List[float]]:
-        """Get cached vector"""
-        key = self._generate_cache_key("vector", content_hash)
-        return self.get(key)
\ No newline at end of file
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['vector_store'] = self.vector_store.get_stats()
+        return stats
+    
+    def shutdown(self):
+        super().shutdown()
+        self.vector_store.close()
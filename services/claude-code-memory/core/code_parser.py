@@ -118,6 +118,25 @@ class TreeSitterCodeParser:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
+            return self.parse_content(file_path, content, start_time)
+            
+        except Exception as e:
+            logger.error(f"Error parsing file {file_path}: {e}")
+            return ParseResult(
+                file_path=file_path,
+                language='unknown',
+                elements=[],
+                total_lines=0,
+                parse_time=time.time() - start_time,
+                errors=[str(e)]
+            )
+    
+    def parse_content(self, file_path: str, content: str, start_time: Optional[float] = None) -> ParseResult:
+        """Parse already-loaded file content and extract code elements"""
+        import time
+        start_time = start_time or time.time()
+        
+        try:
             # Detect language
             language = self.detect_language(file_path)
             if not language or language not in self.parsers:
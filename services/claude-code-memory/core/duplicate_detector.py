@@ -0,0 +1,211 @@
+"""
+Project-wide near-duplicate detection with token shingling and MinHash/LSH
+"""
+import re
+import zlib
+import logging
+from dataclasses import dataclass
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Modulus for the MinHash permutations (Mersenne prime 2^31 - 1)
+MERSENNE_PRIME = (1 << 31) - 1
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z_]\w*|\d+(?:\.\d+)?|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|\S')
+COMMENT_PATTERN = re.compile(r'#[^\n]*|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+@dataclass
+class CloneMember:
+    """A function taking part in a clone cluster"""
+    file_path: str
+    name: str
+    start_line: int
+    end_line: int
+
+@dataclass
+class CloneCluster:
+    """Group of functions that are near-duplicates of each other"""
+    members: List[CloneMember]
+    similarity: float  # lowest verified pairwise similarity in the cluster
+    files: int = 0
+
+    def __post_init__(self):
+        self.files = len({m.file_path for m in self.members})
+
+@dataclass
+class _Fragment:
+    member: CloneMember
+    signature: np.ndarray
+    band_keys: Tuple[bytes, ...]  # LSH bucket key of each band
+
+class DuplicateDetector:
+    """Finds clusters of near-duplicate functions across many files
+
+    Each function is reduced to a MinHash signature over k-token shingles
+    (literals normalized, comments stripped) as it is added, so only the
+    fixed-size signatures are kept in memory. Candidate pairs come from LSH
+    banding; candidates are verified on the estimated Jaccard similarity and
+    merged into clusters with union-find.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.8,
+                 num_perm: int = 128,
+                 bands: int = 32,
+                 shingle_size: int = 5,
+                 min_lines: int = 5,
+                 max_bucket_size: int = 100,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_lines = min_lines
+        self.max_bucket_size = max_bucket_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+        self.fragments: List[_Fragment] = []
+        self.buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.fragments)
+
+    def tokenize(self, content: str) -> List[str]:
+        """Tokenize code, stripping comments and normalizing literals"""
+        tokens = []
+        for token in TOKEN_PATTERN.findall(COMMENT_PATTERN.sub(' ', content)):
+            if token[0].isdigit():
+                tokens.append('<num>')
+            elif token[0] in '"\'':
+                tokens.append('<str>')
+            else:
+                tokens.append(token)
+        return tokens
+
+    def signature(self, content: str) -> Optional[np.ndarray]:
+        """MinHash signature of a code fragment, or None if it is too short"""
+        tokens = self.tokenize(content)
+        if len(tokens) < self.shingle_size:
+            return None
+
+        token_hashes = np.fromiter((zlib.crc32(t.encode('utf8')) for t in tokens),
+                                   dtype=np.uint64, count=len(tokens))
+
+        # Rolling combination of k consecutive token hashes into one shingle hash
+        k = self.shingle_size
+        shingles = np.zeros(len(tokens) - k + 1, dtype=np.uint64)
+        for offset in range(k):
+            shingles = (shingles * np.uint64(31) + token_hashes[offset:len(tokens) - k + 1 + offset]) % np.uint64(MERSENNE_PRIME)
+        shingles = np.unique(shingles)
+
+        hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def add(self, file_path: str, name: str, start_line: int, end_line: int, content: str) -> bool:
+        """Index one function; returns False if it is too small to compare"""
+        if sum(1 for line in content.split('\n') if line.strip()) < self.min_lines:
+            return False
+
+        signature = self.signature(content)
+        if signature is None:
+            return False
+
+        index = len(self.fragments)
+        band_keys = tuple(signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands))
+        self.fragments.append(_Fragment(CloneMember(file_path, name, start_line, end_line), signature, band_keys))
+        for band, key in enumerate(band_keys):
+            self.buckets[band][key].append(index)
+        return True
+
+    def add_elements(self, file_path: str, elements) -> int:
+        """Index the functions among a file's CodeElements"""
+        return sum(
+            self.add(file_path, e.name, e.start_line, e.end_line, e.content)
+            for e in elements if e.type == 'function'
+        )
+
+    def similarity(self, i: int, j: int) -> float:
+        """Estimated Jaccard similarity of two indexed fragments"""
+        return float(np.mean(self.fragments[i].signature == self.fragments[j].signature))
+
+    def _pairs_in_bucket(self, members: List[int]):
+        if len(members) > self.max_bucket_size:
+            # Very large buckets (generated code) are linked through their first member
+            return ((members[0], other) for other in members[1:])
+        return ((a, b) for n, a in enumerate(members) for b in members[n + 1:])
+
+    def _yielded_in_earlier_band(self, i: int, j: int, band: int) -> bool:
+        """Whether an earlier band already yielded the pair (i, j), i < j"""
+        keys_i, keys_j = self.fragments[i].band_keys, self.fragments[j].band_keys
+        for earlier in range(band):
+            if keys_i[earlier] == keys_j[earlier]:
+                members = self.buckets[earlier][keys_i[earlier]]
+                if len(members) <= self.max_bucket_size or members[0] == i:
+                    return True
+        return False
+
+    def _candidate_pairs(self):
+        """Yield candidate pairs from LSH buckets, each pair at most once
+
+        A pair is only yielded by the first band that produces it, checked
+        against the band keys instead of a set of every pair seen so far.
+        """
+        for band, band_buckets in enumerate(self.buckets):
+            for members in band_buckets.values():
+                if len(members) < 2:
+                    continue
+                for i, j in self._pairs_in_bucket(members):
+                    if band == 0 or not self._yielded_in_earlier_band(i, j, band):
+                        yield i, j
+
+    def find_clusters(self) -> List[CloneCluster]:
+        """Group verified near-duplicates into clusters, largest first"""
+        parent = list(range(len(self.fragments)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        edge_similarity: Dict[int, float] = {}
+        for i, j in self._candidate_pairs():
+            similarity = self.similarity(i, j)
+            if similarity < self.threshold:
+                continue
+            root_i, root_j = find(i), find(j)
+            lowest = min(similarity, edge_similarity.pop(root_i, 1.0), edge_similarity.pop(root_j, 1.0)) \
+                if root_i != root_j else min(similarity, edge_similarity.get(root_i, 1.0))
+            parent[root_j] = root_i
+            edge_similarity[root_i] = lowest
+
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for index in range(len(self.fragments)):
+            groups[find(index)].append(index)
+
+        clusters = [
+            CloneCluster(
+                members=[self.fragments[i].member for i in indices],
+                similarity=edge_similarity.get(root, 1.0)
+            )
+            for root, indices in groups.items() if len(indices) > 1
+        ]
+        clusters.sort(key=lambda c: (-len(c.members), -c.similarity))
+        return clusters
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'fragments': len(self.fragments),
+            'signature_bytes': len(self.fragments) * self.num_perm * 4,
+        }
@@ -0,0 +1,308 @@
+"""
+Embedded in-process vector index used when Qdrant is unavailable
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Payload fields with an inverted index for fast filtering
+INDEXED_FIELDS = ('language', 'element_type', 'file_path', 'project_name')
+
+class LocalVectorIndex:
+    """Cosine-similarity index over a normalized float32 matrix
+
+    Small collections are searched exactly with one matrix-vector product.
+    Once the collection grows past ``ann_threshold`` an IVF index (k-means
+    coarse quantizer) is trained and only the ``nprobe`` closest lists are
+    scanned. Payload filters on indexed fields are resolved through
+    inverted lists before scoring. Replaced and deleted points leave dead
+    rows behind, which are compacted away once they pass
+    ``compaction_ratio`` of the stored rows.
+    """
+
+    def __init__(self,
+                 dimension: int,
+                 index_dir: Optional[str] = None,
+                 ann_threshold: int = 50000,
+                 nprobe: int = 16,
+                 compaction_ratio: float = 0.25):
+        self.dimension = dimension
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.compaction_ratio = compaction_ratio
+
+        self._lock = threading.RLock()
+        self._reset()
+
+        if self.index_dir and (self.index_dir / "vectors.npy").exists():
+            self.load()
+
+    def _reset(self):
+        self._vectors = np.zeros((1024, self.dimension), dtype=np.float32)
+        self._alive = np.zeros(1024, dtype=bool)
+        self.ids: List[str] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.field_index: Dict[str, Dict[Any, List[int]]] = {f: {} for f in INDEXED_FIELDS}
+
+        # IVF state
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments: Optional[np.ndarray] = None
+        self.trained_rows = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.id_to_row)
+
+    def _ensure_capacity(self, extra: int):
+        needed = len(self.ids) + extra
+        if needed <= self._vectors.shape[0]:
+            return
+        capacity = max(needed, self._vectors.shape[0] * 2)
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        vectors[:len(self.ids)] = self._vectors[:len(self.ids)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.ids)] = self._alive[:len(self.ids)]
+        self._vectors, self._alive = vectors, alive
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        """Insert or replace points; an id repeated within the batch keeps its last occurrence"""
+        vectors = self._normalize(vectors).reshape(len(ids), self.dimension)
+
+        last_occurrence = {point_id: position for position, point_id in enumerate(ids)}
+        if len(last_occurrence) < len(ids):
+            keep = sorted(last_occurrence.values())
+            ids = [ids[position] for position in keep]
+            payloads = [payloads[position] for position in keep]
+            vectors = vectors[keep]
+
+        with self._lock:
+            for point_id in ids:
+                if point_id in self.id_to_row:
+                    self._remove_row(self.id_to_row.pop(point_id))
+
+            self._ensure_capacity(len(ids))
+            start = len(self.ids)
+            self._vectors[start:start + len(ids)] = vectors
+            self._alive[start:start + len(ids)] = True
+
+            for offset, (point_id, payload) in enumerate(zip(ids, payloads)):
+                row = start + offset
+                self.ids.append(point_id)
+                self.payloads.append(payload)
+                self.id_to_row[point_id] = row
+                for field in INDEXED_FIELDS:
+                    if field in payload:
+                        self.field_index[field].setdefault(payload[field], []).append(row)
+
+            if self.assignments is not None:
+                self.assignments = np.concatenate([
+                    self.assignments, self._assign(vectors)
+                ])
+
+            self._maybe_compact()
+            if self.size >= self.ann_threshold and self.size > 2 * max(self.trained_rows, 1):
+                self.train()
+
+    def _remove_row(self, row: int):
+        self._alive[row] = False
+        self.payloads[row] = None
+
+    def _maybe_compact(self):
+        dead = len(self.ids) - self.size
+        if dead and dead > self.compaction_ratio * len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """Drop dead rows and renumber the live ones"""
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[:len(self.ids)])
+            if len(live_rows) == len(self.ids):
+                return
+
+            capacity = max(1024, len(live_rows))
+            vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+            vectors[:len(live_rows)] = self._vectors[live_rows]
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:len(live_rows)] = True
+
+            self._vectors, self._alive = vectors, alive
+            self.ids = [self.ids[row] for row in live_rows]
+            self.payloads = [self.payloads[row] for row in live_rows]
+            self.id_to_row = {point_id: row for row, point_id in enumerate(self.ids)}
+            self.field_index = {f: {} for f in INDEXED_FIELDS}
+            for row, payload in enumerate(self.payloads):
+                for field in INDEXED_FIELDS:
+                    if field in payload:
+                        self.field_index[field].setdefault(payload[field], []).append(row)
+            if self.assignments is not None:
+                self.assignments = self.assignments[live_rows]
+
+    def delete(self, filters: Dict[str, Any]) -> int:
+        """Delete points matching a filter"""
+        with self._lock:
+            rows = np.flatnonzero(self._filter_mask(filters))
+            for row in rows:
+                self.id_to_row.pop(self.ids[row], None)
+                self._remove_row(row)
+            self._maybe_compact()
+            return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _filter_mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean mask of live rows matching filters
+
+        Uses the same semantics as the Qdrant filter built by
+        SemanticSearchEngine.search: a single condition must match, several
+        conditions (including list values) match if any of them does.
+        """
+        count = len(self.ids)
+        alive = self._alive[:count]
+        conditions = []
+        for key, value in (filters or {}).items():
+            for v in (value if isinstance(value, list) else [value]):
+                conditions.append((key, v))
+
+        if not conditions:
+            return alive.copy()
+
+        mask = np.zeros(count, dtype=bool)
+        for key, value in conditions:
+            if key in self.field_index:
+                rows = self.field_index[key].get(value)
+                if rows:
+                    mask[rows] = True
+            else:
+                for row in np.flatnonzero(alive):
+                    if self.payloads[row].get(key) == value:
+                        mask[row] = True
+        return mask & alive
+
+    def train(self, iterations: int = 10, sample_size: int = 100000):
+        """Train the IVF coarse quantizer with k-means on a sample"""
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[:len(self.ids)])
+            if len(live_rows) == 0:
+                return
+            nlist = max(1, int(np.sqrt(len(live_rows))))
+            rng = np.random.default_rng(0)
+            sample_rows = live_rows if len(live_rows) <= sample_size else rng.choice(live_rows, sample_size, replace=False)
+            sample = self._vectors[sample_rows]
+
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=nlist)
+                nonempty = counts > 0
+                centroids[nonempty] = self._normalize(sums[nonempty])
+
+            self.centroids = centroids
+            self.assignments = self._assign(self._vectors[:len(self.ids)])
+            self.trained_rows = len(live_rows)
+            logger.info(f"Trained local IVF index: {nlist} lists over {len(live_rows)} vectors")
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk):
+            labels[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ self.centroids.T, axis=1)
+        return labels
+
+    def search(self,
+               query_vector: np.ndarray,
+               limit: int = 10,
+               score_threshold: Optional[float] = None,
+               filters: Optional[Dict[str, Any]] = None,
+               exact: bool = False) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Return (id, score, payload) for the top matches"""
+        query = self._normalize(query_vector).reshape(-1)
+
+        with self._lock:
+            mask = self._filter_mask(filters)
+
+            if self.centroids is not None and not exact and self.size >= self.ann_threshold:
+                probe = np.zeros(len(self.centroids), dtype=bool)
+                probe[np.argsort(self.centroids @ query)[-self.nprobe:]] = True
+                mask &= probe[self.assignments]
+
+            rows = np.flatnonzero(mask)
+            if len(rows) == 0:
+                return []
+
+            scores = self._vectors[rows] @ query
+            k = min(limit, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for i in top:
+                score = float(scores[i])
+                if score_threshold is not None and score < score_threshold:
+                    break
+                row = rows[i]
+                results.append((self.ids[row], score, self.payloads[row]))
+            return results
+
+    def scroll(self, filters: Optional[Dict[str, Any]] = None, limit: int = 10) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return points matching filters without scoring"""
+        with self._lock:
+            rows = np.flatnonzero(self._filter_mask(filters))[:limit]
+            return [(self.ids[row], self.payloads[row]) for row in rows]
+
+    def iter_payloads(self):
+        with self._lock:
+            return [p for p in self.payloads if p is not None]
+
+    def save(self):
+        """Persist live points to index_dir"""
+        if not self.index_dir:
+            return
+        with self._lock:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            live_rows = np.flatnonzero(self._alive[:len(self.ids)])
+            np.save(self.index_dir / "vectors.npy", self._vectors[live_rows])
+            with open(self.index_dir / "points.json", 'w') as f:
+                json.dump({
+                    'dimension': self.dimension,
+                    'ids': [self.ids[row] for row in live_rows],
+                    'payloads': [self.payloads[row] for row in live_rows],
+                }, f)
+            if self.centroids is not None:
+                np.save(self.index_dir / "centroids.npy", self.centroids)
+            logger.info(f"Saved local index with {len(live_rows)} points to {self.index_dir}")
+
+    def load(self):
+        """Load points persisted by save()"""
+        with self._lock:
+            with open(self.index_dir / "points.json") as f:
+                points = json.load(f)
+            if points['dimension'] != self.dimension:
+                raise ValueError(
+                    f"Local index at {self.index_dir} has dimension {points['dimension']}, expected {self.dimension}"
+                )
+            vectors = np.load(self.index_dir / "vectors.npy")
+            self.upsert(points['ids'], vectors, points['payloads'])
+
+            centroids_path = self.index_dir / "centroids.npy"
+            if centroids_path.exists() and self.centroids is None:
+                self.centroids = np.load(centroids_path)
+                self.assignments = self._assign(self._vectors[:len(self.ids)])
+                self.trained_rows = self.size
+            logger.info(f"Loaded local index with {self.size} points from {self.index_dir}")
@@ -16,12 +16,16 @@ from pathlib import Path
 from dataclasses import dataclass, asdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchAny
+
 from .code_parser import TreeSitterCodeParser
+from .parallel_parser import ParallelParsingEngine
+from .project_watcher import ProjectWatcher
 from .semantic_search import SemanticCodeSearch
 from .pattern_analyzer import CodePatternAnalyzer
 from .qdrant_manager import QdrantMemoryManager
-from ..utils.project_scanner import ProjectScanner
-from ..utils.cache_manager import CacheManager
+from .project_scanner import ProjectScanner
+from .cache_manager import CacheManager, ParseResultCache, ManifestEntry
 
 logger = logging.getLogger(__name__)
 
@@ -66,9 +70,12 @@ class UnifiedMemoryOrchestrator:
         self.qdrant_manager: Optional[QdrantMemoryManager] = None
         self.project_scanner: Optional[ProjectScanner] = None
         self.cache_manager: Optional[CacheManager] = None
+        self.manifest_cache: Optional[ParseResultCache] = None
+        self.parsing_engine: Optional[ParallelParsingEngine] = None
         
         # Task management
         self.active_tasks: Dict[str, IndexingTask] = {}
+        self.watchers: Dict[str, ProjectWatcher] = {}
         self.executor = ThreadPoolExecutor(max_workers=4)
         
         # Configuration
@@ -79,6 +86,12 @@ class UnifiedMemoryOrchestrator:
             "max_file_size": int(os.getenv("MAX_FILE_SIZE", 1024 * 1024)),  # 1MB
             "supported_languages": ["python", "javascript", "typescript", "rust", "go", "java", "cpp", "c"],
             "cache_ttl": int(os.getenv("CACHE_TTL", 3600)),  # 1 hour
+            "index_dir": os.getenv("MEMORY_INDEX_DIR", "data/indices"),
+            "parse_workers": int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1)),
+            "parse_max_in_flight": int(os.getenv("PARSE_MAX_IN_FLIGHT", 0)) or None,
+            "store_batch_size": int(os.getenv("STORE_BATCH_SIZE", 500)),
+            "watch_debounce_seconds": float(os.getenv("WATCH_DEBOUNCE_SECONDS", 0.5)),
+            "watch_use_polling": os.getenv("WATCH_USE_POLLING", "false").lower() == "true",
         }
         
         # Statistics
@@ -102,6 +115,13 @@ class UnifiedMemoryOrchestrator:
             self.code_parser = TreeSitterCodeParser()
             await self.code_parser.initialize()
             
+            self.parsing_engine = ParallelParsingEngine(
+                max_workers=self.config["parse_workers"],
+                max_in_flight=self.config["parse_max_in_flight"],
+                max_file_size=self.config["max_file_size"]
+            )
+            self.parsing_engine.start()
+            
             self.qdrant_manager = QdrantMemoryManager(
                 url=self.config["qdrant_url"],
                 collection_name=self.config["collection_name"]
@@ -125,6 +145,7 @@ class UnifiedMemoryOrchestrator:
             )
             
             self.cache_manager = CacheManager(ttl=self.config["cache_ttl"])
+            self.manifest_cache = ParseResultCache(os.path.join(self.config["index_dir"], "manifest"))
             
             # Initialize integration with existing UltraMCP systems
             await self._initialize_ultramcp_integrations()
@@ -220,52 +241,93 @@ class UnifiedMemoryOrchestrator:
             
             self.logger.info(f"🔍 Starting indexing for {task.project_name}")
             
+            loop = asyncio.get_running_loop()
+            incremental = indexing_mode == "incremental" and not force_reindex
+            
+            # Load the previous manifest so unchanged files are skipped without hashing
+            manifest = {}
+            if incremental:
+                manifest = await loop.run_in_executor(
+                    None, self.manifest_cache.get_manifest, task.project_name
+                )
+            
             # Scan project files
-            files = await self.project_scanner.scan_project(
-                Path(task.project_path),
-                include_patterns=include_patterns,
-                exclude_patterns=exclude_patterns
+            scan_result = await loop.run_in_executor(
+                None,
+                self.project_scanner.scan_project,
+                task.project_path,
+                include_patterns,
+                exclude_patterns,
+                manifest
             )
             
-            task.total_files = len(files)
-            self.logger.info(f"📁 Found {len(files)} files to process")
-            
-            # Check if project already indexed
-            if not force_reindex:
-                existing_project = await self.qdrant_manager.get_project_info(task.project_name)
-                if existing_project and indexing_mode == "incremental":
-                    files = await self._filter_changed_files(files, existing_project)
-                    self.logger.info(f"📄 Incremental update: {len(files)} changed files")
+            changed_infos = [info for info in scan_result.files if info.changed]
+            files = [Path(info.path) for info in changed_infos]
             
-            # Process files in batches
-            batch_size = 10
-            processed_entities = []
+            task.total_files = len(files)
+            self.logger.info(f"📁 Found {scan_result.scanned_files} files, {len(files)} to process")
             
-            for i in range(0, len(files), batch_size):
-                batch = files[i:i + batch_size]
+            if incremental:
+                self.logger.info(
+                    f"📄 Incremental update: {len(files)} changed, "
+                    f"{scan_result.unchanged_files} unchanged, {len(scan_result.deleted_files)} deleted"
+                )
                 
-                # Process batch
-                batch_entities = await self._process_file_batch(batch, task.project_name)
-                processed_entities.extend(batch_entities)
+                # Drop stale elements for modified and deleted files
+                stale_paths = [info.path for info in changed_infos if info.path in manifest]
+                await self._remove_indexed_files(task.project_name, stale_paths + scan_result.deleted_files)
+            
+            # Parse files in the worker pool and stream entities to storage
+            store_batch_size = self.config["store_batch_size"]
+            pending_entities = []
+            pending_paths = []
+            stored_paths = set()
+            entities_stored = 0
+            progress_step = max(1, len(files) // 100)
+            
+            async for outcome in self.parsing_engine.parse_files(files):
+                task.files_processed += 1
+                task.progress = task.files_processed / max(1, task.total_files)
                 
-                # Update progress
-                task.files_processed = min(i + batch_size, len(files))
-                task.progress = task.files_processed / task.total_files
+                # Skipped or failed files stay out of the manifest so the next refresh retries them
+                if not outcome.skipped:
+                    pending_entities.extend(self._add_project_context(outcome.entities, task.project_name))
+                    pending_paths.append(str(outcome.file_path))
                 
-                self.logger.info(f"📊 Progress: {task.progress:.1%} ({task.files_processed}/{task.total_files})")
-            
-            # Store entities in Qdrant
-            if processed_entities:
-                await self.qdrant_manager.store_entities(processed_entities, task.project_name)
-                self.logger.info(f"💾 Stored {len(processed_entities)} entities for {task.project_name}")
+                if len(pending_entities) >= store_batch_size:
+                    await self.qdrant_manager.store_entities(pending_entities, task.project_name)
+                    entities_stored += len(pending_entities)
+                    stored_paths.update(pending_paths)
+                    pending_entities = []
+                    pending_paths = []
+                
+                if task.files_processed % progress_step == 0:
+                    self.logger.info(f"📊 Progress: {task.progress:.1%} ({task.files_processed}/{task.total_files})")
+            
+            if pending_entities:
+                await self.qdrant_manager.store_entities(pending_entities, task.project_name)
+                entities_stored += len(pending_entities)
+            stored_paths.update(pending_paths)
+            
+            if entities_stored:
+                self.logger.info(f"💾 Stored {entities_stored} entities for {task.project_name}")
+            
+            # Record what was stored (and refreshed stats of untouched files) so the
+            # next refresh can skip it
+            manifest_infos = [info for info in changed_infos if info.path in stored_paths]
+            manifest_infos += [info for info in scan_result.files if info.stat_changed and not info.changed]
+            await loop.run_in_executor(
+                None, self._update_manifest, task.project_name, manifest_infos,
+                scan_result.deleted_files, not incremental
+            )
             
             # Update project metadata
             await self.qdrant_manager.update_project_metadata(
                 task.project_name,
                 {
                     "path": task.project_path,
-                    "files_count": len(files),
-                    "entities_count": len(processed_entities),
+                    "files_count": scan_result.scanned_files,
+                    "entities_count": entities_stored,
                     "indexed_at": datetime.now().isoformat(),
                     "indexing_mode": indexing_mode
                 }
@@ -279,7 +341,7 @@ class UnifiedMemoryOrchestrator:
             # Update statistics
             self.stats["projects_indexed"] += 1
             self.stats["files_processed"] += len(files)
-            self.stats["entities_extracted"] += len(processed_entities)
+            self.stats["entities_extracted"] += entities_stored
             
             indexing_time = (task.completed_at - task.started_at).total_seconds()
             self.stats["indexing_time_total"] += indexing_time
@@ -297,28 +359,19 @@ class UnifiedMemoryOrchestrator:
         """Process a batch of files and extract code entities"""
         entities = []
         
-        for file_path in files:
-            try:
-                # Read file content
-                content = await self._read_file_safely(file_path)
-                if not content:
-                    continue
-                
-                # Parse with Tree-sitter
-                file_entities = await self.code_parser.parse_file(file_path, content)
-                
-                # Add project context
-                for entity in file_entities:
-                    entity["project_name"] = project_name
-                    entity["indexed_at"] = datetime.now().isoformat()
-                
-                entities.extend(file_entities)
-                
-            except Exception as e:
-                self.logger.warning(f"Failed to process {file_path}: {e}")
+        async for outcome in self.parsing_engine.parse_files(files):
+            entities.extend(self._add_project_context(outcome.entities, project_name))
         
         return entities
 
+    def _add_project_context(self, entities: List[Dict], project_name: str) -> List[Dict]:
+        """Attach project context to parsed entities"""
+        indexed_at = datetime.now().isoformat()
+        for entity in entities:
+            entity["project_name"] = project_name
+            entity["indexed_at"] = indexed_at
+        return entities
+
     async def _read_file_safely(self, file_path: Path) -> Optional[str]:
         """Safely read file content with encoding detection"""
         try:
@@ -591,12 +644,15 @@ class UnifiedMemoryOrchestrator:
             **self.stats,
             "qdrant_stats": qdrant_stats,
             "active_tasks": len(self.active_tasks),
+            "parsing_stats": dict(self.parsing_engine.stats) if self.parsing_engine else {},
             "cache_stats": await self.cache_manager.get_stats()
         }
 
     async def delete_project(self, project_name: str):
         """Delete a project from memory"""
+        await self.stop_watching(project_name)
         await self.qdrant_manager.delete_project(project_name)
+        self.manifest_cache.clear_manifest(project_name)
 
     async def refresh_project(self, project_name: str) -> str:
         """Refresh/update project index"""
@@ -613,6 +669,100 @@ class UnifiedMemoryOrchestrator:
             force_reindex=False
         )
 
+    async def start_watching(self, project_name: str, project_path: Optional[str] = None) -> Dict:
+        """Start live index updates for a project from filesystem events"""
+        if project_name in self.watchers:
+            return asdict(self.watchers[project_name].get_stats())
+        
+        if project_path is None:
+            project_info = await self.qdrant_manager.get_project_info(project_name)
+            if not project_info:
+                raise ValueError(f"Project {project_name} not found")
+            project_path = project_info["path"]
+        
+        root = Path(project_path).resolve()
+        
+        def path_filter(path: str) -> bool:
+            try:
+                relative_path = os.path.relpath(path, root)
+            except ValueError:
+                return False
+            return (self.code_parser.detect_language(path) is not None and
+                    not self.project_scanner.should_ignore(relative_path))
+        
+        async def on_changes(changed: Set[str], deleted: Set[str]):
+            await self._apply_watched_changes(project_name, changed, deleted)
+        
+        watcher = ProjectWatcher(
+            project_name=project_name,
+            project_path=str(root),
+            on_changes=on_changes,
+            path_filter=path_filter,
+            debounce_seconds=self.config["watch_debounce_seconds"],
+            use_polling=self.config["watch_use_polling"]
+        )
+        await watcher.start()
+        self.watchers[project_name] = watcher
+        
+        return asdict(watcher.get_stats())
+
+    async def stop_watching(self, project_name: str) -> bool:
+        """Stop live index updates for a project"""
+        watcher = self.watchers.pop(project_name, None)
+        if not watcher:
+            return False
+        
+        await watcher.stop()
+        return True
+
+    async def get_watcher_metrics(self) -> Dict[str, Dict]:
+        """Lag and queue-depth metrics for all project watchers"""
+        return {name: asdict(watcher.get_stats()) for name, watcher in self.watchers.items()}
+
+    async def _apply_watched_changes(self, project_name: str, changed: Set[str], deleted: Set[str]):
+        """Reindex touched files and drop elements of deleted ones"""
+        loop = asyncio.get_running_loop()
+        
+        # Files that vanished before we got to them count as deleted
+        existing = {path for path in changed if os.path.exists(path)}
+        deleted = deleted | (changed - existing)
+        
+        await self._remove_indexed_files(project_name, sorted(deleted | existing))
+        
+        entities = []
+        manifest_entries = []
+        async for outcome in self.parsing_engine.parse_files(sorted(existing)):
+            if outcome.skipped:
+                continue
+            
+            try:
+                stat_info = os.stat(outcome.file_path)
+            except FileNotFoundError:
+                # Deleted between the event and this batch
+                deleted.add(outcome.file_path)
+                continue
+            
+            entities.extend(self._add_project_context(outcome.entities, project_name))
+            manifest_entries.append(ManifestEntry(
+                path=outcome.file_path,
+                mtime_ns=stat_info.st_mtime_ns,
+                size_bytes=stat_info.st_size,
+                inode=stat_info.st_ino,
+                content_hash=self.project_scanner.calculate_file_checksum(outcome.file_path)
+            ))
+        
+        if entities:
+            await self.qdrant_manager.store_entities(entities, project_name)
+        
+        await loop.run_in_executor(None, self.manifest_cache.update_manifest, project_name, manifest_entries)
+        if deleted:
+            await loop.run_in_executor(None, self.manifest_cache.remove_from_manifest, project_name, sorted(deleted))
+        
+        self.logger.info(
+            f"🔄 Live update for {project_name}: {len(manifest_entries)} files reindexed "
+            f"({len(entities)} entities), {len(deleted)} deleted"
+        )
+
     async def background_maintenance(self):
         """Background maintenance tasks"""
         try:
@@ -647,12 +797,16 @@ class UnifiedMemoryOrchestrator:
     async def cleanup(self):
         """Cleanup resources"""
         try:
+            for project_name in list(self.watchers):
+                await self.stop_watching(project_name)
             if self.qdrant_manager:
                 await self.qdrant_manager.close()
             if self.cache_manager:
                 await self.cache_manager.close()
             if self.executor:
                 self.executor.shutdown(wait=True)
+            if self.parsing_engine:
+                self.parsing_engine.shutdown()
                 
             self.logger.info("🛑 Memory orchestrator cleanup completed")
         except Exception as e:
@@ -732,7 +886,42 @@ class UnifiedMemoryOrchestrator:
         
         return suggestions
 
-    async def _filter_changed_files(self, files: List[Path], existing_project: Dict) -> List[Path]:
-        """Filter files that have changed since last indexing"""
-        # For now, return all files - in production, would check modification times
-        return files
\ No newline at end of file
+    async def _remove_indexed_files(self, project_name: str, file_paths: List[str]):
+        """Delete stored entities for files that changed or disappeared"""
+        if not file_paths:
+            return
+        
+        # Same store and collection that store_entities writes to
+        await self.qdrant_manager.delete_points(
+            self.config["collection_name"],
+            filter_conditions=Filter(must=[
+                FieldCondition(key="project_name", match=MatchValue(value=project_name)),
+                FieldCondition(key="file_path", match=MatchAny(any=list(file_paths)))
+            ])
+        )
+        
+        self.logger.info(f"🗑️ Removed indexed elements for {len(file_paths)} files")
+
+    def _update_manifest(
+        self,
+        project_name: str,
+        indexed_files: List,
+        deleted_files: List[str],
+        replace: bool
+    ):
+        """Persist manifest entries for indexed files and drop deleted ones"""
+        if replace:
+            self.manifest_cache.clear_manifest(project_name)
+        elif deleted_files:
+            self.manifest_cache.remove_from_manifest(project_name, deleted_files)
+        
+        self.manifest_cache.update_manifest(project_name, [
+            ManifestEntry(
+                path=info.path,
+                mtime_ns=info.mtime_ns,
+                size_bytes=info.size_bytes,
+                inode=info.inode,
+                content_hash=info.checksum
+            )
+            for info in indexed_files
+        ])
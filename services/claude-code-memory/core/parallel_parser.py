@@ -0,0 +1,181 @@
+"""
+Process-pool Tree-sitter parsing for project indexing
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Small snippets used to warm up each language parser inside a worker
+WARMUP_SNIPPETS = {
+    'python': "def f(x):\n    return x\n",
+    'javascript': "function f(x) { return x; }\n",
+    'typescript': "function f(x: number): number { return x; }\n",
+    'java': "class A { int f(int x) { return x; } }\n",
+    'cpp': "int f(int x) { return x; }\n",
+    'c': "int f(int x) { return x; }\n",
+    'go': "package main\nfunc f(x int) int { return x }\n",
+    'rust': "fn f(x: i32) -> i32 { x }\n",
+}
+
+FILE_ENCODINGS = ['utf-8', 'utf-16', 'latin-1', 'ascii']
+
+# Per-process state, populated by _init_worker
+_worker_parser = None
+_worker_max_file_size = 0
+
+@dataclass
+class FileParseOutcome:
+    """Entities produced for one file by a parsing worker"""
+    file_path: str
+    language: str
+    entities: List[Dict[str, Any]] = field(default_factory=list)
+    parse_time: float = 0.0
+    skipped: bool = False
+    errors: List[str] = field(default_factory=list)
+
+def _init_worker(max_file_size: int):
+    """Build and warm up one parser per language in the worker process"""
+    global _worker_parser, _worker_max_file_size
+    from .code_parser import TreeSitterCodeParser
+
+    _worker_max_file_size = max_file_size
+    _worker_parser = TreeSitterCodeParser()
+
+    for language, snippet in WARMUP_SNIPPETS.items():
+        parser = _worker_parser.parsers.get(language)
+        if parser is None:
+            continue
+        try:
+            parser.parse(snippet.encode('utf8'))
+        except Exception as e:
+            logger.debug(f"Warm-up failed for {language} in pid {os.getpid()}: {e}")
+
+def _read_file(file_path: str) -> Optional[str]:
+    """Read file content trying several encodings"""
+    for encoding in FILE_ENCODINGS:
+        try:
+            with open(file_path, 'r', encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def _parse_in_worker(file_path: str) -> FileParseOutcome:
+    """Read and parse a single file inside a worker process"""
+    start_time = time.time()
+    language = _worker_parser.detect_language(file_path) or 'unknown'
+
+    try:
+        if os.stat(file_path).st_size > _worker_max_file_size:
+            return FileParseOutcome(file_path=file_path, language=language, skipped=True,
+                                    errors=["File too large"])
+
+        content = _read_file(file_path)
+        if not content:
+            return FileParseOutcome(file_path=file_path, language=language, skipped=True,
+                                    errors=["Could not decode file"])
+
+        result = _worker_parser.parse_content(file_path, content)
+        return FileParseOutcome(
+            file_path=file_path,
+            language=result.language,
+            entities=[asdict(element) for element in result.elements],
+            parse_time=time.time() - start_time,
+            errors=result.errors
+        )
+    except Exception as e:
+        return FileParseOutcome(file_path=file_path, language=language, skipped=True,
+                                parse_time=time.time() - start_time, errors=[str(e)])
+
+class ParallelParsingEngine:
+    """Fans TreeSitterCodeParser work out over a process pool
+
+    At most ``max_in_flight`` files are submitted at once; new files are only
+    submitted as the consumer pulls results, so a slow embedding/upsert stage
+    applies backpressure to parsing instead of letting results pile up.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 max_file_size: int = 1024 * 1024):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.max_workers * 4
+        self.max_file_size = max_file_size
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+        self.stats = {
+            "files_parsed": 0,
+            "files_skipped": 0,
+            "entities_produced": 0,
+            "parse_time_total": 0.0,
+        }
+
+    def start(self):
+        """Start the worker pool"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.max_file_size,)
+            )
+            logger.info(f"Started parsing pool with {self.max_workers} workers "
+                        f"(max in flight: {self.max_in_flight})")
+
+    async def parse_files(self, files: Iterable[Path]) -> AsyncIterator[FileParseOutcome]:
+        """Parse files in parallel, yielding outcomes as they complete"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        file_iter = iter(files)
+        in_flight = set()
+
+        def submit_next() -> bool:
+            try:
+                file_path = next(file_iter)
+            except StopIteration:
+                return False
+            in_flight.add(loop.run_in_executor(self.executor, _parse_in_worker, str(file_path)))
+            return True
+
+        while len(in_flight) < self.max_in_flight and submit_next():
+            pass
+
+        try:
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+                for future in done:
+                    in_flight.discard(future)
+                    outcome = future.result()
+                    self._record(outcome)
+                    yield outcome
+
+                    submit_next()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def _record(self, outcome: FileParseOutcome):
+        """Update statistics for a finished file"""
+        if outcome.skipped:
+            self.stats["files_skipped"] += 1
+            if outcome.errors:
+                logger.warning(f"Skipped {outcome.file_path}: {outcome.errors[0]}")
+            return
+
+        self.stats["files_parsed"] += 1
+        self.stats["entities_produced"] += len(outcome.entities)
+        self.stats["parse_time_total"] += outcome.parse_time
+
+    def shutdown(self):
+        """Shut down the worker pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
@@ -4,12 +4,15 @@ Advanced code pattern analysis and detection
 import re
 import ast
 import json
-from typing import Dict, List, Set, Tuple, Optional, Any
+import time
+from bisect import bisect_right
+from typing import Dict, List, Set, Tuple, Optional, Any, Iterable
 from dataclasses import dataclass, asdict
 from collections import defaultdict, Counter
 from pathlib import Path
 import logging
 from .code_parser import CodeElement, ParseResult
+from .duplicate_detector import DuplicateDetector, CloneCluster
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +36,17 @@ class PatternAnalysisResult:
     summary: Dict[str, int]
     analysis_time: float
 
+@dataclass
+class ProjectPatternAnalysisResult:
+    """Pattern analysis across all files of a project"""
+    file_results: List[PatternAnalysisResult]
+    clone_clusters: List[CloneCluster]
+    duplicate_patterns: List[Pattern]
+    summary: Dict[str, int]
+    files_analyzed: int
+    functions_indexed: int
+    analysis_time: float = 0.0
+
 class CodePatternAnalyzer:
     """Advanced code pattern detection and analysis"""
     
@@ -257,29 +271,32 @@ class CodePatternAnalyzer:
             }
         }
     
-    def analyze_patterns(self, parse_result: ParseResult) -> PatternAnalysisResult:
+    def analyze_patterns(self, parse_result: ParseResult, content: Optional[str] = None) -> PatternAnalysisResult:
         """Analyze code patterns in parsed result"""
-        import time
         start_time = time.time()
         
         patterns = []
         metrics = {}
         
         try:
+            # Read the file once and share it between all checks
+            if content is None:
+                content = self._get_file_content(parse_result.file_path)
+            
             # Analyze design patterns
-            design_patterns = self._detect_design_patterns(parse_result)
+            design_patterns = self._detect_design_patterns(parse_result, content)
             patterns.extend(design_patterns)
             
             # Analyze anti-patterns
-            anti_patterns = self._detect_anti_patterns(parse_result)
+            anti_patterns = self._detect_anti_patterns(parse_result, content)
             patterns.extend(anti_patterns)
             
             # Analyze code smells
-            code_smells = self._detect_code_smells(parse_result)
+            code_smells = self._detect_code_smells(parse_result, content)
             patterns.extend(code_smells)
             
             # Check best practices
-            best_practices = self._check_best_practices(parse_result)
+            best_practices = self._check_best_practices(parse_result, content)
             patterns.extend(best_practices)
             
             # Calculate metrics
@@ -302,10 +319,60 @@ class CodePatternAnalyzer:
             analysis_time=time.time() - start_time
         )
     
-    def _detect_design_patterns(self, parse_result: ParseResult) -> List[Pattern]:
+    def new_duplicate_detector(self) -> DuplicateDetector:
+        """Create a duplicate detector using the duplicate_code thresholds"""
+        thresholds = self.anti_patterns['duplicate_code']['thresholds']
+        return DuplicateDetector(threshold=thresholds['similarity'], min_lines=thresholds['min_lines'])
+    
+    def analyze_project(self,
+                        parse_results: Iterable[ParseResult],
+                        keep_file_results: bool = True) -> ProjectPatternAnalysisResult:
+        """Analyze a stream of parse results, detecting clones across files
+        
+        Each file is read once and analyzed as it arrives; only its MinHash
+        signatures are kept for the project-wide duplicate search, so memory
+        stays bounded when ``keep_file_results`` is False.
+        """
+        start_time = time.time()
+        detector = self.new_duplicate_detector()
+        file_results = []
+        summary = Counter()
+        files_analyzed = 0
+        
+        for parse_result in parse_results:
+            try:
+                result = self.analyze_patterns(parse_result)
+                detector.add_elements(parse_result.file_path, parse_result.elements)
+            except Exception as e:
+                logger.error(f"Error analyzing {parse_result.file_path}: {e}")
+                continue
+            
+            files_analyzed += 1
+            summary.update(result.summary)
+            if keep_file_results:
+                file_results.append(result)
+        
+        clusters = detector.find_clusters()
+        duplicate_patterns = [
+            self._clone_cluster_pattern(cluster) for cluster in clusters if cluster.files > 1
+        ]
+        summary['clone_clusters'] = len(clusters)
+        summary['cross_file_clone_clusters'] = len(duplicate_patterns)
+        
+        return ProjectPatternAnalysisResult(
+            file_results=file_results,
+            clone_clusters=clusters,
+            duplicate_patterns=duplicate_patterns,
+            summary=dict(summary),
+            files_analyzed=files_analyzed,
+            functions_indexed=len(detector),
+            analysis_time=time.time() - start_time
+        )
+    
+    def _detect_design_patterns(self, parse_result: ParseResult, content: str) -> List[Pattern]:
         """Detect design patterns in code"""
         patterns = []
-        content = self._get_file_content(parse_result.file_path)
+        line_starts = self._line_starts(content)
         
         for pattern_name, pattern_info in self.design_patterns.items():
             occurrences = []
@@ -315,7 +382,7 @@ class CodePatternAnalyzer:
             for indicator in pattern_info['indicators']:
                 matches = re.finditer(indicator, content, re.MULTILINE | re.IGNORECASE)
                 for match in matches:
-                    line_num = content[:match.start()].count('\n') + 1
+                    line_num = self._line_number(line_starts, match.start())
                     occurrences.append({
                         'line': line_num,
                         'match': match.group(),
@@ -343,7 +410,7 @@ class CodePatternAnalyzer:
         
         return patterns
     
-    def _detect_anti_patterns(self, parse_result: ParseResult) -> List[Pattern]:
+    def _detect_anti_patterns(self, parse_result: ParseResult, content: str) -> List[Pattern]:
         """Detect anti-patterns in code"""
         patterns = []
         
@@ -365,16 +432,15 @@ class CodePatternAnalyzer:
         patterns.extend(duplicate_patterns)
         
         # Check for magic numbers
-        magic_number_pattern = self._check_magic_numbers(parse_result)
+        magic_number_pattern = self._check_magic_numbers(content)
         if magic_number_pattern:
             patterns.append(magic_number_pattern)
         
         return patterns
     
-    def _detect_code_smells(self, parse_result: ParseResult) -> List[Pattern]:
+    def _detect_code_smells(self, parse_result: ParseResult, content: str) -> List[Pattern]:
         """Detect code smells"""
         patterns = []
-        content = self._get_file_content(parse_result.file_path)
         
         for smell_name, smell_info in self.code_smells.items():
             if smell_name == 'dead_code':
@@ -392,7 +458,7 @@ class CodePatternAnalyzer:
         
         return patterns
     
-    def _check_best_practices(self, parse_result: ParseResult) -> List[Pattern]:
+    def _check_best_practices(self, parse_result: ParseResult, content: str) -> List[Pattern]:
         """Check adherence to best practices"""
         patterns = []
         
@@ -402,7 +468,7 @@ class CodePatternAnalyzer:
             patterns.append(docstring_issues)
         
         # Check error handling
-        error_handling = self._check_error_handling(parse_result)
+        error_handling = self._check_error_handling(parse_result, content)
         if error_handling:
             patterns.append(error_handling)
         
@@ -486,44 +552,40 @@ class CodePatternAnalyzer:
     
     def _check_duplicate_code(self, parse_result: ParseResult) -> List[Pattern]:
         """Check for duplicate code blocks"""
-        patterns = []
+        detector = self.new_duplicate_detector()
+        detector.add_elements(parse_result.file_path, parse_result.elements)
         
-        # Simple duplicate detection based on content similarity
-        functions = [e for e in parse_result.elements if e.type == 'function']
-        
-        for i, func1 in enumerate(functions):
-            for func2 in functions[i+1:]:
-                similarity = self._calculate_similarity(func1.content, func2.content)
-                
-                if similarity > self.anti_patterns['duplicate_code']['thresholds']['similarity']:
-                    patterns.append(Pattern(
-                        name="Duplicate Code",
-                        type='anti_pattern',
-                        description=self.anti_patterns['duplicate_code']['description'],
-                        confidence=similarity,
-                        occurrences=[
-                            {'element': func1.name, 'line': func1.start_line},
-                            {'element': func2.name, 'line': func2.start_line}
-                        ],
-                        severity=self.anti_patterns['duplicate_code']['severity'],
-                        recommendations=self.anti_patterns['duplicate_code']['recommendations']
-                    ))
-        
-        return patterns
+        return [self._clone_cluster_pattern(cluster) for cluster in detector.find_clusters()]
+    
+    def _clone_cluster_pattern(self, cluster: CloneCluster) -> Pattern:
+        """Report a clone cluster as a duplicate code pattern"""
+        return Pattern(
+            name="Duplicate Code",
+            type='anti_pattern',
+            description=self.anti_patterns['duplicate_code']['description'],
+            confidence=cluster.similarity,
+            occurrences=[
+                {'element': m.name, 'line': m.start_line, 'file_path': m.file_path}
+                for m in cluster.members
+            ],
+            severity=self.anti_patterns['duplicate_code']['severity'],
+            recommendations=self.anti_patterns['duplicate_code']['recommendations']
+        )
     
-    def _check_magic_numbers(self, parse_result: ParseResult) -> Optional[Pattern]:
+    def _check_magic_numbers(self, content: str) -> Optional[Pattern]:
         """Check for magic numbers in code"""
-        content = self._get_file_content(parse_result.file_path)
         occurrences = []
+        lines = content.split('\n')
+        line_starts = self._line_starts(content)
         
         for pattern in self.anti_patterns['magic_numbers']['patterns']:
             matches = re.finditer(pattern, content)
             for match in matches:
-                line_num = content[:match.start()].count('\n') + 1
+                line_num = self._line_number(line_starts, match.start())
                 occurrences.append({
                     'line': line_num,
                     'value': match.group(),
-                    'context': self._get_line_context(content, line_num)
+                    'context': self._get_line_context(lines, line_num)
                 })
         
         if occurrences:
@@ -542,11 +604,12 @@ class CodePatternAnalyzer:
     def _check_dead_code(self, content: str, smell_info: Dict[str, Any]) -> Optional[Pattern]:
         """Check for dead code"""
         occurrences = []
+        line_starts = self._line_starts(content)
         
         for indicator in smell_info['indicators']:
             matches = re.finditer(indicator, content, re.MULTILINE)
             for match in matches:
-                line_num = content[:match.start()].count('\n') + 1
+                line_num = self._line_number(line_starts, match.start())
                 occurrences.append({
                     'line': line_num,
                     'match': match.group().strip(),
@@ -652,10 +715,8 @@ class CodePatternAnalyzer:
         
         return None
     
-    def _check_error_handling(self, parse_result: ParseResult) -> Optional[Pattern]:
+    def _check_error_handling(self, parse_result: ParseResult, content: str) -> Optional[Pattern]:
         """Check for proper error handling"""
-        content = self._get_file_content(parse_result.file_path)
-        
         # Count try/except blocks
         try_blocks = len(re.findall(r'try:\s*\n', content))
         except_blocks = len(re.findall(r'except\s+\w*:', content))
@@ -687,7 +748,6 @@ class CodePatternAnalyzer:
         if parse_result.language != 'python':
             return None
         
-        content = self._get_file_content(parse_result.file_path)
         functions = [e for e in parse_result.elements if e.type == 'function']
         
         functions_with_hints = 0
@@ -796,9 +856,16 @@ class CodePatternAnalyzer:
         
         return common / total if total > 0 else 0.0
     
-    def _get_line_context(self, content: str, line_num: int, context_lines: int = 2) -> str:
+    def _line_starts(self, content: str) -> List[int]:
+        """Offsets at which each line starts"""
+        return [0] + [match.end() for match in re.finditer('\n', content)]
+    
+    def _line_number(self, line_starts: List[int], offset: int) -> int:
+        """1-based line number of a character offset"""
+        return bisect_right(line_starts, offset)
+    
+    def _get_line_context(self, lines: List[str], line_num: int, context_lines: int = 2) -> str:
         """Get context around a specific line"""
-        lines = content.split('\n')
         start = max(0, line_num - context_lines - 1)
         end = min(len(lines), line_num + context_lines)
         
@@ -5,7 +5,7 @@ import os
 import fnmatch
 from pathlib import Path
 from typing import List, Set, Dict, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import logging
 import hashlib
 import json
@@ -27,6 +27,9 @@ class ScanResult:
     scan_time: float
     errors: List[str]
     last_modified: datetime
+    files: List['FileInfo'] = field(default_factory=list)
+    unchanged_files: int = 0
+    deleted_files: List[str] = field(default_factory=list)
 
 @dataclass
 class FileInfo:
@@ -38,6 +41,10 @@ class FileInfo:
     file_type: str
     last_modified: datetime
     checksum: str
+    mtime_ns: int = 0
+    inode: int = 0
+    changed: bool = True
+    stat_changed: bool = False  # Content unchanged but the recorded stat triple is stale
 
 class ProjectScanner:
     """Intelligent project scanning with filtering and optimization"""
@@ -194,8 +201,15 @@ class ProjectScanner:
     
     def scan_project(self, project_path: str, 
                      include_patterns: Optional[List[str]] = None,
-                     exclude_patterns: Optional[List[str]] = None) -> ScanResult:
-        """Scan a project directory and return detailed information"""
+                     exclude_patterns: Optional[List[str]] = None,
+                     manifest: Optional[Dict[str, Any]] = None) -> ScanResult:
+        """Scan a project directory and return detailed information
+        
+        When a manifest (path -> ManifestEntry) from a previous scan is given,
+        files whose (mtime, size, inode) are unchanged reuse the recorded
+        checksum instead of being re-read, and manifest paths that no longer
+        exist are reported in ``deleted_files``.
+        """
         start_time = time.time()
         project_path = Path(project_path).resolve()
         
@@ -224,6 +238,8 @@ class ProjectScanner:
         file_types = {}
         errors = []
         file_infos = []
+        unchanged_files = 0
+        seen_paths = set()
         
         try:
             # Walk the directory tree
@@ -282,6 +298,19 @@ class ProjectScanner:
                             languages[language] = languages.get(language, 0) + 1
                             file_types[file_extension] = file_types.get(file_extension, 0) + 1
                             
+                            # Reuse the recorded checksum when the stat triple is unchanged;
+                            # otherwise hash the file and only reparse if the content moved
+                            seen_paths.add(file_path)
+                            previous = manifest.get(file_path) if manifest else None
+                            stat_unchanged = previous is not None and previous.matches_stat(
+                                stat_info.st_mtime_ns, file_size, stat_info.st_ino
+                            )
+                            checksum = (previous.content_hash if stat_unchanged
+                                        else self.calculate_file_checksum(file_path))
+                            unchanged = previous is not None and bool(checksum) and checksum == previous.content_hash
+                            if unchanged:
+                                unchanged_files += 1
+                            
                             # Create file info
                             file_info = FileInfo(
                                 path=file_path,
@@ -290,7 +319,11 @@ class ProjectScanner:
                                 language=language,
                                 file_type=file_extension,
                                 last_modified=datetime.fromtimestamp(stat_info.st_mtime),
-                                checksum=self.calculate_file_checksum(file_path)
+                                checksum=checksum,
+                                mtime_ns=stat_info.st_mtime_ns,
+                                inode=stat_info.st_ino,
+                                changed=not unchanged,
+                                stat_changed=unchanged and not stat_unchanged
                             )
                             file_infos.append(file_info)
                         else:
@@ -310,6 +343,15 @@ class ProjectScanner:
         
         scan_time = time.time() - start_time
         
+        # Paths missing from this walk may only have been cut off (max_files,
+        # stat or walk errors); report them only when they are really gone
+        deleted_files = []
+        if manifest:
+            deleted_files = [
+                path for path in manifest
+                if path not in seen_paths and not os.path.exists(path)
+            ]
+        
         result = ScanResult(
             project_path=str(project_path),
             total_files=total_files,
@@ -320,7 +362,10 @@ class ProjectScanner:
             file_types=file_types,
             scan_time=scan_time,
             errors=errors,
-            last_modified=datetime.utcnow()
+            last_modified=datetime.utcnow(),
+            files=file_infos,
+            unchanged_files=unchanged_files,
+            deleted_files=deleted_files
         )
         
         logger.info(f"Scanned project {project_path}: {scanned_files} files, {len(languages)} languages")
@@ -512,6 +557,8 @@ class ProjectScanner:
                 # Convert dataclass to dict with datetime serialization
                 result_dict = asdict(scan_result)
                 result_dict['last_modified'] = scan_result.last_modified.isoformat()
+                for file_dict, file_info in zip(result_dict['files'], scan_result.files):
+                    file_dict['last_modified'] = file_info.last_modified.isoformat()
                 json.dump(result_dict, f, indent=2)
             
             logger.info(f"Saved scan result to {output_path}")
@@ -526,6 +573,11 @@ class ProjectScanner:
             
             # Convert datetime string back
             result_dict['last_modified'] = datetime.fromisoformat(result_dict['last_modified'])
+            files = []
+            for file_dict in result_dict.get('files', []):
+                file_dict['last_modified'] = datetime.fromisoformat(file_dict['last_modified'])
+                files.append(FileInfo(**file_dict))
+            result_dict['files'] = files
             
             return ScanResult(**result_dict)
         except Exception as e:
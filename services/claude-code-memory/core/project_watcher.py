@@ -0,0 +1,262 @@
+"""
+Filesystem watching for live index updates of indexed projects
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler, FileSystemEvent
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+    logger = logging.getLogger(__name__)
+    logger.warning("watchdog not available. Install with: pip install watchdog")
+
+logger = logging.getLogger(__name__)
+
+# Callback receiving (changed_paths, deleted_paths) for one coalesced batch
+ChangeHandler = Callable[[Set[str], Set[str]], Awaitable[None]]
+
+@dataclass
+class WatcherStats:
+    """Runtime metrics for a project watcher"""
+    project_name: str
+    mode: str
+    running: bool
+    queue_depth: int
+    pending_paths: int
+    events_received: int
+    batches_applied: int
+    files_reindexed: int
+    files_deleted: int
+    failed_batches: int
+    retry_delay_seconds: float
+    last_lag_seconds: float
+    max_lag_seconds: float
+    last_batch_at: Optional[float]
+
+class _EventForwarder(FileSystemEventHandler):
+    """Forwards watchdog events from the observer thread into an asyncio queue"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        super().__init__()
+        self.loop = loop
+        self.queue = queue
+
+    def on_any_event(self, event: 'FileSystemEvent'):
+        if event.is_directory:
+            return
+
+        received_at = time.time()
+        if event.event_type == 'moved':
+            self._put(event.src_path, 'deleted', received_at)
+            self._put(event.dest_path, 'modified', received_at)
+        elif event.event_type == 'deleted':
+            self._put(event.src_path, 'deleted', received_at)
+        elif event.event_type in ('created', 'modified', 'closed'):
+            self._put(event.src_path, 'modified', received_at)
+
+    def _put(self, path: str, kind: str, received_at: float):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (path, kind, received_at))
+
+class ProjectWatcher:
+    """Watches one project directory and applies debounced, coalesced changes
+
+    Uses inotify (through watchdog's native observer) when available and falls
+    back to a polling observer. Bursts of events are collected until the tree
+    has been quiet for ``debounce_seconds`` (or ``max_batch_delay`` has passed),
+    and each path is reported once with its final state. A batch the change
+    handler fails on is kept and retried with exponential backoff, merged with
+    whatever arrives in the meantime.
+    """
+
+    def __init__(self,
+                 project_name: str,
+                 project_path: str,
+                 on_changes: ChangeHandler,
+                 path_filter: Optional[Callable[[str], bool]] = None,
+                 debounce_seconds: float = 0.5,
+                 max_batch_delay: float = 5.0,
+                 use_polling: bool = False,
+                 polling_interval: float = 2.0,
+                 retry_initial_delay: float = 1.0,
+                 retry_max_delay: float = 60.0):
+        if not WATCHDOG_AVAILABLE:
+            raise ImportError("watchdog not available. Install with: pip install watchdog")
+
+        self.project_name = project_name
+        self.project_path = str(Path(project_path).resolve())
+        self.on_changes = on_changes
+        self.path_filter = path_filter
+        self.debounce_seconds = debounce_seconds
+        self.max_batch_delay = max_batch_delay
+        self.use_polling = use_polling
+        self.polling_interval = polling_interval
+        self.retry_initial_delay = retry_initial_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.observer = None
+        self.mode = "polling" if use_polling else "native"
+        self._consumer: Optional[asyncio.Task] = None
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._retry_delay = 0.0
+
+        self.stats = {
+            "events_received": 0,
+            "batches_applied": 0,
+            "files_reindexed": 0,
+            "files_deleted": 0,
+            "failed_batches": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "last_batch_at": None,
+        }
+
+    async def start(self):
+        """Start the observer and the batching consumer"""
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        handler = _EventForwarder(loop, self.queue)
+
+        self.observer = self._start_observer(handler)
+        self._consumer = asyncio.create_task(self._consume())
+
+        logger.info(f"👀 Watching {self.project_path} for {self.project_name} ({self.mode})")
+
+    def _start_observer(self, handler: '_EventForwarder'):
+        """Start a native observer, falling back to polling if it fails
+
+        inotify watch limits only surface once the observer starts walking the
+        tree, so start() is covered by the fallback as well as schedule().
+        """
+        if not self.use_polling:
+            observer = Observer()
+            try:
+                observer.schedule(handler, self.project_path, recursive=True)
+                observer.start()
+                return observer
+            except Exception as e:
+                logger.warning(f"Native file watching unavailable for {self.project_path}, polling instead: {e}")
+                self.mode = "polling"
+                if observer.is_alive():
+                    observer.stop()
+
+        observer = PollingObserver(timeout=self.polling_interval)
+        observer.schedule(handler, self.project_path, recursive=True)
+        observer.start()
+        return observer
+
+    async def stop(self):
+        """Stop the observer and the batching consumer"""
+        if self.observer:
+            self.observer.stop()
+            await asyncio.get_running_loop().run_in_executor(None, self.observer.join)
+            self.observer = None
+
+        if self._consumer:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+
+        logger.info(f"🛑 Stopped watching {self.project_name}")
+
+    async def _consume(self):
+        """Collect events into debounced batches and apply them"""
+        while True:
+            if self._pending:
+                # A failed batch is waiting: back off, still collecting new events
+                await self._collect(self._retry_delay)
+            else:
+                path, kind, received_at = await self.queue.get()
+                self._add_event(path, kind, received_at)
+                # Keep collecting until the tree goes quiet or the batch gets too old
+                await self._collect(self.max_batch_delay, quiet=self.debounce_seconds)
+
+            if await self._flush():
+                self._retry_delay = 0.0
+            else:
+                self._retry_delay = min(self.retry_max_delay,
+                                        max(self.retry_initial_delay, self._retry_delay * 2))
+
+    async def _collect(self, window: float, quiet: Optional[float] = None):
+        """Add queued events for up to ``window`` seconds, or until ``quiet`` seconds pass without one"""
+        started = time.time()
+        while True:
+            remaining = window - (time.time() - started)
+            if remaining <= 0:
+                return
+            try:
+                path, kind, received_at = await asyncio.wait_for(
+                    self.queue.get(), timeout=min(quiet, remaining) if quiet else remaining
+                )
+            except asyncio.TimeoutError:
+                if quiet:
+                    return
+                continue
+            self._add_event(path, kind, received_at)
+
+    def _add_event(self, path: str, kind: str, received_at: float):
+        """Coalesce an event into the pending batch, keeping the first arrival time"""
+        self.stats["events_received"] += 1
+
+        if self.path_filter and not self.path_filter(path):
+            return
+
+        first_seen = self._pending.get(path, (kind, received_at))[1]
+        self._pending[path] = (kind, first_seen)
+
+    async def _flush(self) -> bool:
+        """Hand the coalesced batch to the change handler; False if it must be retried"""
+        if not self._pending:
+            return True
+
+        pending, self._pending = self._pending, {}
+        changed = {path for path, (kind, _) in pending.items() if kind == 'modified'}
+        deleted = {path for path, (kind, _) in pending.items() if kind == 'deleted'}
+        oldest_event = min(first_seen for _, first_seen in pending.values())
+
+        try:
+            await self.on_changes(changed, deleted)
+        except Exception as e:
+            # Merge the batch back under any newer events: newest kind, oldest arrival
+            for path, (kind, first_seen) in pending.items():
+                newer = self._pending.get(path)
+                self._pending[path] = (newer[0] if newer else kind, first_seen)
+            self.stats["failed_batches"] += 1
+            retry_in = min(self.retry_max_delay, max(self.retry_initial_delay, self._retry_delay * 2))
+            logger.error(f"Error applying watched changes for {self.project_name} "
+                         f"({len(pending)} paths, retrying in {retry_in:.1f}s): {e}")
+            return False
+
+        now = time.time()
+        lag = now - oldest_event
+        self.stats["batches_applied"] += 1
+        self.stats["files_reindexed"] += len(changed)
+        self.stats["files_deleted"] += len(deleted)
+        self.stats["last_lag_seconds"] = lag
+        self.stats["max_lag_seconds"] = max(self.stats["max_lag_seconds"], lag)
+        self.stats["last_batch_at"] = now
+        return True
+
+    def get_stats(self) -> WatcherStats:
+        """Snapshot of watcher metrics"""
+        return WatcherStats(
+            project_name=self.project_name,
+            mode=self.mode,
+            running=self._consumer is not None and not self._consumer.done(),
+            queue_depth=self.queue.qsize() if self.queue else 0,
+            pending_paths=len(self._pending),
+            retry_delay_seconds=self._retry_delay,
+            **self.stats
+        )
@@ -4,7 +4,7 @@ Semantic search engine using Qdrant vector database
 import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.http.models import Distance, VectorParams, Filter, FieldCondition, MatchValue
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Optional, Any, Tuple
 import logging
@@ -14,6 +14,9 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 import asyncio
 import aiohttp
+import os
+
+from .local_index import LocalVectorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -49,11 +52,25 @@ class SemanticSearchEngine:
     def __init__(self, 
                  qdrant_url: str = "http://sam.chat:6333",
                  collection_name: str = "code_memory",
-                 model_name: str = "all-MiniLM-L6-v2"):
+                 model_name: str = "all-MiniLM-L6-v2",
+                 vector_cache: Optional[Any] = None,
+                 index_backend: Optional[str] = None,
+                 local_index_dir: Optional[str] = None):
         self.qdrant_url = qdrant_url
         self.collection_name = collection_name
         self.model_name = model_name
         
+        # "qdrant", "local" (embedded index only) or "auto" (Qdrant with a
+        # local mirror used whenever Qdrant is unreachable)
+        self.index_backend = index_backend or os.getenv("SEARCH_INDEX_BACKEND", "qdrant")
+        if self.index_backend not in ("qdrant", "local", "auto"):
+            raise ValueError(f"Unknown index backend: {self.index_backend}")
+        self.local_index_dir = local_index_dir or os.getenv("LOCAL_INDEX_DIR")
+        self.local_index: Optional[LocalVectorIndex] = None
+        
+        # Optional VectorCache so unchanged content is never re-encoded
+        self.vector_cache = vector_cache
+        
         # Initialize clients
         self.client = None
         self.encoder = None
@@ -65,21 +82,32 @@ class SemanticSearchEngine:
     async def initialize(self):
         """Initialize the search engine"""
         try:
-            # Initialize Qdrant client
-            self.client = QdrantClient(url=self.qdrant_url)
-            
-            # Test connection
-            collections = await self._get_collections()
-            self.is_connected = True
-            logger.info(f"Connected to Qdrant at {self.qdrant_url}")
+            if self.index_backend != "local":
+                try:
+                    # Initialize Qdrant client and test connection
+                    self.client = QdrantClient(url=self.qdrant_url)
+                    self.client.get_collections()
+                    logger.info(f"Connected to Qdrant at {self.qdrant_url}")
+                except Exception as e:
+                    if self.index_backend == "qdrant":
+                        raise
+                    logger.warning(f"Qdrant unavailable, using local index only: {e}")
+                    self.client = None
             
             # Initialize sentence transformer
             self.encoder = SentenceTransformer(self.model_name)
             self.vector_size = self.encoder.get_sentence_embedding_dimension()
             logger.info(f"Loaded sentence transformer: {self.model_name} (dim: {self.vector_size})")
             
+            if self.index_backend in ("local", "auto"):
+                self.local_index = LocalVectorIndex(self.vector_size, self.local_index_dir)
+                logger.info(f"Local vector index ready ({self.local_index.size} points)")
+            
             # Create collection if it doesn't exist
-            await self.ensure_collection()
+            if self.client is not None:
+                await self.ensure_collection()
+            
+            self.is_connected = True
             
         except Exception as e:
             logger.error(f"Failed to initialize semantic search engine: {e}")
@@ -134,6 +162,54 @@ class SemanticSearchEngine:
             logger.error(f"Error encoding text: {e}")
             raise
     
+    def encode_texts(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Encode many texts in a single batched forward pass.
+
+        Returns a float32 matrix of shape (len(texts), vector_size).
+        """
+        if not self.encoder:
+            raise RuntimeError("Encoder not initialized")
+        
+        if not texts:
+            return np.empty((0, self.vector_size), dtype=np.float32)
+        
+        try:
+            clean_texts = [self._clean_text(text) for text in texts]
+            
+            if self.vector_cache is None:
+                return self._encode_clean(clean_texts, batch_size)
+            
+            # Only encode texts whose content hash is not cached yet
+            hashes = [
+                hashlib.sha256(f"{self.model_name}:{text}".encode()).hexdigest()
+                for text in clean_texts
+            ]
+            vectors, found = self.vector_cache.get_vectors(hashes)
+            if vectors.shape[1] != self.vector_size:
+                vectors = np.zeros((len(texts), self.vector_size), dtype=np.float32)
+            
+            missing = np.flatnonzero(~found)
+            if len(missing):
+                encoded = self._encode_clean([clean_texts[i] for i in missing], batch_size)
+                vectors[missing] = encoded
+                self.vector_cache.cache_vectors([hashes[i] for i in missing], encoded)
+            
+            return vectors
+            
+        except Exception as e:
+            logger.error(f"Error encoding batch of {len(texts)} texts: {e}")
+            raise
+    
+    def _encode_clean(self, clean_texts: List[str], batch_size: int) -> np.ndarray:
+        """Run already-cleaned texts through the encoder as one batch"""
+        vectors = self.encoder.encode(
+            clean_texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+    
     def _clean_text(self, text: str) -> str:
         """Clean text for better embedding"""
         # Remove excessive whitespace
@@ -165,21 +241,10 @@ class SemanticSearchEngine:
             # Encode content to vector
             vector = self.encode_text(content)
             
-            # Create point for Qdrant
-            point = PointStruct(
-                id=element_id,
-                vector=vector.tolist(),
-                payload={
-                    'content': content,
-                    'indexed_at': datetime.utcnow().isoformat(),
-                    **metadata
-                }
-            )
-            
-            # Upsert point
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[point]
+            self._write_points(
+                [element_id],
+                vector.reshape(1, -1),
+                [{'content': content, 'indexed_at': datetime.utcnow().isoformat(), **metadata}]
             )
             
             logger.debug(f"Indexed element: {element_id}")
@@ -191,59 +256,114 @@ class SemanticSearchEngine:
     
     async def batch_index_elements(self, 
                                   elements: List[Tuple[str, str, Dict[str, Any]]], 
-                                  batch_size: int = 100) -> Dict[str, int]:
-        """Index multiple code elements in batches"""
+                                  batch_size: int = 100,
+                                  encode_batch_size: int = 64) -> Dict[str, int]:
+        """Index multiple code elements in batches
+        
+        Each batch is encoded in one forward pass and kept as a float32 matrix
+        until upsert. Encoding of batch N+1 runs in a worker thread while
+        batch N is being upserted, so the encoder and Qdrant overlap.
+        """
         stats = {'success': 0, 'failed': 0}
         
         try:
             if not self.is_connected:
                 await self.initialize()
             
-            # Process in batches
-            for i in range(0, len(elements), batch_size):
-                batch = elements[i:i + batch_size]
-                points = []
+            batches = [elements[i:i + batch_size] for i in range(0, len(elements), batch_size)]
+            if not batches:
+                return stats
+            
+            loop = asyncio.get_running_loop()
+            
+            def encode_batch(batch: List[Tuple[str, str, Dict[str, Any]]]) -> np.ndarray:
+                return self.encode_texts([content for _, content, _ in batch], batch_size=encode_batch_size)
+            
+            pending_vectors = loop.run_in_executor(None, encode_batch, batches[0])
+            pending_upsert = None
+            
+            for index, batch in enumerate(batches):
+                try:
+                    vectors = await pending_vectors
+                except Exception as e:
+                    logger.error(f"Error encoding batch of {len(batch)} elements: {e}")
+                    vectors = None
                 
-                for element_id, content, metadata in batch:
-                    try:
-                        # Encode content
-                        vector = self.encode_text(content)
-                        
-                        # Create point
-                        point = PointStruct(
-                            id=element_id,
-                            vector=vector.tolist(),
-                            payload={
-                                'content': content,
-                                'indexed_at': datetime.utcnow().isoformat(),
-                                **metadata
-                            }
-                        )
-                        points.append(point)
-                        
-                    except Exception as e:
-                        logger.error(f"Error preparing element {element_id}: {e}")
-                        stats['failed'] += 1
+                # Start encoding the next batch before waiting on Qdrant
+                if index + 1 < len(batches):
+                    pending_vectors = loop.run_in_executor(None, encode_batch, batches[index + 1])
                 
-                # Batch upsert
-                if points:
-                    try:
-                        self.client.upsert(
-                            collection_name=self.collection_name,
-                            points=points
-                        )
-                        stats['success'] += len(points)
-                        logger.info(f"Indexed batch of {len(points)} elements")
-                        
-                    except Exception as e:
-                        logger.error(f"Error batch indexing: {e}")
-                        stats['failed'] += len(points)
+                if pending_upsert is not None:
+                    self._record_upsert_result(await pending_upsert, stats)
+                    pending_upsert = None
+                
+                if vectors is None:
+                    stats['failed'] += len(batch)
+                    continue
+                
+                pending_upsert = loop.run_in_executor(None, self._upsert_batch, batch, vectors)
+            
+            if pending_upsert is not None:
+                self._record_upsert_result(await pending_upsert, stats)
+            
+            if self.local_index is not None:
+                await loop.run_in_executor(None, self.save_local_index)
         
         except Exception as e:
             logger.error(f"Error in batch indexing: {e}")
         
         return stats
     
+    def _upsert_batch(self, 
+                      batch: List[Tuple[str, str, Dict[str, Any]]], 
+                      vectors: np.ndarray) -> Tuple[int, Optional[Exception]]:
+        """Upsert one encoded batch; returns (count, error)"""
+        indexed_at = datetime.utcnow().isoformat()
+        
+        try:
+            self._write_points(
+                [element_id for element_id, _, _ in batch],
+                vectors,
+                [
+                    {'content': content, 'indexed_at': indexed_at, **metadata}
+                    for _, content, metadata in batch
+                ]
+            )
+            return len(batch), None
+        except Exception as e:
+            return len(batch), e
+    
+    def _write_points(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        """Write points to Qdrant and/or the local index"""
+        if self.local_index is not None:
+            self.local_index.upsert(ids, vectors, payloads)
+        
+        if self.client is not None:
+            try:
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=models.Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads)
+                )
+            except Exception as e:
+                if self.local_index is None:
+                    raise
+                logger.warning(f"Qdrant upsert failed, kept {len(ids)} points in local index: {e}")
+    
+    def save_local_index(self):
+        """Persist the local index if one is configured"""
+        if self.local_index is not None:
+            self.local_index.save()
+    
+    def _record_upsert_result(self, result: Tuple[int, Optional[Exception]], stats: Dict[str, int]):
+        """Fold the outcome of an upsert into batch statistics"""
+        count, error = result
+        if error is None:
+            stats['success'] += count
+            logger.info(f"Indexed batch of {count} elements")
+        else:
+            logger.error(f"Error batch indexing: {error}")
+            stats['failed'] += count
+    
     async def search(self, 
                     query: str, 
                     limit: int = 10,
@@ -257,54 +377,22 @@ class SemanticSearchEngine:
             # Encode query
             query_vector = self.encode_text(query)
             
-            # Build filters
-            qdrant_filter = None
-            if filters:
-                conditions = []
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        # Multiple values (OR condition)
-                        for v in value:
-                            conditions.append(
-                                FieldCondition(key=key, match=MatchValue(value=v))
-                            )
-                    else:
-                        # Single value
-                        conditions.append(
-                            FieldCondition(key=key, match=MatchValue(value=value))
-                        )
-                
-                if conditions:
-                    qdrant_filter = Filter(should=conditions) if len(conditions) > 1 else Filter(must=[conditions[0]])
-            
-            # Perform search
-            search_results = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector.tolist(),
-                query_filter=qdrant_filter,
-                limit=limit,
-                score_threshold=score_threshold
-            )
+            if self.client is not None:
+                try:
+                    hits = self._qdrant_search(query_vector, limit, score_threshold, filters)
+                except Exception as e:
+                    if self.local_index is None:
+                        raise
+                    logger.warning(f"Qdrant search failed, using local index: {e}")
+                    hits = self.local_index.search(query_vector, limit, score_threshold, filters)
+            else:
+                hits = self.local_index.search(query_vector, limit, score_threshold, filters)
             
             # Convert to SearchResult objects
-            results = []
-            for hit in search_results:
-                payload = hit.payload
-                
-                result = SearchResult(
-                    id=str(hit.id),
-                    score=hit.score,
-                    content=payload.get('content', ''),
-                    metadata=payload,
-                    file_path=payload.get('file_path', ''),
-                    element_type=payload.get('element_type', ''),
-                    element_name=payload.get('element_name', ''),
-                    start_line=payload.get('start_line', 0),
-                    end_line=payload.get('end_line', 0),
-                    language=payload.get('language', ''),
-                    context=self._generate_context(payload)
-                )
-                results.append(result)
+            results = [
+                self._to_search_result(point_id, score, payload)
+                for point_id, score, payload in hits
+            ]
             
             logger.info(f"Found {len(results)} results for query: {query[:50]}...")
             return results
@@ -313,6 +401,57 @@ class SemanticSearchEngine:
             logger.error(f"Error in semantic search: {e}")
             return []
     
+    def _qdrant_search(self, 
+                       query_vector: np.ndarray, 
+                       limit: int, 
+                       score_threshold: float,
+                       filters: Optional[Dict[str, Any]]) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Run a vector search against Qdrant"""
+        # Build filters
+        qdrant_filter = None
+        if filters:
+            conditions = []
+            for key, value in filters.items():
+                if isinstance(value, list):
+                    # Multiple values (OR condition)
+                    for v in value:
+                        conditions.append(
+                            FieldCondition(key=key, match=MatchValue(value=v))
+                        )
+                else:
+                    # Single value
+                    conditions.append(
+                        FieldCondition(key=key, match=MatchValue(value=value))
+                    )
+            
+            if conditions:
+                qdrant_filter = Filter(should=conditions) if len(conditions) > 1 else Filter(must=[conditions[0]])
+        
+        search_results = self.client.search(
+            collection_name=self.collection_name,
+            query_vector=query_vector.tolist(),
+            query_filter=qdrant_filter,
+            limit=limit,
+            score_threshold=score_threshold
+        )
+        return [(str(hit.id), hit.score, hit.payload) for hit in search_results]
+    
+    def _to_search_result(self, point_id: str, score: float, payload: Dict[str, Any]) -> SearchResult:
+        """Build a SearchResult from a point payload"""
+        return SearchResult(
+            id=point_id,
+            score=score,
+            content=payload.get('content', ''),
+            metadata=payload,
+            file_path=payload.get('file_path', ''),
+            element_type=payload.get('element_type', ''),
+            element_name=payload.get('element_name', ''),
+            start_line=payload.get('start_line', 0),
+            end_line=payload.get('end_line', 0),
+            language=payload.get('language', ''),
+            context=self._generate_context(payload)
+        )
+    
     def _generate_context(self, metadata: Dict[str, Any]) -> str:
         """Generate context string from metadata"""
         context_parts = []
@@ -340,33 +479,26 @@ class SemanticSearchEngine:
         else:
             # If no query, just filter by type
             try:
-                search_results = self.client.scroll(
-                    collection_name=self.collection_name,
-                    scroll_filter=Filter(
-                        must=[FieldCondition(key='element_type', match=MatchValue(value=element_type))]
-                    ),
-                    limit=limit
-                )
-                
-                results = []
-                for point in search_results[0]:
-                    payload = point.payload
-                    result = SearchResult(
-                        id=str(point.id),
-                        score=1.0,  # No semantic scoring for filter-only
-                        content=payload.get('content', ''),
-                        metadata=payload,
-                        file_path=payload.get('file_path', ''),
-                        element_type=payload.get('element_type', ''),
-                        element_name=payload.get('element_name', ''),
-                        start_line=payload.get('start_line', 0),
-                        end_line=payload.get('end_line', 0),
-                        language=payload.get('language', ''),
-                        context=self._generate_context(payload)
-                    )
-                    results.append(result)
+                if self.client is not None:
+                    try:
+                        search_results = self.client.scroll(
+                            collection_name=self.collection_name,
+                            scroll_filter=Filter(
+                                must=[FieldCondition(key='element_type', match=MatchValue(value=element_type))]
+                            ),
+                            limit=limit
+                        )
+                        points = [(str(point.id), point.payload) for point in search_results[0]]
+                    except Exception as e:
+                        if self.local_index is None:
+                            raise
+                        logger.warning(f"Qdrant scroll failed, using local index: {e}")
+                        points = self.local_index.scroll(filters, limit)
+                else:
+                    points = self.local_index.scroll(filters, limit)
                 
-                return results
+                # No semantic scoring for filter-only
+                return [self._to_search_result(point_id, 1.0, payload) for point_id, payload in points]
                 
             except Exception as e:
                 logger.error(f"Error searching by element type: {e}")
@@ -394,21 +526,26 @@ class SemanticSearchEngine:
             if not self.is_connected:
                 await self.initialize()
             
-            # Get collection info
-            collection_info = self.client.get_collection(self.collection_name)
-            
-            # Get all points to analyze metadata
-            all_points, _ = self.client.scroll(
-                collection_name=self.collection_name,
-                limit=10000  # Adjust based on expected size
-            )
+            if self.client is not None:
+                # Get collection info
+                collection_info = self.client.get_collection(self.collection_name)
+                total_points = collection_info.points_count or 0
+                
+                # Get all points to analyze metadata
+                all_points, _ = self.client.scroll(
+                    collection_name=self.collection_name,
+                    limit=10000  # Adjust based on expected size
+                )
+                payloads = [point.payload for point in all_points]
+            else:
+                total_points = self.local_index.size
+                payloads = self.local_index.iter_payloads()
             
             # Analyze metadata
             languages = {}
             element_types = {}
             
-            for point in all_points:
-                payload = point.payload
+            for payload in payloads:
                 
                 lang = payload.get('language', 'unknown')
                 languages[lang] = languages.get(lang, 0) + 1
@@ -417,7 +554,7 @@ class SemanticSearchEngine:
                 element_types[elem_type] = element_types.get(elem_type, 0) + 1
             
             return IndexStats(
-                total_points=collection_info.points_count or 0,
+                total_points=total_points,
                 collections=[self.collection_name],
                 vector_dimensions=self.vector_size,
                 index_size_mb=0.0,  # Qdrant doesn't easily expose this
@@ -444,13 +581,17 @@ class SemanticSearchEngine:
             if not self.is_connected:
                 await self.initialize()
             
+            if self.local_index is not None:
+                self.local_index.delete({'file_path': file_path})
+            
             # Delete points with matching file_path
-            self.client.delete(
-                collection_name=self.collection_name,
-                points_selector=Filter(
-                    must=[FieldCondition(key='file_path', match=MatchValue(value=file_path))]
+            if self.client is not None:
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=Filter(
+                        must=[FieldCondition(key='file_path', match=MatchValue(value=file_path))]
+                    )
                 )
-            )
             
             logger.info(f"Deleted indexed elements from file: {file_path}")
             return True
@@ -465,9 +606,14 @@ class SemanticSearchEngine:
             if not self.is_connected:
                 await self.initialize()
             
+            if self.local_index is not None:
+                self.local_index.clear()
+                self.save_local_index()
+            
             # Delete collection and recreate
-            self.client.delete_collection(self.collection_name)
-            await self.ensure_collection()
+            if self.client is not None:
+                self.client.delete_collection(self.collection_name)
+                await self.ensure_collection()
             
             logger.info("Cleared semantic search index")
             return True
@@ -0,0 +1,236 @@
+"""
+Memory-mapped float32 vector store for embedding caches
+"""
+import os
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class VectorStore:
+    """Append-only float32 matrix on disk with a content-hash -> row index
+
+    Vectors are appended as raw rows to ``vectors.f32`` and read back through
+    a read-only ``np.memmap``, so lookups return zero-copy views and batched
+    lookups are a single fancy-index gather. Overwritten and deleted rows are
+    left in place until ``compact`` rewrites the file with live rows only.
+    """
+
+    def __init__(self,
+                 store_dir: str,
+                 dimension: Optional[int] = None,
+                 compaction_ratio: float = 0.5):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.matrix_path = self.store_dir / "vectors.f32"
+        self.index_path = self.store_dir / "vectors.db"
+        self.compaction_ratio = compaction_ratio
+
+        self.dimension = dimension
+        self.index: Dict[str, int] = {}
+        self.row_count = 0
+        self._matrix: Optional[np.memmap] = None
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_index()
+        self._load()
+
+    def _init_index(self):
+        """Create index and metadata tables"""
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vector_index (
+                content_hash TEXT PRIMARY KEY,
+                row INTEGER
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vector_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        self._conn.commit()
+
+    def _load(self):
+        """Load dimension and index, and drop any partially written tail row"""
+        row = self._conn.execute("SELECT value FROM vector_meta WHERE key = 'dimension'").fetchone()
+        if row:
+            stored_dimension = int(row[0])
+            if self.dimension is not None and self.dimension != stored_dimension:
+                raise ValueError(
+                    f"Vector store at {self.store_dir} has dimension {stored_dimension}, "
+                    f"expected {self.dimension}"
+                )
+            self.dimension = stored_dimension
+        elif self.dimension is not None:
+            self._save_dimension()
+
+        if self.dimension is None or not self.matrix_path.exists():
+            return
+
+        row_bytes = self.dimension * 4
+        file_size = self.matrix_path.stat().st_size
+        self.row_count = file_size // row_bytes
+        if file_size % row_bytes:
+            with open(self.matrix_path, 'r+b') as f:
+                f.truncate(self.row_count * row_bytes)
+            logger.warning(f"Truncated partial row in {self.matrix_path}")
+
+        self.index = {
+            content_hash: row
+            for content_hash, row in self._conn.execute("SELECT content_hash, row FROM vector_index")
+            if row < self.row_count
+        }
+
+    def _save_dimension(self):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO vector_meta (key, value) VALUES ('dimension', ?)",
+            (str(self.dimension),)
+        )
+        self._conn.commit()
+
+    def _matrix_view(self) -> np.ndarray:
+        """Read-only memory map covering all appended rows"""
+        if self._matrix is None or self._matrix.shape[0] != self.row_count:
+            if self.row_count == 0:
+                return np.empty((0, self.dimension or 0), dtype=np.float32)
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r',
+                                     shape=(self.row_count, self.dimension))
+        return self._matrix
+
+    def _check_dimension(self, dimension: int):
+        if self.dimension is None:
+            self.dimension = dimension
+            self._save_dimension()
+        elif dimension != self.dimension:
+            raise ValueError(f"Vector dimension {dimension} does not match store dimension {self.dimension}")
+
+    def put(self, content_hash: str, vector: np.ndarray) -> int:
+        """Append a vector and return its row"""
+        return self.put_many([content_hash], np.asarray(vector).reshape(1, -1))[0]
+
+    def put_many(self, content_hashes: List[str], vectors: np.ndarray) -> List[int]:
+        """Append a batch of vectors and return their rows"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(content_hashes):
+            raise ValueError("vectors must be a (n, dimension) matrix matching content_hashes")
+
+        with self._lock:
+            self._check_dimension(vectors.shape[1])
+
+            first_row = self.row_count
+            with open(self.matrix_path, 'ab') as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            rows = list(range(first_row, first_row + len(content_hashes)))
+            self.row_count += len(content_hashes)
+            self.index.update(zip(content_hashes, rows))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vector_index (content_hash, row) VALUES (?, ?)",
+                zip(content_hashes, rows)
+            )
+            self._conn.commit()
+
+        self._maybe_compact()
+        return rows
+
+    def get(self, content_hash: str) -> Optional[np.ndarray]:
+        """Zero-copy view of a stored vector"""
+        with self._lock:
+            row = self.index.get(content_hash)
+            if row is None:
+                return None
+            return self._matrix_view()[row]
+
+    def get_many(self, content_hashes: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Gather many vectors at once
+
+        Returns ``(vectors, found)`` where ``vectors`` has one row per
+        requested hash (zeros where missing) and ``found`` is a boolean mask.
+        """
+        with self._lock:
+            rows = np.fromiter((self.index.get(h, -1) for h in content_hashes), dtype=np.int64)
+            found = rows >= 0
+            vectors = np.zeros((len(rows), self.dimension or 0), dtype=np.float32)
+            if found.any():
+                vectors[found] = self._matrix_view()[rows[found]]
+            return vectors, found
+
+    def contains(self, content_hash: str) -> bool:
+        return content_hash in self.index
+
+    def delete(self, content_hash: str) -> bool:
+        """Drop a vector from the index; its row is reclaimed on compaction"""
+        with self._lock:
+            if self.index.pop(content_hash, None) is None:
+                return False
+            self._conn.execute("DELETE FROM vector_index WHERE content_hash = ?", (content_hash,))
+            self._conn.commit()
+        self._maybe_compact()
+        return True
+
+    @property
+    def garbage_rows(self) -> int:
+        return self.row_count - len(self.index)
+
+    def _maybe_compact(self):
+        if self.row_count and self.garbage_rows / self.row_count > self.compaction_ratio:
+            self.compact()
+
+    def compact(self) -> int:
+        """Rewrite the matrix with live rows only; returns rows reclaimed"""
+        with self._lock:
+            reclaimed = self.garbage_rows
+            if reclaimed == 0:
+                return 0
+
+            hashes = list(self.index)
+            live_rows = np.fromiter((self.index[h] for h in hashes), dtype=np.int64, count=len(hashes))
+            order = np.argsort(live_rows)
+            hashes = [hashes[i] for i in order]
+            live = np.ascontiguousarray(self._matrix_view()[live_rows[order]])
+
+            tmp_path = self.matrix_path.with_suffix(".f32.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(live.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._matrix = None
+            os.replace(tmp_path, self.matrix_path)
+
+            self.row_count = len(hashes)
+            self.index = {h: row for row, h in enumerate(hashes)}
+            self._conn.execute("DELETE FROM vector_index")
+            self._conn.executemany(
+                "INSERT INTO vector_index (content_hash, row) VALUES (?, ?)",
+                self.index.items()
+            )
+            self._conn.commit()
+
+            logger.info(f"Compacted vector store {self.store_dir}: reclaimed {reclaimed} rows")
+            return reclaimed
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'vectors': len(self.index),
+            'rows': self.row_count,
+            'garbage_rows': self.garbage_rows,
+            'dimension': self.dimension or 0,
+            'size_bytes': self.row_count * (self.dimension or 0) * 4,
+        }
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
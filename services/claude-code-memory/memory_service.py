@@ -58,6 +58,7 @@ async def lifespan(app: FastAPI):
         await health_monitor.start()
         
         metrics_collector = MetricsCollector()
+        metrics_collector.register_source("project_watchers", memory_orchestrator.get_watcher_metrics)
         await metrics_collector.start()
         
         logger.info("✅ Claude Code Memory Service initialized successfully")
@@ -154,6 +155,7 @@ class IndexProjectRequest(BaseModel):
     exclude_patterns: List[str] = Field(default=["**/node_modules/**", "**/.git/**", "**/__pycache__/**"], description="File patterns to exclude")
     indexing_mode: IndexingMode = Field(default=IndexingMode.FULL, description="Indexing strategy")
     force_reindex: bool = Field(default=False, description="Force complete reindexing")
+    watch: bool = Field(default=False, description="Keep the index live by watching the project for file changes")
 
 class SearchCodeRequest(BaseModel):
     query: str = Field(..., description="Search query")
@@ -249,11 +251,15 @@ async def index_project(
             force_reindex=request.force_reindex
         )
         
+        if request.watch:
+            await orchestrator.start_watching(request.project_name, request.project_path)
+        
         return {
             "success": True,
             "task_id": task_id,
             "project_name": request.project_name,
             "status": "indexing_started",
+            "watching": request.watch,
             "message": f"Started indexing project {request.project_name}",
             "estimated_time": "5-30 minutes depending on project size"
         }
@@ -470,6 +476,60 @@ async def refresh_project(
         logger.error(f"Error refreshing project: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/projects/{project_name}/watch")
+async def watch_project(
+    project_name: str,
+    orchestrator: UnifiedMemoryOrchestrator = Depends(get_memory_orchestrator)
+):
+    """Start live index updates for a project from filesystem events"""
+    try:
+        watcher = await orchestrator.start_watching(project_name)
+        return {
+            "success": True,
+            "project_name": project_name,
+            "watcher": watcher,
+            "message": f"Watching project {project_name} for changes"
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error starting project watcher: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/projects/{project_name}/watch")
+async def unwatch_project(
+    project_name: str,
+    orchestrator: UnifiedMemoryOrchestrator = Depends(get_memory_orchestrator)
+):
+    """Stop live index updates for a project"""
+    try:
+        stopped = await orchestrator.stop_watching(project_name)
+        return {
+            "success": stopped,
+            "project_name": project_name,
+            "message": f"Stopped watching project {project_name}" if stopped else f"Project {project_name} was not being watched"
+        }
+    except Exception as e:
+        logger.error(f"Error stopping project watcher: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/watchers/metrics")
+async def get_watcher_metrics(
+    metrics: MetricsCollector = Depends(get_metrics_collector)
+):
+    """Get lag and queue-depth metrics for project watchers"""
+    try:
+        service_metrics = await metrics.get_metrics()
+        
+        return {
+            "success": True,
+            "project_watchers": service_metrics.get("project_watchers", {}),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting watcher metrics: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Background tasks
 async def background_indexing_task():
     """Background task for continuous indexing"""
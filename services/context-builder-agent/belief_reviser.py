@@ -12,8 +12,7 @@ from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
 import json
-import hashlib
-import yaml
+from knowledge_tree_store import KnowledgeTreeStore, VersionRecord, apply_changes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -47,6 +46,12 @@ class BeliefReviser:
         self.db_pool = None
         self.knowledge_tree_path = "/root/ultramcp/.context/core/knowledge_tree.yaml"
         self.versions_path = "/root/ultramcp/.context/versions"
+        # In-memory tree with a delta WAL; the YAML file is rewritten on compaction
+        self.store = KnowledgeTreeStore(
+            self.knowledge_tree_path,
+            wal_path=f"{self.versions_path}/knowledge_tree.wal"
+        )
+        self._revision_lock = asyncio.Lock()
         self.performance_metrics = {
             "revisions_processed": 0,
             "revisions_applied": 0,
@@ -56,6 +61,11 @@ class BeliefReviser:
         
         # Initialize FastAPI routes
         self._setup_routes()
+        
+        @self.app.on_event("shutdown")
+        async def shutdown_event():
+            if self.store.loaded:
+                self.store.close()
     
     def _setup_routes(self):
         """Setup FastAPI routes"""
@@ -156,6 +166,7 @@ class BeliefReviser:
                 "success_rate": success_rate,
                 "knowledge_tree_path": self.knowledge_tree_path,
                 "versions_path": self.versions_path,
+                "knowledge_tree_store": self.store.get_stats(),
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
     
@@ -205,6 +216,25 @@ class BeliefReviser:
                 CREATE INDEX IF NOT EXISTS idx_belief_revisions_domain 
                 ON belief_revisions(domain);
                 
+                CREATE TABLE IF NOT EXISTS knowledge_version_deltas (
+                    id SERIAL PRIMARY KEY,
+                    version VARCHAR(50) NOT NULL,
+                    parent_version VARCHAR(50),
+                    checkpoint_version VARCHAR(50),
+                    changes JSONB NOT NULL,
+                    context_hash VARCHAR(64) NOT NULL,
+                    coherence_score FLOAT,
+                    timestamp TIMESTAMPTZ DEFAULT NOW(),
+                    commit_message TEXT
+                );
+                
+                CREATE INDEX IF NOT EXISTS idx_knowledge_version_deltas_version 
+                ON knowledge_version_deltas(version);
+                
+                CREATE INDEX IF NOT EXISTS idx_knowledge_version_deltas_checkpoint 
+                ON knowledge_version_deltas(checkpoint_version, id);
+                
+                -- Full snapshots, only at checkpoints
                 CREATE TABLE IF NOT EXISTS knowledge_versions (
                     version VARCHAR(50) PRIMARY KEY,
                     knowledge_tree JSONB NOT NULL,
@@ -217,34 +247,20 @@ class BeliefReviser:
             """)
     
     async def _load_knowledge_tree(self) -> Dict[str, Any]:
-        """Load current knowledge tree from file"""
+        """Current knowledge tree (loaded from file once, then kept in memory)"""
+        if self.store.loaded:
+            return self.store.tree
+        
         try:
-            with open(self.knowledge_tree_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            knowledge_tree = self.store.load()
         except Exception as e:
             logger.error(f"Failed to load knowledge tree: {e}")
             raise
-    
-    async def _save_knowledge_tree(self, knowledge_tree: Dict[str, Any]):
-        """Save knowledge tree to file"""
-        try:
-            with open(self.knowledge_tree_path, 'w', encoding='utf-8') as f:
-                yaml.dump(knowledge_tree, f, default_flow_style=False, allow_unicode=True)
-        except Exception as e:
-            logger.error(f"Failed to save knowledge tree: {e}")
-            raise
-    
-    def _calculate_context_hash(self, knowledge_tree: Dict[str, Any]) -> str:
-        """Calculate hash of knowledge tree for versioning"""
-        # Remove timestamp and hash fields for consistent hashing
-        tree_copy = json.loads(json.dumps(knowledge_tree))
-        if 'last_updated' in tree_copy:
-            del tree_copy['last_updated']
-        if 'context_hash' in tree_copy:
-            del tree_copy['context_hash']
         
-        content = json.dumps(tree_copy, sort_keys=True)
-        return hashlib.sha256(content.encode()).hexdigest()[:16]
+        # Base checkpoint for deltas committed by this process
+        checkpoint_version, snapshot = self.store.latest_checkpoint()
+        await self._store_checkpoint_in_db(checkpoint_version, snapshot, "Checkpoint: knowledge tree loaded")
+        return knowledge_tree
     
     def _generate_version(self, current_version: str) -> str:
         """Generate new version number"""
@@ -264,7 +280,14 @@ class BeliefReviser:
                            confidence_delta: float, trust_signal: float,
                            source: str, reason: str) -> Dict[str, Any]:
         """Core belief revision logic"""
-        
+        async with self._revision_lock:
+            return await self._revise_belief_locked(
+                domain, field, new_value, confidence_delta, trust_signal, source, reason
+            )
+    
+    async def _revise_belief_locked(self, domain: str, field: str, new_value: Any,
+                                    confidence_delta: float, trust_signal: float,
+                                    source: str, reason: str) -> Dict[str, Any]:
         # Load current knowledge tree
         knowledge_tree = await self._load_knowledge_tree()
         
@@ -304,31 +327,23 @@ class BeliefReviser:
         apply_revision = trust_signal > 0.5 and confidence_delta != 0
         
         if apply_revision:
-            # Create backup version
-            current_version = knowledge_tree.get("version", "1.0.0")
-            new_version = self._generate_version(current_version)
+            new_version = self._generate_version(self.store.version)
             
-            # Store current version in database
-            if self.db_pool:
-                await self._store_version_in_db(current_version, knowledge_tree, f"Before revision: {reason}")
-            
-            # Apply revision
-            field_data["value"] = new_value
-            field_data["confidence"] = new_confidence
-            field_data["source"] = source
-            field_data["timestamp"] = datetime.utcnow().isoformat() + "Z"
-            
-            # Update knowledge tree metadata
-            knowledge_tree["version"] = new_version
-            knowledge_tree["last_updated"] = datetime.utcnow().isoformat() + "Z"
-            knowledge_tree["context_hash"] = self._calculate_context_hash(knowledge_tree)
-            
-            # Update average confidence in metadata
-            if "metadata" in knowledge_tree:
-                await self._update_metadata_confidence(knowledge_tree)
+            # Apply revision: rehashes only this field's path and appends the delta to the WAL
+            record = self.store.update_field(
+                domain, field,
+                {
+                    "value": new_value,
+                    "confidence": new_confidence,
+                    "source": source,
+                    "timestamp": datetime.utcnow().isoformat() + "Z"
+                },
+                new_version,
+                f"Revision: {reason}"
+            )
             
-            # Save updated knowledge tree
-            await self._save_knowledge_tree(knowledge_tree)
+            # Store version delta in database
+            await self._store_version_in_db(record)
             
             # Store revision in database
             if self.db_pool:
@@ -359,26 +374,32 @@ class BeliefReviser:
                 "reason": f"Trust signal too low ({trust_signal}) or no confidence change"
             }
     
-    async def _update_metadata_confidence(self, knowledge_tree: Dict[str, Any]):
-        """Update average confidence in metadata"""
-        total_confidence = 0
-        field_count = 0
+    async def _store_version_in_db(self, record: VersionRecord):
+        """Store a version delta in database (plus a snapshot if it is a checkpoint)"""
+        if not self.db_pool:
+            return
         
-        for domain_data in knowledge_tree.get("domains", {}).values():
-            for field_data in domain_data.get("fields", {}).values():
-                if isinstance(field_data, dict) and "confidence" in field_data:
-                    total_confidence += field_data["confidence"]
-                    field_count += 1
+        try:
+            async with self.db_pool.acquire() as conn:
+                await conn.execute("""
+                    INSERT INTO knowledge_version_deltas 
+                    (version, parent_version, checkpoint_version, changes, context_hash,
+                     coherence_score, commit_message)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                """, record.version, record.parent_version, record.checkpoint_version,
+                json.dumps(record.changes, default=str), record.context_hash,
+                self.store.tree.get("coherence_score", 1.0), record.message)
+        except Exception as e:
+            logger.error(f"Failed to store version delta in database: {e}")
+            return
         
-        if field_count > 0:
-            avg_confidence = total_confidence / field_count
-            if "metadata" not in knowledge_tree:
-                knowledge_tree["metadata"] = {}
-            knowledge_tree["metadata"]["avg_confidence"] = round(avg_confidence, 3)
+        checkpoint_version, snapshot = self.store.latest_checkpoint()
+        if checkpoint_version == record.version:
+            await self._store_checkpoint_in_db(record.version, snapshot, f"Checkpoint: {record.message}")
     
-    async def _store_version_in_db(self, version: str, knowledge_tree: Dict[str, Any], 
-                                  commit_message: str):
-        """Store version in database"""
+    async def _store_checkpoint_in_db(self, version: str, knowledge_tree: Dict[str, Any], 
+                                      commit_message: str):
+        """Store a full checkpoint snapshot in database"""
         if not self.db_pool:
             return
         
@@ -423,53 +444,108 @@ class BeliefReviser:
     
     async def _rollback_to_version(self, target_version: str) -> Dict[str, Any]:
         """Rollback to specific version"""
-        if not self.db_pool:
-            return {"success": False, "error": "Database not available"}
-        
-        try:
-            async with self.db_pool.acquire() as conn:
-                # Get target version
-                row = await conn.fetchrow("""
-                    SELECT knowledge_tree, context_hash, timestamp
-                    FROM knowledge_versions
-                    WHERE version = $1
-                """, target_version)
+        async with self._revision_lock:
+            try:
+                await self._load_knowledge_tree()
                 
-                if not row:
-                    return {"success": False, "error": f"Version {target_version} not found"}
+                # Replay deltas in memory, falling back to checkpoints + deltas in database
+                knowledge_tree = self.store.reconstruct(target_version)
+                if knowledge_tree is None:
+                    if not self.db_pool:
+                        return {"success": False, "error": "Database not available"}
+                    knowledge_tree = await self._reconstruct_from_db(target_version)
                 
-                # Restore knowledge tree
-                knowledge_tree = row["knowledge_tree"]
-                knowledge_tree["version"] = self._generate_version(target_version)
-                knowledge_tree["last_updated"] = datetime.utcnow().isoformat() + "Z"
+                if knowledge_tree is None:
+                    return {"success": False, "error": f"Version {target_version} not found"}
                 
-                # Save restored tree
-                await self._save_knowledge_tree(knowledge_tree)
+                # Restore as a new version on top of the current head
+                record = self.store.restore(
+                    knowledge_tree,
+                    self._generate_version(self.store.version),
+                    f"Rollback to {target_version}"
+                )
+                await self._store_version_in_db(record)
                 
                 logger.info(f"Successfully rolled back to version {target_version}")
                 
                 return {
                     "success": True,
                     "restored_version": target_version,
-                    "new_version": knowledge_tree["version"],
+                    "new_version": record.version,
+                    "changes_applied": len(record.changes),
                     "timestamp": datetime.utcnow().isoformat() + "Z"
                 }
                 
-        except Exception as e:
-            logger.error(f"Rollback failed: {e}")
-            return {"success": False, "error": str(e)}
+            except Exception as e:
+                logger.error(f"Rollback failed: {e}")
+                return {"success": False, "error": str(e)}
+    
+    async def _reconstruct_from_db(self, target_version: str) -> Optional[Dict[str, Any]]:
+        """Rebuild a version from its checkpoint snapshot and the deltas after it"""
+        async with self.db_pool.acquire() as conn:
+            checkpoint = await conn.fetchrow("""
+                SELECT knowledge_tree FROM knowledge_versions WHERE version = $1
+            """, target_version)
+            if checkpoint:
+                return self._decode_json(checkpoint["knowledge_tree"])
+            
+            target = await conn.fetchrow("""
+                SELECT id, checkpoint_version
+                FROM knowledge_version_deltas
+                WHERE version = $1
+                ORDER BY id DESC
+                LIMIT 1
+            """, target_version)
+            if not target:
+                return None
+            
+            checkpoint = await conn.fetchrow("""
+                SELECT knowledge_tree FROM knowledge_versions WHERE version = $1
+            """, target["checkpoint_version"])
+            if not checkpoint:
+                logger.error(f"Checkpoint {target['checkpoint_version']} for version {target_version} not found")
+                return None
+            
+            rows = await conn.fetch("""
+                SELECT changes
+                FROM knowledge_version_deltas
+                WHERE checkpoint_version = $1 AND id <= $2
+                ORDER BY id
+            """, target["checkpoint_version"], target["id"])
+        
+        knowledge_tree = self._decode_json(checkpoint["knowledge_tree"])
+        for row in rows:
+            apply_changes(knowledge_tree, self._decode_json(row["changes"]))
+        return knowledge_tree
+    
+    @staticmethod
+    def _decode_json(value: Any) -> Any:
+        return json.loads(value) if isinstance(value, str) else value
     
     async def _get_version_history(self) -> Dict[str, Any]:
         """Get version history"""
         if not self.db_pool:
-            return {"versions": [], "error": "Database not available"}
+            # Versions committed by this process are still available in memory
+            return {
+                "versions": [
+                    {
+                        "version": record.version,
+                        "context_hash": record.context_hash,
+                        "coherence_score": None,
+                        "timestamp": record.timestamp,
+                        "commit_message": record.message
+                    }
+                    for record in self.store.history(50)
+                ],
+                "error": "Database not available"
+            }
         
         try:
             async with self.db_pool.acquire() as conn:
                 rows = await conn.fetch("""
                     SELECT version, context_hash, coherence_score, timestamp, commit_message
-                    FROM knowledge_versions
-                    ORDER BY timestamp DESC
+                    FROM knowledge_version_deltas
+                    ORDER BY id DESC
                     LIMIT 50
                 """)
                 
@@ -5,7 +5,6 @@ Coordinates all ContextBuilderAgent components for semantic coherence
 """
 
 import asyncio
-import aiohttp
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -14,6 +13,7 @@ from datetime import datetime
 import json
 import yaml
 from semantic_coherence_bus import get_semantic_bus, ContextMutation
+from service_client import ServiceClientPool, ServiceConfig
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -58,6 +58,21 @@ class ContextBuilderOrchestrator:
             "utility_predictor": "http://sam.chat:8023",
             "memory_tuner": "http://sam.chat:8026"
         }
+        # Per-service timeouts (seconds); the contradiction resolver waits on LLM calls
+        self.service_timeouts = {
+            "drift_detector": 15.0,
+            "contradiction_resolver": 60.0,
+            "belief_reviser": 15.0,
+            "utility_predictor": 10.0,
+            "memory_tuner": 30.0
+        }
+        self.service_clients = ServiceClientPool({
+            service_name: ServiceConfig(
+                base_url=endpoint,
+                timeout=self.service_timeouts.get(service_name, 30.0)
+            )
+            for service_name, endpoint in self.service_endpoints.items()
+        })
         self.knowledge_tree_path = "/root/ultramcp/.context/core/knowledge_tree.yaml"
         self.performance_metrics = {
             "operations_processed": 0,
@@ -74,6 +89,10 @@ class ContextBuilderOrchestrator:
         @self.app.on_event("startup")
         async def startup_event():
             await self._initialize_system()
+        
+        @self.app.on_event("shutdown")
+        async def shutdown_event():
+            await self.service_clients.close()
     
     def _setup_routes(self):
         """Setup FastAPI routes"""
@@ -198,6 +217,7 @@ class ContextBuilderOrchestrator:
             return {
                 **self.performance_metrics,
                 "service_endpoints": self.service_endpoints,
+                "service_clients": self.service_clients.get_metrics(),
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
     
@@ -220,20 +240,12 @@ class ContextBuilderOrchestrator:
         start_time = datetime.utcnow()
         
         while (datetime.utcnow() - start_time).total_seconds() < max_wait_time:
-            all_healthy = True
-            
-            for service_name, endpoint in self.service_endpoints.items():
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(f"{endpoint}/health", timeout=5) as response:
-                            if response.status != 200:
-                                all_healthy = False
-                                break
-                except:
-                    all_healthy = False
-                    break
-            
-            if all_healthy:
+            health_results = await self.service_clients.fan_out({
+                service_name: self.service_clients.call(service_name, "/health", timeout=5)
+                for service_name in self.service_endpoints
+            })
+            
+            if all(result is not None for result in health_results.values()):
                 logger.info("All services are ready")
                 return
             
@@ -269,23 +281,43 @@ class ContextBuilderOrchestrator:
             # Load current knowledge tree for comparison
             current_knowledge = await self._load_knowledge_tree()
             
-            # Check for drift
-            drift_result = await self._call_service(
-                "drift_detector", 
-                "/detect_drift",
-                {
-                    "current_context": context_data,
-                    "previous_context": current_knowledge,
-                    "domain": parameters.get("domain", "ORGANIZACION"),
-                    "confidence_threshold": parameters.get("threshold", 0.78)
-                }
-            )
+            async def drift_then_contradictions():
+                drift = await self._call_service(
+                    "drift_detector", 
+                    "/detect_drift",
+                    {
+                        "current_context": context_data,
+                        "previous_context": current_knowledge,
+                        "domain": parameters.get("domain", "ORGANIZACION"),
+                        "confidence_threshold": parameters.get("threshold", 0.78)
+                    },
+                    coalesce=True
+                )
+                # Contradictions only count towards coherence when drift is detected,
+                # so the (slow, LLM-backed) resolver is only called in that case
+                if drift and drift.get("drift_detected"):
+                    return drift, await self._check_contradictions(context_data, current_knowledge)
+                return drift, None
+            
+            # Drift (plus contradictions) and utility checks are independent: run them in parallel
+            checks = await self.service_clients.fan_out({
+                "drift_detection": drift_then_contradictions(),
+                "utility_prediction": self._call_service(
+                    "utility_predictor",
+                    "/predict_utility",
+                    {
+                        "mutation_data": context_data,
+                        "context_state": current_knowledge,
+                        "historical_success_rate": parameters.get("success_rate", 0.7)
+                    },
+                    coalesce=True
+                )
+            })
+            drift_result, contradiction_result = checks["drift_detection"] or (None, None)
             validation_results["drift_detection"] = drift_result
-            
-            # Check for contradictions if any are found
+            validation_results["utility_prediction"] = checks["utility_prediction"]
             if drift_result and drift_result.get("drift_detected"):
-                contradiction_check = await self._check_contradictions(context_data, current_knowledge)
-                validation_results["contradiction_analysis"] = contradiction_check
+                validation_results["contradiction_analysis"] = contradiction_result
             
             # Calculate overall coherence score
             coherence_score = self._calculate_coherence_score(validation_results)
@@ -318,7 +350,8 @@ class ContextBuilderOrchestrator:
                     "mutation_data": context_data,
                     "context_state": await self._load_knowledge_tree(),
                     "historical_success_rate": parameters.get("success_rate", 0.7)
-                }
+                },
+                coalesce=True
             )
             
             # Check if utility is high enough
@@ -380,11 +413,9 @@ class ContextBuilderOrchestrator:
                                parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize context thresholds and parameters"""
         try:
-            optimization_results = {}
-            
             # Optimize thresholds via memory tuner
-            for metric in ["context_overlap_ratio", "embedding_similarity", "belief_consistency_index"]:
-                optimization_result = await self._call_service(
+            optimization_results = await self.service_clients.fan_out({
+                metric: self._call_service(
                     "memory_tuner",
                     "/optimize_threshold",
                     {
@@ -392,9 +423,11 @@ class ContextBuilderOrchestrator:
                         "current_value": parameters.get(f"current_{metric}", 0.8),
                         "target_performance": parameters.get("target_performance", 0.85),
                         "optimization_window_hours": parameters.get("window_hours", 24)
-                    }
+                    },
+                    coalesce=True
                 )
-                optimization_results[metric] = optimization_result
+                for metric in ["context_overlap_ratio", "embedding_similarity", "belief_consistency_index"]
+            })
             
             # Apply optimizations if they show improvement
             applied_optimizations = []
@@ -436,25 +469,22 @@ class ContextBuilderOrchestrator:
                               parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze context for patterns and insights"""
         try:
-            analysis_results = {}
-            
-            # Pattern analysis via memory tuner
-            pattern_result = await self._call_service(
-                "memory_tuner",
-                "/analyze_patterns",
-                {
-                    "context_history": parameters.get("context_history", [context_data]),
-                    "analysis_window_hours": parameters.get("window_hours", 48)
-                }
-            )
-            analysis_results["pattern_analysis"] = pattern_result
-            
-            # Performance trends
-            trends_result = await self._call_service(
-                "memory_tuner",
-                "/performance_trends"
-            )
-            analysis_results["performance_trends"] = trends_result
+            # Pattern analysis and performance trends via memory tuner
+            analysis_results = await self.service_clients.fan_out({
+                "pattern_analysis": self._call_service(
+                    "memory_tuner",
+                    "/analyze_patterns",
+                    {
+                        "context_history": parameters.get("context_history", [context_data]),
+                        "analysis_window_hours": parameters.get("window_hours", 48)
+                    },
+                    coalesce=True
+                ),
+                "performance_trends": self._call_service(
+                    "memory_tuner",
+                    "/performance_trends"
+                )
+            })
             
             return {
                 "success": True,
@@ -540,35 +570,14 @@ class ContextBuilderOrchestrator:
             }
     
     async def _call_service(self, service_name: str, endpoint: str, 
-                           data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
-        """Call a specific service endpoint"""
-        try:
-            service_url = self.service_endpoints.get(service_name)
-            if not service_url:
-                logger.error(f"Unknown service: {service_name}")
-                return None
-            
-            url = f"{service_url}{endpoint}"
-            
-            async with aiohttp.ClientSession() as session:
-                if data:
-                    async with session.post(url, json=data, timeout=30) as response:
-                        if response.status == 200:
-                            return await response.json()
-                        else:
-                            logger.error(f"Service {service_name} returned {response.status}")
-                            return None
-                else:
-                    async with session.get(url, timeout=30) as response:
-                        if response.status == 200:
-                            return await response.json()
-                        else:
-                            logger.error(f"Service {service_name} returned {response.status}")
-                            return None
-                            
-        except Exception as e:
-            logger.error(f"Error calling service {service_name}: {e}")
-            return None
+                           data: Optional[Dict[str, Any]] = None,
+                           coalesce: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """Call a specific service endpoint through its pooled client
+        
+        Pass coalesce=True for read-only POSTs so identical in-flight calls are shared;
+        mutating POSTs (revise_belief, apply_threshold_adjustment) must never coalesce.
+        """
+        return await self.service_clients.call(service_name, endpoint, data, coalesce=coalesce)
     
     async def _check_contradictions(self, context1: Dict[str, Any], 
                                    context2: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -585,7 +594,8 @@ class ContextBuilderOrchestrator:
                 "conflicting_statements": conflicting_statements,
                 "context_domain": "general",
                 "confidence_threshold": 0.85
-            }
+            },
+            coalesce=True
         )
     
     def _calculate_coherence_score(self, validation_results: Dict[str, Any]) -> float:
@@ -615,11 +625,14 @@ class ContextBuilderOrchestrator:
     async def _check_all_services_health(self) -> bool:
         """Check health of all services"""
         try:
-            for service_name, endpoint in self.service_endpoints.items():
-                health_result = await self._call_service(service_name, "/health")
-                if not health_result or health_result.get("status") not in ["healthy", "degraded"]:
-                    return False
-            return True
+            health_results = await self.service_clients.fan_out({
+                service_name: self._call_service(service_name, "/health")
+                for service_name in self.service_endpoints
+            })
+            return all(
+                health_result and health_result.get("status") in ["healthy", "degraded"]
+                for health_result in health_results.values()
+            )
         except:
             return False
     
@@ -638,9 +651,15 @@ class ContextBuilderOrchestrator:
         }
         
         # Get status from each service
-        for service_name, endpoint in self.service_endpoints.items():
-            service_status = await self._call_service(service_name, "/health")
-            service_metrics = await self._call_service(service_name, "/metrics")
+        calls = {}
+        for service_name in self.service_endpoints:
+            calls[(service_name, "health")] = self._call_service(service_name, "/health")
+            calls[(service_name, "metrics")] = self._call_service(service_name, "/metrics")
+        responses = await self.service_clients.fan_out(calls)
+        
+        for service_name in self.service_endpoints:
+            service_status = responses[(service_name, "health")]
+            service_metrics = responses[(service_name, "metrics")]
             
             status["services"][service_name] = {
                 "status": service_status.get("status", "unknown") if service_status else "unreachable",
@@ -13,6 +13,7 @@ import logging
 from datetime import datetime
 import hashlib
 import json
+from collections import OrderedDict
 from transformers import AutoTokenizer, AutoModel
 import torch
 from sentence_transformers import SentenceTransformer
@@ -27,6 +28,22 @@ class ContextDriftRequest(BaseModel):
     previous_context: Dict[str, Any]
     domain: str
     confidence_threshold: float = 0.78
+    include_field_scores: bool = False
+
+class DriftCheckItem(BaseModel):
+    current_context: Dict[str, Any]
+    previous_context: Dict[str, Any]
+    domain: str
+    confidence_threshold: Optional[float] = None
+
+class BatchDriftRequest(BaseModel):
+    items: List[DriftCheckItem] = []
+    # Whole-tree shortcut: one check per domain of current_context/previous_context
+    current_context: Optional[Dict[str, Any]] = None
+    previous_context: Optional[Dict[str, Any]] = None
+    domains: Optional[List[str]] = None
+    confidence_threshold: float = 0.78
+    include_field_scores: bool = True
 
 class ContextDriftResponse(BaseModel):
     drift_detected: bool
@@ -36,23 +53,40 @@ class ContextDriftResponse(BaseModel):
     timestamp: str
     recommendation: str
 
+class BatchDriftResponse(BaseModel):
+    results: List[ContextDriftResponse]
+    drift_detected_count: int
+    min_similarity: float
+    texts_encoded: int
+    processing_time_ms: float
+    timestamp: str
+
 class ContextDriftDetector:
     """
     High-performance context drift detector using BGE-Large embeddings
     Detects semantic changes in context that may indicate need for mutation
     """
     
-    def __init__(self):
+    def __init__(self, max_cache_size: int = 10000):
         self.app = FastAPI(title="Context Drift Detector", version="1.0.0")
         self.model = None
         self.redis_client = None
         self.similarity_threshold = 0.78
-        self.embedding_cache = {}
+        # In-memory LRU (L1); Redis acts as L2 when available
+        self.embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.max_cache_size = max_cache_size
         self.performance_metrics = {
             "requests_processed": 0,
+            "batch_requests_processed": 0,
             "drift_detected_count": 0,
             "avg_similarity_score": 0.0,
-            "cache_hit_rate": 0.0
+            "cache_hit_rate": 0.0,
+            "embedding_lookups": 0,
+            "cache_hits": 0,
+            "redis_hits": 0,
+            "cache_evictions": 0,
+            "texts_encoded": 0,
+            "encode_calls": 0
         }
         
         # Initialize FastAPI routes
@@ -76,13 +110,12 @@ class ContextDriftDetector:
                     request.current_context,
                     request.previous_context,
                     request.domain,
-                    request.confidence_threshold
+                    request.confidence_threshold,
+                    include_field_scores=request.include_field_scores
                 )
                 
                 # Update metrics
-                self.performance_metrics["requests_processed"] += 1
-                if result["drift_detected"]:
-                    self.performance_metrics["drift_detected_count"] += 1
+                self._record_results([result])
                 
                 # Calculate processing time
                 processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
@@ -94,6 +127,54 @@ class ContextDriftDetector:
                 logger.error(f"Error in drift detection: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
+        @self.app.post("/detect_drift_batch", response_model=BatchDriftResponse)
+        async def detect_drift_batch(request: BatchDriftRequest):
+            """Detect drift for many (domain, current, previous) pairs in one pass"""
+            try:
+                start_time = datetime.utcnow()
+                
+                if self.model is None:
+                    await self._load_model()
+                
+                checks = [
+                    (item.current_context, item.previous_context, item.domain,
+                     item.confidence_threshold if item.confidence_threshold is not None else request.confidence_threshold)
+                    for item in request.items
+                ]
+                if request.current_context is not None and request.previous_context is not None:
+                    domains = request.domains or self._tree_domains(request.current_context, request.previous_context)
+                    checks.extend(
+                        (request.current_context, request.previous_context, domain, request.confidence_threshold)
+                        for domain in domains
+                    )
+                
+                if not checks:
+                    raise HTTPException(status_code=400, detail="No drift checks provided")
+                
+                encoded_before = self.performance_metrics["texts_encoded"]
+                results = await self._detect_context_drift_batch(checks, request.include_field_scores)
+                
+                self._record_results(results)
+                self.performance_metrics["batch_requests_processed"] += 1
+                
+                processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+                logger.info(f"Batch drift detection of {len(results)} checks completed in {processing_time:.2f}ms")
+                
+                return BatchDriftResponse(
+                    results=[ContextDriftResponse(**result) for result in results],
+                    drift_detected_count=sum(1 for result in results if result["drift_detected"]),
+                    min_similarity=min(result["similarity_score"] for result in results),
+                    texts_encoded=self.performance_metrics["texts_encoded"] - encoded_before,
+                    processing_time_ms=processing_time,
+                    timestamp=datetime.utcnow().isoformat() + "Z"
+                )
+                
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Error in batch drift detection: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
+        
         @self.app.get("/health")
         async def health_check():
             """Health check endpoint"""
@@ -118,14 +199,15 @@ class ContextDriftDetector:
         @self.app.get("/metrics")
         async def get_metrics():
             """Get performance metrics"""
-            cache_requests = sum(1 for _ in self.embedding_cache.keys())
-            cache_hits = self.performance_metrics.get("cache_hits", 0)
-            cache_hit_rate = cache_hits / max(cache_requests, 1)
+            lookups = self.performance_metrics["embedding_lookups"]
+            cache_hits = self.performance_metrics["cache_hits"] + self.performance_metrics["redis_hits"]
+            cache_hit_rate = cache_hits / max(lookups, 1)
             
             return {
                 **self.performance_metrics,
                 "cache_hit_rate": cache_hit_rate,
                 "cache_size": len(self.embedding_cache),
+                "max_cache_size": self.max_cache_size,
                 "similarity_threshold": self.similarity_threshold,
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
@@ -153,46 +235,105 @@ class ContextDriftDetector:
             logger.error(f"Failed to load model: {e}")
             raise
     
+    @staticmethod
+    def _embedding_cache_key(text: str) -> str:
+        return f"embedding:{hashlib.md5(text.encode()).hexdigest()}"
+    
+    def _cache_get(self, cache_key: str) -> Optional[np.ndarray]:
+        embedding = self.embedding_cache.get(cache_key)
+        if embedding is not None:
+            self.embedding_cache.move_to_end(cache_key)
+        return embedding
+    
+    def _cache_put(self, cache_key: str, embedding: np.ndarray):
+        self.embedding_cache[cache_key] = embedding
+        self.embedding_cache.move_to_end(cache_key)
+        while len(self.embedding_cache) > self.max_cache_size:
+            self.embedding_cache.popitem(last=False)
+            self.performance_metrics["cache_evictions"] += 1
+    
     async def _get_embedding(self, text: str) -> np.ndarray:
         """Get embedding for text with caching"""
-        # Generate cache key
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        cache_key = f"embedding:{text_hash}"
-        
-        # Try Redis cache first
-        if self.redis_client:
-            try:
-                cached = await self.redis_client.get(cache_key)
-                if cached:
-                    self.performance_metrics["cache_hits"] = self.performance_metrics.get("cache_hits", 0) + 1
-                    return np.frombuffer(cached, dtype=np.float32)
-            except Exception as e:
-                logger.warning(f"Redis cache read failed: {e}")
-        
-        # Try in-memory cache
-        if cache_key in self.embedding_cache:
-            self.performance_metrics["cache_hits"] = self.performance_metrics.get("cache_hits", 0) + 1
-            return self.embedding_cache[cache_key]
+        return (await self._get_embeddings([text]))[0]
+    
+    async def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Get normalized embeddings for many texts (LRU, then Redis, then one model.encode call)"""
+        keys = [self._embedding_cache_key(text) for text in texts]
+        self.performance_metrics["embedding_lookups"] += len(texts)
         
-        # Generate new embedding
-        embedding = self.model.encode(text, normalize_embeddings=True)
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}  # cache_key -> text (deduplicated)
+        for cache_key, text in zip(keys, texts):
+            if cache_key in found or cache_key in missing:
+                continue
+            embedding = self._cache_get(cache_key)
+            if embedding is not None:
+                found[cache_key] = embedding
+                self.performance_metrics["cache_hits"] += 1
+            else:
+                missing[cache_key] = text
         
-        # Cache the result
-        if self.redis_client:
+        # L2: Redis, one round trip for all misses
+        if missing and self.redis_client:
             try:
-                await self.redis_client.setex(
-                    cache_key, 
-                    3600,  # 1 hour TTL
-                    embedding.tobytes()
-                )
+                missing_keys = list(missing.keys())
+                cached_values = await self.redis_client.mget(missing_keys)
+                for cache_key, cached in zip(missing_keys, cached_values):
+                    if cached:
+                        embedding = np.frombuffer(cached, dtype=np.float32)
+                        found[cache_key] = embedding
+                        self._cache_put(cache_key, embedding)
+                        del missing[cache_key]
+                        self.performance_metrics["redis_hits"] += 1
             except Exception as e:
-                logger.warning(f"Redis cache write failed: {e}")
+                logger.warning(f"Redis cache read failed: {e}")
         
-        # Also cache in memory (with size limit)
-        if len(self.embedding_cache) < 1000:
-            self.embedding_cache[cache_key] = embedding
+        # Encode everything still missing in a single batch
+        if missing:
+            missing_keys = list(missing.keys())
+            encoded = await asyncio.to_thread(
+                self.model.encode,
+                [missing[cache_key] for cache_key in missing_keys],
+                normalize_embeddings=True
+            )
+            encoded = np.asarray(encoded, dtype=np.float32)
+            self.performance_metrics["encode_calls"] += 1
+            self.performance_metrics["texts_encoded"] += len(missing_keys)
+            
+            for cache_key, embedding in zip(missing_keys, encoded):
+                found[cache_key] = embedding
+                self._cache_put(cache_key, embedding)
+            
+            if self.redis_client:
+                try:
+                    pipeline = self.redis_client.pipeline()
+                    for cache_key in missing_keys:
+                        pipeline.setex(cache_key, 3600, found[cache_key].tobytes())  # 1 hour TTL
+                    await pipeline.execute()
+                except Exception as e:
+                    logger.warning(f"Redis cache write failed: {e}")
         
-        return embedding
+        return np.stack([found[cache_key] for cache_key in keys])
+    
+    @staticmethod
+    def _field_to_text(field: str, field_data: Any) -> str:
+        """Text representation of a single knowledge-tree field"""
+        if isinstance(field_data, dict) and "value" in field_data:
+            value = field_data["value"]
+            if isinstance(value, list):
+                return f"{field}: {', '.join(map(str, value))}"
+            return f"{field}: {value}"
+        return f"{field}: {field_data}"
+    
+    @staticmethod
+    def _tree_domains(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+        """Domains present in either tree, in tree order"""
+        domains = [domain for domain, data in current.items() if isinstance(data, dict)]
+        domains.extend(
+            domain for domain, data in previous.items()
+            if isinstance(data, dict) and domain not in current
+        )
+        return domains
     
     def _context_to_text(self, context: Dict[str, Any], domain: str) -> str:
         """Convert context to text representation for embedding"""
@@ -205,14 +346,7 @@ class ContextDriftDetector:
             if isinstance(domain_context, dict):
                 if "fields" in domain_context:
                     for field, field_data in domain_context["fields"].items():
-                        if isinstance(field_data, dict) and "value" in field_data:
-                            value = field_data["value"]
-                            if isinstance(value, list):
-                                text_parts.append(f"{field}: {', '.join(map(str, value))}")
-                            else:
-                                text_parts.append(f"{field}: {value}")
-                        else:
-                            text_parts.append(f"{field}: {field_data}")
+                        text_parts.append(self._field_to_text(field, field_data))
                 
                 # Include metadata if available
                 for key in ["type", "confidence", "source"]:
@@ -226,45 +360,104 @@ class ContextDriftDetector:
     
     async def _detect_context_drift(self, current_context: Dict[str, Any], 
                                    previous_context: Dict[str, Any],
-                                   domain: str, confidence_threshold: float) -> Dict[str, Any]:
+                                   domain: str, confidence_threshold: float,
+                                   include_field_scores: bool = False) -> Dict[str, Any]:
         """Core drift detection logic"""
+        results = await self._detect_context_drift_batch(
+            [(current_context, previous_context, domain, confidence_threshold)],
+            include_field_scores
+        )
+        return results[0]
+    
+    async def _detect_context_drift_batch(self, checks: List[tuple],
+                                         include_field_scores: bool = False) -> List[Dict[str, Any]]:
+        """Drift detection for many (current, previous, domain, threshold) checks
         
-        # Convert contexts to text
-        current_text = self._context_to_text(current_context, domain)
-        previous_text = self._context_to_text(previous_context, domain)
+        All texts (domains and, optionally, common fields) are embedded in one
+        batch and compared with a single vectorized dot product.
+        """
+        texts: List[str] = []
+        text_index: Dict[str, int] = {}
         
-        # Get embeddings
-        current_embedding = await self._get_embedding(current_text)
-        previous_embedding = await self._get_embedding(previous_text)
+        def index_of(text: str) -> int:
+            if text not in text_index:
+                text_index[text] = len(texts)
+                texts.append(text)
+            return text_index[text]
         
-        # Calculate cosine similarity
-        similarity = np.dot(current_embedding, previous_embedding)
+        left: List[int] = []
+        right: List[int] = []
+        field_pairs: List[List[tuple]] = []  # per check: (field, pair position)
         
-        # Determine if drift detected
-        drift_detected = similarity < confidence_threshold
+        for current_context, previous_context, domain, _ in checks:
+            left.append(index_of(self._context_to_text(current_context, domain)))
+            right.append(index_of(self._context_to_text(previous_context, domain)))
+            
+            fields = []
+            if include_field_scores:
+                current_fields = self._domain_fields(current_context, domain)
+                previous_fields = self._domain_fields(previous_context, domain)
+                for field in current_fields.keys() & previous_fields.keys():
+                    fields.append((field, len(left)))
+                    left.append(index_of(self._field_to_text(field, current_fields[field])))
+                    right.append(index_of(self._field_to_text(field, previous_fields[field])))
+            field_pairs.append(fields)
         
-        # Analyze specific changes
-        drift_details = await self._analyze_drift_details(
-            current_context, previous_context, domain, similarity
-        )
+        embeddings = await self._get_embeddings(texts)
+        similarities = np.einsum("ij,ij->i", embeddings[left], embeddings[right])
         
-        # Generate recommendation
-        recommendation = self._generate_recommendation(
-            drift_detected, similarity, drift_details
-        )
+        results = []
+        for check_index, (current_context, previous_context, domain, confidence_threshold) in enumerate(checks):
+            similarity = float(similarities[check_index])
+            field_scores = {field: float(similarities[position]) for field, position in field_pairs[check_index]}
+            
+            # Determine if drift detected
+            drift_detected = similarity < confidence_threshold
+            
+            # Analyze specific changes
+            drift_details = await self._analyze_drift_details(
+                current_context, previous_context, domain, similarity,
+                field_scores if include_field_scores else None
+            )
+            
+            # Generate recommendation
+            recommendation = self._generate_recommendation(
+                drift_detected, similarity, drift_details
+            )
+            
+            results.append({
+                "drift_detected": drift_detected,
+                "similarity_score": similarity,
+                "confidence": 1.0 - similarity if drift_detected else similarity,
+                "drift_details": drift_details,
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "recommendation": recommendation
+            })
         
-        return {
-            "drift_detected": drift_detected,
-            "similarity_score": float(similarity),
-            "confidence": float(1.0 - similarity) if drift_detected else float(similarity),
-            "drift_details": drift_details,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "recommendation": recommendation
-        }
+        return results
+    
+    @staticmethod
+    def _domain_fields(context: Dict[str, Any], domain: str) -> Dict[str, Any]:
+        domain_context = context.get(domain)
+        if isinstance(domain_context, dict) and isinstance(domain_context.get("fields"), dict):
+            return domain_context["fields"]
+        return {}
+    
+    def _record_results(self, results: List[Dict[str, Any]]):
+        """Update request metrics for a set of drift results"""
+        for result in results:
+            self.performance_metrics["requests_processed"] += 1
+            if result["drift_detected"]:
+                self.performance_metrics["drift_detected_count"] += 1
+            processed = self.performance_metrics["requests_processed"]
+            self.performance_metrics["avg_similarity_score"] += (
+                (result["similarity_score"] - self.performance_metrics["avg_similarity_score"]) / processed
+            )
     
     async def _analyze_drift_details(self, current: Dict[str, Any], 
                                    previous: Dict[str, Any], domain: str,
-                                   similarity: float) -> Dict[str, Any]:
+                                   similarity: float,
+                                   field_scores: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """Analyze specific details of the drift"""
         details = {
             "domain": domain,
@@ -272,6 +465,8 @@ class ContextDriftDetector:
             "changes_detected": [],
             "severity": "low"
         }
+        if field_scores is not None:
+            details["field_similarity"] = field_scores
         
         if domain in current and domain in previous:
             current_domain = current[domain]
@@ -307,12 +502,15 @@ class ContextDriftDetector:
                     previous_value = previous_fields[field].get("value")
                     
                     if current_value != previous_value:
-                        details["changes_detected"].append({
+                        change = {
                             "type": "field_modified",
                             "field": field,
                             "old_value": previous_value,
                             "new_value": current_value
-                        })
+                        }
+                        if field_scores and field in field_scores:
+                            change["similarity"] = field_scores[field]
+                        details["changes_detected"].append(change)
         
         # Determine severity
         if similarity < 0.5:
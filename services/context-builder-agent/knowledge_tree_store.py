@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+UltraMCP ContextBuilderAgent 2.0 - Knowledge Tree Store
+In-memory knowledge tree with Merkle hashing, a write-ahead delta log and
+versions stored as deltas against periodic checkpoints
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Top-level keys left out of the context hash (they change on every commit)
+UNHASHED_KEYS = ("last_updated", "context_hash")
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+def _get_path(tree: Dict[str, Any], path: List[str]) -> Tuple[bool, Any]:
+    node = tree
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return False, None
+        node = node[key]
+    return True, node
+
+def _set_path(tree: Dict[str, Any], path: List[str], value: Any):
+    node = tree
+    for key in path[:-1]:
+        if not isinstance(node.get(key), dict):
+            node[key] = {}
+        node = node[key]
+    node[path[-1]] = value
+
+def _delete_path(tree: Dict[str, Any], path: List[str]):
+    found, parent = _get_path(tree, path[:-1])
+    if found and isinstance(parent, dict):
+        parent.pop(path[-1], None)
+
+def make_change(tree: Dict[str, Any], path: List[str], new_value: Any = None,
+                delete: bool = False) -> Optional[Dict[str, Any]]:
+    """Delta for setting (or deleting) one path; None if it changes nothing"""
+    found, old_value = _get_path(tree, path)
+    if delete and not found:
+        return None
+    if not delete and found and old_value == new_value:
+        return None
+
+    change = {"path": list(path)}
+    if found:
+        change["old"] = copy.deepcopy(old_value)
+    else:
+        change["old_missing"] = True
+    if delete:
+        change["new_missing"] = True
+    else:
+        change["new"] = copy.deepcopy(new_value)
+    return change
+
+def apply_changes(tree: Dict[str, Any], changes: List[Dict[str, Any]], reverse: bool = False):
+    """Apply deltas in place (or undo them with reverse=True)"""
+    for change in (reversed(changes) if reverse else changes):
+        missing = change.get("old_missing") if reverse else change.get("new_missing")
+        if missing:
+            _delete_path(tree, change["path"])
+        else:
+            _set_path(tree, change["path"], copy.deepcopy(change["old"] if reverse else change["new"]))
+
+def diff_trees(current: Any, target: Any, path: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Deltas turning current into target (dicts are diffed key by key)"""
+    path = path or []
+    if isinstance(current, dict) and isinstance(target, dict):
+        changes = []
+        for key in current.keys() - target.keys():
+            changes.append({"path": path + [key], "old": copy.deepcopy(current[key]), "new_missing": True})
+        for key, value in target.items():
+            if key not in current:
+                changes.append({"path": path + [key], "old_missing": True, "new": copy.deepcopy(value)})
+            else:
+                changes.extend(diff_trees(current[key], value, path + [key]))
+        return changes
+    if current == target:
+        return []
+    return [{"path": path, "old": copy.deepcopy(current), "new": copy.deepcopy(target)}]
+
+@dataclass
+class VersionRecord:
+    """One committed version, stored as a delta against its parent"""
+    version: str
+    parent_version: Optional[str]
+    sequence: int
+    changes: List[Dict[str, Any]]
+    context_hash: str
+    checkpoint_version: Optional[str]
+    message: str = ""
+    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat() + "Z")
+
+class KnowledgeTreeStore:
+    """
+    Knowledge tree kept in memory between revisions
+
+    - Field, domain and root hashes form a Merkle tree: a field change rehashes
+      only that field, its domain and the root
+    - Every commit appends its field-level deltas to a write-ahead log; the
+      YAML file is rewritten on compaction (every N commits or after a delay)
+    - Versions are deltas; full snapshots are kept only at checkpoints
+    """
+
+    def __init__(self, tree_path: str, wal_path: Optional[str] = None,
+                 compact_every: int = 50, compact_after_seconds: float = 5.0,
+                 checkpoint_interval: int = 50, max_checkpoints: int = 20):
+        self.tree_path = tree_path
+        self.wal_path = wal_path or f"{tree_path}.wal"
+        self.compact_every = compact_every
+        self.compact_after_seconds = compact_after_seconds
+        self.checkpoint_interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+
+        self.tree: Dict[str, Any] = {}
+        self.loaded = False
+
+        # Merkle hashes
+        self._field_hashes: Dict[str, Dict[str, str]] = {}
+        self._domain_meta_hashes: Dict[str, str] = {}
+        self._domain_hashes: Dict[str, str] = {}
+        # Running confidence sum for metadata.avg_confidence
+        self._field_confidence: Dict[Tuple[str, str], float] = {}
+        self._confidence_sum = 0.0
+
+        # Version log: sequence -> record, version -> sequence
+        self._records: Dict[int, VersionRecord] = {}
+        self._sequence_by_version: Dict[str, int] = {}
+        self._checkpoints: Dict[int, Dict[str, Any]] = {}  # sequence -> snapshot
+        self._head_sequence = 0
+        self._checkpoint_sequence = 0
+        self._base_version: Optional[str] = None
+
+        self._pending_deltas = 0
+        self._compaction_handle: Optional[asyncio.TimerHandle] = None
+
+        self.metrics = {
+            "commits": 0,
+            "changes_applied": 0,
+            "fields_rehashed": 0,
+            "wal_appends": 0,
+            "compactions": 0,
+            "checkpoints": 0,
+            "reconstructions": 0,
+            "deltas_replayed": 0
+        }
+
+    @property
+    def version(self) -> str:
+        return self.tree.get("version", "1.0.0")
+
+    @property
+    def context_hash(self) -> str:
+        return self.tree.get("context_hash", "")
+
+    # ------------------------------------------------------------------
+    # Loading and compaction
+    # ------------------------------------------------------------------
+
+    def load(self) -> Dict[str, Any]:
+        """Load the YAML tree once and replay any deltas left in the WAL"""
+        with open(self.tree_path, 'r', encoding='utf-8') as f:
+            self.tree = yaml.safe_load(f) or {}
+        os.makedirs(os.path.dirname(self.wal_path) or ".", exist_ok=True)
+
+        self._rebuild_hashes()
+        self._records.clear()
+        self._base_version = self.version
+        self._sequence_by_version = {self.version: 0}
+        self._checkpoints = {0: copy.deepcopy(self.tree)}
+        self._head_sequence = 0
+        self._checkpoint_sequence = 0
+
+        replayed = 0
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, 'r', encoding='utf-8') as wal:
+                for line in wal:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("Ignoring truncated WAL entry")
+                        break
+                    # Deltas are path assignments, so replaying already-compacted ones is harmless
+                    apply_changes(self.tree, entry["changes"])
+                    self._rehash_paths(entry["changes"])
+                    self._head_sequence += 1
+                    record = VersionRecord(**{**entry, "sequence": self._head_sequence, "checkpoint_version": self._checkpoint_version()})
+                    self._records[record.sequence] = record
+                    self._sequence_by_version[record.version] = record.sequence
+                    replayed += 1
+            self._pending_deltas = replayed
+
+        self.loaded = True
+        logger.info(f"Knowledge tree loaded (version {self.version}, {replayed} WAL deltas replayed)")
+        return self.tree
+
+    def compact(self):
+        """Rewrite the YAML file from memory and truncate the WAL"""
+        if self._compaction_handle is not None:
+            self._compaction_handle.cancel()
+            self._compaction_handle = None
+        if not self._pending_deltas:
+            return
+
+        tmp_path = f"{self.tree_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            yaml.dump(self.tree, f, default_flow_style=False, allow_unicode=True)
+        os.replace(tmp_path, self.tree_path)
+        open(self.wal_path, 'w').close()
+
+        self._pending_deltas = 0
+        self.metrics["compactions"] += 1
+
+    def _compact_safely(self):
+        self._compaction_handle = None
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Knowledge tree compaction failed: {e}")
+
+    def _schedule_compaction(self):
+        if self._pending_deltas >= self.compact_every:
+            self._compact_safely()
+            return
+        if self._compaction_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # No loop: compaction happens on the next threshold or close()
+            self._compaction_handle = loop.call_later(self.compact_after_seconds, self._compact_safely)
+
+    def _append_wal(self, record: VersionRecord):
+        entry = asdict(record)
+        del entry["sequence"], entry["checkpoint_version"]
+        with open(self.wal_path, 'a', encoding='utf-8') as wal:
+            wal.write(json.dumps(entry, default=str) + "\n")
+            wal.flush()
+            os.fsync(wal.fileno())
+        self.metrics["wal_appends"] += 1
+
+    def close(self):
+        self.compact()
+
+    # ------------------------------------------------------------------
+    # Merkle hashing
+    # ------------------------------------------------------------------
+
+    def _rebuild_hashes(self):
+        self._field_hashes.clear()
+        self._domain_meta_hashes.clear()
+        self._domain_hashes.clear()
+        self._field_confidence.clear()
+        self._confidence_sum = 0.0
+
+        for domain, domain_data in self.tree.get("domains", {}).items():
+            fields = domain_data.get("fields", {}) if isinstance(domain_data, dict) else {}
+            for field_name in fields:
+                self._rehash_field(domain, field_name)
+            self._rehash_domain(domain, meta_changed=True)
+        self._rehash_root()
+
+    def _rehash_field(self, domain: str, field_name: str):
+        found, field_data = _get_path(self.tree, ["domains", domain, "fields", field_name])
+        domain_fields = self._field_hashes.setdefault(domain, {})
+
+        old_confidence = self._field_confidence.pop((domain, field_name), None)
+        if old_confidence is not None:
+            self._confidence_sum -= old_confidence
+
+        if not found:
+            domain_fields.pop(field_name, None)
+            return
+
+        domain_fields[field_name] = _digest(field_data)
+        if isinstance(field_data, dict) and "confidence" in field_data:
+            self._field_confidence[(domain, field_name)] = field_data["confidence"]
+            self._confidence_sum += field_data["confidence"]
+        self.metrics["fields_rehashed"] += 1
+
+    def _rehash_domain(self, domain: str, meta_changed: bool = False):
+        found, domain_data = _get_path(self.tree, ["domains", domain])
+        if not found:
+            self._domain_hashes.pop(domain, None)
+            self._domain_meta_hashes.pop(domain, None)
+            self._field_hashes.pop(domain, None)
+            return
+
+        if meta_changed or domain not in self._domain_meta_hashes:
+            if isinstance(domain_data, dict):
+                meta = {k: v for k, v in domain_data.items() if k != "fields"}
+            else:
+                meta = domain_data
+            self._domain_meta_hashes[domain] = _digest(meta)
+
+        field_hashes = self._field_hashes.get(domain, {})
+        self._domain_hashes[domain] = _digest([self._domain_meta_hashes[domain], sorted(field_hashes.items())])
+
+    def _rehash_root(self) -> str:
+        rest = {k: v for k, v in self.tree.items() if k != "domains" and k not in UNHASHED_KEYS}
+        return _digest([rest, sorted(self._domain_hashes.items())])[:16]
+
+    def _rehash_paths(self, changes: List[Dict[str, Any]]):
+        """Rehash only the fields and domains touched by the given deltas"""
+        dirty_fields = set()
+        dirty_domains: Dict[str, bool] = {}  # domain -> metadata changed
+
+        for change in changes:
+            path = change["path"]
+            if not path or path[0] != "domains":
+                continue
+            if len(path) == 1:
+                self._rebuild_hashes()
+                return
+            domain = path[1]
+            if len(path) >= 4 and path[2] == "fields":
+                dirty_fields.add((domain, path[3]))
+                dirty_domains.setdefault(domain, False)
+            elif len(path) == 3 and path[2] == "fields":
+                # Whole fields dict replaced
+                old = change.get("old") if isinstance(change.get("old"), dict) else {}
+                new = change.get("new") if isinstance(change.get("new"), dict) else {}
+                dirty_fields.update((domain, name) for name in set(old) | set(new))
+                dirty_domains.setdefault(domain, False)
+            else:
+                dirty_domains[domain] = True
+                if len(path) == 2:
+                    # Whole domain replaced: rehash all of its fields
+                    for data in (change.get("old"), change.get("new")):
+                        if isinstance(data, dict) and isinstance(data.get("fields"), dict):
+                            dirty_fields.update((domain, name) for name in data["fields"])
+
+        for domain, field_name in dirty_fields:
+            self._rehash_field(domain, field_name)
+        for domain, meta_changed in dirty_domains.items():
+            self._rehash_domain(domain, meta_changed)
+
+    def average_confidence(self) -> Optional[float]:
+        if not self._field_confidence:
+            return None
+        return self._confidence_sum / len(self._field_confidence)
+
+    # ------------------------------------------------------------------
+    # Commits
+    # ------------------------------------------------------------------
+
+    def update_field(self, domain: str, field_name: str, values: Dict[str, Any],
+                     version: str, message: str = "") -> VersionRecord:
+        """Set keys of one field and commit the result as a new version"""
+        base = ["domains", domain, "fields", field_name]
+        changes = [make_change(self.tree, base + [key], value) for key, value in values.items()]
+        return self._commit([change for change in changes if change], version, message)
+
+    def restore(self, target_tree: Dict[str, Any], version: str, message: str = "") -> VersionRecord:
+        """Commit the difference between the current tree and target_tree"""
+        current = {k: v for k, v in self.tree.items() if k not in UNHASHED_KEYS + ("version",)}
+        target = {k: v for k, v in target_tree.items() if k not in UNHASHED_KEYS + ("version",)}
+        return self._commit(diff_trees(current, target), version, message)
+
+    def _commit(self, changes: List[Dict[str, Any]], version: str, message: str) -> VersionRecord:
+        parent_version = self.version
+        apply_changes(self.tree, changes)
+        self._rehash_paths(changes)
+
+        # Metadata is part of the same delta
+        metadata_changes = [make_change(self.tree, ["version"], version)]
+        avg_confidence = self.average_confidence()
+        if "metadata" in self.tree and avg_confidence is not None:
+            metadata_changes.append(make_change(self.tree, ["metadata", "avg_confidence"], round(avg_confidence, 3)))
+        metadata_changes = [change for change in metadata_changes if change]
+        apply_changes(self.tree, metadata_changes)
+
+        context_hash = self._rehash_root()
+        final_changes = [
+            make_change(self.tree, ["last_updated"], datetime.utcnow().isoformat() + "Z"),
+            make_change(self.tree, ["context_hash"], context_hash)
+        ]
+        final_changes = [change for change in final_changes if change]
+        apply_changes(self.tree, final_changes)
+
+        all_changes = changes + metadata_changes + final_changes
+        self._head_sequence += 1
+        record = VersionRecord(
+            version=version,
+            parent_version=parent_version,
+            sequence=self._head_sequence,
+            changes=all_changes,
+            context_hash=context_hash,
+            checkpoint_version=self._checkpoint_version(),
+            message=message
+        )
+        self._records[record.sequence] = record
+        self._sequence_by_version[version] = record.sequence
+
+        self._append_wal(record)
+        self._pending_deltas += 1
+        self.metrics["commits"] += 1
+        self.metrics["changes_applied"] += len(all_changes)
+
+        if self._head_sequence - self._checkpoint_sequence >= self.checkpoint_interval:
+            self._take_checkpoint()
+        self._schedule_compaction()
+        return record
+
+    # ------------------------------------------------------------------
+    # Checkpoints and reconstruction
+    # ------------------------------------------------------------------
+
+    def _checkpoint_version(self) -> Optional[str]:
+        if self._checkpoint_sequence == 0:
+            return self._base_version
+        return self._records[self._checkpoint_sequence].version
+
+    def _take_checkpoint(self):
+        self._checkpoints[self._head_sequence] = copy.deepcopy(self.tree)
+        self._checkpoint_sequence = self._head_sequence
+        self.metrics["checkpoints"] += 1
+
+        # Drop the oldest checkpoint and the deltas only it could reach
+        if len(self._checkpoints) > self.max_checkpoints:
+            oldest = min(self._checkpoints)
+            del self._checkpoints[oldest]
+            floor = min(self._checkpoints)
+            for sequence in [s for s in self._records if s < floor]:
+                del self._records[sequence]
+            self._sequence_by_version = {
+                version: sequence for version, sequence in self._sequence_by_version.items()
+                if sequence >= floor
+            }
+
+    def latest_checkpoint(self) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Most recent checkpoint (version, snapshot)"""
+        return self._checkpoint_version(), self._checkpoints[self._checkpoint_sequence]
+
+    def has_version(self, version: str) -> bool:
+        return version in self._sequence_by_version
+
+    def reconstruct(self, version: str) -> Optional[Dict[str, Any]]:
+        """Rebuild a past version from the nearest checkpoint or from the head"""
+        target = self._sequence_by_version.get(version)
+        if target is None:
+            return None
+        self.metrics["reconstructions"] += 1
+
+        if target in self._checkpoints:
+            return copy.deepcopy(self._checkpoints[target])
+
+        checkpoint = max(s for s in self._checkpoints if s <= target)
+        if self._head_sequence - target < target - checkpoint:
+            # Undo newer deltas starting from the current tree
+            tree = copy.deepcopy(self.tree)
+            for sequence in range(self._head_sequence, target, -1):
+                apply_changes(tree, self._records[sequence].changes, reverse=True)
+            self.metrics["deltas_replayed"] += self._head_sequence - target
+        else:
+            tree = copy.deepcopy(self._checkpoints[checkpoint])
+            for sequence in range(checkpoint + 1, target + 1):
+                apply_changes(tree, self._records[sequence].changes)
+            self.metrics["deltas_replayed"] += target - checkpoint
+        return tree
+
+    def history(self, limit: int = 50) -> List[VersionRecord]:
+        sequences = sorted(self._records, reverse=True)[:limit]
+        return [self._records[sequence] for sequence in sequences]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "version": self.version,
+            "context_hash": self.context_hash,
+            "domains": len(self._domain_hashes),
+            "fields": sum(len(fields) for fields in self._field_hashes.values()),
+            "pending_deltas": self._pending_deltas,
+            "versions_in_memory": len(self._records),
+            "checkpoints_in_memory": len(self._checkpoints)
+        }
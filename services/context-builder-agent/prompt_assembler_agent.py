@@ -7,16 +7,17 @@ Next-generation dynamic prompt assembly with semantic coherence
 import asyncio
 import json
 import yaml
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import aiohttp
 import jinja2
-from semantic_coherence_bus import get_semantic_bus, SemanticMessage
+from semantic_coherence_bus import get_semantic_bus
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,6 +51,21 @@ class PromptFragment:
     success_rate: float = 0.0
     last_updated: str = ""
 
+@dataclass
+class IndexedSelection:
+    """Fragments selected for one (prompt type, complexity, domain) key"""
+    context_fragment: Optional[PromptFragment] = None
+    expert_fragment: Optional[PromptFragment] = None
+
+@dataclass
+class CompiledPrompt:
+    """Assembled prompt skeleton with its precompiled template"""
+    skeleton: str
+    fragments_used: List[str]
+    template: Optional[jinja2.Template] = None
+    generation: int = 0
+    compiled_at: str = field(default_factory=lambda: datetime.utcnow().isoformat() + "Z")
+
 class PromptAssemblyRequest(BaseModel):
     """Request for prompt assembly"""
     prompt_type: PromptType
@@ -113,9 +129,33 @@ class PromptAssemblerAgent:
             "avg_effectiveness": 0.0,
             "optimizations_performed": 0,
             "templates_created": 0,
-            "fragments_managed": 0
+            "fragments_managed": 0,
+            "assembly_cache_hits": 0,
+            "skeleton_cache_hits": 0,
+            "skeletons_compiled": 0,
+            "cache_invalidations": 0,
+            "usage_events_flushed": 0,
+            "usage_batches_flushed": 0
         }
         
+        # Compiled assembly layer: fragment index, skeleton cache and result cache.
+        # Everything is invalidated whenever fragment state that drives selection changes.
+        self._fragment_generation = 0
+        self._fragment_index: Dict[Tuple[str, str, str], IndexedSelection] = {}
+        self._reasoning_index: Dict[str, List[PromptFragment]] = {}
+        self._high_performers: Optional[List[PromptFragment]] = None
+        self._skeleton_cache: "OrderedDict[tuple, CompiledPrompt]" = OrderedDict()
+        self._assembly_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.max_skeleton_cache_size = 1024
+        self.max_assembly_cache_size = 4096
+        
+        # Usage logging is buffered and flushed off the request path
+        self._usage_buffer: List[Tuple[List[str], float, float]] = []
+        self._usage_flush_requested = asyncio.Event()
+        self._usage_task: Optional[asyncio.Task] = None
+        self.usage_flush_interval = 1.0
+        self.usage_flush_batch_size = 100
+        
         # Context paths
         self.context_dir = "/root/ultramcp/.context"
         self.fragments_dir = f"{self.context_dir}/fragments"
@@ -129,6 +169,13 @@ class PromptAssemblerAgent:
         @self.app.on_event("startup")
         async def startup_event():
             await self._initialize_system()
+        
+        @self.app.on_event("shutdown")
+        async def shutdown_event():
+            if self._usage_task is not None:
+                self._usage_task.cancel()
+                self._usage_task = None
+            await self._flush_prompt_usage()
     
     def _setup_routes(self):
         """Setup FastAPI routes for prompt assembly"""
@@ -295,6 +342,13 @@ class PromptAssemblerAgent:
             return {
                 **self.performance_metrics,
                 "optimization_history_count": len(self.optimization_history),
+                "compiled_cache": {
+                    "fragment_generation": self._fragment_generation,
+                    "indexed_keys": len(self._fragment_index),
+                    "skeletons_cached": len(self._skeleton_cache),
+                    "assemblies_cached": len(self._assembly_cache),
+                    "pending_usage_events": len(self._usage_buffer)
+                },
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
     
@@ -385,37 +439,34 @@ class PromptAssemblerAgent:
                               template_variables: Dict[str, Any]) -> Dict[str, Any]:
         """Core prompt assembly logic"""
         
-        assembled_parts = []
-        fragments_used = []
-        coherence_score = 0.0
-        
         try:
-            # Step 1: Select base template or fragments
-            if complexity == PromptComplexity.SIMPLE:
-                assembled_parts, fragments_used = await self._simple_assembly(
-                    prompt_type, context_domains, template_variables
-                )
-            elif complexity == PromptComplexity.MEDIUM:
-                assembled_parts, fragments_used = await self._medium_assembly(
-                    prompt_type, context_domains, objective, template_variables
-                )
-            elif complexity == PromptComplexity.COMPLEX:
-                assembled_parts, fragments_used = await self._complex_assembly(
-                    prompt_type, context_domains, objective, constraints, template_variables
-                )
-            elif complexity == PromptComplexity.ADAPTIVE:
-                assembled_parts, fragments_used = await self._adaptive_assembly(
-                    prompt_type, context_domains, objective, constraints, template_variables
-                )
+            skeleton_key = (
+                prompt_type, complexity, tuple(context_domains), objective,
+                self._stable_key(constraints), include_reasoning
+            )
+            result_key = (skeleton_key, self._stable_key(template_variables), target_audience, max_length)
             
-            # Step 2: Add reasoning if requested
-            if include_reasoning:
-                reasoning_fragments = self._select_reasoning_fragments(complexity)
-                assembled_parts.extend(reasoning_fragments)
-                fragments_used.extend([f.fragment_id for f in reasoning_fragments])
+            # Repeated assemblies are served from the result cache
+            cached = self._cache_get(self._assembly_cache, result_key)
+            if cached is not None:
+                self.performance_metrics["assembly_cache_hits"] += 1
+                self._queue_prompt_usage(cached["fragments_used"], cached["coherence_score"], cached["estimated_effectiveness"])
+                return {
+                    **cached,
+                    "prompt_metadata": dict(cached["prompt_metadata"]),
+                    "fragments_used": list(cached["fragments_used"]),
+                    "optimization_suggestions": list(cached["optimization_suggestions"]),
+                    "timestamp": datetime.utcnow().isoformat() + "Z"
+                }
+            
+            # Steps 1-2: Select fragments (via the index) into a compiled skeleton
+            compiled = await self._compile_prompt(
+                skeleton_key, prompt_type, complexity, context_domains, objective, constraints, include_reasoning
+            )
+            fragments_used = list(compiled.fragments_used)
             
             # Step 3: Apply template variables
-            assembled_prompt = await self._apply_template_variables(assembled_parts, template_variables)
+            assembled_prompt = await self._apply_template_variables(compiled, template_variables)
             
             # Step 4: Validate length constraints
             if len(assembled_prompt) > max_length:
@@ -434,10 +485,10 @@ class PromptAssemblerAgent:
                 assembled_prompt, coherence_score, effectiveness, constraints
             )
             
-            # Step 8: Log usage for learning
-            await self._log_prompt_usage(fragments_used, coherence_score, effectiveness)
+            # Step 8: Log usage for learning (flushed in the background)
+            self._queue_prompt_usage(fragments_used, coherence_score, effectiveness)
             
-            return {
+            result = {
                 "assembled_prompt": assembled_prompt,
                 "prompt_metadata": {
                     "prompt_type": prompt_type,
@@ -454,11 +505,136 @@ class PromptAssemblerAgent:
                 "optimization_suggestions": optimization_suggestions,
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
+            self._cache_put(self._assembly_cache, result_key, result, self.max_assembly_cache_size)
+            
+            return {**result, "fragments_used": list(fragments_used)}
             
         except Exception as e:
             logger.error(f"Error in prompt assembly: {e}")
             raise
     
+    async def _compile_prompt(self, skeleton_key: tuple, prompt_type: PromptType,
+                              complexity: PromptComplexity, context_domains: List[str],
+                              objective: str, constraints: Dict[str, Any],
+                              include_reasoning: bool) -> CompiledPrompt:
+        """Assemble and compile the prompt skeleton once per key"""
+        compiled = self._cache_get(self._skeleton_cache, skeleton_key)
+        if compiled is not None:
+            self.performance_metrics["skeleton_cache_hits"] += 1
+            return compiled
+        
+        assembled_parts = []
+        fragments_used = []
+        
+        # Step 1: Select base template or fragments
+        if complexity == PromptComplexity.SIMPLE:
+            assembled_parts, fragments_used = await self._simple_assembly(
+                prompt_type, context_domains, {}
+            )
+        elif complexity == PromptComplexity.MEDIUM:
+            assembled_parts, fragments_used = await self._medium_assembly(
+                prompt_type, context_domains, objective, {}
+            )
+        elif complexity == PromptComplexity.COMPLEX:
+            assembled_parts, fragments_used = await self._complex_assembly(
+                prompt_type, context_domains, objective, constraints, {}
+            )
+        elif complexity == PromptComplexity.ADAPTIVE:
+            assembled_parts, fragments_used = await self._adaptive_assembly(
+                prompt_type, context_domains, objective, constraints, {}
+            )
+        
+        # Step 2: Add reasoning if requested
+        if include_reasoning:
+            reasoning_fragments = self._select_reasoning_fragments(complexity)
+            assembled_parts.extend(f.content for f in reasoning_fragments)
+            fragments_used.extend([f.fragment_id for f in reasoning_fragments])
+        
+        skeleton = "\n\n".join(assembled_parts)
+        try:
+            template = self.jinja_env.from_string(skeleton)
+        except Exception as e:
+            logger.warning(f"Template compilation failed: {e}")
+            template = None
+        
+        compiled = CompiledPrompt(
+            skeleton=skeleton,
+            fragments_used=fragments_used,
+            template=template,
+            generation=self._fragment_generation
+        )
+        self._cache_put(self._skeleton_cache, skeleton_key, compiled, self.max_skeleton_cache_size)
+        self.performance_metrics["skeletons_compiled"] += 1
+        return compiled
+    
+    @staticmethod
+    def _stable_key(value: Any) -> str:
+        return json.dumps(value, sort_keys=True, default=str)
+    
+    @staticmethod
+    def _cache_get(cache: OrderedDict, key: tuple) -> Optional[Any]:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+    
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key: tuple, value: Any, max_size: int):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+    
+    def _invalidate_compiled(self, reason: str):
+        """Drop the fragment index and every cached skeleton/assembly"""
+        self._fragment_generation += 1
+        self._fragment_index.clear()
+        self._reasoning_index.clear()
+        self._high_performers = None
+        self._skeleton_cache.clear()
+        self._assembly_cache.clear()
+        self.performance_metrics["cache_invalidations"] += 1
+        logger.info(f"Compiled prompt cache invalidated ({reason})")
+    
+    def _indexed_selection(self, prompt_type: PromptType, complexity: PromptComplexity,
+                           domain: str) -> IndexedSelection:
+        """Fragment selection for a (prompt type, complexity, domain) key, computed once"""
+        key = (prompt_type, complexity, domain)
+        selection = self._fragment_index.get(key)
+        if selection is not None:
+            return selection
+        
+        selection = IndexedSelection()
+        if prompt_type == PromptType.CONTEXT_INJECTION:
+            matching_fragments = [
+                f for f in self.prompt_fragments.values()
+                if domain.upper() in f.context_domain.upper()
+            ]
+            if matching_fragments:
+                selection.context_fragment = max(matching_fragments, key=lambda x: x.priority)
+        
+        if complexity in (PromptComplexity.COMPLEX, PromptComplexity.ADAPTIVE):
+            expert_fragments = [
+                f for f in self.prompt_fragments.values()
+                if f.context_domain == domain and f.priority > 0.8
+            ]
+            if expert_fragments:
+                selection.expert_fragment = max(expert_fragments, key=lambda x: x.success_rate)
+        
+        self._fragment_index[key] = selection
+        return selection
+    
+    def _selection_signature(self) -> tuple:
+        """Selection-relevant fragment state (usage stats only matter through these)"""
+        experts = {}
+        for fragment in self.prompt_fragments.values():
+            if fragment.priority > 0.8:
+                best = experts.get(fragment.context_domain)
+                if best is None or fragment.success_rate > best.success_rate:
+                    experts[fragment.context_domain] = fragment
+        high_performers = tuple(f.fragment_id for f in self._select_high_performers(use_index=False))
+        return tuple(sorted((d, f.fragment_id) for d, f in experts.items())), high_performers
+    
     async def _simple_assembly(self, prompt_type: PromptType, context_domains: List[str],
                               template_variables: Dict[str, Any]) -> Tuple[List[str], List[str]]:
         """Simple prompt assembly with basic templates"""
@@ -476,12 +652,8 @@ class PromptAssemblerAgent:
         elif prompt_type == PromptType.CONTEXT_INJECTION:
             # Add relevant context fragments
             for domain in context_domains:
-                matching_fragments = [
-                    f for f in self.prompt_fragments.values()
-                    if domain.upper() in f.context_domain.upper()
-                ]
-                if matching_fragments:
-                    best_fragment = max(matching_fragments, key=lambda x: x.priority)
+                best_fragment = self._indexed_selection(prompt_type, PromptComplexity.SIMPLE, domain).context_fragment
+                if best_fragment:
                     parts.append(best_fragment.content)
                     used_fragments.append(best_fragment.fragment_id)
         
@@ -536,12 +708,8 @@ class PromptAssemblerAgent:
         
         # Add domain-specific expertise
         for domain in context_domains:
-            expert_fragments = [
-                f for f in self.prompt_fragments.values()
-                if f.context_domain == domain and f.priority > 0.8
-            ]
-            if expert_fragments:
-                best_expert = max(expert_fragments, key=lambda x: x.success_rate)
+            best_expert = self._indexed_selection(prompt_type, PromptComplexity.COMPLEX, domain).expert_fragment
+            if best_expert:
                 parts.append(best_expert.content)
                 used_fragments.append(best_expert.fragment_id)
         
@@ -568,15 +736,8 @@ class PromptAssemblerAgent:
         parts.extend(complex_parts)
         used_fragments.extend(complex_used)
         
-        # Apply adaptive optimizations based on history
-        high_performing_fragments = [
-            f for f in self.prompt_fragments.values()
-            if f.success_rate > 0.8 and f.usage_count > 5
-        ]
-        
-        # Sort by success rate and add top performers
-        high_performing_fragments.sort(key=lambda x: x.success_rate, reverse=True)
-        for fragment in high_performing_fragments[:2]:  # Add top 2 performers
+        # Apply adaptive optimizations based on history: add top 2 performers
+        for fragment in self._select_high_performers():
             if fragment.fragment_id not in used_fragments:
                 parts.append(fragment.content)
                 used_fragments.append(fragment.fragment_id)
@@ -590,8 +751,25 @@ class PromptAssemblerAgent:
         
         return parts, used_fragments
     
+    def _select_high_performers(self, use_index: bool = True) -> List[PromptFragment]:
+        """Top 2 fragments by success rate among those with enough usage"""
+        if use_index and self._high_performers is not None:
+            return self._high_performers
+        
+        high_performing_fragments = [
+            f for f in self.prompt_fragments.values()
+            if f.success_rate > 0.8 and f.usage_count > 5
+        ]
+        high_performing_fragments.sort(key=lambda x: x.success_rate, reverse=True)
+        
+        if use_index:
+            self._high_performers = high_performing_fragments[:2]
+        return high_performing_fragments[:2]
+    
     def _select_reasoning_fragments(self, complexity: PromptComplexity) -> List[PromptFragment]:
         """Select appropriate reasoning fragments based on complexity"""
+        if complexity in self._reasoning_index:
+            return self._reasoning_index[complexity]
         
         reasoning_fragments = [
             f for f in self.prompt_fragments.values()
@@ -600,20 +778,22 @@ class PromptAssemblerAgent:
         
         if complexity in [PromptComplexity.SIMPLE, PromptComplexity.MEDIUM]:
             # Use basic step-by-step reasoning
-            return [f for f in reasoning_fragments if "step_by_step" in f.fragment_id]
-        else:
-            # Use more sophisticated reasoning for complex/adaptive
-            return reasoning_fragments
+            reasoning_fragments = [f for f in reasoning_fragments if "step_by_step" in f.fragment_id]
+        # Complex/adaptive use every reasoning fragment
+        
+        self._reasoning_index[complexity] = reasoning_fragments
+        return reasoning_fragments
     
-    async def _apply_template_variables(self, parts: List[str], variables: Dict[str, Any]) -> str:
-        """Apply template variables to assembled parts"""
+    async def _apply_template_variables(self, compiled: CompiledPrompt, variables: Dict[str, Any]) -> str:
+        """Apply template variables to a compiled skeleton"""
         
-        combined_content = "\n\n".join(parts)
+        combined_content = compiled.skeleton
         
         try:
-            # Use Jinja2 for variable substitution
-            template = self.jinja_env.from_string(combined_content)
-            return template.render(**variables)
+            # Render the precompiled Jinja2 template
+            if compiled.template is None:
+                raise ValueError("skeleton could not be compiled")
+            return compiled.template.render(**variables)
         except Exception as e:
             logger.warning(f"Template variable substitution failed: {e}")
             # Fallback to simple string replacement
@@ -796,43 +976,73 @@ class PromptAssemblerAgent:
             logger.warning(f"Suggestion generation failed: {e}")
             return ["Review prompt for clarity and completeness"]
     
-    async def _log_prompt_usage(self, fragments_used: List[str], coherence_score: float, effectiveness: float):
-        """Log prompt usage for learning and optimization"""
+    def _queue_prompt_usage(self, fragments_used: List[str], coherence_score: float, effectiveness: float):
+        """Buffer a usage event; the background flusher applies it"""
+        self._usage_buffer.append((list(fragments_used), coherence_score, effectiveness))
+        
+        if self._usage_task is None or self._usage_task.done():
+            self._usage_task = asyncio.create_task(self._usage_flush_loop())
+        if len(self._usage_buffer) >= self.usage_flush_batch_size:
+            self._usage_flush_requested.set()
+    
+    async def _usage_flush_loop(self):
+        """Flush buffered usage every interval, or early when the batch fills up"""
+        while True:
+            try:
+                await asyncio.wait_for(self._usage_flush_requested.wait(), timeout=self.usage_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._usage_flush_requested.clear()
+            await self._flush_prompt_usage()
+    
+    async def _flush_prompt_usage(self):
+        """Apply buffered usage statistics and publish them as one batch"""
+        usage_events, self._usage_buffer = self._usage_buffer, []
+        if not usage_events:
+            return
         
         try:
-            # Update fragment usage statistics
-            for fragment_id in fragments_used:
-                if fragment_id in self.prompt_fragments:
-                    fragment = self.prompt_fragments[fragment_id]
-                    fragment.usage_count += 1
-                    
-                    # Update success rate (simple exponential moving average)
-                    performance_score = (coherence_score + effectiveness) / 2
-                    alpha = 0.1  # Learning rate
-                    fragment.success_rate = (
-                        (1 - alpha) * fragment.success_rate + alpha * performance_score
-                    )
-                    fragment.last_updated = datetime.utcnow().isoformat() + "Z"
+            signature_before = self._selection_signature()
+            for fragments_used, coherence_score, effectiveness in usage_events:
+                self._log_prompt_usage(fragments_used, coherence_score, effectiveness)
+            
+            # Usage stats only change assembly when they change fragment selection
+            if self._selection_signature() != signature_before:
+                self._invalidate_compiled("fragment ranking changed")
+            
+            self.performance_metrics["usage_events_flushed"] += len(usage_events)
+            self.performance_metrics["usage_batches_flushed"] += 1
             
             # Log to semantic bus for system-wide learning
             if self.semantic_bus:
-                usage_message = SemanticMessage(
-                    message_id=f"prompt_usage_{int(datetime.utcnow().timestamp())}",
-                    message_type="PROMPT_USAGE",
-                    content={
-                        "fragments_used": fragments_used,
-                        "coherence_score": coherence_score,
-                        "effectiveness": effectiveness,
-                        "timestamp": datetime.utcnow().isoformat() + "Z"
-                    },
-                    source="PromptAssemblerAgent",
-                    timestamp=datetime.utcnow().isoformat() + "Z"
-                )
-                await self.semantic_bus.publish_semantic_message(usage_message)
+                await self.semantic_bus.publish_fragment_update({
+                    "update_type": "prompt_usage",
+                    "events": len(usage_events),
+                    "fragments_used": sorted({f for fragments, _, _ in usage_events for f in fragments}),
+                    "avg_coherence_score": sum(e[1] for e in usage_events) / len(usage_events),
+                    "avg_effectiveness": sum(e[2] for e in usage_events) / len(usage_events),
+                    "timestamp": datetime.utcnow().isoformat() + "Z"
+                })
                 
         except Exception as e:
             logger.warning(f"Usage logging failed: {e}")
     
+    def _log_prompt_usage(self, fragments_used: List[str], coherence_score: float, effectiveness: float):
+        """Update fragment usage statistics for one assembly"""
+        
+        for fragment_id in fragments_used:
+            if fragment_id in self.prompt_fragments:
+                fragment = self.prompt_fragments[fragment_id]
+                fragment.usage_count += 1
+                
+                # Update success rate (simple exponential moving average)
+                performance_score = (coherence_score + effectiveness) / 2
+                alpha = 0.1  # Learning rate
+                fragment.success_rate = (
+                    (1 - alpha) * fragment.success_rate + alpha * performance_score
+                )
+                fragment.last_updated = datetime.utcnow().isoformat() + "Z"
+    
     async def _optimize_prompt(self, original_prompt: str, performance_metrics: Dict[str, float],
                               target_improvement: str, optimization_budget: int) -> Dict[str, Any]:
         """Optimize existing prompt based on performance feedback"""
@@ -924,6 +1134,7 @@ class PromptAssemblerAgent:
             }
             
             self.templates[template_name] = template_record
+            self._invalidate_compiled(f"template {template_name} created")
             
             # Save to file system
             template_file = f"{self.templates_dir}/{template_name}.yaml"
@@ -1128,6 +1339,9 @@ class PromptAssemblerAgent:
                         fragment.success_rate = min(1.0, fragment.success_rate + 0.02)
                     updates_made.append(f"Boosted {domain} domain fragments")
             
+            if updates_made:
+                self._invalidate_compiled("adaptive learning update")
+            
             return {
                 "success": True,
                 "updates_made": updates_made,
@@ -1174,6 +1388,7 @@ class PromptAssemblerAgent:
                             fragment.usage_count = data.get("usage_count", 0)
                             fragment.success_rate = data.get("success_rate", 0.0)
                             fragment.last_updated = data.get("last_updated", "")
+                self._invalidate_compiled("fragment performance data loaded")
                 logger.info("Loaded fragment performance data")
         except Exception as e:
             logger.warning(f"Performance data loading failed: {e}")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+UltraMCP ContextBuilderAgent 2.0 - Service Client Layer
+Pooled HTTP clients for calls between ContextBuilderAgent microservices
+"""
+
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Optional, Sequence, Tuple
+
+import aiohttp
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+@dataclass
+class ServiceConfig:
+    """Connection settings for one downstream service"""
+    base_url: str
+    timeout: float = 30.0            # Total request timeout (seconds)
+    connect_timeout: float = 5.0
+    max_concurrency: int = 16        # Concurrent requests (and pooled connections)
+    keepalive_timeout: float = 60.0
+
+class LatencyHistogram:
+    """Cumulative latency histogram (Prometheus-style buckets, milliseconds)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.total += 1
+        self.sum += value_ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.total:
+            return 0.0
+        target = q * self.total
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = list(itertools.accumulate(self.counts))
+        return {
+            "buckets_ms": {
+                **{str(bound): count for bound, count in zip(self.buckets, cumulative)},
+                "+Inf": self.total
+            },
+            "count": self.total,
+            "sum_ms": self.sum,
+            "avg_ms": self.sum / self.total if self.total else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99)
+        }
+
+class ServiceClient:
+    """
+    Keep-alive client for a single service: one pooled session, a concurrency
+    cap and coalescing of identical in-flight requests
+    """
+
+    def __init__(self, name: str, config: ServiceConfig):
+        self.name = name
+        self.config = config
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+        self.latency = LatencyHistogram()
+        self.metrics = {
+            "requests": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "in_flight": 0
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session on first use (inside the running loop)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.max_concurrency,
+                keepalive_timeout=self.config.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout, connect=self.config.connect_timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        return self._session
+
+    async def request(self, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                      coalesce: Optional[bool] = None,
+                      timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """POST when data is given, GET otherwise; returns None on any failure
+
+        Identical in-flight requests share one call. GETs coalesce by default;
+        POSTs only when the caller marks them as read-only (coalesce=True).
+        """
+        method = "POST" if data else "GET"
+        if coalesce is None:
+            coalesce = method == "GET"
+
+        if not coalesce:
+            return await self._send(method, endpoint, data, timeout)
+
+        key = (method, endpoint, json.dumps(data, sort_keys=True, default=str) if data else "")
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.metrics["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        result = None
+        try:
+            result = await self._send(method, endpoint, data, timeout)
+            return result
+        finally:
+            del self._in_flight[key]
+            future.set_result(result)
+
+    async def _send(self, method: str, endpoint: str, data: Optional[Dict[str, Any]],
+                    timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        session = self._get_session()
+        url = f"{self.config.base_url}{endpoint}"
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+
+        async with self._semaphore:
+            self.metrics["requests"] += 1
+            self.metrics["in_flight"] += 1
+            start_time = time.perf_counter()
+            try:
+                async with session.request(method, url, json=data, timeout=request_timeout) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    logger.error(f"Service {self.name} returned {response.status}")
+                    self.metrics["errors"] += 1
+                    return None
+            except asyncio.TimeoutError:
+                logger.error(f"Timeout calling service {self.name} ({endpoint})")
+                self.metrics["timeouts"] += 1
+                return None
+            except Exception as e:
+                logger.error(f"Error calling service {self.name}: {e}")
+                self.metrics["errors"] += 1
+                return None
+            finally:
+                self.latency.observe((time.perf_counter() - start_time) * 1000)
+                self.metrics["in_flight"] -= 1
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "base_url": self.config.base_url,
+            "timeout_s": self.config.timeout,
+            "max_concurrency": self.config.max_concurrency,
+            "latency": self.latency.to_dict()
+        }
+
+class ServiceClientPool:
+    """Service clients for the ContextBuilderAgent family, keyed by service name"""
+
+    def __init__(self, services: Dict[str, ServiceConfig]):
+        self.clients = {name: ServiceClient(name, config) for name, config in services.items()}
+
+    def __contains__(self, service_name: str) -> bool:
+        return service_name in self.clients
+
+    async def call(self, service_name: str, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                   coalesce: Optional[bool] = None,
+                   timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Call a service endpoint; returns None if the service is unknown or the call fails"""
+        client = self.clients.get(service_name)
+        if client is None:
+            logger.error(f"Unknown service: {service_name}")
+            return None
+        return await client.request(endpoint, data, coalesce=coalesce, timeout=timeout)
+
+    async def fan_out(self, calls: Dict[Any, Awaitable[Any]]) -> Dict[Any, Any]:
+        """Run named calls concurrently; a failed call yields None under its name"""
+        names = list(calls.keys())
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+
+        fanned = {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Fan-out call {name} failed: {result}")
+                result = None
+            fanned[name] = result
+        return fanned
+
+    async def close(self):
+        await asyncio.gather(*(client.close() for client in self.clients.values()))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {name: client.get_metrics() for name, client in self.clients.items()}
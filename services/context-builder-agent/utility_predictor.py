@@ -38,13 +38,46 @@ class UtilityPredictionResponse(BaseModel):
     recommendation: str
     timestamp: str
 
+class BatchUtilityPredictionRequest(BaseModel):
+    mutations: List[Dict[str, Any]]
+    context_state: Dict[str, Any]
+    historical_success_rate: float = 0.5
+
+class BatchUtilityPredictionResponse(BaseModel):
+    predictions: List[UtilityPredictionResponse]
+    high_utility_count: int
+    processing_time_ms: float
+    timestamp: str
+
+SOURCE_CREDIBILITY = {
+    "user_input": 0.9,
+    "meeting_transcript": 0.8,
+    "document_analysis": 0.7,
+    "ai_inference": 0.6,
+    "system_generated": 0.5,
+    "unknown": 0.3
+}
+
+DOMAIN_CRITICALITY = {
+    "ORGANIZACION": 0.9,
+    "OBJETIVOS": 0.9,
+    "PAIN_POINTS": 0.9,
+    "REGLAS_NEGOCIO": 0.9,
+    "BUYER_PERSONAS": 0.8,
+    "OFERTA": 0.8,
+    "MERCADO": 0.6,
+    "INSIGHTS": 0.5
+}
+
+HIGH_DEPENDENCY_DOMAINS = ("ORGANIZACION", "OBJETIVOS")
+
 class UtilityPredictor:
     """
     Predicts utility of context mutations using ensemble ML models
     Combines Random Forest and Neural Network for robust predictions
     """
     
-    def __init__(self):
+    def __init__(self, batch_window_ms: Optional[float] = None, max_batch_size: int = 256):
         self.app = FastAPI(title="Utility Predictor", version="1.0.0")
         self.rf_model = None
         self.nn_model = None
@@ -62,9 +95,21 @@ class UtilityPredictor:
             "predictions_made": 0,
             "high_utility_predicted": 0,
             "model_accuracy": 0.0,
-            "last_training": None
+            "last_training": None,
+            "batch_requests": 0,
+            "model_batches": 0,
+            "micro_batches": 0,
+            "coalesced_requests": 0
         }
         
+        # Micro-batching of concurrent single predictions (0 disables it)
+        if batch_window_ms is None:
+            batch_window_ms = float(os.getenv("UTILITY_BATCH_WINDOW_MS", "0"))
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending_predictions: List[tuple] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        
         # Initialize FastAPI routes
         self._setup_routes()
         
@@ -83,16 +128,18 @@ class UtilityPredictor:
                 if not self.model_trained:
                     await self._train_models()
                 
-                result = await self._predict_utility(
-                    request.mutation_data,
-                    request.context_state,
-                    request.historical_success_rate
-                )
-                
-                # Update metrics
-                self.performance_metrics["predictions_made"] += 1
-                if result["utility_score"] > 0.7:
-                    self.performance_metrics["high_utility_predicted"] += 1
+                if self.batch_window > 0:
+                    result = await self._predict_utility_coalesced(
+                        request.mutation_data,
+                        request.context_state,
+                        request.historical_success_rate
+                    )
+                else:
+                    result = await self._predict_utility(
+                        request.mutation_data,
+                        request.context_state,
+                        request.historical_success_rate
+                    )
                 
                 processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
                 logger.info(f"Utility prediction completed in {processing_time:.2f}ms")
@@ -103,6 +150,35 @@ class UtilityPredictor:
                 logger.error(f"Error in utility prediction: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
+        @self.app.post("/predict_utility_batch", response_model=BatchUtilityPredictionResponse)
+        async def predict_utility_batch(request: BatchUtilityPredictionRequest):
+            """Predict utility of many mutations with one model pass"""
+            try:
+                start_time = datetime.utcnow()
+                
+                if not self.model_trained:
+                    await self._train_models()
+                
+                results = await self._predict_utility_batch([
+                    (mutation_data, request.context_state, request.historical_success_rate)
+                    for mutation_data in request.mutations
+                ])
+                self.performance_metrics["batch_requests"] += 1
+                
+                processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+                logger.info(f"Batch utility prediction of {len(results)} mutations completed in {processing_time:.2f}ms")
+                
+                return BatchUtilityPredictionResponse(
+                    predictions=[UtilityPredictionResponse(**result) for result in results],
+                    high_utility_count=sum(1 for result in results if result["utility_score"] > 0.7),
+                    processing_time_ms=processing_time,
+                    timestamp=datetime.utcnow().isoformat() + "Z"
+                )
+                
+            except Exception as e:
+                logger.error(f"Error in batch utility prediction: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
+        
         @self.app.post("/retrain_models")
         async def retrain_models():
             """Retrain ML models with latest data"""
@@ -174,6 +250,7 @@ class UtilityPredictor:
                 **self.performance_metrics,
                 "high_utility_rate": success_rate,
                 "models_path": self.models_path,
+                "batch_window_ms": self.batch_window * 1000,
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
     
@@ -377,128 +454,176 @@ class UtilityPredictor:
                          context_state: Dict[str, Any],
                          historical_success: float) -> List[float]:
         """Extract features from mutation and context data"""
-        
-        # Extract confidence score
-        confidence_score = mutation_data.get("confidence", 0.5)
-        
-        # Extract source credibility (based on source type)
-        source = mutation_data.get("source", "unknown")
-        source_credibility_map = {
-            "user_input": 0.9,
-            "meeting_transcript": 0.8,
-            "document_analysis": 0.7,
-            "ai_inference": 0.6,
-            "system_generated": 0.5,
-            "unknown": 0.3
-        }
-        source_credibility = source_credibility_map.get(source, 0.5)
-        
-        # Extract domain criticality
-        domain = mutation_data.get("target_domain", "").split(".")[0]
-        criticality_map = {
-            "ORGANIZACION": 0.9,
-            "OBJETIVOS": 0.9,
-            "PAIN_POINTS": 0.9,
-            "REGLAS_NEGOCIO": 0.9,
-            "BUYER_PERSONAS": 0.8,
-            "OFERTA": 0.8,
-            "MERCADO": 0.6,
-            "INSIGHTS": 0.5
-        }
-        domain_criticality = criticality_map.get(domain, 0.5)
-        
-        # Calculate change magnitude (normalized)
-        old_value = mutation_data.get("previous_value")
-        new_value = mutation_data.get("new_value")
-        if old_value and new_value:
-            if isinstance(old_value, str) and isinstance(new_value, str):
-                change_magnitude = len(set(new_value.split()) - set(old_value.split())) / max(len(new_value.split()), 1)
+        return self._extract_features_batch([(mutation_data, context_state, historical_success)])[0].tolist()
+    
+    def _extract_features_batch(self, items: List[tuple]) -> np.ndarray:
+        """Extract features for (mutation_data, context_state, historical_success) items into one matrix"""
+        features = np.empty((len(items), len(self.feature_names)), dtype=np.float64)
+        now = datetime.utcnow()
+        parsed_timestamps: Dict[str, Optional[datetime]] = {}
+        
+        for row, (mutation_data, context_state, historical_success) in enumerate(items):
+            # Extract source credibility (based on source type)
+            source_credibility = SOURCE_CREDIBILITY.get(mutation_data.get("source", "unknown"), 0.5)
+            
+            # Extract domain criticality
+            domain = mutation_data.get("target_domain", "").split(".")[0]
+            domain_criticality = DOMAIN_CRITICALITY.get(domain, 0.5)
+            
+            # Calculate change magnitude (normalized)
+            old_value = mutation_data.get("previous_value")
+            new_value = mutation_data.get("new_value")
+            if old_value and new_value:
+                if isinstance(old_value, str) and isinstance(new_value, str):
+                    new_words = new_value.split()
+                    change_magnitude = len(set(new_words) - set(old_value.split())) / max(len(new_words), 1)
+                else:
+                    change_magnitude = 0.5  # Default for non-string changes
             else:
-                change_magnitude = 0.5  # Default for non-string changes
-        else:
-            change_magnitude = 1.0 if old_value is None else 0.5
-        
-        # Historical success rate
-        historical_success = min(max(historical_success, 0.0), 1.0)
-        
-        # Context coherence (from context state)
-        context_coherence = context_state.get("coherence_score", 0.8)
-        
-        # Dependency impact (estimated based on domain)
-        dependency_impact = 0.8 if domain in ["ORGANIZACION", "OBJETIVOS"] else 0.3
+                change_magnitude = 1.0 if old_value is None else 0.5
+            
+            # Temporal relevance (how recent is the data), each distinct timestamp parsed once
+            timestamp = mutation_data.get("timestamp")
+            if timestamp is None:
+                temporal_relevance = 1.0
+            else:
+                if timestamp not in parsed_timestamps:
+                    try:
+                        parsed_timestamps[timestamp] = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+                    except Exception:
+                        parsed_timestamps[timestamp] = None
+                mutation_time = parsed_timestamps[timestamp]
+                if mutation_time is None:
+                    temporal_relevance = 0.5
+                else:
+                    hours_old = (now.replace(tzinfo=mutation_time.tzinfo) - mutation_time).total_seconds() / 3600
+                    temporal_relevance = max(0, 1 - hours_old / 24)  # Decay over 24 hours
+            
+            features[row] = (
+                mutation_data.get("confidence", 0.5),
+                source_credibility,
+                domain_criticality,
+                change_magnitude,
+                min(max(historical_success, 0.0), 1.0),
+                context_state.get("coherence_score", 0.8),
+                0.8 if domain in HIGH_DEPENDENCY_DOMAINS else 0.3,  # Dependency impact
+                temporal_relevance,
+                0.9 if mutation_data.get("requires_cod_validation", False) else 0.6,  # Evidence quality
+                0.7  # Stakeholder alignment (estimated)
+            )
         
-        # Temporal relevance (how recent is the data)
-        timestamp = mutation_data.get("timestamp", datetime.utcnow().isoformat())
-        try:
-            mutation_time = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-            hours_old = (datetime.utcnow().replace(tzinfo=mutation_time.tzinfo) - mutation_time).total_seconds() / 3600
-            temporal_relevance = max(0, 1 - hours_old / 24)  # Decay over 24 hours
-        except:
-            temporal_relevance = 0.5
-        
-        # Evidence quality (based on requires_cod_validation)
-        evidence_quality = 0.9 if mutation_data.get("requires_cod_validation", False) else 0.6
-        
-        # Stakeholder alignment (estimated)
-        stakeholder_alignment = 0.7  # Default value
-        
-        return [
-            confidence_score, source_credibility, domain_criticality,
-            change_magnitude, historical_success, context_coherence,
-            dependency_impact, temporal_relevance, evidence_quality,
-            stakeholder_alignment
-        ]
+        return features
     
     async def _predict_utility(self, mutation_data: Dict[str, Any],
                               context_state: Dict[str, Any],
                               historical_success: float) -> Dict[str, Any]:
         """Core utility prediction logic"""
+        return (await self._predict_utility_batch([(mutation_data, context_state, historical_success)]))[0]
+    
+    async def _predict_utility_batch(self, items: List[tuple]) -> List[Dict[str, Any]]:
+        """Predict utility for many mutations with one scaler/ensemble pass"""
+        if not items:
+            return []
         
         # Extract features
-        features = self._extract_features(mutation_data, context_state, historical_success)
-        features_array = np.array(features).reshape(1, -1)
+        features_array = self._extract_features_batch(items)
         features_scaled = self.scaler.transform(features_array)
         
         # Get predictions from both models
-        rf_prob = self.rf_model.predict_proba(features_array)[0]
-        nn_prob = self.nn_model.predict_proba(features_scaled)[0]
+        rf_probs = self.rf_model.predict_proba(features_array)[:, 1]
+        nn_probs = self.nn_model.predict_proba(features_scaled)[:, 1]
         
         # Ensemble prediction (weighted average)
         rf_weight = 0.6  # Random Forest gets higher weight due to better interpretability
         nn_weight = 0.4
         
-        utility_prob = rf_weight * rf_prob[1] + nn_weight * nn_prob[1]
+        utility_probs = rf_weight * rf_probs + nn_weight * nn_probs
         
         # Calculate confidence (agreement between models)
-        model_agreement = 1 - abs(rf_prob[1] - nn_prob[1])
-        confidence = min(utility_prob * model_agreement, 1.0)
-        
-        # Generate recommendation
-        recommendation = self._generate_recommendation(utility_prob, confidence, features)
-        
-        # Detailed prediction info
-        prediction_details = {
-            "extracted_features": dict(zip(self.feature_names, features)),
-            "rf_prediction": float(rf_prob[1]),
-            "nn_prediction": float(nn_prob[1]),
-            "ensemble_weight": {"rf": rf_weight, "nn": nn_weight},
-            "model_agreement": float(model_agreement)
-        }
+        model_agreements = 1 - np.abs(rf_probs - nn_probs)
+        confidences = np.minimum(utility_probs * model_agreements, 1.0)
+        
+        self.performance_metrics["model_batches"] += 1
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        
+        results = []
+        for row in range(len(items)):
+            features = features_array[row].tolist()
+            utility_prob = float(utility_probs[row])
+            confidence = float(confidences[row])
+            rf_prob = float(rf_probs[row])
+            nn_prob = float(nn_probs[row])
+            
+            # Detailed prediction info
+            prediction_details = {
+                "extracted_features": dict(zip(self.feature_names, features)),
+                "rf_prediction": rf_prob,
+                "nn_prediction": nn_prob,
+                "ensemble_weight": {"rf": rf_weight, "nn": nn_weight},
+                "model_agreement": float(model_agreements[row])
+            }
+            
+            model_consensus = {
+                "unanimous": abs(rf_prob - nn_prob) < 0.1,
+                "confidence_level": "high" if confidence > 0.8 else "medium" if confidence > 0.6 else "low",
+                "prediction_strength": "strong" if utility_prob > 0.8 or utility_prob < 0.2 else "weak"
+            }
+            
+            results.append({
+                "utility_score": utility_prob,
+                "confidence": confidence,
+                "prediction_details": prediction_details,
+                "model_consensus": model_consensus,
+                "recommendation": self._generate_recommendation(utility_prob, confidence, features),
+                "timestamp": timestamp
+            })
+        
+        # Update metrics
+        self.performance_metrics["predictions_made"] += len(results)
+        self.performance_metrics["high_utility_predicted"] += int(np.count_nonzero(utility_probs > 0.7))
+        
+        return results
+    
+    async def _predict_utility_coalesced(self, mutation_data: Dict[str, Any],
+                                        context_state: Dict[str, Any],
+                                        historical_success: float) -> Dict[str, Any]:
+        """Queue a single prediction so concurrent requests share one model pass"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_predictions.append(((mutation_data, context_state, historical_success), future))
+        self.performance_metrics["coalesced_requests"] += 1
+        
+        if len(self._pending_predictions) >= self.max_batch_size:
+            await self._flush_predictions()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.batch_window, lambda: asyncio.ensure_future(self._flush_predictions())
+            )
         
-        model_consensus = {
-            "unanimous": abs(rf_prob[1] - nn_prob[1]) < 0.1,
-            "confidence_level": "high" if confidence > 0.8 else "medium" if confidence > 0.6 else "low",
-            "prediction_strength": "strong" if utility_prob > 0.8 or utility_prob < 0.2 else "weak"
-        }
+        return await future
+    
+    async def _flush_predictions(self):
+        """Run all queued single predictions as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
         
-        return {
-            "utility_score": float(utility_prob),
-            "confidence": float(confidence),
-            "prediction_details": prediction_details,
-            "model_consensus": model_consensus,
-            "recommendation": recommendation,
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
+        pending, self._pending_predictions = self._pending_predictions, []
+        if not pending:
+            return
+        
+        self.performance_metrics["micro_batches"] += 1
+        try:
+            results = await self._predict_utility_batch([item for item, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
     
     def _generate_recommendation(self, utility_score: float, confidence: float,
                                features: List[float]) -> str:
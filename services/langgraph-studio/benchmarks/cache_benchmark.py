@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for the LangGraph node cache
+
+Measures `cached_node` hit overhead with several threads calling cached
+nodes concurrently, for the current IntelligentCache and a reference of
+the previous engine (one RLock, json.dumps + sha256 keys, pickle-based
+sizing, O(n) LRU scan). Also compares persisting a stream of updates: the
+previous engine re-pickled the whole cache per save, the current one
+appends to a journal from a background thread. Finally, a thundering-herd
+run counts node executions when many callers miss on the same inputs at once.
+
+Usage:
+    python benchmarks/cache_benchmark.py [--entries 1000] [--threads 1 4 8 16]
+        [--calls 20000] [--saves 20] [--herd 32]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.intelligent_cache import CacheEntry, IntelligentCache, cached_node, smart_cache_key
+
+class LegacyIntelligentCache:
+    """Reference of the previous hot paths, for comparison only"""
+
+    def __init__(self, max_size=1000, max_memory_mb=100, default_ttl=3600, persistence_path=None):
+        self.max_size = max_size
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.default_ttl = default_ttl
+        self.persistence_path = persistence_path
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'size_bytes': 0}
+
+    def _generate_key(self, node_name, inputs, context=None):
+        cache_data = {'node': node_name, 'inputs': self._normalize_inputs(inputs), 'context': context or {}}
+        return hashlib.sha256(json.dumps(cache_data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _normalize_inputs(self, inputs):
+        normalized = {}
+        for key, value in inputs.items():
+            if isinstance(value, (str, int, float, bool)):
+                normalized[key] = value
+            elif isinstance(value, (list, tuple)):
+                normalized[key] = [v if isinstance(v, (str, int, float, bool)) else
+                                   self._normalize_inputs(v) if isinstance(v, dict) else str(v) for v in value]
+            elif isinstance(value, dict):
+                normalized[key] = self._normalize_inputs(value)
+            else:
+                normalized[key] = str(value)
+        return normalized
+
+    def get(self, node_name, inputs, context=None):
+        key = self._generate_key(node_name, inputs, context)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if entry.is_expired():
+                del self._cache[key]
+                self._stats['misses'] += 1
+                return None
+            entry.touch()
+            self._stats['hits'] += 1
+            return entry.value
+
+    def set(self, node_name, inputs, value, ttl=None, context=None):
+        key = self._generate_key(node_name, inputs, context)
+        size_bytes = len(pickle.dumps(value))
+        with self._lock:
+            while len(self._cache) >= self.max_size:
+                lru_key = min(self._cache.keys(), key=lambda k: self._cache[k].last_access)
+                self._stats['size_bytes'] -= self._cache.pop(lru_key).size_bytes
+            now = time.time()
+            self._cache[key] = CacheEntry(value, now, 1, now, key, node_name, ttl or self.default_ttl, size_bytes)
+            self._stats['size_bytes'] += size_bytes
+
+    def _save_cache(self):
+        with self._lock, open(self.persistence_path, 'wb') as f:
+            pickle.dump({'cache': self._cache, 'stats': self._stats}, f)
+
+def legacy_cached_node(cache, ttl=None, cache_key_fn=None):
+    """The previous decorator body, minus its prints"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(state, *args, **kwargs):
+            cache_inputs = cache_key_fn(state)
+            cached_result = cache.get(func.__name__, cache_inputs)
+            if cached_result is not None:
+                return cached_result
+            result = func(state, *args, **kwargs)
+            cache.set(func.__name__, cache_inputs, result, ttl)
+            return result
+        return wrapper
+    return decorator
+
+def make_state(i: int):
+    return {
+        'task': f"Summarize the findings of research thread {i} for the weekly report",
+        'model': 'claude-3-sonnet',
+        'temperature': 0.2,
+        'max_tokens': 2048,
+        'context': {'history': [f"message {j}" for j in range(10)]},
+        'session_id': f"session-{i % 7}"
+    }
+
+def make_result(state):
+    return {
+        **state,
+        'reasoning_result': f"Analysis: {state['task']}",
+        'evidence': [{'source': f"doc-{j}", 'score': j / 10, 'excerpt': 'lorem ipsum ' * 20} for j in range(10)],
+        'reasoning_confidence': 0.85
+    }
+
+def bench_hits(node, states, threads: int, calls: int):
+    """Per-call hit latency (us) and aggregate calls/s with `threads` concurrent callers"""
+    per_thread = calls // threads
+    latencies = [0.0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        start = time.perf_counter()
+        for i in range(per_thread):
+            node(states[(index * 31 + i) % len(states)])
+        latencies[index] = (time.perf_counter() - start) / per_thread * 1e6
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return statistics.mean(latencies), per_thread * threads / elapsed
+
+def bench_persistence(cache, states, saves: int, updates_per_save: int):
+    """Mean seconds per save after `updates_per_save` new results"""
+    samples = []
+    for s in range(saves):
+        for i in range(updates_per_save):
+            state = states[(s * updates_per_save + i) % len(states)]
+            cache.set('reasoning_node', smart_cache_key(state), make_result(state))
+        start = time.perf_counter()
+        cache._save_cache()
+        samples.append(time.perf_counter() - start)
+    return statistics.mean(samples)
+
+def bench_herd(make_node, callers: int, keys: int = 4, node_seconds: float = 0.05):
+    """Node executions and wall time when `callers` threads miss on `keys` inputs at once"""
+    executions = [0]
+    counter_lock = threading.Lock()
+
+    def slow_node(state):
+        with counter_lock:
+            executions[0] += 1
+        time.sleep(node_seconds)  # Stands in for an LLM or research call
+        return make_result(state)
+
+    node = make_node(slow_node)
+    states = [make_state(i) for i in range(keys)]
+    barrier = threading.Barrier(callers)
+
+    def worker(index):
+        barrier.wait()
+        node(states[index % keys])
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(callers)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return executions[0], time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="IntelligentCache cached_node benchmark")
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--saves", type=int, default=20)
+    parser.add_argument("--updates-per-save", type=int, default=10)
+    parser.add_argument("--herd", type=int, default=32, help="concurrent callers in the thundering-herd run")
+    args = parser.parse_args()
+
+    states = [make_state(i) for i in range(args.entries)]
+    legacy_cache = LegacyIntelligentCache(max_size=args.entries * 2, max_memory_mb=1024)
+    current_cache = IntelligentCache(max_size=args.entries * 2, max_memory_mb=1024)
+
+    @legacy_cached_node(legacy_cache, ttl=1800, cache_key_fn=smart_cache_key)
+    def legacy_node(state):
+        return make_result(state)
+
+    @cached_node(ttl=1800, cache_key_fn=smart_cache_key, cache=current_cache, verbose=False)
+    def current_node(state):
+        return make_result(state)
+
+    # Warm both caches so every benchmarked call is a hit
+    for state in states:
+        legacy_node(state)
+        current_node(state)
+
+    print(f"cached_node hit overhead ({args.entries} entries, {args.calls} calls per run)")
+    print(f"  {'threads':>7} {'legacy us/call':>15} {'current us/call':>16} {'legacy calls/s':>15} "
+          f"{'current calls/s':>16} {'speedup':>8}")
+    for threads in args.threads:
+        legacy_us, legacy_rate = bench_hits(legacy_node, states, threads, args.calls)
+        current_us, current_rate = bench_hits(current_node, states, threads, args.calls)
+        print(f"  {threads:>7} {legacy_us:>15.1f} {current_us:>16.1f} {legacy_rate:>15.0f} "
+              f"{current_rate:>16.0f} {current_rate / legacy_rate:>7.2f}x")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        legacy_cache.persistence_path = os.path.join(cache_dir, 'legacy.pkl')
+        journaled = IntelligentCache(max_size=args.entries * 2, max_memory_mb=1024,
+                                     persistence_path=os.path.join(cache_dir, 'journal.pkl'))
+        for state in states:
+            journaled.set('reasoning_node', smart_cache_key(state), make_result(state))
+        journaled._save_cache()
+
+        legacy_save = bench_persistence(legacy_cache, states, args.saves, args.updates_per_save)
+        current_save = bench_persistence(journaled, states, args.saves, args.updates_per_save)
+
+        reloaded = IntelligentCache(max_size=args.entries * 2, max_memory_mb=1024,
+                                    persistence_path=os.path.join(cache_dir, 'journal.pkl'))
+        assert len(reloaded) == len(journaled), "journal replay lost entries"
+
+    print(f"\npersistence ({args.updates_per_save} updates between saves, {args.entries} cached results)")
+    print(f"  legacy full snapshot   {legacy_save * 1000:>9.2f} ms/save")
+    print(f"  current journal flush  {current_save * 1000:>9.2f} ms/save")
+    print(f"  speedup                {legacy_save / current_save:>9.2f}x")
+
+    legacy_runs, legacy_time = bench_herd(
+        lambda fn: legacy_cached_node(LegacyIntelligentCache(), cache_key_fn=smart_cache_key)(fn), args.herd)
+    current_runs, current_time = bench_herd(
+        lambda fn: cached_node(cache_key_fn=smart_cache_key, cache=IntelligentCache(), verbose=False)(fn), args.herd)
+
+    print(f"\nthundering herd ({args.herd} concurrent callers, 4 distinct inputs, 50 ms node)")
+    print(f"  legacy   {legacy_runs:>4} node executions in {legacy_time * 1000:>7.1f} ms")
+    print(f"  current  {current_runs:>4} node executions in {current_time * 1000:>7.1f} ms")
+
+if __name__ == "__main__":
+    main()
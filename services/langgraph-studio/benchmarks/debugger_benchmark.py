@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for RealtimeDebugger node instrumentation
+
+Runs a wrapped async node in a loop and reports the per-call overhead of
+the debugger wrapper over the bare node, for the current tracing mode and
+a reference of the previous one (three shallow state copies per call,
+list.pop(0) trimming, json.dumps(asdict(event)) and one broadcast task per
+event awaiting each client in turn). Connected clients are simulated with
+in-process fakes, so the websockets server itself is not involved.
+
+Usage:
+    python benchmarks/debugger_benchmark.py [--calls 20000] [--clients 0 4]
+        [--state-keys 40]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from studio.realtime_debugger import DebugEvent, RealtimeDebugger, _DebugClient
+
+class LegacyRealtimeDebugger(RealtimeDebugger):
+    """Reference of the previous hot paths, for comparison only"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.events_buffer = []
+        self.legacy_clients = set()
+
+    def log_event(self, event):
+        self.events_buffer.append(event)
+        if len(self.events_buffer) > self.max_buffer_size:
+            self.events_buffer.pop(0)
+        session_state = self.session_states.setdefault(event.session_id, {
+            "start_time": event.timestamp, "current_node": None, "nodes_visited": [],
+            "total_duration": 0, "error_count": 0
+        })
+        if event.event_type == "node_enter":
+            session_state["current_node"] = event.node_name
+            session_state["nodes_visited"].append(event.node_name)
+        elif event.event_type == "node_exit" and event.duration_ms:
+            session_state["total_duration"] += event.duration_ms
+        asyncio.create_task(self._broadcast_event(event))
+
+    async def _broadcast_event(self, event):
+        if not self.legacy_clients:
+            return
+        message = json.dumps(asdict(event))
+        for client in self.legacy_clients:
+            await client.send(message)
+
+    def create_node_wrapper(self, node_name, original_func):
+        async def wrapped_node(state, **kwargs):
+            session_id = state.get("session_id", "unknown")
+            start_time = time.time()
+            self.log_event(DebugEvent(datetime.now().isoformat(), session_id, "node_enter", node_name,
+                                      state.copy(), {}, {"kwargs": kwargs}))
+            result = await original_func(state, **kwargs)
+            self.log_event(DebugEvent(datetime.now().isoformat(), session_id, "node_exit", node_name,
+                                      state.copy(), result.copy(), {"success": True},
+                                      duration_ms=(time.time() - start_time) * 1000))
+            return result
+        return wrapped_node
+
+class FakeClient:
+    """Stand-in for a websocket client"""
+    remote_address = ("127.0.0.1", 0)
+
+    def __init__(self):
+        self.messages = 0
+
+    async def send(self, message):
+        self.messages += 1
+
+def make_state(keys: int):
+    state = {"session_id": "bench-session", "task": "Summarize the quarterly research findings"}
+    for i in range(keys):
+        state[f"field_{i}"] = {"values": list(range(20)), "label": f"value {i}"}
+    return state
+
+async def node(state):
+    # Partial update, as LangGraph nodes usually return
+    return {"step": state.get("step", 0) + 1, "reasoning": "done"}
+
+async def time_calls(func, state, calls: int, flush=None) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await func(state)
+    # Let pending broadcast work finish so its cost is counted
+    if flush is not None:
+        await flush()
+    await asyncio.sleep(0)
+    pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    while any(not t.done() for t in pending if not getattr(t, "_bench_daemon", False)):
+        await asyncio.sleep(0)
+    return (time.perf_counter() - start) / calls * 1e6
+
+async def run_current(state, calls: int, clients: int, **kwargs) -> float:
+    debugger = RealtimeDebugger(**kwargs)
+    senders = []
+    for _ in range(clients):
+        fake = FakeClient()
+        client = _DebugClient(websocket=fake, queue=asyncio.Queue(maxsize=debugger.client_queue_size))
+        debugger.clients[fake] = client
+        client.sender = asyncio.create_task(debugger._client_sender(client))
+        client.sender._bench_daemon = True
+        senders.append(client.sender)
+
+    async def broadcaster():
+        while True:
+            await asyncio.sleep(debugger.broadcast_interval)
+            debugger._broadcast_pending()
+
+    loop_task = asyncio.create_task(broadcaster())
+    loop_task._bench_daemon = True
+
+    async def flush():
+        debugger._broadcast_pending()
+        while any(not client.queue.empty() for client in debugger.clients.values()):
+            await asyncio.sleep(0)
+
+    wrapped = debugger.create_node_wrapper("reasoning", node)
+    elapsed = await time_calls(wrapped, state, calls, flush)
+
+    for task in senders + [loop_task]:
+        task.cancel()
+    return elapsed
+
+async def run_legacy(state, calls: int, clients: int) -> float:
+    debugger = LegacyRealtimeDebugger()
+    debugger.legacy_clients = {FakeClient() for _ in range(clients)}
+    wrapped = debugger.create_node_wrapper("reasoning", node)
+    return await time_calls(wrapped, state, calls)
+
+async def main_async(args):
+    state = make_state(args.state_keys)
+    bare = await time_calls(node, state, args.calls)
+    print(f"bare node: {bare:.2f} us/call ({args.state_keys + 2} state keys)")
+
+    print(f"\n  {'clients':>7} {'mode':<32} {'us/call':>9} {'overhead us':>12}")
+    for clients in args.clients:
+        rows = [
+            ("legacy", await run_legacy(state, args.calls, clients)),
+            ("current, diff capture", await run_current(state, args.calls, clients)),
+            ("current, no state capture", await run_current(state, args.calls, clients, state_capture="none")),
+            ("current, 10% session sampling", await run_current(state, args.calls, clients, session_sample_rate=0.1)),
+        ]
+        for label, value in rows:
+            print(f"  {clients:>7} {label:<32} {value:>9.2f} {value - bare:>12.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="RealtimeDebugger instrumentation benchmark")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--state-keys", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
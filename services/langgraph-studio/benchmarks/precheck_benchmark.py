@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark for the conditional prechecker
+
+Measures the per-state cost of the reasoning, research and building
+prechecks with the text analysis cache disabled (every call re-runs the
+pattern, keyword and entity scans) and enabled, on a workload where states
+repeat the way retries and fan-out branches do. Also times precheck_batch
+against per-state calls and the research similarity lookup as the index of
+remembered queries grows, with and without the cache-hit threshold used to
+prune candidates.
+
+Usage:
+    python benchmarks/precheck_benchmark.py [--distinct 200] [--repeats 10]
+        [--indexed 100 1000 10000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.conditional_precheck import ConditionalPrechecker
+
+WORDS = (
+    "analyze compare evaluate the impact of artificial intelligence on global supply chains "
+    "then create a comprehensive report with landing page and dashboard for Acme Corp in "
+    "Paris using \"Deep Learning\" models what is current latest news stock price research"
+).split()
+
+def make_states(distinct: int, repeats: int, seed: int = 7):
+    rng = random.Random(seed)
+    texts = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 40))) for _ in range(distinct)]
+    states = [{'task': text, 'query': text, 'project_type': 'web', 'requirements': ['auth', 'api']}
+              for text in texts for _ in range(repeats)]
+    rng.shuffle(states)
+    return states
+
+def bench_calls(prechecker: ConditionalPrechecker, states, node_type: str) -> float:
+    start = time.perf_counter()
+    for state in states:
+        prechecker.precheck(state, node_type)
+    return (time.perf_counter() - start) / len(states)
+
+def bench_batch(prechecker: ConditionalPrechecker, states, node_type: str) -> float:
+    start = time.perf_counter()
+    prechecker.precheck_batch(states, node_type)
+    return (time.perf_counter() - start) / len(states)
+
+def bench_research_index(indexed: int, lookups: int = 2000) -> Tuple[float, float]:
+    rng = random.Random(indexed)
+    syllables = ['ka', 'lo', 'mi', 'ren', 'to', 'sa', 'vu', 'der', 'qui', 'no', 'bel', 'tra']
+    topics = [''.join(rng.choice(syllables) for _ in range(3)) for _ in range(5000)]
+
+    def make_query():
+        return ' '.join(rng.choice(WORDS) if rng.random() < 0.3 else rng.choice(topics)
+                        for _ in range(rng.randint(4, 12)))
+
+    prechecker = ConditionalPrechecker()
+    remembered = [make_query() for _ in range(indexed)]
+    for query in remembered:
+        prechecker.remember_research(query, {'research_results': query})
+    # Half the lookups are rephrasings of remembered queries, half are new topics
+    queries = [rng.choice(remembered) + ' ' + rng.choice(topics) if i % 2 else make_query()
+               for i in range(lookups)]
+
+    index = prechecker.research_index
+    start = time.perf_counter()
+    for query in queries:
+        index.lookup(query)
+    full_scan = (time.perf_counter() - start) / lookups
+
+    threshold = prechecker.cost_thresholds['cache_hit_threshold']
+    start = time.perf_counter()
+    for query in queries:
+        index.lookup(query, threshold)
+    pruned = (time.perf_counter() - start) / lookups
+    return full_scan, pruned
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--distinct', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--indexed', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    states = make_states(args.distinct, args.repeats)
+    print(f"prechecks ({len(states)} states, {args.distinct} distinct texts)")
+    for node_type in ('reasoning', 'research', 'building'):
+        cold = bench_calls(ConditionalPrechecker(analysis_cache_size=0), states, node_type)
+        memoized = bench_calls(ConditionalPrechecker(), states, node_type)
+        batched = bench_batch(ConditionalPrechecker(), states, node_type)
+        print(f"  {node_type:<10} uncached {cold * 1e6:>8.1f} us   memoized {memoized * 1e6:>8.1f} us"
+              f"   batch {batched * 1e6:>8.1f} us   speedup {cold / memoized:>5.2f}x")
+
+    print("\nresearch similarity lookup")
+    for indexed in args.indexed:
+        full_scan, pruned = bench_research_index(indexed)
+        print(f"  {indexed:>6} remembered queries  all overlaps {full_scan * 1e6:>8.1f} us"
+              f"   above threshold {pruned * 1e6:>8.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,55 @@
 """
 Real-time Debugger for LangGraph Studio
 Proporciona debugging visual en tiempo real y monitoreo de sesiones
+
+Trazado de bajo coste en los wrappers de nodos:
+- Buffer circular preasignado (append O(1), sin list.pop(0))
+- Diffs de estado solo con las claves que cambian (comparación por identidad)
+- Muestreo por sesión y por nodo (los errores se registran siempre)
+- Broadcast por lotes: cada lote se serializa una vez y se reparte en
+  paralelo a colas por cliente, con política para clientes lentos
 """
 
 import asyncio
 import json
 import logging
+import random
+import threading
 import time
+import zlib
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Callable
-from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
 import websockets
-import threading
-from dataclasses import dataclass, asdict
 
 logger = logging.getLogger(__name__)
 
+STATE_CAPTURE_MODES = ("diff", "full", "none")
+SLOW_CLIENT_POLICIES = ("drop_oldest", "disconnect")
+
+_MISSING = object()
+
+def compute_state_diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Claves nuevas o reasignadas y claves eliminadas
+
+    Los nodos de LangGraph suelen devolver actualizaciones parciales que se
+    fusionan con el estado, así que las claves ausentes solo se reportan como
+    eliminadas cuando el resultado es un estado completo (conserva la mayoría
+    de las claves de entrada). La comparación es por identidad: un valor
+    mutado en sitio (p. ej. messages.append) no aparece como cambiado.
+    """
+    changed = {}
+    carried = 0
+    for key, value in after.items():
+        if before.get(key, _MISSING) is value:
+            carried += 1
+        else:
+            changed[key] = value
+    full_state = carried * 2 > len(before)
+    removed = [key for key in before if key not in after] if full_state and carried < len(before) else []
+    return {"changed": changed, "removed": removed}
+
 @dataclass
 class DebugEvent:
     """Evento de debugging"""
@@ -28,18 +62,141 @@ class DebugEvent:
     metadata: Dict[str, Any]
     duration_ms: Optional[float] = None
     error: Optional[str] = None
+    state_diff: Optional[Dict[str, Any]] = None  # {"changed": {...}, "removed": [...]}
+    # (antes, después) como copias superficiales; el diff se calcula al leerlo
+    diff_source: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = field(default=None, repr=False, compare=False)
+
+    def resolve_state_diff(self) -> Optional[Dict[str, Any]]:
+        """Calcula el diff pendiente fuera de la ruta caliente del nodo"""
+        if self.diff_source is not None:
+            self.state_diff = compute_state_diff(*self.diff_source)
+            self.diff_source = None
+        return self.state_diff
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict serializable sin la copia profunda de asdict"""
+        self.resolve_state_diff()
+        data = {
+            "timestamp": self.timestamp,
+            "session_id": self.session_id,
+            "event_type": self.event_type,
+            "node_name": self.node_name,
+            "state_before": self.state_before,
+            "state_after": self.state_after,
+            "metadata": self.metadata,
+            "duration_ms": self.duration_ms,
+            "error": self.error
+        }
+        if self.state_diff is not None:
+            data["state_diff"] = self.state_diff
+        return data
+
+class EventRingBuffer:
+    """Buffer circular preasignado de eventos con número de secuencia"""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._slots: List[Optional[DebugEvent]] = [None] * capacity
+        self._lock = threading.Lock()
+        self.total = 0  # Eventos escritos desde el inicio (secuencia del siguiente)
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def append(self, event: DebugEvent):
+        with self._lock:
+            self._slots[self.total % self.capacity] = event
+            self.total += 1
+
+    def since(self, sequence: int) -> Tuple[List[DebugEvent], int, int]:
+        """Eventos con secuencia >= sequence: (eventos, siguiente secuencia, perdidos)"""
+        with self._lock:
+            end = self.total
+            start = max(sequence, end - self.capacity)
+            events = [self._slots[i % self.capacity] for i in range(start, end)]
+        return events, end, start - sequence
+
+    def latest(self, count: int) -> List[DebugEvent]:
+        """Últimos `count` eventos, del más antiguo al más reciente"""
+        return self.since(max(0, self.total - count))[0]
+
+    def __iter__(self) -> Iterator[DebugEvent]:
+        return iter(self.since(0)[0])
+
+@dataclass
+class _DebugClient:
+    """Cliente WebSocket con su cola de lotes pendientes"""
+    websocket: Any
+    queue: asyncio.Queue
+    dropped: int = 0
+    sender: Optional[asyncio.Task] = field(default=None, repr=False)
 
 class RealtimeDebugger:
     """Debugger en tiempo real para LangGraph Studio"""
     
-    def __init__(self, port: int = 8124):
+    def __init__(self,
+                 port: int = 8124,
+                 max_buffer_size: int = 1000,
+                 state_capture: str = "diff",
+                 session_sample_rate: float = 1.0,
+                 node_sample_rates: Optional[Dict[str, float]] = None,
+                 broadcast_interval: float = 0.05,
+                 client_queue_size: int = 100,
+                 slow_client_policy: str = "drop_oldest",
+                 send_timeout: float = 1.0):
+        if state_capture not in STATE_CAPTURE_MODES:
+            raise ValueError(f"state_capture must be one of {STATE_CAPTURE_MODES}")
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"slow_client_policy must be one of {SLOW_CLIENT_POLICIES}")
+
         self.port = port
-        self.clients = set()
-        self.events_buffer = []
-        self.max_buffer_size = 1000
+        self.clients: Dict[Any, _DebugClient] = {}
+        self.max_buffer_size = max_buffer_size
+        self.events_buffer = EventRingBuffer(max_buffer_size)
         self.session_states = {}
         self.node_timings = {}
         self.is_running = False
+
+        # Captura de estado y muestreo
+        self.state_capture = state_capture
+        self.session_sample_rate = session_sample_rate
+        self.node_sample_rates: Dict[str, float] = dict(node_sample_rates or {})
+
+        # Broadcast
+        self.broadcast_interval = broadcast_interval
+        self.client_queue_size = client_queue_size
+        self.slow_client_policy = slow_client_policy
+        self.send_timeout = send_timeout
+        self._broadcast_sequence = 0
+
+        self.trace_stats = {
+            "events_logged": 0,
+            "node_calls_sampled_out": 0,
+            "batches_broadcast": 0,
+            "events_missed_by_broadcast": 0,
+            "batches_dropped": 0,
+            "clients_dropped": 0
+        }
+
+    def configure_sampling(self,
+                           session_sample_rate: Optional[float] = None,
+                           node_sample_rates: Optional[Dict[str, float]] = None):
+        """Ajusta el muestreo por sesión y por nodo en caliente"""
+        if session_sample_rate is not None:
+            self.session_sample_rate = session_sample_rate
+        if node_sample_rates is not None:
+            self.node_sample_rates.update(node_sample_rates)
+
+    def _is_session_sampled(self, session_id: Any) -> bool:
+        """Decisión determinista y estable por sesión (hash del id, sin cache: crc32 es barato)"""
+        rate = self.session_sample_rate
+        return rate >= 1.0 or (zlib.crc32(str(session_id).encode()) / 0xFFFFFFFF) < rate
+
+    def _should_trace(self, session_id: str, node_name: str) -> bool:
+        if not self._is_session_sampled(session_id):
+            return False
+        rate = self.node_sample_rates.get(node_name, 1.0)
+        return rate >= 1.0 or random.random() < rate
         
     async def start_server(self):
         """Inicia el servidor WebSocket para debugging"""
@@ -47,28 +204,38 @@ class RealtimeDebugger:
         logger.info(f"Starting realtime debugger on port {self.port}")
         
         async def handle_client(websocket, path):
-            self.clients.add(websocket)
+            client = _DebugClient(websocket=websocket, queue=asyncio.Queue(maxsize=self.client_queue_size))
             logger.info(f"Debug client connected: {websocket.remote_address}")
             
             try:
-                # Enviar eventos del buffer al cliente nuevo
-                for event in self.events_buffer[-50:]:  # Últimos 50 eventos
-                    await websocket.send(json.dumps(asdict(event)))
+                # Enviar eventos del buffer al cliente nuevo en un solo lote
+                backlog = self.events_buffer.latest(50)  # Últimos 50 eventos
+                if backlog:
+                    await websocket.send(self._serialize_batch(backlog))
+
+                self.clients[websocket] = client
+                client.sender = asyncio.create_task(self._client_sender(client))
                 
                 # Mantener conexión activa
                 await websocket.wait_closed()
             except websockets.exceptions.ConnectionClosed:
                 pass
             finally:
-                self.clients.discard(websocket)
+                self.clients.pop(websocket, None)
+                if client.sender is not None:
+                    client.sender.cancel()
                 logger.info(f"Debug client disconnected")
         
         start_server = websockets.serve(handle_client, "0.0.0.0", self.port)
         await start_server
         
-        # Mantener servidor corriendo
+        # Los eventos ya emitidos no se retransmiten a los clientes nuevos por el broadcast
+        self._broadcast_sequence = self.events_buffer.total
+
+        # Mantener servidor corriendo y emitir lotes
         while self.is_running:
-            await asyncio.sleep(1)
+            await asyncio.sleep(self.broadcast_interval)
+            self._broadcast_pending()
     
     def start_background_server(self):
         """Inicia servidor en background thread"""
@@ -83,14 +250,14 @@ class RealtimeDebugger:
     
     def log_event(self, event: DebugEvent):
         """Registra un evento de debugging"""
-        # Agregar al buffer
+        # Agregar al buffer (el broadcast lo recoge en el siguiente lote)
         self.events_buffer.append(event)
-        if len(self.events_buffer) > self.max_buffer_size:
-            self.events_buffer.pop(0)
+        self.trace_stats["events_logged"] += 1
         
         # Actualizar estado de sesión
-        if event.session_id not in self.session_states:
-            self.session_states[event.session_id] = {
+        session_state = self.session_states.get(event.session_id)
+        if session_state is None:
+            session_state = self.session_states[event.session_id] = {
                 "start_time": event.timestamp,
                 "current_node": None,
                 "nodes_visited": [],
@@ -98,8 +265,6 @@ class RealtimeDebugger:
                 "error_count": 0
             }
         
-        session_state = self.session_states[event.session_id]
-        
         if event.event_type == "node_enter":
             session_state["current_node"] = event.node_name
             session_state["nodes_visited"].append(event.node_name)
@@ -111,87 +276,155 @@ class RealtimeDebugger:
         elif event.event_type == "error":
             session_state["error_count"] += 1
         
-        # Enviar a clientes conectados
-        asyncio.create_task(self._broadcast_event(event))
+    def _serialize_batch(self, events: List[DebugEvent]) -> str:
+        """Serializa un lote de eventos una sola vez para todos los clientes"""
+        return json.dumps([event.to_dict() for event in events], default=str)
     
-    async def _broadcast_event(self, event: DebugEvent):
-        """Envía evento a todos los clientes conectados"""
-        if not self.clients:
+    def _broadcast_pending(self):
+        """Encola en cada cliente los eventos nuevos desde el último lote"""
+        events, self._broadcast_sequence, missed = self.events_buffer.since(self._broadcast_sequence)
+        if missed:
+            self.trace_stats["events_missed_by_broadcast"] += missed
+        if not events or not self.clients:
             return
         
-        message = json.dumps(asdict(event))
-        disconnected = set()
+        message = self._serialize_batch(events)
+        self.trace_stats["batches_broadcast"] += 1
         
-        for client in self.clients:
+        for client in list(self.clients.values()):
+            try:
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._handle_slow_client(client, message)
+
+    def _handle_slow_client(self, client: _DebugClient, message: str):
+        """Aplica la política para clientes que no vacían su cola"""
+        if self.slow_client_policy == "disconnect":
+            self._drop_client(client, "send queue full")
+            return
+
+        # drop_oldest: descartar el lote más antiguo y encolar el nuevo
+        try:
+            client.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        client.queue.put_nowait(message)
+        client.dropped += 1
+        self.trace_stats["batches_dropped"] += 1
+
+    def _drop_client(self, client: _DebugClient, reason: str):
+        if self.clients.pop(client.websocket, None) is None:
+            return
+        self.trace_stats["clients_dropped"] += 1
+        logger.warning(f"Dropping slow debug client {getattr(client.websocket, 'remote_address', '')}: {reason}")
+        if client.sender is not None:
+            client.sender.cancel()
+        asyncio.ensure_future(client.websocket.close())
+
+    async def _client_sender(self, client: _DebugClient):
+        """Envía los lotes de un cliente; cada cliente avanza de forma independiente"""
+        while True:
+            message = await client.queue.get()
             try:
-                await client.send(message)
+                await asyncio.wait_for(client.websocket.send(message), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._drop_client(client, f"send exceeded {self.send_timeout}s")
+                return
             except websockets.exceptions.ConnectionClosed:
-                disconnected.add(client)
-        
-        # Limpiar clientes desconectados
-        self.clients -= disconnected
+                self.clients.pop(client.websocket, None)
+                return
     
     def create_node_wrapper(self, node_name: str, original_func: Callable):
         """Crea wrapper para nodo que registra eventos de debugging"""
+        is_async = asyncio.iscoroutinefunction(original_func)
         
         async def wrapped_node(state: Dict[str, Any], **kwargs) -> Dict[str, Any]:
             session_id = state.get("session_id", "unknown")
-            start_time = time.time()
-            timestamp = datetime.now().isoformat()
+            traced = self._should_trace(session_id, node_name)
+            if not traced:
+                self.trace_stats["node_calls_sampled_out"] += 1
             
-            # Evento de entrada al nodo
-            enter_event = DebugEvent(
-                timestamp=timestamp,
-                session_id=session_id,
-                event_type="node_enter",
-                node_name=node_name,
-                state_before=state.copy(),
-                state_after={},
-                metadata={"kwargs": kwargs}
-            )
-            self.log_event(enter_event)
+            capture = self.state_capture
+            before = None
+            if traced and capture != "none":
+                # Copia superficial: referencias a los valores, no a su contenido
+                before = dict(state)
+            full_before = before if capture == "full" and before is not None else {}
+
+            start_time = time.perf_counter()
+
+            if traced:
+                # Evento de entrada al nodo
+                self.log_event(DebugEvent(
+                    timestamp=datetime.now().isoformat(),
+                    session_id=session_id,
+                    event_type="node_enter",
+                    node_name=node_name,
+                    state_before=full_before,
+                    state_after={},
+                    metadata={"kwargs": kwargs}
+                ))
             
             try:
                 # Ejecutar nodo original
-                if asyncio.iscoroutinefunction(original_func):
+                if is_async:
                     result = await original_func(state, **kwargs)
                 else:
                     result = original_func(state, **kwargs)
                 
-                # Calcular duración
-                duration_ms = (time.time() - start_time) * 1000
-                
-                # Evento de salida del nodo
-                exit_event = DebugEvent(
-                    timestamp=datetime.now().isoformat(),
-                    session_id=session_id,
-                    event_type="node_exit",
-                    node_name=node_name,
-                    state_before=state.copy(),
-                    state_after=result.copy() if isinstance(result, dict) else {},
-                    metadata={"success": True},
-                    duration_ms=duration_ms
-                )
-                self.log_event(exit_event)
-                
-                return result
-                
             except Exception as e:
-                # Evento de error
-                error_event = DebugEvent(
+                # Evento de error (se registra aunque la llamada no esté muestreada)
+                self.log_event(DebugEvent(
                     timestamp=datetime.now().isoformat(),
                     session_id=session_id,
                     event_type="error",
                     node_name=node_name,
-                    state_before=state.copy(),
+                    state_before=full_before,
                     state_after={},
                     metadata={"error_type": type(e).__name__},
+                    duration_ms=(time.perf_counter() - start_time) * 1000,
                     error=str(e)
-                )
-                self.log_event(error_event)
+                ))
                 raise
+
+            if traced:
+                # Calcular duración
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                
+                # Evento de salida del nodo
+                self.log_event(DebugEvent(
+                    timestamp=datetime.now().isoformat(),
+                    session_id=session_id,
+                    event_type="node_exit",
+                    node_name=node_name,
+                    state_before=full_before,
+                    state_after=dict(result) if capture == "full" and isinstance(result, dict) else {},
+                    metadata={"success": True},
+                    duration_ms=duration_ms,
+                    diff_source=(before, dict(result)) if capture == "diff" and isinstance(result, dict) else None
+                ))
+                
+            return result
         
         return wrapped_node
+
+    def get_trace_stats(self) -> Dict[str, Any]:
+        """Estadísticas del trazado y del broadcast"""
+        return {
+            **self.trace_stats,
+            "buffered_events": len(self.events_buffer),
+            "buffer_capacity": self.events_buffer.capacity,
+            "state_capture": self.state_capture,
+            "session_sample_rate": self.session_sample_rate,
+            "node_sample_rates": dict(self.node_sample_rates),
+            "clients": {
+                str(getattr(client.websocket, "remote_address", "")): {
+                    "queued_batches": client.queue.qsize(),
+                    "dropped_batches": client.dropped
+                }
+                for client in list(self.clients.values())
+            }
+        }
     
     def get_session_summary(self, session_id: str) -> Dict[str, Any]:
         """Obtiene resumen de una sesión"""
@@ -256,7 +489,7 @@ class RealtimeDebugger:
     def export_session_trace(self, session_id: str, format: str = "json") -> str:
         """Exporta traza de sesión en formato especificado"""
         summary = self.get_session_summary(session_id)
-        events = [asdict(e) for e in self.events_buffer if e.session_id == session_id]
+        events = [e.to_dict() for e in self.events_buffer if e.session_id == session_id]
         
         trace_data = {
             "session_summary": summary,
@@ -266,11 +499,11 @@ class RealtimeDebugger:
         }
         
         if format == "json":
-            return json.dumps(trace_data, indent=2)
+            return json.dumps(trace_data, indent=2, default=str)
         elif format == "mermaid":
             return self._generate_mermaid_trace(events)
         else:
-            return json.dumps(trace_data, indent=2)
+            return json.dumps(trace_data, indent=2, default=str)
     
     def _generate_mermaid_trace(self, events: List[Dict[str, Any]]) -> str:
         """Genera diagrama Mermaid de la traza"""
@@ -5,10 +5,42 @@ Intelligent filtering before expensive operations
 
 import time
 import re
+from collections import Counter, OrderedDict
 from typing import Dict, Any, Optional, List, Callable, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import hashlib
+import math
+
+# Pattern categories checked by _check_patterns, in priority order; anchored
+# categories only match at the start of the text (re.match semantics)
+PATTERN_PRIORITY = (
+    ('high_confidence_skip', True),
+    ('simple_queries', True),
+    ('cached_patterns', False)
+)
+
+COMPLEX_KEYWORDS = (
+    'analyze', 'comprehensive', 'detailed', 'complex', 'multiple',
+    'integrate', 'optimize', 'advanced', 'sophisticated', 'elaborate'
+)
+MULTI_STEP_WORDS = ('first', 'then', 'next', 'finally', 'step')
+RESEARCH_KEYWORDS = ('compare', 'analyze', 'evaluate')
+BUILD_KEYWORDS = ('full', 'complete', 'comprehensive')
+
+# Capitalized words, quoted strings and URLs (matched independently, as they may overlap)
+ENTITY_PATTERNS = (
+    re.compile(r'\b[A-Z][a-z]+\b'),
+    re.compile(r'"([^"]*)"'),
+    re.compile(r'https?://[^\s]+')
+)
+TOKEN_PATTERN = re.compile(r'\w+')
+
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is',
+    'it', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'what', 'when', 'where', 'which',
+    'who', 'why', 'with'
+])
 
 class ConfidenceLevel(Enum):
     """Confidence levels for precheck decisions"""
@@ -37,17 +69,216 @@ class PrecheckResult:
     alternative_path: Optional[str] = None
     metadata: Dict[str, Any] = None
 
+@dataclass
+class TextFeatures:
+    """Text-only analysis shared by all prechecks of the same text"""
+    lower: str
+    length: int
+    word_count: int
+    pattern_match: Optional[Tuple[str, str]]  # (category, pattern)
+    complex_keyword_count: int
+    multi_step: bool
+    research_keywords: bool
+    build_keywords: bool
+    entities: Tuple[str, ...]
+
+class ResearchSimilarityIndex:
+    """
+    Inverted index over past research queries and the results they produced
+
+    Similarity is the cosine between binary bags of content words; only
+    queries sharing at least one word with the probe are scored. Exact
+    repeats (after lowercasing and whitespace normalization) score 1.0.
+    With a minimum score, candidates are drawn from the rarest words only
+    (a match must share at least min_score**2 of the probe's words).
+    Entries expire ttl_seconds after they were last added.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, frozenset]" = OrderedDict()  # normalized query -> tokens, oldest first
+        self._results: Dict[str, Dict[str, Any]] = {}  # normalized query -> research output
+        self._added_at: Dict[str, float] = {}
+        self._postings: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        self._evict_expired()
+        return len(self._entries)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return ' '.join(query.lower().split())
+
+    @staticmethod
+    def tokenize(normalized: str) -> frozenset:
+        return frozenset(t for t in TOKEN_PATTERN.findall(normalized) if t not in STOPWORDS)
+
+    def add(self, query: str, result: Dict[str, Any]):
+        self._evict_expired()
+        normalized = self.normalize(query)
+        self._results[normalized] = result
+        self._added_at[normalized] = time.monotonic()
+        if normalized in self._entries:
+            self._entries.move_to_end(normalized)
+            return
+
+        tokens = self.tokenize(normalized)
+        self._entries[normalized] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(normalized)
+
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        evicted, evicted_tokens = self._entries.popitem(last=False)
+        del self._results[evicted]
+        del self._added_at[evicted]
+        for token in evicted_tokens:
+            posting = self._postings[token]
+            posting.discard(evicted)
+            if not posting:
+                del self._postings[token]
+
+    def _evict_expired(self):
+        # Entries are kept in add order, so expired ones are always at the front
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._entries and self._added_at[next(iter(self._entries))] <= cutoff:
+            self._evict_oldest()
+
+    def get(self, cached_query: str) -> Optional[Dict[str, Any]]:
+        """Stored research output for a query returned by lookup()"""
+        self._evict_expired()
+        return self._results.get(cached_query)
+
+    def lookup(self, query: str, min_score: float = 0.0) -> Tuple[float, Optional[str]]:
+        """Best (similarity, cached query) for a query, (0.0, None) if nothing reaches min_score"""
+        self._evict_expired()
+        normalized = self.normalize(query)
+        if normalized in self._entries:
+            return 1.0, normalized
+
+        tokens = self.tokenize(normalized)
+        if not tokens:
+            return 0.0, None
+
+        postings = [self._postings.get(token, ()) for token in tokens]
+        if min_score <= 0.0:
+            overlaps = Counter()
+            for posting in postings:
+                overlaps.update(posting)
+        else:
+            # Prefix filter: scan only the rarest postings, then score candidates exactly
+            min_shared = math.ceil(min_score * min_score * len(tokens) - 1e-9)
+            postings.sort(key=len)
+            candidates = set()
+            for posting in postings[:len(tokens) - min_shared + 1]:
+                candidates.update(posting)
+            overlaps = {candidate: len(tokens & self._entries[candidate]) for candidate in candidates}
+        if not overlaps:
+            return 0.0, None
+
+        best_query, best_score = None, 0.0
+        for candidate, shared in overlaps.items():
+            score = shared / math.sqrt(len(tokens) * len(self._entries[candidate]))
+            if score > best_score:
+                best_query, best_score = candidate, score
+        if best_score < min_score:
+            return 0.0, None
+        return best_score, best_query
+
 class ConditionalPrechecker:
     """
     Intelligent precheck system for LangGraph nodes
     Analyzes inputs to determine if expensive operations are worthwhile
     """
     
-    def __init__(self):
+    def __init__(self, analysis_cache_size: int = 4096):
         self.patterns = self._load_patterns()
         self.cost_thresholds = self._load_cost_thresholds()
         self.entity_cache = {}
         self.decision_history = []
+        self.research_index = ResearchSimilarityIndex()
+        
+        # Memoized text analysis, keyed by a digest of the text
+        self.analysis_cache_size = analysis_cache_size
+        self._analysis_cache: "OrderedDict[bytes, TextFeatures]" = OrderedDict()
+        self.analysis_stats = {'hits': 0, 'misses': 0}
+        self._batch_features: Optional[Dict[bytes, TextFeatures]] = None  # Pinned during precheck_batch
+        self.compile_patterns()
+        
+    def compile_patterns(self):
+        """Compile the precheck patterns (call again after editing self.patterns)
+
+        Anchored categories share one alternation wrapped in \\A: every
+        alternative matches at the start, so the first one in priority order
+        wins. Unanchored categories are searched pattern by pattern afterwards,
+        since an alternation would report the leftmost match instead of the
+        first pattern in list order.
+        """
+        alternatives = []
+        self._pattern_groups: Dict[str, Tuple[str, str]] = {}
+        self._unanchored_patterns: List[Tuple[str, str, re.Pattern]] = []
+        for category, anchored in PATTERN_PRIORITY:
+            for pattern in self.patterns[category]:
+                if not anchored:
+                    self._unanchored_patterns.append((category, pattern, re.compile(pattern)))
+                    continue
+                name = f"p{len(self._pattern_groups)}"
+                self._pattern_groups[name] = (category, pattern)
+                alternatives.append(f"(?P<{name}>\\A(?:{pattern}))")
+        self._pattern_regex = re.compile('|'.join(alternatives)) if alternatives else None
+        self._analysis_cache.clear()
+
+    def _match_patterns(self, text: str) -> Optional[Tuple[str, str]]:
+        """(category, pattern) of the first matching pattern in priority order"""
+        if self._pattern_regex is not None:
+            match = self._pattern_regex.search(text)
+            if match:
+                return self._pattern_groups[match.lastgroup]
+        for category, pattern, regex in self._unanchored_patterns:
+            if regex.search(text):
+                return category, pattern
+        return None
+        
+    def _features(self, text: str) -> TextFeatures:
+        """Memoized text analysis (patterns, keywords, entities)"""
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        features = self._analysis_cache.get(key)
+        if features is None and self._batch_features is not None:
+            features = self._batch_features.get(key)
+        if features is not None:
+            if key in self._analysis_cache:
+                self._analysis_cache.move_to_end(key)
+            self.analysis_stats['hits'] += 1
+            return features
+        
+        self.analysis_stats['misses'] += 1
+        lower = text.lower()
+        
+        entities = set()
+        for pattern in ENTITY_PATTERNS:
+            entities.update(pattern.findall(text))
+        
+        features = TextFeatures(
+            lower=lower,
+            length=len(text),
+            word_count=len(text.split()),
+            pattern_match=self._match_patterns(lower.strip()),
+            complex_keyword_count=sum(1 for keyword in COMPLEX_KEYWORDS if keyword in lower),
+            multi_step=any(word in lower for word in MULTI_STEP_WORDS),
+            research_keywords=any(word in lower for word in RESEARCH_KEYWORDS),
+            build_keywords=any(word in lower for word in BUILD_KEYWORDS),
+            entities=tuple(entities)
+        )
+        
+        self._analysis_cache[key] = features
+        if self._batch_features is not None:
+            self._batch_features[key] = features
+        if len(self._analysis_cache) > self.analysis_cache_size:
+            self._analysis_cache.popitem(last=False)
+        return features
         
     def _load_patterns(self) -> Dict[str, Any]:
         """Load patterns for different types of analysis"""
@@ -149,14 +380,16 @@ class ConditionalPrechecker:
             )
         
         # Check for cached research
-        cache_similarity = self._check_research_cache(query)
-        if cache_similarity > self.cost_thresholds['cache_hit_threshold']:
+        cache_threshold = self.cost_thresholds['cache_hit_threshold']
+        cache_similarity, cached_query = self.research_index.lookup(query, cache_threshold)
+        if cache_similarity > cache_threshold:
             return PrecheckResult(
                 decision=PrecheckDecision.CACHE_LOOKUP,
                 confidence=cache_similarity,
                 reasoning=f"Similar research found in cache (similarity: {cache_similarity:.2f})",
                 estimated_cost=0.01,
-                estimated_time=0.5
+                estimated_time=0.5,
+                metadata={'cached_query': cached_query}
             )
         
         # Analyze research complexity
@@ -231,70 +464,61 @@ class ConditionalPrechecker:
     
     def _check_patterns(self, text: str) -> Optional[PrecheckResult]:
         """Check text against known patterns"""
-        text_lower = text.lower().strip()
+        match = self._features(text).pattern_match
+        if match is None:
+            return None
+        category, pattern = match
         
         # Check for high-confidence skip patterns
-        for pattern in self.patterns['high_confidence_skip']:
-            if re.match(pattern, text_lower):
-                return PrecheckResult(
-                    decision=PrecheckDecision.SKIP,
-                    confidence=0.95,
-                    reasoning=f"Matched skip pattern: {pattern}",
-                    estimated_cost=0.0,
-                    estimated_time=0.0,
-                    metadata={'pattern': pattern}
-                )
+        if category == 'high_confidence_skip':
+            return PrecheckResult(
+                decision=PrecheckDecision.SKIP,
+                confidence=0.95,
+                reasoning=f"Matched skip pattern: {pattern}",
+                estimated_cost=0.0,
+                estimated_time=0.0,
+                metadata={'pattern': pattern}
+            )
         
         # Check for simple queries
-        for pattern in self.patterns['simple_queries']:
-            if re.match(pattern, text_lower):
-                return PrecheckResult(
-                    decision=PrecheckDecision.SIMPLIFIED,
-                    confidence=0.8,
-                    reasoning=f"Simple query detected: {pattern}",
-                    estimated_cost=0.02,
-                    estimated_time=2.0,
-                    alternative_path="simple_lookup",
-                    metadata={'pattern': pattern}
-                )
-        
-        # Check for cached patterns
-        for pattern in self.patterns['cached_patterns']:
-            if re.search(pattern, text_lower):
-                return PrecheckResult(
-                    decision=PrecheckDecision.CACHE_LOOKUP,
-                    confidence=0.85,
-                    reasoning=f"Cacheable pattern detected: {pattern}",
-                    estimated_cost=0.01,
-                    estimated_time=0.5,
-                    metadata={'pattern': pattern}
-                )
+        if category == 'simple_queries':
+            return PrecheckResult(
+                decision=PrecheckDecision.SIMPLIFIED,
+                confidence=0.8,
+                reasoning=f"Simple query detected: {pattern}",
+                estimated_cost=0.02,
+                estimated_time=2.0,
+                alternative_path="simple_lookup",
+                metadata={'pattern': pattern}
+            )
         
-        return None
+        # Cached patterns
+        return PrecheckResult(
+            decision=PrecheckDecision.CACHE_LOOKUP,
+            confidence=0.85,
+            reasoning=f"Cacheable pattern detected: {pattern}",
+            estimated_cost=0.01,
+            estimated_time=0.5,
+            metadata={'pattern': pattern}
+        )
     
     def _analyze_complexity(self, text: str, context: Dict[str, Any]) -> float:
         """Analyze complexity of a task/query"""
+        features = self._features(text)
         complexity_score = 0.0
         
         # Length-based complexity
-        complexity_score += min(len(text) / 1000, 0.3)
+        complexity_score += min(features.length / 1000, 0.3)
         
         # Keyword-based complexity
-        complex_keywords = [
-            'analyze', 'comprehensive', 'detailed', 'complex', 'multiple',
-            'integrate', 'optimize', 'advanced', 'sophisticated', 'elaborate'
-        ]
-        
-        for keyword in complex_keywords:
-            if keyword in text.lower():
-                complexity_score += 0.1
+        complexity_score += 0.1 * features.complex_keyword_count
         
         # Context complexity
         if context:
             complexity_score += min(len(context) / 10, 0.2)
         
         # Multi-step indicators
-        if any(word in text.lower() for word in ['first', 'then', 'next', 'finally', 'step']):
+        if features.multi_step:
             complexity_score += 0.2
         
         return min(complexity_score, 1.0)
@@ -302,21 +526,7 @@ class ConditionalPrechecker:
     def _extract_entities(self, text: str) -> List[str]:
         """Extract entities from text"""
         # Simple entity extraction (in production, use NER)
-        entities = []
-        
-        # Extract capitalized words (potential proper nouns)
-        words = re.findall(r'\b[A-Z][a-z]+\b', text)
-        entities.extend(words)
-        
-        # Extract quoted strings
-        quoted = re.findall(r'"([^"]*)"', text)
-        entities.extend(quoted)
-        
-        # Extract URLs
-        urls = re.findall(r'https?://[^\s]+', text)
-        entities.extend(urls)
-        
-        return list(set(entities))
+        return list(self._features(text).entities)
     
     def _analyze_entities(self, entities: List[str]) -> float:
         """Analyze confidence based on entities"""
@@ -353,19 +563,17 @@ class ConditionalPrechecker:
     
     def _check_research_cache(self, query: str) -> float:
         """Check similarity with cached research"""
-        # Simple similarity check (in production, use embeddings)
-        query_hash = hashlib.md5(query.lower().encode()).hexdigest()
-        
-        # Simulate cache lookup
-        if query_hash in self.entity_cache:
-            return 0.9
-        
-        # Check for similar queries (simplified)
-        for cached_query in self.entity_cache.keys():
-            if len(set(query.lower().split()) & set(cached_query.split())) > 2:
-                return 0.7
-        
-        return 0.0
+        return self.research_index.lookup(query, self.cost_thresholds['cache_hit_threshold'])[0]
+    
+    def remember_research(self, query: str, result: Dict[str, Any]):
+        """Index a researched query and its output so similar queries can reuse it"""
+        if query and query.strip():
+            self.research_index.add(query, result)
+    
+    def cached_research(self, precheck_result: PrecheckResult) -> Optional[Dict[str, Any]]:
+        """Research output behind a CACHE_LOOKUP decision, None if it is gone"""
+        cached_query = (precheck_result.metadata or {}).get('cached_query')
+        return self.research_index.get(cached_query) if cached_query else None
     
     def _analyze_research_complexity(self, query: str, research_type: str) -> float:
         """Analyze research complexity"""
@@ -381,10 +589,11 @@ class ConditionalPrechecker:
         complexity += type_complexity.get(research_type, 0.5)
         
         # Query complexity
-        if len(query.split()) > 10:
+        features = self._features(query)
+        if features.word_count > 10:
             complexity += 0.2
         
-        if any(word in query.lower() for word in ['compare', 'analyze', 'evaluate']):
+        if features.research_keywords:
             complexity += 0.3
         
         return min(complexity, 1.0)
@@ -421,7 +630,7 @@ class ConditionalPrechecker:
         complexity += min(len(requirements) / 10, 0.3)
         
         # Task complexity
-        if any(word in task.lower() for word in ['full', 'complete', 'comprehensive']):
+        if self._features(task).build_keywords:
             complexity += 0.2
         
         return min(complexity, 1.0)
@@ -435,9 +644,12 @@ class ConditionalPrechecker:
         }
         
         project_templates = templates.get(project_type, [])
+        if not project_templates:
+            return None
         
+        task_lower = self._features(task).lower
         for template in project_templates:
-            if template.replace('_', ' ') in task.lower():
+            if template.replace('_', ' ') in task_lower:
                 return template
         
         return None
@@ -501,10 +713,30 @@ class ConditionalPrechecker:
             estimated_time=estimated_time
         )
     
+    def precheck(self, state: Dict[str, Any], node_type: str = 'reasoning') -> PrecheckResult:
+        """Run the precheck for a node type (unknown types use the reasoning precheck)"""
+        if node_type == 'research':
+            return self.precheck_research(state)
+        elif node_type == 'building':
+            return self.precheck_building(state)
+        return self.precheck_reasoning(state)
+    
+    def precheck_batch(self, states: List[Dict[str, Any]], node_type: str = 'reasoning') -> List[PrecheckResult]:
+        """Precheck many queued tasks in one pass
+
+        Each distinct text is analyzed once for the whole batch, even when the
+        batch holds more distinct texts than the analysis cache.
+        """
+        self._batch_features = {}
+        try:
+            return [self.precheck(state, node_type) for state in states]
+        finally:
+            self._batch_features = None
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get precheck statistics"""
         if not self.decision_history:
-            return {'total_decisions': 0}
+            return {'total_decisions': 0, 'analysis_cache': self._analysis_cache_stats()}
         
         decisions = [d.decision for d in self.decision_history]
         decision_counts = {d.value: decisions.count(d) for d in PrecheckDecision}
@@ -514,7 +746,17 @@ class ConditionalPrechecker:
             'decision_distribution': decision_counts,
             'avg_confidence': sum(d.confidence for d in self.decision_history) / len(self.decision_history),
             'total_estimated_cost': sum(d.estimated_cost for d in self.decision_history),
-            'total_estimated_time': sum(d.estimated_time for d in self.decision_history)
+            'total_estimated_time': sum(d.estimated_time for d in self.decision_history),
+            'analysis_cache': self._analysis_cache_stats()
+        }
+    
+    def _analysis_cache_stats(self) -> Dict[str, Any]:
+        lookups = self.analysis_stats['hits'] + self.analysis_stats['misses']
+        return {
+            **self.analysis_stats,
+            'hit_rate': self.analysis_stats['hits'] / lookups if lookups else 0.0,
+            'entries': len(self._analysis_cache),
+            'research_index_entries': len(self.research_index)
         }
 
 # Global precheck instance
@@ -525,17 +767,21 @@ def precheck_node(node_type: str = 'reasoning'):
     Decorator for adding precheck to LangGraph nodes
     """
     def decorator(func: Callable) -> Callable:
+        def run(state: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
+            inputs = dict(state)
+            result = func(state, *args, **kwargs)
+            if node_type == 'research' and isinstance(result, dict):
+                # Keep only what the node produced, not the caller's session state
+                produced = {
+                    key: value for key, value in result.items()
+                    if key != 'precheck_result' and (key not in inputs or inputs[key] is not value)
+                }
+                _global_prechecker.remember_research(state.get('query', state.get('question', '')), produced)
+            return result
+        
         def wrapper(state: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
             # Perform precheck
-            if node_type == 'reasoning':
-                precheck_result = _global_prechecker.precheck_reasoning(state)
-            elif node_type == 'research':
-                precheck_result = _global_prechecker.precheck_research(state)
-            elif node_type == 'building':
-                precheck_result = _global_prechecker.precheck_building(state)
-            else:
-                # Default to reasoning precheck
-                precheck_result = _global_prechecker.precheck_reasoning(state)
+            precheck_result = _global_prechecker.precheck(state, node_type)
             
             # Add precheck result to state
             state['precheck_result'] = precheck_result
@@ -553,11 +799,14 @@ def precheck_node(node_type: str = 'reasoning'):
                 }
             
             elif precheck_result.decision == PrecheckDecision.CACHE_LOOKUP:
+                cached = _global_prechecker.cached_research(precheck_result)
+                if cached is None:
+                    print(f"✅ EXECUTING {func.__name__}: cached research no longer available")
+                    return run(state, *args, **kwargs)
                 print(f"🎯 CACHE LOOKUP for {func.__name__}: {precheck_result.reasoning}")
-                # In a real implementation, this would do cache lookup
                 return {
                     **state,
-                    'result': f"Cache lookup: {precheck_result.reasoning}",
+                    **cached,
                     'from_cache': True
                 }
             
@@ -565,7 +814,7 @@ def precheck_node(node_type: str = 'reasoning'):
                 print(f"⚡ SIMPLIFIED {func.__name__}: {precheck_result.reasoning}")
                 # Execute simplified version
                 state['simplified'] = True
-                return func(state, *args, **kwargs)
+                return run(state, *args, **kwargs)
             
             elif precheck_result.decision == PrecheckDecision.DELEGATE:
                 print(f"🔄 DELEGATING {func.__name__}: {precheck_result.reasoning}")
@@ -578,7 +827,7 @@ def precheck_node(node_type: str = 'reasoning'):
             
             else:  # EXECUTE
                 print(f"✅ EXECUTING {func.__name__}: {precheck_result.reasoning}")
-                return func(state, *args, **kwargs)
+                return run(state, *args, **kwargs)
         
         return wrapper
     return decorator
@@ -588,6 +837,10 @@ def get_precheck_stats() -> Dict[str, Any]:
     """Get precheck statistics"""
     return _global_prechecker.get_stats()
 
+def precheck_batch(states: List[Dict[str, Any]], node_type: str = 'reasoning') -> List[PrecheckResult]:
+    """Precheck many queued states with the global prechecker"""
+    return _global_prechecker.precheck_batch(states, node_type)
+
 def reset_precheck_history():
     """Reset precheck decision history"""
     _global_prechecker.decision_history.clear()
@@ -4,12 +4,17 @@ Intelligent fallback mechanisms for research and LLM services
 """
 
 import asyncio
+import bisect
 import logging
-from typing import Dict, Any, List, Optional, Union
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, Union
 from enum import Enum
 import time
 import random
 
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0, 60.0)
+
 class ServiceStatus(Enum):
     HEALTHY = "healthy"
     DEGRADED = "degraded"
@@ -21,28 +26,124 @@ class FallbackStrategy(Enum):
     PARALLEL = "parallel"      # Try multiple services simultaneously
     WEIGHTED = "weighted"      # Try based on success rates
     ADAPTIVE = "adaptive"      # Learn from failures
+    FIRST_SUCCESSFUL = "first_successful"  # Race all, keep going until one succeeds
+    HEDGED = "hedged"          # Start the next service after the current one's p95
+    COST_CAPPED = "cost_capped"  # Hedged fan-out that stops at a spend budget
+
+class SlidingWindowStats:
+    """
+    Latency and success histograms over the most recent calls of a service
+
+    Keeps the last `window_size` calls younger than `max_age` seconds;
+    bucket counts are updated incrementally as calls enter and leave the
+    window. Latency is only tracked for successful calls, so fast failures
+    don't pull the percentiles down.
+    """
+
+    def __init__(self, window_size: int = 100, max_age: float = 600.0,
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.window_size = window_size
+        self.max_age = max_age
+        self.buckets = tuple(buckets)
+        self.latency_counts = [0] * (len(self.buckets) + 1)
+        self.samples = deque()  # (timestamp, latency, success, bucket)
+        self.successes = 0
+        self.failures = 0
+
+    def observe(self, latency: float, success: bool):
+        bucket = bisect.bisect_left(self.buckets, latency)
+        self.samples.append((time.time(), latency, success, bucket))
+        if success:
+            self.latency_counts[bucket] += 1
+            self.successes += 1
+        else:
+            self.failures += 1
+        while len(self.samples) > self.window_size:
+            self._evict()
+
+    def _evict(self):
+        _, _, success, bucket = self.samples.popleft()
+        if success:
+            self.latency_counts[bucket] -= 1
+            self.successes -= 1
+        else:
+            self.failures -= 1
+
+    def _expire(self):
+        cutoff = time.time() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self._evict()
+
+    @property
+    def total(self) -> int:
+        self._expire()
+        return self.successes + self.failures
+
+    def success_rate(self, prior: float = 1.0) -> float:
+        """Success rate with one pseudo-call at `prior` so new services aren't ruled out"""
+        total = self.total
+        return (self.successes + prior) / (total + 1)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile of successful calls, interpolated within its bucket"""
+        self._expire()
+        if not self.successes:
+            return None
+        target = q * self.successes
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (self.buckets[-1] * 2,), self.latency_counts):
+            if count and seen + count >= target:
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.total
+        return {
+            'window_calls': total,
+            'window_successes': self.successes,
+            'window_failures': self.failures,
+            'success_rate': self.successes / total if total else None,
+            'p50_latency': self.percentile(0.5),
+            'p95_latency': self.percentile(0.95),
+            'latency_buckets': {
+                **{str(bound): count for bound, count in zip(self.buckets, self.latency_counts)},
+                '+Inf': self.latency_counts[-1]
+            }
+        }
 
 class FallbackManager:
     """
     Manages fallback strategies for MCP services
     """
     
-    def __init__(self):
+    def __init__(self, window_size: int = 100, window_max_age: float = 600.0,
+                 default_hedge_delay: float = 1.0, min_hedge_samples: int = 5):
         self.services = {}
         self.service_stats = {}
+        self.service_windows: Dict[str, SlidingWindowStats] = {}
         self.fallback_chains = {}
         self.circuit_breakers = {}
+        self.window_size = window_size
+        self.window_max_age = window_max_age
+        self.default_hedge_delay = default_hedge_delay  # Used until a service has enough samples
+        self.min_hedge_samples = min_hedge_samples
         self.logger = logging.getLogger(__name__)
         
-    def register_service(self, service_name: str, service_instance, priority: int = 1):
+    def register_service(self, service_name: str, service_instance, priority: int = 1,
+                         cost_per_call: float = 0.0):
         """Register a service with fallback manager"""
         self.services[service_name] = {
             'instance': service_instance,
             'priority': priority,
+            'cost_per_call': cost_per_call,
             'status': ServiceStatus.UNKNOWN,
             'last_check': None,
             'consecutive_failures': 0
         }
+        self.service_windows[service_name] = SlidingWindowStats(self.window_size, self.window_max_age)
         
         self.service_stats[service_name] = {
             'total_calls': 0,
@@ -60,36 +161,58 @@ class FallbackManager:
             'timeout': 60  # seconds
         }
         
-    def register_fallback_chain(self, chain_name: str, services: List[str], strategy: FallbackStrategy = FallbackStrategy.SEQUENTIAL):
+    def register_fallback_chain(self, chain_name: str, services: List[str],
+                                strategy: FallbackStrategy = FallbackStrategy.SEQUENTIAL,
+                                cost_budget: Optional[float] = None):
         """Register a fallback chain"""
         self.fallback_chains[chain_name] = {
             'services': services,
             'strategy': strategy,
+            'cost_budget': cost_budget,  # Default budget for COST_CAPPED calls
             'last_used': None,
             'success_count': 0,
             'failure_count': 0
         }
         
-    async def execute_with_fallback(self, chain_name: str, operation: str, *args, **kwargs) -> Dict[str, Any]:
-        """Execute operation with fallback strategy"""
+    async def execute_with_fallback(self, chain_name: str, operation: str, *args,
+                                    strategy: Optional[Union[FallbackStrategy, str]] = None,
+                                    cost_budget: Optional[float] = None,
+                                    **kwargs) -> Dict[str, Any]:
+        """Execute operation with fallback strategy
+
+        `strategy` and `cost_budget` override the chain's defaults for this call.
+        """
         chain = self.fallback_chains.get(chain_name)
         if not chain:
             raise ValueError(f"Fallback chain '{chain_name}' not found")
             
-        strategy = chain['strategy']
+        strategy = FallbackStrategy(strategy) if strategy is not None else chain['strategy']
         services = chain['services']
+        chain['last_used'] = time.time()
         
         if strategy == FallbackStrategy.SEQUENTIAL:
-            return await self._execute_sequential(services, operation, *args, **kwargs)
-        elif strategy == FallbackStrategy.PARALLEL:
-            return await self._execute_parallel(services, operation, *args, **kwargs)
+            result = await self._execute_sequential(services, operation, *args, **kwargs)
+        elif strategy in (FallbackStrategy.PARALLEL, FallbackStrategy.FIRST_SUCCESSFUL):
+            result = await self._execute_first_successful(services, operation, *args, **kwargs)
         elif strategy == FallbackStrategy.WEIGHTED:
-            return await self._execute_weighted(services, operation, *args, **kwargs)
+            result = await self._execute_weighted(services, operation, *args, **kwargs)
         elif strategy == FallbackStrategy.ADAPTIVE:
-            return await self._execute_adaptive(services, operation, *args, **kwargs)
+            result = await self._execute_adaptive(services, operation, *args, **kwargs)
+        elif strategy == FallbackStrategy.HEDGED:
+            result = await self._execute_hedged(services, operation, *args, **kwargs)
+        elif strategy == FallbackStrategy.COST_CAPPED:
+            budget = cost_budget if cost_budget is not None else chain['cost_budget']
+            result = await self._execute_hedged(services, operation, *args, cost_budget=budget, **kwargs)
         else:
             raise ValueError(f"Unknown fallback strategy: {strategy}")
             
+        result['strategy'] = strategy.value
+        if result['success']:
+            chain['success_count'] += 1
+        else:
+            chain['failure_count'] += 1
+        return result
+            
     async def _execute_sequential(self, services: List[str], operation: str, *args, **kwargs) -> Dict[str, Any]:
         """Execute services sequentially until one succeeds"""
         last_error = None
@@ -121,7 +244,7 @@ class FallbackManager:
                 }
                 
             except Exception as e:
-                self._record_failure(service_name, str(e))
+                self._record_failure(service_name, str(e), time.time() - start_time)
                 last_error = e
                 self.logger.warning(f"Service {service_name} failed: {e}")
                 continue
@@ -136,87 +259,131 @@ class FallbackManager:
         
     async def _execute_parallel(self, services: List[str], operation: str, *args, **kwargs) -> Dict[str, Any]:
         """Execute services in parallel, return first successful result"""
-        available_services = [s for s in services if self._is_service_available(s)]
+        return await self._execute_first_successful(services, operation, *args, **kwargs)
         
-        if not available_services:
+    def rank_services(self, services: List[str]) -> List[str]:
+        """Available services, best first, by sliding-window success rate and median latency"""
+        scored = []
+        for index, service_name in enumerate(services):
+            if not self._is_service_available(service_name):
+                continue
+            window = self.service_windows[service_name]
+            p50 = window.percentile(0.5)
+            latency = p50 if p50 is not None else self.default_hedge_delay
+            # Faster services win among equally reliable ones
+            score = window.success_rate() / (latency + 0.1)
+            scored.append((-score, -self.services[service_name]['priority'], index, service_name))
+        return [service_name for *_, service_name in sorted(scored)]
+        
+    def hedge_delay(self, service_name: str) -> float:
+        """Seconds to wait on a service before hedging: its sliding-window p95"""
+        window = self.service_windows[service_name]
+        p95 = window.percentile(0.95)  # Expires old samples before successes is read
+        if p95 is None or window.successes < self.min_hedge_samples:
+            return self.default_hedge_delay
+        return p95
+        
+    async def _execute_first_successful(self, services: List[str], operation: str, *args, **kwargs) -> Dict[str, Any]:
+        """Race all available services; the rest keep running until one succeeds"""
+        return await self._execute_fan_out(self.rank_services(services), operation, args, kwargs, hedged=False)
+        
+    async def _execute_hedged(self, services: List[str], operation: str, *args,
+                              cost_budget: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Start services one at a time in ranked order, hedging after each one's p95"""
+        return await self._execute_fan_out(self.rank_services(services), operation, args, kwargs,
+                                           hedged=True, cost_budget=cost_budget)
+        
+    async def _execute_fan_out(self, ranked: List[str], operation: str, args: tuple, kwargs: Dict[str, Any],
+                               hedged: bool, cost_budget: Optional[float] = None) -> Dict[str, Any]:
+        """Launch services in order and return the first success
+
+        Without hedging every service starts at once. With hedging the next
+        service starts when the most recent one exceeds its p95 latency,
+        counted from its launch, or fails. A cost budget skips any service
+        whose call would exceed it.
+        Remaining calls are cancelled only once a call has succeeded.
+        """
+        if not ranked:
             return {
                 'success': False,
                 'error': "No services available",
-                'services_tried': services
+                'services_tried': []
             }
             
-        # Create tasks for all available services
-        tasks = []
-        for service_name in available_services:
-            task = asyncio.create_task(
-                self._execute_single_service(service_name, operation, *args, **kwargs)
-            )
-            tasks.append((service_name, task))
+        queue = deque(ranked)
+        pending: Dict[asyncio.Task, str] = {}
+        tried: List[str] = []
+        errors: Dict[str, str] = {}
+        spent = 0.0
+        hedges = 0
+        budget_exhausted = False
+        
+        hedge_deadline = None
+        
+        def launch_next() -> Optional[str]:
+            nonlocal spent, budget_exhausted, hedge_deadline
+            while queue:
+                service_name = queue.popleft()
+                cost = self.services[service_name]['cost_per_call']
+                if cost_budget is not None and spent + cost > cost_budget:
+                    budget_exhausted = True
+                    continue
+                spent += cost
+                tried.append(service_name)
+                task = asyncio.create_task(self._execute_single_service(service_name, operation, *args, **kwargs))
+                pending[task] = service_name
+                if hedged:
+                    hedge_deadline = time.monotonic() + self.hedge_delay(service_name)
+                return service_name
+            return None
+            
+        for _ in range(len(ranked) if not hedged else 1):
+            launch_next()
             
-        # Wait for first successful result
         try:
-            done, pending = await asyncio.wait(
-                [task for _, task in tasks],
-                return_when=asyncio.FIRST_COMPLETED
-            )
-            
-            # Cancel pending tasks
-            for task in pending:
-                task.cancel()
+            while pending:
+                timeout = max(0.0, hedge_deadline - time.monotonic()) if hedged and queue else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
                 
-            # Get the first completed result
-            for task in done:
-                try:
-                    result = await task
+                if not done:
+                    # Slower than its p95: hedge with the next service, keep this one running
+                    if launch_next():
+                        hedges += 1
+                    continue
+                    
+                for task in done:
+                    service_name = pending.pop(task)
+                    result = task.result()
                     if result['success']:
+                        result.update({
+                            'fallback_used': service_name != ranked[0],
+                            'services_tried': tried,
+                            'hedges': hedges,
+                            'cost_spent': spent
+                        })
                         return result
-                except Exception as e:
-                    continue
+                    errors[service_name] = result['error']
                     
-            # If no successful result, wait for all to complete
+                if hedged:
+                    # A failure frees the slot for the next service right away
+                    launch_next()
+        finally:
             for task in pending:
-                try:
-                    await task
-                except:
-                    pass
-                    
-            return {
-                'success': False,
-                'error': "All parallel services failed",
-                'services_tried': available_services
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"Parallel execution failed: {e}",
-                'services_tried': available_services
-            }
-            
-    async def _execute_weighted(self, services: List[str], operation: str, *args, **kwargs) -> Dict[str, Any]:
-        """Execute services based on success rate weights"""
-        # Calculate weights based on success rates
-        weights = []
-        for service_name in services:
-            if not self._is_service_available(service_name):
-                weights.append(0)
-                continue
-                
-            stats = self.service_stats[service_name]
-            if stats['total_calls'] == 0:
-                weights.append(1.0)  # Default weight for new services
-            else:
-                success_rate = stats['successful_calls'] / stats['total_calls']
-                # Boost weight for faster services
-                response_time_factor = max(0.1, 1.0 / (stats['avg_response_time'] + 0.1))
-                weights.append(success_rate * response_time_factor)
+                task.cancel()
                 
-        # Sort services by weight (highest first)
-        weighted_services = sorted(zip(services, weights), key=lambda x: x[1], reverse=True)
-        ordered_services = [s for s, w in weighted_services if w > 0]
+        return {
+            'success': False,
+            'error': "Cost budget exhausted" if budget_exhausted and not errors else "All services failed",
+            'errors': errors,
+            'services_tried': tried,
+            'fallback_exhausted': True,
+            'budget_exhausted': budget_exhausted,
+            'cost_spent': spent
+        }
         
-        # Execute sequentially in weighted order
-        return await self._execute_sequential(ordered_services, operation, *args, **kwargs)
+    async def _execute_weighted(self, services: List[str], operation: str, *args, **kwargs) -> Dict[str, Any]:
+        """Execute services sequentially, ranked by sliding-window success rate and latency"""
+        return await self._execute_sequential(self.rank_services(services), operation, *args, **kwargs)
         
     async def _execute_adaptive(self, services: List[str], operation: str, *args, **kwargs) -> Dict[str, Any]:
         """Adaptive execution that learns from patterns"""
@@ -258,7 +425,7 @@ class FallbackManager:
             }
             
         except Exception as e:
-            self._record_failure(service_name, str(e))
+            self._record_failure(service_name, str(e), time.time() - start_time)
             return {
                 'success': False,
                 'error': str(e),
@@ -287,6 +454,7 @@ class FallbackManager:
         stats['total_calls'] += 1
         stats['successful_calls'] += 1
         stats['last_success'] = time.time()
+        self.service_windows[service_name].observe(response_time, True)
         
         # Update average response time
         if stats['avg_response_time'] == 0:
@@ -303,12 +471,13 @@ class FallbackManager:
         self.services[service_name]['status'] = ServiceStatus.HEALTHY
         self.services[service_name]['consecutive_failures'] = 0
         
-    def _record_failure(self, service_name: str, error: str):
+    def _record_failure(self, service_name: str, error: str, response_time: float = 0.0):
         """Record failed service call"""
         stats = self.service_stats[service_name]
         stats['total_calls'] += 1
         stats['failed_calls'] += 1
         stats['last_failure'] = time.time()
+        self.service_windows[service_name].observe(response_time, False)
         
         # Update circuit breaker
         circuit_breaker = self.circuit_breakers[service_name]
@@ -330,6 +499,7 @@ class FallbackManager:
         """Get statistics for all services"""
         return {
             'services': dict(self.service_stats),
+            'windows': {name: window.to_dict() for name, window in self.service_windows.items()},
             'circuit_breakers': dict(self.circuit_breakers),
             'fallback_chains': dict(self.fallback_chains)
         }
@@ -348,9 +518,9 @@ class ResearchFallbackService:
     def setup_research_services(self):
         """Setup research service fallback chain"""
         # Register services (these would be actual service instances)
-        self.fallback_manager.register_service('perplexity', MockPerplexityService(), priority=3)
-        self.fallback_manager.register_service('serper', MockSerperService(), priority=2)
-        self.fallback_manager.register_service('wikipedia', MockWikipediaService(), priority=1)
+        self.fallback_manager.register_service('perplexity', MockPerplexityService(), priority=3, cost_per_call=0.005)
+        self.fallback_manager.register_service('serper', MockSerperService(), priority=2, cost_per_call=0.001)
+        self.fallback_manager.register_service('wikipedia', MockWikipediaService(), priority=1, cost_per_call=0.0)
         
         # Register fallback chain
         self.fallback_manager.register_fallback_chain(
@@ -359,10 +529,12 @@ class ResearchFallbackService:
             FallbackStrategy.SEQUENTIAL
         )
         
-    async def search_with_fallback(self, query: str, **kwargs) -> Dict[str, Any]:
-        """Search with automatic fallback"""
+    async def search_with_fallback(self, query: str,
+                                   strategy: Optional[Union[FallbackStrategy, str]] = None,
+                                   cost_budget: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Search with automatic fallback (strategy and budget override the chain per call)"""
         return await self.fallback_manager.execute_with_fallback(
-            'research', 'search', query, **kwargs
+            'research', 'search', query, strategy=strategy, cost_budget=cost_budget, **kwargs
         )
 
 # LLM Fallback Implementation
@@ -379,10 +551,10 @@ class LLMFallbackService:
     def setup_llm_services(self):
         """Setup LLM service fallback chain"""
         # Register services (these would be actual LLM service instances)
-        self.fallback_manager.register_service('deepseek', MockDeepSeekService(), priority=4)
-        self.fallback_manager.register_service('mistral', MockMistralService(), priority=3)
-        self.fallback_manager.register_service('llama', MockLlamaService(), priority=2)
-        self.fallback_manager.register_service('openai', MockOpenAIService(), priority=1)
+        self.fallback_manager.register_service('deepseek', MockDeepSeekService(), priority=4, cost_per_call=0.002)
+        self.fallback_manager.register_service('mistral', MockMistralService(), priority=3, cost_per_call=0.001)
+        self.fallback_manager.register_service('llama', MockLlamaService(), priority=2, cost_per_call=0.0)
+        self.fallback_manager.register_service('openai', MockOpenAIService(), priority=1, cost_per_call=0.004)
         
         # Register fallback chains for different use cases
         self.fallback_manager.register_fallback_chain(
@@ -403,12 +575,14 @@ class LLMFallbackService:
             FallbackStrategy.SEQUENTIAL
         )
         
-    async def generate_with_fallback(self, prompt: str, task_type: str = 'reasoning', **kwargs) -> Dict[str, Any]:
-        """Generate with automatic LLM fallback"""
+    async def generate_with_fallback(self, prompt: str, task_type: str = 'reasoning',
+                                     strategy: Optional[Union[FallbackStrategy, str]] = None,
+                                     cost_budget: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Generate with automatic LLM fallback (strategy and budget override the chain per call)"""
         chain_name = task_type if task_type in ['reasoning', 'coding', 'creative'] else 'reasoning'
         
         return await self.fallback_manager.execute_with_fallback(
-            chain_name, 'generate', prompt, **kwargs
+            chain_name, 'generate', prompt, strategy=strategy, cost_budget=cost_budget, **kwargs
         )
 
 # Mock service implementations for testing
@@ -510,6 +684,22 @@ async def test_fallback_system():
     )
     print(f"LLM result: {result}")
     
+    print("\n🔄 Testing hedged and cost-capped LLM calls...")
+    result = await llm_fallback.generate_with_fallback(
+        "Explain quantum computing",
+        task_type="reasoning",
+        strategy=FallbackStrategy.HEDGED
+    )
+    print(f"Hedged result: {result}")
+    
+    result = await llm_fallback.generate_with_fallback(
+        "Explain quantum computing",
+        task_type="reasoning",
+        strategy="cost_capped",
+        cost_budget=0.003
+    )
+    print(f"Cost-capped result: {result}")
+    
     # Get statistics
     print("\n📊 Service Statistics:")
     research_stats = research_fallback.fallback_manager.get_service_stats()
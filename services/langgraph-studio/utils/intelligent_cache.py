@@ -1,19 +1,43 @@
 """
 Intelligent Caching System for LangGraph Nodes
 Implements memoization and smart caching to optimize resource usage
+
+The store is split into lock-sharded LRU segments so concurrent graph
+executions only contend when they touch the same shard. Keys are derived
+from a canonical tuple encoding hashed with blake2b, entry sizes are
+estimated without pickling, and persistence is an append-only journal
+written and compacted by a background thread.
 """
 
+import asyncio
+import atexit
 import hashlib
-import json
-import time
-import pickle
 import os
-from typing import Any, Dict, Optional, Callable, Union
-from functools import wraps
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+import pickle
+import queue
+import sys
 import threading
-import weakref
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Fields of a node state that never influence its output
+EXCLUDED_STATE_FIELDS = frozenset(['_metadata', '_internal', 'session_id'])
+
+# State fields used by smart_cache_key
+SMART_KEY_FIELDS = ('task', 'query', 'question', 'input', 'model', 'temperature', 'max_tokens')
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+_PRIMITIVE_TYPES = frozenset(_PRIMITIVES)
+
+# Containers deeper than this, or items past the sample, are extrapolated
+_SIZE_DEPTH = 3
+_SIZE_SAMPLE = 16
 
 @dataclass
 class CacheEntry:
@@ -26,288 +50,590 @@ class CacheEntry:
     node_name: str
     ttl: Optional[float] = None
     size_bytes: int = 0
-    
+
     def is_expired(self) -> bool:
         """Check if cache entry is expired"""
         if self.ttl is None:
             return False
         return time.time() - self.timestamp > self.ttl
-    
+
     def is_stale(self, max_age: float = 3600) -> bool:
         """Check if cache entry is stale (default 1 hour)"""
         return time.time() - self.timestamp > max_age
-    
+
     def touch(self):
         """Update access information"""
         self.access_count += 1
         self.last_access = time.time()
 
+def _canonical(value: Any) -> Any:
+    """Order-independent, repr-stable form of a value for key derivation"""
+    if isinstance(value, _PRIMITIVES):
+        return value
+    if isinstance(value, dict):
+        return dict(sorted((k if isinstance(k, str) else str(k), _canonical(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    # Convert complex objects to string representation
+    return str(value)
+
+def estimate_size(obj: Any, _depth: int = 0) -> int:
+    """Approximate in-memory size of a value in bytes (no pickling)
+
+    Walks containers a few levels deep and extrapolates from a sample of
+    large ones, so the cost stays bounded for big node results.
+    """
+    size = sys.getsizeof(obj, 64)
+    if type(obj) in _PRIMITIVE_TYPES:
+        return size
+
+    if isinstance(obj, dict):
+        count = len(obj)
+        children = obj.values() if count <= _SIZE_SAMPLE else list(obj.values())[:_SIZE_SAMPLE]
+        # Keys are mostly short strings
+        keys = obj.keys() if count <= _SIZE_SAMPLE else list(obj.keys())[:_SIZE_SAMPLE]
+        sample_size = sum(map(sys.getsizeof, keys))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        count = len(obj)
+        children = obj if count <= _SIZE_SAMPLE else list(obj)[:_SIZE_SAMPLE]
+        sample_size = 0
+    elif hasattr(obj, '__dict__') and _depth < _SIZE_DEPTH:
+        return size + estimate_size(vars(obj), _depth + 1)
+    else:
+        return size
+
+    sampled = 0
+    for child in children:
+        sampled += 1
+        if type(child) in _PRIMITIVE_TYPES or _depth >= _SIZE_DEPTH:
+            sample_size += sys.getsizeof(child, 64)
+        else:
+            sample_size += estimate_size(child, _depth + 1)
+
+    if not sampled:
+        return size
+    return size + sample_size * count // sampled
+
+class _Shard:
+    """One LRU segment of the cache with its own lock and counters"""
+    __slots__ = ('lock', 'entries', 'flights', 'size_bytes', 'hits', 'misses', 'evictions',
+                 'coalesced', 'flight_errors', 'flight_timeouts')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.flights: Dict[str, Future] = {}  # key -> computation in progress
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.flight_errors = 0
+        self.flight_timeouts = 0
+
+class CacheJournal:
+    """
+    Append-only on-disk journal of cache writes
+
+    Records are pickled ('set', key, entry) and ('clear', node_name) tuples.
+    Callers only enqueue; a background thread pickles, appends and, once the
+    journal holds more than `compact_ratio` records per live entry, rewrites
+    it from a snapshot of the live entries.
+    """
+
+    def __init__(self, path: str,
+                 snapshot_fn: Callable[[], List[Tuple[str, CacheEntry]]],
+                 live_count_fn: Callable[[], int],
+                 compact_ratio: float = 2.0,
+                 min_compact_records: int = 1000):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+        self._snapshot_fn = snapshot_fn
+        self._live_count_fn = live_count_fn
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._file = None
+        self._records = 0
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self.stats = {
+            'records_written': 0,
+            'write_errors': 0,
+            'compactions': 0
+        }
+
+    def load(self) -> Iterable[tuple]:
+        """Read all records, truncating a torn tail left by a crash"""
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, 'rb') as f:
+            good_offset = 0
+            while True:
+                try:
+                    records.append(pickle.load(f))
+                    good_offset = f.tell()
+                except EOFError:
+                    break
+                except Exception as e:
+                    print(f"Cache journal truncated at byte {good_offset}: {e}")
+                    break
+
+        if good_offset < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_offset)
+        self._records = len(records)
+        return records
+
+    def append(self, record: tuple):
+        """Queue a record for the writer thread"""
+        if self._writer is None:
+            self._start_writer()
+        self._queue.put(record)
+
+    def flush(self):
+        """Block until every queued record is on disk"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'ab')
+        return self._file
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(batch)
+                if (self._records >= self.min_compact_records and
+                        self._records > self.compact_ratio * max(1, self._live_count_fn())):
+                    self.compact()
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                print(f"Failed to write cache journal: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, records: Sequence[tuple]):
+        f = self._open()
+        for record in records:
+            try:
+                data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                # Unpicklable results stay memory-only
+                self.stats['write_errors'] += 1
+                continue
+            f.write(data)
+            self._records += 1
+            self.stats['records_written'] += 1
+        f.flush()
+
+    def compact(self):
+        """Rewrite the journal as one 'set' record per live entry
+
+        Runs on the writer thread (or before it starts), so records queued
+        during compaction are appended to the new file afterwards.
+        """
+        temp_path = f"{self.path}.compact"
+        written = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(temp_path, 'wb') as f:
+            for key, entry in self._snapshot_fn():
+                try:
+                    f.write(pickle.dumps(('set', key, entry), protocol=pickle.HIGHEST_PROTOCOL))
+                    written += 1
+                except Exception:
+                    continue
+            f.flush()
+            os.fsync(f.fileno())
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.replace(temp_path, self.path)
+        self._records = written
+        self.stats['compactions'] += 1
+
 class IntelligentCache:
     """
-    Intelligent caching system with multiple eviction strategies
+    Intelligent caching system with lock-sharded LRU segments
     """
-    
-    def __init__(self, 
+
+    def __init__(self,
                  max_size: int = 1000,
                  max_memory_mb: int = 100,
                  default_ttl: float = 3600,
-                 persistence_path: Optional[str] = None):
+                 persistence_path: Optional[str] = None,
+                 shards: int = 16):
         self.max_size = max_size
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
         self.default_ttl = default_ttl
         self.persistence_path = persistence_path
-        
-        self._cache: Dict[str, CacheEntry] = {}
-        self._lock = threading.RLock()
-        self._stats = {
-            'hits': 0,
-            'misses': 0,
-            'evictions': 0,
-            'size_bytes': 0
-        }
-        
+
+        # Limits are enforced per shard
+        shard_count = max(1, min(shards, max_size))
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._shard_max_size = -(-max_size // shard_count)
+        self._shard_max_bytes = self.max_memory_bytes // shard_count
+
+        self._journal: Optional[CacheJournal] = None
+        if persistence_path:
+            self._journal = CacheJournal(persistence_path, self._snapshot, self.__len__)
+
         # Load persisted cache if available
         self._load_cache()
-        
+        if self._journal is not None:
+            atexit.register(self._journal.flush)
+
         # Cleanup thread
         self._cleanup_thread = threading.Thread(target=self._periodic_cleanup, daemon=True)
         self._cleanup_thread.start()
-    
-    def _generate_key(self, node_name: str, inputs: Dict[str, Any], 
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def _shard_for(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _generate_key(self, node_name: str, inputs: Dict[str, Any],
                      context: Optional[Dict] = None) -> str:
         """Generate cache key from inputs"""
-        # Create deterministic hash from inputs
-        cache_data = {
-            'node': node_name,
-            'inputs': self._normalize_inputs(inputs),
-            'context': context or {}
-        }
-        
-        # Sort keys for consistent hashing
-        cache_str = json.dumps(cache_data, sort_keys=True, default=str)
-        return hashlib.sha256(cache_str.encode()).hexdigest()
-    
-    def _normalize_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Normalize inputs for consistent caching"""
-        normalized = {}
-        
-        for key, value in inputs.items():
-            if isinstance(value, (str, int, float, bool)):
-                normalized[key] = value
-            elif isinstance(value, (list, tuple)):
-                normalized[key] = [self._normalize_value(v) for v in value]
-            elif isinstance(value, dict):
-                normalized[key] = self._normalize_inputs(value)
-            else:
-                # Convert complex objects to string representation
-                normalized[key] = str(value)
-        
-        return normalized
-    
-    def _normalize_value(self, value: Any) -> Any:
-        """Normalize individual values"""
-        if isinstance(value, (str, int, float, bool)):
-            return value
-        elif isinstance(value, dict):
-            return self._normalize_inputs(value)
-        else:
-            return str(value)
-    
+        material = repr((node_name, _canonical(inputs), _canonical(context) if context else None))
+        return hashlib.blake2b(material.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+    def make_key(self, node_name: str, inputs: Dict[str, Any],
+                 context: Optional[Dict] = None) -> str:
+        """Public key derivation, so callers can reuse a key for get and set"""
+        return self._generate_key(node_name, inputs, context)
+
     def _calculate_size(self, obj: Any) -> int:
         """Calculate approximate size of object in bytes"""
         try:
-            return len(pickle.dumps(obj))
-        except:
+            return estimate_size(obj)
+        except Exception:
             # Fallback to string representation
             return len(str(obj).encode('utf-8'))
-    
-    def get(self, node_name: str, inputs: Dict[str, Any], 
+
+    def get(self, node_name: str, inputs: Dict[str, Any],
             context: Optional[Dict] = None) -> Optional[Any]:
         """Get cached result if available"""
-        key = self._generate_key(node_name, inputs, context)
-        
-        with self._lock:
-            entry = self._cache.get(key)
-            
+        return self.get_by_key(self._generate_key(node_name, inputs, context))
+
+    def get_by_key(self, key: str, default: Any = None) -> Any:
+        """Get cached result for a key from make_key"""
+        shard = self._shard_for(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+
             if entry is None:
-                self._stats['misses'] += 1
-                return None
-            
+                shard.misses += 1
+                return default
+
             # Check if expired
             if entry.is_expired():
-                del self._cache[key]
-                self._stats['misses'] += 1
-                self._stats['evictions'] += 1
-                return None
-            
+                del shard.entries[key]
+                shard.size_bytes -= entry.size_bytes
+                shard.misses += 1
+                shard.evictions += 1
+                return default
+
             # Update access info
+            shard.entries.move_to_end(key)
             entry.touch()
-            self._stats['hits'] += 1
-            
+            shard.hits += 1
+
             return entry.value
-    
-    def set(self, node_name: str, inputs: Dict[str, Any], 
+
+    def set(self, node_name: str, inputs: Dict[str, Any],
             value: Any, ttl: Optional[float] = None,
             context: Optional[Dict] = None):
         """Cache a result"""
-        key = self._generate_key(node_name, inputs, context)
+        self.set_by_key(self._generate_key(node_name, inputs, context), node_name, value, ttl)
+
+    def set_by_key(self, key: str, node_name: str, value: Any, ttl: Optional[float] = None):
+        """Cache a result under a key from make_key"""
         size_bytes = self._calculate_size(value)
-        
-        with self._lock:
-            # Check memory limits
-            if size_bytes > self.max_memory_bytes:
-                # Object too large to cache
-                return
-            
-            # Create cache entry
-            entry = CacheEntry(
-                value=value,
-                timestamp=time.time(),
-                access_count=1,
-                last_access=time.time(),
-                input_hash=key,
-                node_name=node_name,
-                ttl=ttl or self.default_ttl,
-                size_bytes=size_bytes
-            )
-            
+        if size_bytes > self._shard_max_bytes:
+            # Object too large to cache
+            return
+
+        now = time.time()
+        entry = CacheEntry(
+            value=value,
+            timestamp=now,
+            access_count=1,
+            last_access=now,
+            input_hash=key,
+            node_name=node_name,
+            ttl=ttl or self.default_ttl,
+            size_bytes=size_bytes
+        )
+        self._store(key, entry, journal=True)
+
+    def get_or_join(self, key: str) -> Tuple[Any, Optional[Future], bool]:
+        """Single-flight lookup for a key from make_key
+
+        Returns (value, None, False) on a hit. On a miss returns
+        (None, flight, leader): the leader must compute the value and call
+        complete_flight or fail_flight; everyone else waits on the flight.
+        """
+        shard = self._shard_for(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None:
+                if not entry.is_expired():
+                    shard.entries.move_to_end(key)
+                    entry.touch()
+                    shard.hits += 1
+                    return entry.value, None, False
+                del shard.entries[key]
+                shard.size_bytes -= entry.size_bytes
+                shard.evictions += 1
+
+            flight = shard.flights.get(key)
+            if flight is not None:
+                shard.coalesced += 1
+                return None, flight, False
+
+            # Left pending (not running) so an abandoned flight can be cancelled
+            flight = Future()
+            shard.flights[key] = flight
+            shard.misses += 1
+            return None, flight, True
+
+    def complete_flight(self, key: str, node_name: str, flight: Future, value: Any,
+                        ttl: Optional[float] = None):
+        """Cache the leader's result, then hand it to the waiting callers"""
+        try:
+            self.set_by_key(key, node_name, value, ttl)
+        finally:
+            self._end_flight(key, flight)
+            flight.set_result(value)
+
+    def fail_flight(self, key: str, flight: Future, error: BaseException):
+        """Propagate the leader's error to waiting callers without caching anything"""
+        shard = self._end_flight(key, flight)
+        if isinstance(error, (asyncio.CancelledError, CancelledError)):
+            # Only the leader was cancelled: waiters retry instead of failing
+            flight.cancel()
+            return
+        with shard.lock:
+            shard.flight_errors += 1
+        flight.set_exception(error)
+
+    def record_flight_timeout(self, key: str):
+        shard = self._shard_for(key)
+        with shard.lock:
+            shard.flight_timeouts += 1
+
+    def _end_flight(self, key: str, flight: Future) -> _Shard:
+        shard = self._shard_for(key)
+        with shard.lock:
+            if shard.flights.get(key) is flight:
+                del shard.flights[key]
+        return shard
+
+    def _store(self, key: str, entry: CacheEntry, journal: bool):
+        shard = self._shard_for(key)
+        with shard.lock:
+            previous = shard.entries.pop(key, None)
+            if previous is not None:
+                shard.size_bytes -= previous.size_bytes
+
             # Evict if necessary
-            self._evict_if_needed(size_bytes)
-            
+            self._evict_if_needed(shard, entry.size_bytes)
+
             # Store entry
-            self._cache[key] = entry
-            self._stats['size_bytes'] += size_bytes
-    
-    def _evict_if_needed(self, new_size: int):
-        """Evict entries if cache limits exceeded"""
-        # Check size limit
-        while len(self._cache) >= self.max_size:
-            self._evict_lru()
-        
-        # Check memory limit
-        while self._stats['size_bytes'] + new_size > self.max_memory_bytes:
-            self._evict_lru()
-    
-    def _evict_lru(self):
-        """Evict least recently used entry"""
-        if not self._cache:
-            return
-        
-        # Find LRU entry
-        lru_key = min(self._cache.keys(), 
-                     key=lambda k: self._cache[k].last_access)
-        
-        entry = self._cache.pop(lru_key)
-        self._stats['size_bytes'] -= entry.size_bytes
-        self._stats['evictions'] += 1
-    
+            shard.entries[key] = entry
+            shard.size_bytes += entry.size_bytes
+
+            # Enqueued under the shard lock so journal order matches store order
+            if journal and self._journal is not None:
+                self._journal.append(('set', key, entry))
+
+    def _evict_if_needed(self, shard: _Shard, new_size: int):
+        """Evict entries if shard limits exceeded (caller holds shard.lock)"""
+        entries = shard.entries
+        while entries and (len(entries) >= self._shard_max_size or
+                           shard.size_bytes + new_size > self._shard_max_bytes):
+            # Least recently used entry is first
+            _, entry = entries.popitem(last=False)
+            shard.size_bytes -= entry.size_bytes
+            shard.evictions += 1
+
     def _periodic_cleanup(self):
         """Periodic cleanup of expired entries"""
         while True:
             time.sleep(300)  # Run every 5 minutes
-            
-            with self._lock:
-                expired_keys = [
-                    key for key, entry in self._cache.items()
-                    if entry.is_expired()
-                ]
-                
-                for key in expired_keys:
-                    entry = self._cache.pop(key)
-                    self._stats['size_bytes'] -= entry.size_bytes
-                    self._stats['evictions'] += 1
-    
+
+            for shard in self._shards:
+                with shard.lock:
+                    expired_keys = [
+                        key for key, entry in shard.entries.items()
+                        if entry.is_expired()
+                    ]
+
+                    for key in expired_keys:
+                        entry = shard.entries.pop(key)
+                        shard.size_bytes -= entry.size_bytes
+                        shard.evictions += 1
+
+    def _snapshot(self) -> List[Tuple[str, CacheEntry]]:
+        """Live entries, gathered one shard at a time"""
+        live = []
+        for shard in self._shards:
+            with shard.lock:
+                live.extend((key, entry) for key, entry in shard.entries.items() if not entry.is_expired())
+        return live
+
     def _load_cache(self):
-        """Load cache from persistence"""
-        if not self.persistence_path or not os.path.exists(self.persistence_path):
+        """Load cache from persistence by replaying the journal"""
+        if self._journal is None:
             return
-        
+
         try:
-            with open(self.persistence_path, 'rb') as f:
-                data = pickle.load(f)
-                self._cache = data.get('cache', {})
-                self._stats = data.get('stats', self._stats)
+            records = self._journal.load()
         except Exception as e:
             print(f"Failed to load cache: {e}")
-    
+            return
+
+        migrated = False
+        for record in records:
+            if isinstance(record, dict):
+                # Full snapshot written by earlier versions: its entries are keyed by the
+                # old sha256 scheme and don't keep their inputs, so they can't be re-keyed
+                # and would never be hit again. Drop them and rewrite the file as a journal.
+                dropped = len(record.get('cache', {}))
+                if dropped:
+                    print(f"Dropped {dropped} entries from legacy cache snapshot (old key format)")
+                migrated = True
+            elif record[0] == 'set':
+                _, key, entry = record
+                if not entry.is_expired():
+                    self._store(key, entry, journal=False)
+            elif record[0] == 'clear':
+                self._clear(record[1])
+
+        if migrated:
+            try:
+                self._journal.compact()
+            except Exception as e:
+                print(f"Failed to convert cache snapshot to journal: {e}")
+
     def _save_cache(self):
-        """Save cache to persistence"""
-        if not self.persistence_path:
+        """Save cache to persistence (waits for the journal writer)"""
+        if self._journal is None:
             return
-        
+
         try:
-            os.makedirs(os.path.dirname(self.persistence_path), exist_ok=True)
-            with open(self.persistence_path, 'wb') as f:
-                pickle.dump({
-                    'cache': self._cache,
-                    'stats': self._stats
-                }, f)
+            self._journal.flush()
         except Exception as e:
             print(f"Failed to save cache: {e}")
-    
+
+    def _clear(self, node_name: Optional[str]):
+        for shard in self._shards:
+            with shard.lock:
+                if node_name:
+                    # Clear specific node cache
+                    keys_to_remove = [
+                        key for key, entry in shard.entries.items()
+                        if entry.node_name == node_name
+                    ]
+                    for key in keys_to_remove:
+                        entry = shard.entries.pop(key)
+                        shard.size_bytes -= entry.size_bytes
+                else:
+                    # Clear all cache
+                    shard.entries.clear()
+                    shard.size_bytes = 0
+
     def clear(self, node_name: Optional[str] = None):
         """Clear cache entries"""
-        with self._lock:
-            if node_name:
-                # Clear specific node cache
-                keys_to_remove = [
-                    key for key, entry in self._cache.items()
-                    if entry.node_name == node_name
-                ]
-                for key in keys_to_remove:
-                    entry = self._cache.pop(key)
-                    self._stats['size_bytes'] -= entry.size_bytes
-            else:
-                # Clear all cache
-                self._cache.clear()
-                self._stats['size_bytes'] = 0
-    
+        self._clear(node_name)
+        if self._journal is not None:
+            self._journal.append(('clear', node_name))
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        with self._lock:
-            hit_rate = (self._stats['hits'] / 
-                       (self._stats['hits'] + self._stats['misses'])
-                       if self._stats['hits'] + self._stats['misses'] > 0 else 0)
-            
-            return {
-                **self._stats,
-                'hit_rate': hit_rate,
-                'cache_size': len(self._cache),
-                'memory_usage_mb': self._stats['size_bytes'] / (1024 * 1024)
+        hits = sum(shard.hits for shard in self._shards)
+        misses = sum(shard.misses for shard in self._shards)
+        size_bytes = sum(shard.size_bytes for shard in self._shards)
+
+        stats = {
+            'hits': hits,
+            'misses': misses,
+            'evictions': sum(shard.evictions for shard in self._shards),
+            'coalesced': sum(shard.coalesced for shard in self._shards),
+            'in_flight': sum(len(shard.flights) for shard in self._shards),
+            'flight_errors': sum(shard.flight_errors for shard in self._shards),
+            'flight_timeouts': sum(shard.flight_timeouts for shard in self._shards),
+            'size_bytes': size_bytes,
+            'hit_rate': hits / (hits + misses) if hits + misses > 0 else 0,
+            'cache_size': len(self),
+            'memory_usage_mb': size_bytes / (1024 * 1024),
+            'shards': len(self._shards)
+        }
+        if self._journal is not None:
+            stats['journal'] = {
+                **self._journal.stats,
+                'records': self._journal._records,
+                'pending': self._journal._queue.qsize()
             }
-    
+        return stats
+
     def get_cache_info(self) -> Dict[str, Any]:
         """Get detailed cache information"""
-        with self._lock:
-            entries_by_node = {}
-            for entry in self._cache.values():
-                node = entry.node_name
-                if node not in entries_by_node:
-                    entries_by_node[node] = {
-                        'count': 0,
-                        'size_bytes': 0,
-                        'avg_access_count': 0,
-                        'oldest_timestamp': float('inf'),
-                        'newest_timestamp': 0
-                    }
-                
-                info = entries_by_node[node]
-                info['count'] += 1
-                info['size_bytes'] += entry.size_bytes
-                info['avg_access_count'] += entry.access_count
-                info['oldest_timestamp'] = min(info['oldest_timestamp'], entry.timestamp)
-                info['newest_timestamp'] = max(info['newest_timestamp'], entry.timestamp)
-            
-            # Calculate averages
-            for info in entries_by_node.values():
-                if info['count'] > 0:
-                    info['avg_access_count'] /= info['count']
-            
-            return {
-                'total_entries': len(self._cache),
-                'entries_by_node': entries_by_node,
-                'stats': self.get_stats()
-            }
+        entries_by_node = {}
+        for _, entry in self._snapshot():
+            node = entry.node_name
+            if node not in entries_by_node:
+                entries_by_node[node] = {
+                    'count': 0,
+                    'size_bytes': 0,
+                    'avg_access_count': 0,
+                    'oldest_timestamp': float('inf'),
+                    'newest_timestamp': 0
+                }
+
+            info = entries_by_node[node]
+            info['count'] += 1
+            info['size_bytes'] += entry.size_bytes
+            info['avg_access_count'] += entry.access_count
+            info['oldest_timestamp'] = min(info['oldest_timestamp'], entry.timestamp)
+            info['newest_timestamp'] = max(info['newest_timestamp'], entry.timestamp)
+
+        # Calculate averages
+        for info in entries_by_node.values():
+            if info['count'] > 0:
+                info['avg_access_count'] /= info['count']
+
+        return {
+            'total_entries': len(self),
+            'entries_by_node': entries_by_node,
+            'stats': self.get_stats()
+        }
 
 # Global cache instance
 _global_cache = IntelligentCache(
@@ -317,95 +643,175 @@ _global_cache = IntelligentCache(
     persistence_path='cache/langgraph_cache.pkl'
 )
 
-def cached_node(ttl: Optional[float] = None, 
+# Per-node key extractors registered with register_key_extractor
+_key_extractors: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+def register_key_extractor(node_name: str, extractor: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    """Use `extractor(state)` as the cache inputs of a node without an explicit cache_key_fn"""
+    _key_extractors[node_name] = extractor
+
+def field_key_extractor(fields: Sequence[str]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Key extractor keeping only the given state fields"""
+    fields = tuple(fields)
+
+    def extract(state: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: state[field] for field in fields if field in state}
+
+    return extract
+
+def default_cache_inputs(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Use relevant state fields for caching"""
+    return {k: v for k, v in state.items() if k not in EXCLUDED_STATE_FIELDS}
+
+def cached_node(ttl: Optional[float] = None,
                 cache_key_fn: Optional[Callable] = None,
-                skip_cache_fn: Optional[Callable] = None):
+                skip_cache_fn: Optional[Callable] = None,
+                cache: Optional[IntelligentCache] = None,
+                verbose: bool = True,
+                timeout: Optional[float] = None):
     """
     Decorator for caching LangGraph node results
-    
+
+    Works for sync and async nodes. Concurrent calls with identical cache
+    inputs are coalesced: the first caller runs the node and the others
+    wait for its result, which is cached once. If the node raises, every
+    waiting caller gets the same exception and nothing is cached.
+
     Args:
         ttl: Time to live for cache entries
-        cache_key_fn: Custom function to generate cache key
+        cache_key_fn: Custom function to generate cache key (defaults to the
+            extractor registered for the node, then to all non-internal fields)
         skip_cache_fn: Function to determine if caching should be skipped
+        cache: Cache instance to use (defaults to the global cache)
+        verbose: Print cache hits and misses
+        timeout: Seconds a caller waits on an identical in-flight call before
+            running the node itself; for async nodes also the limit on the
+            node's own run (asyncio.TimeoutError, not cached)
     """
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(state: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
-            node_name = func.__name__
-            
+        node_name = func.__name__
+
+        def prepare(state: Dict[str, Any]) -> Tuple[IntelligentCache, Optional[str]]:
+            target = cache if cache is not None else _global_cache
+
             # Check if caching should be skipped
             if skip_cache_fn and skip_cache_fn(state):
-                return func(state, *args, **kwargs)
-            
+                return target, None
+
             # Generate cache key
-            if cache_key_fn:
-                cache_inputs = cache_key_fn(state)
-            else:
-                # Use relevant state fields for caching
-                cache_inputs = {
-                    k: v for k, v in state.items()
-                    if k not in ['_metadata', '_internal', 'session_id']
-                }
-            
-            # Try to get from cache
-            cached_result = _global_cache.get(node_name, cache_inputs)
-            if cached_result is not None:
+            key_fn = cache_key_fn or _key_extractors.get(node_name, default_cache_inputs)
+            return target, target.make_key(node_name, key_fn(state))
+
+        def log_lookup(flight: Optional[Future], leader: bool):
+            if not verbose:
+                return
+            if flight is None:
                 print(f"🎯 Cache HIT for {node_name}")
-                return cached_result
-            
-            print(f"⚡ Cache MISS for {node_name} - executing...")
-            
-            # Execute function
-            result = func(state, *args, **kwargs)
-            
-            # Cache result
-            _global_cache.set(node_name, cache_inputs, result, ttl)
-            
-            return result
-        
+            elif leader:
+                print(f"⚡ Cache MISS for {node_name} - executing...")
+            else:
+                print(f"⏳ Cache MISS for {node_name} - joining in-flight call...")
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(state: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
+                target, key = prepare(state)
+                if key is None:
+                    return await func(state, *args, **kwargs)
+
+                while True:
+                    value, flight, leader = target.get_or_join(key)
+                    log_lookup(flight, leader)
+                    if flight is None:
+                        return value
+
+                    if leader:
+                        try:
+                            result = await asyncio.wait_for(func(state, *args, **kwargs), timeout)
+                        except BaseException as e:
+                            target.fail_flight(key, flight, e)
+                            raise
+                        target.complete_flight(key, node_name, flight, result, ttl)
+                        return result
+
+                    waiter = asyncio.wrap_future(flight)
+                    try:
+                        # Shielded so a timed-out waiter doesn't cancel the shared flight
+                        return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+                    except asyncio.TimeoutError:
+                        # Nobody awaits the waiter any more; consume its outcome
+                        waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+                        if flight.cancelled():
+                            continue
+                        if flight.done():
+                            # Finished meanwhile, or the leader itself timed out
+                            return flight.result()
+                        target.record_flight_timeout(key)
+                        return await asyncio.wait_for(func(state, *args, **kwargs), timeout)
+                    except (asyncio.CancelledError, CancelledError):
+                        if not flight.cancelled():
+                            raise
+                        # The leader was cancelled: look up again
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(state: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
+            target, key = prepare(state)
+            if key is None:
+                return func(state, *args, **kwargs)
+
+            while True:
+                value, flight, leader = target.get_or_join(key)
+                log_lookup(flight, leader)
+                if flight is None:
+                    return value
+
+                if leader:
+                    # Execute function
+                    try:
+                        result = func(state, *args, **kwargs)
+                    except BaseException as e:
+                        target.fail_flight(key, flight, e)
+                        raise
+                    # Cache result and release waiting callers
+                    target.complete_flight(key, node_name, flight, result, ttl)
+                    return result
+
+                try:
+                    return flight.result(timeout=timeout)
+                except FutureTimeoutError:
+                    if flight.cancelled():
+                        continue
+                    if flight.done():
+                        # Finished meanwhile, or the leader's own TimeoutError
+                        return flight.result()
+                    target.record_flight_timeout(key)
+                    return func(state, *args, **kwargs)
+                except CancelledError:
+                    continue
+
         return wrapper
     return decorator
 
-def smart_cache_key(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Smart cache key generation for common patterns"""
-    key_fields = {}
-    
-    # Include task/query if present
-    if 'task' in state:
-        key_fields['task'] = state['task']
-    if 'query' in state:
-        key_fields['query'] = state['query']
-    if 'question' in state:
-        key_fields['question'] = state['question']
-    
-    # Include input data
-    if 'input' in state:
-        key_fields['input'] = state['input']
-    
-    # Include configuration that affects output
-    if 'model' in state:
-        key_fields['model'] = state['model']
-    if 'temperature' in state:
-        key_fields['temperature'] = state['temperature']
-    if 'max_tokens' in state:
-        key_fields['max_tokens'] = state['max_tokens']
-    
-    return key_fields
+# Smart cache key generation for common patterns: task/query, input data and
+# configuration that affects output
+smart_cache_key = field_key_extractor(SMART_KEY_FIELDS)
 
 def should_skip_cache(state: Dict[str, Any]) -> bool:
     """Determine if caching should be skipped"""
     # Skip for real-time or time-sensitive queries
     if state.get('real_time', False):
         return True
-    
+
     # Skip for user-specific or session-specific data
     if 'user_id' in state or 'session_id' in state:
         return True
-    
+
     # Skip for random or non-deterministic operations
     if state.get('random', False) or state.get('non_deterministic', False):
         return True
-    
+
     return False
 
 # Utility functions for cache management
@@ -0,0 +1,75 @@
+"""Behavior tests for precheck pattern matching and the research similarity index"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "langgraph-studio"))
+
+from utils.conditional_precheck import ConditionalPrechecker, PrecheckDecision, ResearchSimilarityIndex
+
+
+def test_unanchored_patterns_report_first_pattern_in_list_order():
+    prechecker = ConditionalPrechecker()
+
+    # 'definition.*of' matches earlier in the text, but 'stock.*price.*for' comes first in the list
+    result = prechecker._check_patterns("definition of stock price for apple")
+
+    assert result.decision == PrecheckDecision.CACHE_LOOKUP
+    assert result.metadata["pattern"] == r"stock.*price.*for"
+
+
+def test_anchored_patterns_follow_category_priority():
+    prechecker = ConditionalPrechecker()
+
+    assert prechecker._check_patterns("hello").decision == PrecheckDecision.SKIP
+    simple = prechecker._check_patterns("what is python?")
+    assert simple.decision == PrecheckDecision.SIMPLIFIED
+    assert simple.alternative_path == "simple_lookup"
+    assert prechecker._check_patterns("tell me a story about dragons") is None
+
+
+def test_recompiled_patterns_take_effect():
+    prechecker = ConditionalPrechecker()
+    prechecker.patterns["high_confidence_skip"].append(r"^ok\s*$")
+    prechecker.compile_patterns()
+
+    assert prechecker._check_patterns("ok").decision == PrecheckDecision.SKIP
+
+
+def test_similar_research_is_served_from_cache():
+    prechecker = ConditionalPrechecker()
+    prechecker.remember_research("renewable energy storage battery costs", {"summary": "batteries"})
+
+    result = prechecker.precheck_research({"query": "Renewable energy storage battery costs"})
+    assert result.decision == PrecheckDecision.CACHE_LOOKUP
+    assert prechecker.cached_research(result) == {"summary": "batteries"}
+
+    unrelated = prechecker.precheck_research({"query": "history of medieval castle architecture"})
+    assert unrelated.decision != PrecheckDecision.CACHE_LOOKUP
+
+
+def test_similarity_index_evicts_oldest_entries():
+    index = ResearchSimilarityIndex(max_entries=2)
+    index.add("solar panel efficiency", {"n": 1})
+    index.add("wind turbine maintenance", {"n": 2})
+    index.add("solar panel efficiency", {"n": 3})  # Re-adding refreshes the entry
+    index.add("tidal power generation", {"n": 4})
+
+    assert len(index) == 2
+    assert index.lookup("wind turbine maintenance") == (0.0, None)
+    assert index.get("solar panel efficiency") == {"n": 3}
+    assert index._postings.get("wind") is None
+
+
+def test_similarity_index_expires_entries():
+    index = ResearchSimilarityIndex(ttl_seconds=0.05)
+    index.add("solar panel efficiency", {"n": 1})
+    assert index.lookup("solar panel efficiency") == (1.0, "solar panel efficiency")
+
+    time.sleep(0.1)
+    index.add("tidal power generation", {"n": 2})
+
+    assert len(index) == 1
+    assert index.get("solar panel efficiency") is None
+    assert index.lookup("solar panel efficiency") == (0.0, None)
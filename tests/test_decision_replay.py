@@ -0,0 +1,108 @@
+"""Behavior tests for concurrent, budgeted decision replay batches"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("sklearn")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "chain-of-debate"))
+
+from decision_replay import DecisionReplaySystem, ReplayBudget
+
+
+def make_system(max_batches=200, delay=0.02, cost=1.0):
+    system = DecisionReplaySystem(max_batches=max_batches)
+    executed = []
+
+    async def execute(replay):
+        executed.append(replay.original_input)
+        await asyncio.sleep(delay)
+        replay.replay_output = f"replayed {replay.original_input}"
+        replay.replay_cost = cost
+        replay.replay_tokens = 10
+        replay.replay_duration = delay
+        return {}
+
+    async def current_config():
+        return {"models": ["test"]}
+
+    system._execute_replay = execute
+    system._get_current_system_config = current_config
+    return system, executed
+
+
+def decisions(inputs):
+    return {f"t{i}": {"input": text, "output": "original", "cost": 2.0} for i, text in enumerate(inputs)}
+
+
+def wait_for_batch(system, batch_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = system.get_batch_status(batch_id)
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"batch {batch_id} did not finish")
+
+
+def test_identical_inputs_are_replayed_once():
+    system, executed = make_system()
+    batch = decisions(["same", "same", "same", "other"])
+
+    status = asyncio.run(system.replay_batch(list(batch), decisions=batch))
+
+    assert sorted(executed) == ["other", "same"]
+    assert status["aggregate"]["completed"] == 4
+    assert status["aggregate"]["memoized"] == 2
+    assert status["aggregate"]["spent_cost"] == 2.0
+
+
+def test_cost_budget_stops_new_replays():
+    system, executed = make_system(cost=1.0)
+    batch = decisions([f"input {n}" for n in range(6)])
+
+    status = asyncio.run(system.replay_batch(
+        list(batch), decisions=batch, budget=ReplayBudget(max_concurrency=1, max_cost=3.0)
+    ))
+
+    assert len(executed) == 3
+    assert status["aggregate"]["skipped"] == 3
+
+
+def test_submitted_batch_outlives_the_callers_loop():
+    system, executed = make_system()
+    batch = decisions(["a", "b"])
+
+    async def view():
+        return system.submit_batch(list(batch), decisions=batch)
+
+    try:
+        batch_id = asyncio.run(view())  # The caller's loop is closed right away
+        status = wait_for_batch(system, batch_id)
+        assert status["status"] == "completed"
+        assert sorted(executed) == ["a", "b"]
+    finally:
+        system.shutdown()
+
+
+def test_batch_history_is_bounded():
+    system, _ = make_system(max_batches=2)
+    batch = decisions(["a"])
+
+    try:
+        batch_ids = [system.submit_batch(list(batch), decisions=batch, force_replay=True) for _ in range(4)]
+        for batch_id in batch_ids:
+            if system.get_batch_status(batch_id) is not None:
+                wait_for_batch(system, batch_id)
+        last_id = system.submit_batch(list(batch), decisions=batch, force_replay=True)
+        # Only finished batches are evicted: the running one is always kept
+        assert len(system.replay_batches) <= 3
+        assert system.get_batch_status(last_id) is not None
+        wait_for_batch(system, last_id)
+    finally:
+        system.shutdown()
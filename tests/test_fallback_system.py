@@ -0,0 +1,98 @@
+"""Behavior tests for fan-out, hedged and cost-capped fallback execution"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "langgraph-studio"))
+
+from utils.fallback_system import FallbackManager
+
+
+class FakeService:
+    def __init__(self, delay: float, succeed: bool = True):
+        self.delay = delay
+        self.succeed = succeed
+        self.started_at = None
+
+    async def execute(self, operation, *args, **kwargs):
+        self.started_at = time.monotonic()
+        await asyncio.sleep(self.delay)
+        if not self.succeed:
+            raise RuntimeError("service failed")
+        return self.delay
+
+
+def make_manager(services, default_hedge_delay=0.1):
+    manager = FallbackManager(default_hedge_delay=default_hedge_delay)
+    for priority, (name, service, cost) in enumerate(reversed(services), start=1):
+        manager.register_service(name, service, priority=priority, cost_per_call=cost)
+    return manager
+
+
+def fan_out(manager, ranked, hedged, cost_budget=None):
+    async def main():
+        start = time.monotonic()
+        result = await manager._execute_fan_out(ranked, "op", (), {}, hedged=hedged, cost_budget=cost_budget)
+        return result, time.monotonic() - start
+    return asyncio.run(main())
+
+
+def test_race_returns_fastest_success():
+    slow, fast, broken = FakeService(0.3), FakeService(0.02), FakeService(0.01, succeed=False)
+    manager = make_manager([("slow", slow, 0.0), ("fast", fast, 0.0), ("broken", broken, 0.0)])
+
+    result, elapsed = fan_out(manager, ["slow", "fast", "broken"], hedged=False)
+
+    assert result["success"] and result["service_used"] == "fast"
+    assert elapsed < 0.2
+
+
+def test_hedge_starts_next_service_after_delay():
+    slow, fast = FakeService(1.0), FakeService(0.02)
+    manager = make_manager([("slow", slow, 0.0), ("fast", fast, 0.0)])
+
+    result, elapsed = fan_out(manager, ["slow", "fast"], hedged=True)
+
+    assert result["service_used"] == "fast"
+    assert result["hedges"] == 1
+    assert 0.08 <= fast.started_at - slow.started_at < 0.2
+    assert elapsed < 0.5
+
+
+def test_failure_of_older_call_does_not_postpone_hedge():
+    # a is slow, b fails quickly and c is launched at once; d must then start
+    # one hedge delay after c, not after b's failure plus a fresh delay
+    a, b, c, d = FakeService(1.0), FakeService(0.05, succeed=False), FakeService(1.0), FakeService(0.01)
+    manager = make_manager([("a", a, 0.0), ("b", b, 0.0), ("c", c, 0.0), ("d", d, 0.0)])
+
+    result, _ = fan_out(manager, ["a", "b", "c", "d"], hedged=True)
+
+    assert result["service_used"] == "d"
+    assert 0.08 <= d.started_at - c.started_at < 0.2
+
+
+def test_cost_budget_skips_expensive_services():
+    cheap_broken, expensive, cheap = FakeService(0.01, succeed=False), FakeService(0.01), FakeService(0.01)
+    manager = make_manager([("cheap_broken", cheap_broken, 1.0), ("expensive", expensive, 5.0), ("cheap", cheap, 1.0)])
+
+    result, _ = fan_out(manager, ["cheap_broken", "expensive", "cheap"], hedged=True, cost_budget=2.5)
+
+    assert result["service_used"] == "cheap"
+    assert result["services_tried"] == ["cheap_broken", "cheap"]
+    assert result["cost_spent"] == 2.0
+
+
+def test_hedge_delay_uses_default_without_samples():
+    manager = make_manager([("svc", FakeService(0.01), 0.0)], default_hedge_delay=0.25)
+    assert manager.hedge_delay("svc") == 0.25
+
+    for _ in range(manager.min_hedge_samples):
+        manager._record_success("svc", 0.6)
+    assert 0.5 <= manager.hedge_delay("svc") <= 0.75
+
+    # Samples older than the window age are expired before counting
+    window = manager.service_windows["svc"]
+    window.samples = type(window.samples)((ts - window.max_age - 1, *rest) for ts, *rest in window.samples)
+    assert manager.hedge_delay("svc") == 0.25
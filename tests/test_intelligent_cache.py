@@ -0,0 +1,122 @@
+"""Behavior tests for single-flight node caching and the cache journal"""
+
+import asyncio
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "langgraph-studio"))
+
+from utils.intelligent_cache import CacheEntry, IntelligentCache, cached_node
+
+
+def test_concurrent_sync_calls_run_the_node_once():
+    cache = IntelligentCache()
+    calls = []
+
+    @cached_node(cache=cache, verbose=False)
+    def node(state):
+        calls.append(state["q"])
+        time.sleep(0.1)
+        return {"answer": state["q"]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(node({"q": 1}))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [{"answer": 1}] * 10
+    assert cache.get_stats()["coalesced"] == 9
+
+
+def test_concurrent_async_calls_run_the_node_once():
+    cache = IntelligentCache()
+    calls = []
+
+    @cached_node(cache=cache, verbose=False)
+    async def node(state):
+        calls.append(state["q"])
+        await asyncio.sleep(0.05)
+        return {"answer": state["q"]}
+
+    async def main():
+        return await asyncio.gather(*(node({"q": 2}) for _ in range(10)))
+
+    assert asyncio.run(main()) == [{"answer": 2}] * 10
+    assert calls == [2]
+
+
+def test_failure_is_shared_and_not_cached():
+    cache = IntelligentCache()
+    calls = []
+
+    @cached_node(cache=cache, verbose=False)
+    def node(state):
+        calls.append(1)
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    errors = []
+
+    def run():
+        try:
+            node({"q": 1})
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 5
+    assert len(calls) == 1
+    assert cache.get_stats()["in_flight"] == 0
+
+    with pytest.raises(ValueError):
+        node({"q": 1})
+    assert len(calls) == 2
+
+
+def test_follower_survives_cancelled_leader():
+    cache = IntelligentCache()
+
+    @cached_node(cache=cache, verbose=False)
+    async def node(state):
+        await asyncio.sleep(0.1)
+        return {"answer": 7}
+
+    async def main():
+        leader = asyncio.create_task(node({"q": 4}))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(node({"q": 4}))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == {"answer": 7}
+
+
+def test_journal_persists_entries_and_drops_legacy_snapshot(tmp_path):
+    path = str(tmp_path / "cache.pkl")
+    legacy = CacheEntry("old", time.time(), 0, time.time(), "h", "node")
+    with open(path, "wb") as f:
+        pickle.dump({"cache": {"0" * 64: legacy}, "stats": {}}, f)
+
+    cache = IntelligentCache(persistence_path=path)
+    assert len(cache) == 0
+
+    cache.set("node", {"q": 1}, {"answer": 1})
+    cache._save_cache()
+
+    reloaded = IntelligentCache(persistence_path=path)
+    assert len(reloaded) == 1
+    assert reloaded.get("node", {"q": 1}) == {"answer": 1}
@@ -0,0 +1,91 @@
+"""Behavior tests for the knowledge tree WAL, compaction and version reconstruction"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "context-builder-agent"))
+
+from knowledge_tree_store import KnowledgeTreeStore
+
+BASE_TREE = {
+    "version": "1.0.0",
+    "metadata": {"avg_confidence": 0.8},
+    "domains": {
+        "ORGANIZACION": {
+            "fields": {
+                "nombre_empresa": {"value": "Acme", "confidence": 0.8}
+            }
+        }
+    }
+}
+
+
+@pytest.fixture
+def tree_path(tmp_path):
+    path = tmp_path / "knowledge_tree.yaml"
+    path.write_text(yaml.dump(BASE_TREE))
+    return str(path)
+
+
+def open_store(tree_path, **kwargs):
+    store = KnowledgeTreeStore(tree_path, compact_after_seconds=3600, **kwargs)
+    store.load()
+    return store
+
+
+def test_wal_replay_restores_uncompacted_commits(tree_path):
+    store = open_store(tree_path)
+    store.update_field("ORGANIZACION", "nombre_empresa", {"value": "Acme Corp"}, "1.0.1")
+    store.update_field("ORGANIZACION", "sector", {"value": "retail", "confidence": 0.6}, "1.0.2")
+    expected_hash = store.context_hash
+
+    # Nothing was compacted: the YAML file still holds the base tree
+    assert yaml.safe_load(Path(tree_path).read_text())["version"] == "1.0.0"
+
+    reloaded = open_store(tree_path)
+    assert reloaded.version == "1.0.2"
+    assert reloaded.context_hash == expected_hash
+    assert reloaded.tree["domains"]["ORGANIZACION"]["fields"]["nombre_empresa"]["value"] == "Acme Corp"
+    assert reloaded.has_version("1.0.1")
+
+
+def test_truncated_wal_tail_is_ignored(tree_path):
+    store = open_store(tree_path)
+    store.update_field("ORGANIZACION", "nombre_empresa", {"value": "Acme Corp"}, "1.0.1")
+    with open(store.wal_path, "a", encoding="utf-8") as wal:
+        wal.write('{"version": "1.0.2", "chan')
+
+    reloaded = open_store(tree_path)
+    assert reloaded.version == "1.0.1"
+
+
+def test_compaction_rewrites_tree_and_truncates_wal(tree_path):
+    store = open_store(tree_path, compact_every=2)
+    store.update_field("ORGANIZACION", "nombre_empresa", {"value": "Acme Corp"}, "1.0.1")
+    assert store.get_stats()["pending_deltas"] == 1
+
+    store.update_field("ORGANIZACION", "nombre_empresa", {"value": "Acme Inc"}, "1.0.2")
+    assert store.metrics["compactions"] == 1
+    assert Path(store.wal_path).read_text() == ""
+    on_disk = yaml.safe_load(Path(tree_path).read_text())
+    assert on_disk["version"] == "1.0.2"
+    assert on_disk["context_hash"] == store.context_hash
+
+    reloaded = open_store(tree_path)
+    assert reloaded.tree == store.tree
+
+
+def test_reconstruct_past_versions_from_checkpoints(tree_path):
+    store = open_store(tree_path, checkpoint_interval=3)
+    snapshots = {}
+    for n in range(1, 8):
+        version = f"1.0.{n}"
+        store.update_field("ORGANIZACION", "nombre_empresa", {"value": f"Acme {n}"}, version)
+        snapshots[version] = yaml.safe_load(yaml.dump(store.tree))
+
+    for version, snapshot in snapshots.items():
+        assert store.reconstruct(version) == snapshot
+    assert store.reconstruct("9.9.9") is None
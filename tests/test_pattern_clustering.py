@@ -0,0 +1,80 @@
+"""Behavior tests for the incremental leader clusterer (chain-of-debate)"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "chain-of-debate"))
+
+from pattern_clustering import IncrementalClusterer
+
+
+def greedy_clusters(vectors, threshold):
+    """Reference: join the first earlier leader with cosine >= threshold"""
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    leaders, members = [], []
+    for index, vector in enumerate(normalized):
+        for cluster, leader in enumerate(leaders):
+            if float(vector @ leader) >= threshold:
+                members[cluster].append(index)
+                break
+        else:
+            leaders.append(vector)
+            members.append([index])
+    return members
+
+
+def test_matches_greedy_clustering_across_blocks():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(5, 16))
+    vectors = np.repeat(centers, 20, axis=0) + rng.normal(scale=0.05, size=(100, 16))
+    rng.shuffle(vectors)
+
+    clusterer = IncrementalClusterer(threshold=0.9, block_size=7, initial_capacity=2)
+    clusterer.add_many(list(range(len(vectors))), vectors)
+
+    assert clusterer.clusters(min_size=1) == greedy_clusters(vectors, 0.9)
+
+
+def test_incremental_adds_equal_one_batch():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(60, 8))
+
+    batch = IncrementalClusterer(threshold=0.5)
+    batch.add_many(list(range(60)), vectors)
+
+    incremental = IncrementalClusterer(threshold=0.5)
+    for start in range(0, 60, 13):
+        incremental.add_many(list(range(start, min(start + 13, 60))), vectors[start:start + 13])
+
+    assert incremental.clusters(min_size=1) == batch.clusters(min_size=1)
+
+
+def test_known_items_keep_their_cluster():
+    clusterer = IncrementalClusterer(threshold=0.9)
+    first = clusterer.add("a", [1.0, 0.0])
+    assert clusterer.add("a", [0.0, 1.0]) == first
+    assert len(clusterer) == 1
+
+
+def test_dimension_change_gets_its_own_leaders():
+    clusterer = IncrementalClusterer(threshold=0.9)
+    old = clusterer.add_many(["a", "b"], [[1.0, 0.0, 0.0], [1.0, 0.0, 0.01]])
+    mixed = clusterer.add_many(["c", "d"], [[1.0, 0.0], [1.0, 0.0, 0.0]])
+
+    assert old == [0, 0]
+    assert mixed[1] == 0           # Same dimension: joins the existing cluster
+    assert mixed[0] != 0           # New dimension: never compared with 3-d leaders
+    assert clusterer.get_stats()["dimensions"] == [2, 3]
+    assert clusterer.clusters() == [["a", "b", "d"]]
+
+
+def test_retain_forgets_removed_items():
+    clusterer = IncrementalClusterer(threshold=0.9)
+    clusterer.add_many(["a", "b", "c"], [[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]])
+
+    assert clusterer.retain({"b", "c"}) == 1
+    assert "a" not in clusterer
+    assert clusterer.clusters(min_size=1) == [["b"], ["c"]]
+    assert clusterer.stale_ratio == 0.5
@@ -0,0 +1,157 @@
+"""Behavior tests for the event-driven priority task scheduler"""
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "chain-of-debate"))
+
+from task_scheduler import PriorityTaskScheduler
+
+
+@dataclass
+class Destination:
+    destination_id: str
+    load_score: float = 0.0
+
+
+@dataclass
+class Decision:
+    destination: Destination
+    routing_reason: str = "test"
+    fallback_destinations: List[Destination] = field(default_factory=list)
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=5))
+
+
+def test_priority_order_with_one_worker():
+    order = []
+    destination = Destination("d")
+
+    async def route(payload):
+        return Decision(destination)
+
+    async def execute(payload, decision):
+        order.append(payload)
+
+    async def main():
+        scheduler = PriorityTaskScheduler(route, execute, workers=1)
+        for task_id, priority in (("low", 4), ("critical", 1), ("normal", 3)):
+            await scheduler.enqueue(task_id, priority, task_id)
+        scheduler.start()
+        while scheduler.metrics["completed"] < 3:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+    run(main())
+    assert order == ["critical", "normal", "low"]
+
+
+def test_full_destination_does_not_hold_workers():
+    slow, fast = Destination("slow"), Destination("fast")
+    routed, finished = [], {}
+
+    async def route(payload):
+        routed.append(payload)
+        return Decision(slow if payload.startswith("slow") else fast)
+
+    async def execute(payload, decision):
+        await asyncio.sleep(0.1 if decision.destination is slow else 0.001)
+        finished[payload] = time.monotonic()
+
+    async def main():
+        scheduler = PriorityTaskScheduler(route, execute, workers=2, base_destination_limit=1)
+        scheduler.start()
+        for n in range(3):
+            await scheduler.enqueue(f"slow{n}", 1, f"slow{n}")
+        for n in range(3):
+            await scheduler.enqueue(f"fast{n}", 1, f"fast{n}")
+        await asyncio.sleep(0.05)
+        # The slow destination only admits one task; the others are parked
+        assert {"fast0", "fast1", "fast2"} <= set(finished)
+        assert scheduler.get_metrics()["parked_tasks"] == 2
+        while scheduler.metrics["completed"] < 6:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+    run(main())
+    assert sorted(routed) == sorted(set(routed))  # Parked tasks are not routed again
+    assert finished["slow0"] < finished["slow1"] < finished["slow2"]
+
+
+def test_spills_to_fallback_with_capacity():
+    primary, fallback = Destination("primary"), Destination("fallback")
+    used = []
+
+    async def route(payload):
+        return Decision(primary, fallback_destinations=[fallback])
+
+    async def execute(payload, decision):
+        used.append(decision.destination.destination_id)
+        await asyncio.sleep(0.05)
+
+    async def main():
+        scheduler = PriorityTaskScheduler(route, execute, workers=2, base_destination_limit=1)
+        scheduler.start()
+        await scheduler.enqueue("a", 1, "a")
+        await scheduler.enqueue("b", 1, "b")
+        while scheduler.metrics["completed"] < 2:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return scheduler.metrics["spilled_to_fallback"]
+
+    assert run(main()) == 1
+    assert sorted(used) == ["fallback", "primary"]
+
+
+def test_tasks_expire_at_their_deadline():
+    expired = []
+
+    async def route(payload):
+        return Decision(Destination("d"))
+
+    async def execute(payload, decision):
+        raise AssertionError("expired task executed")
+
+    async def main():
+        scheduler = PriorityTaskScheduler(route, execute, on_expired=expired.append, workers=1)
+        await scheduler.enqueue("late", 1, "late", deadline=time.time() + 0.05)
+        scheduler._expiry_task = asyncio.create_task(scheduler._expire_loop())  # No workers
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+        return scheduler.depth
+
+    assert run(main()) == 0
+    assert expired == ["late"]
+
+
+def test_parked_tasks_still_expire():
+    destination = Destination("d")
+    expired, executed = [], []
+
+    async def route(payload):
+        return Decision(destination)
+
+    async def execute(payload, decision):
+        executed.append(payload)
+        await asyncio.sleep(0.2)
+
+    async def main():
+        scheduler = PriorityTaskScheduler(route, execute, on_expired=expired.append,
+                                          workers=2, base_destination_limit=1)
+        scheduler.start()
+        await scheduler.enqueue("running", 1, "running")
+        await scheduler.enqueue("parked", 1, "parked", deadline=time.time() + 0.05)
+        while scheduler.metrics["completed"] < 1:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    run(main())
+    assert executed == ["running"]
+    assert expired == ["parked"]